@@ -0,0 +1,106 @@
+"""Throughput of the sync Session vs the AsyncSession on DATABASE_URL.
+
+Each mode runs the same workload from concurrent coroutines: reading a chat
+page and inserting a notification. "sync" calls the blocking Session from the
+coroutine, which is what the async handlers did before; "async" awaits the
+asyncpg/aiosqlite driver. Point DATABASE_URL at a local Postgres for numbers
+that matter; SQLite serializes writers and only shows the overhead.
+
+    python scripts/benchmark_db.py --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+sys.path.append(str(BASE_DIR / 'src'))
+
+from sqlalchemy import delete, select
+
+from api.models import MensajeCorrectivo, Notificacion_Correctivo
+from config.database import ASYNC_DATABASE_URL, DATABASE_URL, AsyncSessionLocal, SessionLocal, async_engine
+
+# Ids fuera del rango real para poder limpiar lo que genera el benchmark.
+MANTENIMIENTO_ID = 999_999_000
+FIREBASE_UID = "benchmark-db"
+
+
+def _sembrar_chat(mensajes: int):
+    with SessionLocal() as db:
+        db.add_all(
+            MensajeCorrectivo(firebase_uid=FIREBASE_UID, nombre_usuario="Benchmark", id_mantenimiento=MANTENIMIENTO_ID, texto=str(i))
+            for i in range(mensajes)
+        )
+        db.commit()
+
+
+def _limpiar():
+    with SessionLocal() as db:
+        db.execute(delete(MensajeCorrectivo).where(MensajeCorrectivo.id_mantenimiento == MANTENIMIENTO_ID))
+        db.execute(delete(Notificacion_Correctivo).where(Notificacion_Correctivo.firebase_uid == FIREBASE_UID))
+        db.commit()
+
+
+def _consulta_chat(limit: int):
+    return (
+        select(MensajeCorrectivo)
+        .where(MensajeCorrectivo.id_mantenimiento == MANTENIMIENTO_ID)
+        .order_by(MensajeCorrectivo.created_at.desc(), MensajeCorrectivo.id.desc())
+        .limit(limit)
+    )
+
+
+async def _sync_op(i: int, limit: int):
+    with SessionLocal() as db:
+        if i % 2:
+            db.scalars(_consulta_chat(limit)).all()
+        else:
+            db.add(Notificacion_Correctivo(firebase_uid=FIREBASE_UID, id_mantenimiento=MANTENIMIENTO_ID, mensaje=str(i)))
+            db.commit()
+
+
+async def _async_op(i: int, limit: int):
+    async with AsyncSessionLocal() as db:
+        if i % 2:
+            (await db.scalars(_consulta_chat(limit))).all()
+        else:
+            db.add(Notificacion_Correctivo(firebase_uid=FIREBASE_UID, id_mantenimiento=MANTENIMIENTO_ID, mensaje=str(i)))
+            await db.commit()
+
+
+async def _correr(op, requests: int, concurrency: int, limit: int) -> float:
+    semaforo = asyncio.Semaphore(concurrency)
+
+    async def _una(i: int):
+        async with semaforo:
+            await op(i, limit)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_una(i) for i in range(requests)))
+    return time.perf_counter() - inicio
+
+
+async def main(requests: int, concurrency: int, limit: int):
+    print(f"sync:  {DATABASE_URL}")
+    print(f"async: {ASYNC_DATABASE_URL}")
+    for modo, op in (("sync", _sync_op), ("async", _async_op)):
+        duracion = await _correr(op, requests, concurrency, limit)
+        print(f"{modo:>5}: {requests} operaciones en {duracion:.2f}s -> {requests / duracion:.0f} ops/s")
+    await async_engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--mensajes", type=int, default=500, help="Mensajes de chat sembrados para las lecturas")
+    parser.add_argument("--limit", type=int, default=100, help="Tamaño de página de chat leída")
+    args = parser.parse_args()
+    _sembrar_chat(args.mensajes)
+    try:
+        asyncio.run(main(args.requests, args.concurrency, args.limit))
+    finally:
+        _limpiar()
@@ -0,0 +1,58 @@
+"""Cold start of one worker: importing the app and running its lifespan startup.
+
+Each run is a fresh interpreter, like a new gunicorn worker. "arranque" is the
+current startup; "auto-migrate" adds the schema step (create_all + migrations)
+that every worker used to pay on import, for comparison.
+
+    python scripts/benchmark_startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = BASE_DIR / 'src'
+
+# TESTING evita el worker de Sheets y Firebase: se mide solo lo que hace el proceso al arrancar.
+MEDICION = """
+import asyncio, time
+inicio = time.perf_counter()
+from api.routes import app, lifespan
+importado = time.perf_counter()
+async def _arrancar():
+    async with lifespan(app):
+        return time.perf_counter()
+listo = asyncio.run(_arrancar())
+print(importado - inicio, listo - inicio)
+"""
+
+
+def _medir(auto_migrate: bool):
+    env = {**os.environ, "TESTING": "true", "DB_AUTO_MIGRATE": "true" if auto_migrate else "false"}
+    salida = subprocess.run(
+        [sys.executable, "-c", MEDICION], cwd=SRC_DIR, env=env, check=True, capture_output=True, text=True
+    ).stdout.split()
+    return float(salida[-2]), float(salida[-1])
+
+
+def main(runs: int):
+    print(f"DATABASE_URL: {os.getenv('DATABASE_URL', 'env.config / sqlite:///./test.db')}")
+    resultados = {}
+    for modo, auto_migrate in (("arranque", False), ("auto-migrate", True)):
+        medidas = [_medir(auto_migrate) for _ in range(runs)]
+        importacion = statistics.median(m[0] for m in medidas)
+        total = statistics.median(m[1] for m in medidas)
+        resultados[modo] = total
+        print(f"{modo:>12}: import {importacion * 1000:.0f} ms, listo en {total * 1000:.0f} ms (mediana de {runs})")
+    ahorro = resultados["auto-migrate"] - resultados["arranque"]
+    print(f"Ahorro por worker: {ahorro * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    main(args.runs)
@@ -0,0 +1,22 @@
+import os
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+sys.path.append(str(BASE_DIR / 'src'))
+
+from services.gcloud_storage import delete_folder_markers
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--dry-run']
+    dry_run = '--dry-run' in sys.argv[1:]
+    prefix = args[0] if args else ''
+    bucket_name = os.getenv('GOOGLE_CLOUD_BUCKET_NAME')
+    if not bucket_name:
+        sys.exit('GOOGLE_CLOUD_BUCKET_NAME no está configurado')
+    nombres = delete_folder_markers(bucket_name, prefix, dry_run=dry_run)
+    for nombre in nombres:
+        print(nombre)
+    accion = 'encontrados' if dry_run else 'eliminados'
+    print(f"Marcadores de carpeta {accion}: {len(nombres)}")
@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+sys.path.append(str(BASE_DIR / 'src'))
+
+from config.database import SessionLocal
+from services.sheet_export import export_sheet
+from services.sheet_outbox import MODELOS
+
+if __name__ == '__main__':
+    tipos = sys.argv[1:] or list(MODELOS)
+    for tipo in tipos:
+        if tipo not in MODELOS:
+            sys.exit(f"Tipo desconocido: {tipo} (usar {', '.join(MODELOS)})")
+    with SessionLocal() as session:
+        for tipo in tipos:
+            total = export_sheet(session, tipo)
+            print(f"Planilla {tipo} reconstruida: {total} filas")
@@ -0,0 +1,28 @@
+import os
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+sys.path.append(str(BASE_DIR / 'src'))
+
+from api.models import MantenimientoCorrectivoFoto, MantenimientoPreventivoFoto
+from config.database import SessionLocal
+from services.gcloud_storage import ensure_photo_variants
+
+if __name__ == '__main__':
+    bucket_name = os.getenv('GOOGLE_CLOUD_BUCKET_NAME')
+    if not bucket_name:
+        sys.exit('GOOGLE_CLOUD_BUCKET_NAME no está configurado')
+    prefijo = f"https://storage.googleapis.com/{bucket_name}/"
+    creadas = 0
+    with SessionLocal() as session:
+        for model in (MantenimientoCorrectivoFoto, MantenimientoPreventivoFoto):
+            for (url,) in session.query(model.url).yield_per(500):
+                if not url.startswith(prefijo):
+                    continue
+                try:
+                    creadas += ensure_photo_variants(bucket_name, url[len(prefijo):])
+                except Exception as exc:
+                    print(f"Error en {url}: {exc}")
+    print(f"Variantes generadas para {creadas} fotos")
@@ -0,0 +1,11 @@
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+sys.path.append(str(BASE_DIR / 'src'))
+
+from migrate import migrate
+
+if __name__ == '__main__':
+    migrate(crear_admin='--sin-admin' not in sys.argv)
@@ -0,0 +1,14 @@
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+sys.path.append(str(BASE_DIR / 'src'))
+
+from config.database import SessionLocal
+from services.rollups import rebuild_rollups
+
+if __name__ == '__main__':
+    with SessionLocal() as session:
+        total = rebuild_rollups(session)
+    print(f"Rollup diario reconstruido: {total} filas")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Text, DateTime, func, Boolean
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Text, DateTime, func, Boolean, Index, UniqueConstraint, literal_column
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import declarative_base
 from datetime import datetime
@@ -6,6 +6,14 @@ from zoneinfo import ZoneInfo
 
 Base = declarative_base()
 
+
+def _indice_fecha_id(nombre, model):
+    # Keyset de los listados paginados: ORDER BY fecha_apertura DESC NULLS LAST, id DESC es el
+    # recorrido inverso de (fecha_apertura NULLS FIRST, id). SQLite ya ordena los NULL primero
+    # y no acepta NULLS FIRST en CREATE INDEX.
+    Index(nombre, model.fecha_apertura.asc().nulls_first(), model.id).ddl_if(dialect="postgresql")
+    Index(nombre, model.fecha_apertura, model.id).ddl_if(dialect="sqlite")
+
 class Zona(Base):
     __tablename__ = "zona"
     id = Column(Integer, primary_key=True)
@@ -27,7 +35,7 @@ class Sucursal(Base):
     zona = Column(String)
     direccion = Column(String)
     superficie = Column(String)
-    cliente_id = Column(Integer, ForeignKey("cliente.id"), nullable=False)
+    cliente_id = Column(Integer, ForeignKey("cliente.id"), nullable=False, index=True)
     frecuencia_preventivo = Column(String, nullable=True)
     
     cliente = relationship("Cliente", back_populates="sucursales")
@@ -51,6 +59,7 @@ class Cuadrilla(Base):
 
 class MantenimientoPreventivo(Base):
     __tablename__ = "mantenimiento_preventivo"
+    __table_args__ = (Index("ix_mantenimiento_preventivo_sucursal_fecha", "sucursal_id", "fecha_apertura"),)
     id = Column(Integer, primary_key=True)
     cliente_id = Column(Integer, ForeignKey("cliente.id"), nullable=False)
     sucursal_id = Column(Integer, ForeignKey("sucursal.id"), nullable=False)
@@ -69,17 +78,19 @@ class MantenimientoPreventivo(Base):
     mensaje_preventivo = relationship("MensajePreventivo", backref="mantenimiento")
     planillas = relationship("MantenimientoPreventivoPlanilla", backref="mantenimiento")
     fotos = relationship("MantenimientoPreventivoFoto", backref="mantenimiento")
-    
+
+_indice_fecha_id("ix_mantenimiento_preventivo_fecha_id", MantenimientoPreventivo)
+
 class MantenimientoPreventivoPlanilla(Base):
     __tablename__ = "mantenimiento_preventivo_planilla"
     id = Column(Integer, primary_key=True)
-    mantenimiento_id = Column(Integer, ForeignKey("mantenimiento_preventivo.id"))
+    mantenimiento_id = Column(Integer, ForeignKey("mantenimiento_preventivo.id"), index=True)
     url = Column(String, nullable=False)
 
 class MantenimientoPreventivoFoto(Base):
     __tablename__ = "mantenimiento_preventivo_foto"
     id = Column(Integer, primary_key=True)
-    mantenimiento_id = Column(Integer, ForeignKey("mantenimiento_preventivo.id"))
+    mantenimiento_id = Column(Integer, ForeignKey("mantenimiento_preventivo.id"), index=True)
     url = Column(String, nullable=False)
 
 class MantenimientoCorrectivo(Base):
@@ -106,22 +117,90 @@ class MantenimientoCorrectivo(Base):
     mensaje_correctivo = relationship("MensajeCorrectivo", backref="mantenimiento")
     fotos = relationship("MantenimientoCorrectivoFoto", backref="mantenimiento")
 
+_indice_fecha_id("ix_mantenimiento_correctivo_fecha_id", MantenimientoCorrectivo)
+
 class MantenimientoCorrectivoFoto(Base):
     __tablename__ = "mantenimiento_correctivo_foto"
     id = Column(Integer, primary_key=True)
-    mantenimiento_id = Column(Integer, ForeignKey("mantenimiento_correctivo.id"))
+    mantenimiento_id = Column(Integer, ForeignKey("mantenimiento_correctivo.id"), index=True)
     url = Column(String, nullable=False)
 
+class MantenimientoRollupDiario(Base):
+    __tablename__ = "mantenimiento_rollup_diario"
+    __table_args__ = (Index("ix_rollup_tipo_dia", "tipo", "dia"),)
+
+    id = Column(Integer, primary_key=True)
+    dia = Column(Date, nullable=False)
+    zona = Column(String, nullable=True)
+    id_cuadrilla = Column(Integer, nullable=True)
+    cliente_id = Column(Integer, nullable=False)
+    tipo = Column(String, nullable=False)  # "correctivo" o "preventivo"
+    cantidad = Column(Integer, nullable=False, default=0)
+    cerrados = Column(Integer, nullable=False, default=0)
+    dias_resolucion = Column(Integer, nullable=False, default=0)  # suma de días apertura-cierre de los cerrados
+
+# Un bucket por (tipo, dia, cliente_id, zona, id_cuadrilla). zona e id_cuadrilla pueden ser NULL y los NULL
+# no chocan en un índice único, por eso el coalesce; rollups._aplicar usa la misma clave en ON CONFLICT.
+CLAVE_BUCKET_ROLLUP = (
+    MantenimientoRollupDiario.tipo,
+    MantenimientoRollupDiario.dia,
+    MantenimientoRollupDiario.cliente_id,
+    func.coalesce(MantenimientoRollupDiario.zona, literal_column("''")),
+    func.coalesce(MantenimientoRollupDiario.id_cuadrilla, literal_column("0")),
+)
+Index("ux_rollup_bucket", *CLAVE_BUCKET_ROLLUP, unique=True)
+
+class SheetSyncOutbox(Base):
+    __tablename__ = "sheet_sync_outbox"
+    __table_args__ = (Index("ix_sheet_sync_outbox_estado_proximo", "estado", "proximo_intento"),)
+
+    id = Column(Integer, primary_key=True)
+    tipo = Column(String, nullable=False)  # "correctivo" o "preventivo"
+    operacion = Column(String, nullable=False)  # "append", "update" o "delete"
+    mantenimiento_id = Column(Integer, nullable=False, index=True)
+    estado = Column(String, nullable=False, default="pendiente")  # "pendiente" o "fallido"
+    intentos = Column(Integer, nullable=False, default=0)
+    proximo_intento = Column(DateTime, nullable=False, default=datetime.utcnow)
+    procesando_hasta = Column(DateTime, nullable=True)  # lease del drainer que reclamó el job
+    reclamado_por = Column(String, nullable=True)
+    ultimo_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+class SheetRowIndex(Base):
+    __tablename__ = "sheet_row_index"
+    __table_args__ = (
+        UniqueConstraint("tipo", "mantenimiento_id", name="uq_sheet_row_index_mantenimiento"),
+        Index("ix_sheet_row_index_tipo_fila", "tipo", "fila"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tipo = Column(String, nullable=False)  # "correctivo" o "preventivo"
+    mantenimiento_id = Column(Integer, nullable=False)
+    fila = Column(Integer, nullable=False)  # fila 1-based en la hoja
+
+class SheetIndexEstado(Base):
+    __tablename__ = "sheet_index_estado"
+
+    tipo = Column(String, primary_key=True)  # "correctivo" o "preventivo"
+    # Última lectura completa de la columna de tracking; NULL si el índice de filas no es confiable.
+    reconciliado_en = Column(DateTime, nullable=True)
+    # Lease de export_sheet: mientras no venza, los drainers no tocan esta hoja.
+    exportando_hasta = Column(DateTime, nullable=True)
+
 class Usuario(Base):
     __tablename__ = "usuario"
     id = Column(Integer, primary_key=True)
     nombre = Column(String)
     email = Column(String, unique=True, nullable=False)
-    rol = Column(String)
+    rol = Column(String, index=True)
     firebase_uid = Column(String, unique=True, nullable=True)  # ID de Firebase
 
 class CorrectivoSeleccionado(Base):
     __tablename__ = "correctivo_seleccionado"
+    __table_args__ = (
+        Index("ix_correctivo_seleccionado_cuadrilla_mantenimiento", "id_cuadrilla", "id_mantenimiento"),
+        Index("ix_correctivo_seleccionado_cuadrilla_sucursal", "id_cuadrilla", "id_sucursal"),
+    )
     id = Column(Integer, primary_key=True)
     id_cuadrilla = Column(Integer, ForeignKey("cuadrilla.id"))
     id_mantenimiento = Column(Integer, ForeignKey("mantenimiento_correctivo.id"))
@@ -133,6 +212,10 @@ class CorrectivoSeleccionado(Base):
     
 class PreventivoSeleccionado(Base):
     __tablename__ = "preventivo_seleccionado"
+    __table_args__ = (
+        Index("ix_preventivo_seleccionado_cuadrilla_mantenimiento", "id_cuadrilla", "id_mantenimiento"),
+        Index("ix_preventivo_seleccionado_cuadrilla_sucursal", "id_cuadrilla", "id_sucursal"),
+    )
     id = Column(Integer, primary_key=True)
     id_cuadrilla = Column(Integer, ForeignKey("cuadrilla.id"))
     id_mantenimiento = Column(Integer, ForeignKey("mantenimiento_preventivo.id"))
@@ -146,7 +229,7 @@ class PushSubscription(Base):
     __tablename__ = "push_subscription"
 
     id = Column(Integer, primary_key=True, index=True)
-    firebase_uid = Column(String, nullable=False)
+    firebase_uid = Column(String, nullable=False, index=True)
     endpoint = Column(String, nullable=False)
     p256dh = Column(String, nullable=False)
     auth = Column(String, nullable=False)
@@ -155,6 +238,10 @@ class PushSubscription(Base):
     
 class Notificacion_Correctivo(Base):
     __tablename__ = "notificacion_correctivo"
+    # firebase_uid primero: también sirve a los listados por usuario.
+    __table_args__ = (
+        Index("ix_notificacion_correctivo_uid_mantenimiento", "firebase_uid", "id_mantenimiento", "mensaje", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     firebase_uid = Column(String, nullable=False)
@@ -167,6 +254,10 @@ class Notificacion_Correctivo(Base):
 
 class Notificacion_Preventivo(Base):
     __tablename__ = "notificacion_preventivo"
+    # firebase_uid primero: también sirve a los listados por usuario.
+    __table_args__ = (
+        Index("ix_notificacion_preventivo_uid_mantenimiento", "firebase_uid", "id_mantenimiento", "mensaje", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     firebase_uid = Column(String, nullable=False)
@@ -178,6 +269,7 @@ class Notificacion_Preventivo(Base):
     mantenimiento_preventivo = relationship("MantenimientoPreventivo", back_populates="notificacion_preventivo")
 class MensajeCorrectivo(Base):
     __tablename__ = "mensaje_correctivo"
+    __table_args__ = (Index("ix_mensaje_correctivo_mantenimiento_fecha", "id_mantenimiento", "created_at", "id"),)
     id = Column(Integer, primary_key=True)
     firebase_uid = Column(String)
     nombre_usuario = Column(String)
@@ -188,6 +280,7 @@ class MensajeCorrectivo(Base):
     
 class MensajePreventivo(Base):
     __tablename__ = "mensaje_preventivo"
+    __table_args__ = (Index("ix_mensaje_preventivo_mantenimiento_fecha", "id_mantenimiento", "created_at", "id"),)
     id = Column(Integer, primary_key=True)
     firebase_uid = Column(String)
     nombre_usuario = Column(String)
@@ -203,3 +296,17 @@ class ColumnPreference(Base):
     firebase_uid = Column(String, nullable=False, index=True)
     page = Column(String, nullable=False)
     columns = Column(Text, nullable=False)
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    descripcion = Column(String, nullable=False)
+    applied_at = Column(DateTime, server_default=func.now())
+
+class CacheVersion(Base):
+    """Version counters of in-process caches; a worker reloads its copy when the counter moves."""
+    __tablename__ = "cache_version"
+
+    nombre = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -1,14 +1,18 @@
 from fastapi import FastAPI, Request, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
-from controllers import users, cuadrillas, clientes, sucursales, zonas, auth, mantenimientos_preventivos, mantenimientos_correctivos, maps, notificaciones, push, chats, preferences
-from config.database import get_db
-from services.auth import verify_user_token
+from contextlib import asynccontextmanager, suppress
+from controllers import users, cuadrillas, clientes, sucursales, zonas, auth, mantenimientos_preventivos, mantenimientos_correctivos, maps, notificaciones, push, chats, preferences, metrics, estadisticas, sheets, uploads
+from config.database import DB_AUTO_MIGRATE, engine, get_request_db, release_request_db, close_request_db
+from config.migrations import upgrade_schema
+from services.auth import verify_user_token_async
+from services.token_cache import token_cache, token_version
+from services.sheet_outbox import run_sheet_outbox_worker
+from services.galleries import flush_galleries
 from services.chat_ws import chat_manager
 from services.notification_ws import notification_manager
-from auth.firebase import initialize_firebase
 from init_admin import init_admin
 from dotenv import load_dotenv
+import asyncio
 import os
 from starlette.responses import JSONResponse
 
@@ -30,14 +34,25 @@ DEFAULT_TEST_ENTITY = {
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Nada de esto corre al importar: los workers arrancan sin tocar la base ni Firebase.
+    servicios_externos = os.environ.get("TESTING") != "true" and os.environ.get("E2E_TESTING") != "true"
+    if DB_AUTO_MIGRATE:
+        await asyncio.to_thread(upgrade_schema, engine)
+        if servicios_externos:
+            await asyncio.to_thread(init_admin, email=EMAIL_ADMIN, nombre=NOMBRE_ADMIN, password=PASSWORD_ADMIN)
+    sheet_worker = None
+    if servicios_externos:
+        sheet_worker = asyncio.create_task(run_sheet_outbox_worker())
     yield
+    if sheet_worker is not None:
+        sheet_worker.cancel()
+        with suppress(asyncio.CancelledError):
+            await sheet_worker
+    # Galerías todavía en ventana de debounce: se regeneran antes de salir.
+    await asyncio.to_thread(flush_galleries)
 
 app = FastAPI(lifespan=lifespan)
 
-if os.environ.get("TESTING") != "true" and os.environ.get("E2E_TESTING") != "true":
-    initialize_firebase()
-    init_admin(email=EMAIL_ADMIN, nombre=NOMBRE_ADMIN, password=PASSWORD_ADMIN)
-
 # Configuración de CORS
 origins = [
     FRONTEND_URL,  # Origen del frontend
@@ -71,21 +86,27 @@ async def auth_middleware(request: Request, call_next):
         if token and token.startswith("Bearer "):
             token = token.replace("Bearer ", "")
             try:
-                db = next(get_db())
-                current_entity = verify_user_token(token, db)
-                request.state.current_entity = current_entity
+                # La misma sesión la reciben después los handlers a través de get_db.
+                db = get_request_db(request)
+                # Un solo PK lookup: si algún worker cambió o borró una entidad, la versión ya no coincide.
+                current_entity = token_cache.get(token, token_version(db))
+                if current_entity is None:
+                    current_entity = await verify_user_token_async(token, db)
+                # Sin transacción abierta la conexión vuelve al pool mientras corre el handler.
+                release_request_db(request)
             except HTTPException as e:
+                close_request_db(request)
                 return JSONResponse(
                     content={"detail": e.detail},
                     status_code=e.status_code
                 )
             except Exception as e:
+                close_request_db(request)
                 return JSONResponse(
                     content={"detail": f"Error interno en la verificación del token: {str(e)}"},
                     status_code=500
                 )
-            finally:
-                db.close()
+            request.state.current_entity = current_entity
         else:
             request.state.current_entity = None
     
@@ -97,6 +118,8 @@ async def auth_middleware(request: Request, call_next):
             content={"detail": "Error interno en el procesamiento de la solicitud"},
             status_code=500
         )
+    finally:
+        close_request_db(request)
 
 @app.websocket("/ws/chat/{mantenimiento_id}")
 async def websocket_route(websocket: WebSocket, mantenimiento_id: int):
@@ -129,3 +152,7 @@ app.include_router(notificaciones.router)
 app.include_router(push.router)
 app.include_router(chats.router)
 app.include_router(preferences.router)
+app.include_router(metrics.router)
+app.include_router(estadisticas.router)
+app.include_router(sheets.router)
+app.include_router(uploads.router)
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, EmailStr
 from enum import Enum
 from datetime import date
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 # Enum para los roles
 class Role(str, Enum):
@@ -134,6 +134,33 @@ class MantenimientoCorrectivoCreate(BaseModel):
     estado: Estado
     prioridad: Prioridad
 
+# Filtros para los listados de mantenimientos
+class MantenimientoFiltros(BaseModel):
+    estado: Optional[Estado] = None
+    cliente_id: Optional[int] = None
+    sucursal_id: Optional[int] = None
+    id_cuadrilla: Optional[int] = None
+    apertura_desde: Optional[date] = None
+    apertura_hasta: Optional[date] = None
+    cierre_desde: Optional[date] = None
+    cierre_hasta: Optional[date] = None
+
+class MantenimientoPreventivoFiltros(MantenimientoFiltros):
+    pass
+
+class MantenimientoCorrectivoFiltros(MantenimientoFiltros):
+    prioridad: Optional[Prioridad] = None
+
+# Filtros para las estadísticas agregadas
+class EstadisticasFiltros(BaseModel):
+    meses: List[int] = []
+    anios: List[int] = []
+    cliente_id: Optional[int] = None
+    zona: Optional[str] = None
+    sucursal_id: Optional[int] = None
+    id_cuadrilla: Optional[int] = None
+    estado: Optional[str] = None
+
 class PushSubscriptionKeys(BaseModel):
     p256dh: str
     auth: str
@@ -158,3 +185,20 @@ class ColumnPreferenceRead(BaseModel):
 
 class ColumnPreferenceUpdate(BaseModel):
     columns: list[str]
+
+# Subidas directas a GCS con URL firmada
+class UploadUrlRequest(BaseModel):
+    tipo: str
+    mantenimiento_id: int
+    carpeta: str
+    filename: str
+    content_type: str
+
+class UploadConfirmacion(BaseModel):
+    tipo: str
+    mantenimiento_id: int
+    carpeta: str
+    object_name: str
+    firebase_uid: Optional[str] = None
+    nombre_usuario: Optional[str] = None
+    texto: Optional[str] = None
@@ -2,15 +2,19 @@ import firebase_admin
 from firebase_admin import credentials, auth, db
 import os
 import json
+import threading
+
+_init_lock = threading.Lock()
 
 def initialize_firebase():
+    # Se inicializa en el primer uso (no al importar): los workers y los tests no pagan el costo si no lo necesitan.
     if not firebase_admin._apps:  # Verifica si la app ya está inicializada
         if os.getenv("TESTING") == "true":
             return None  # No inicializar Firebase en tests
-        if os.getenv("FIREBASE_CREDENTIALS"):
-            cred = credentials.Certificate(json.loads(os.getenv("FIREBASE_CREDENTIALS")))
-        firebase_admin.initialize_app(cred, {'databaseURL': os.getenv("FIREBASE_DATABASE_URL")})
+        with _init_lock:
+            if not firebase_admin._apps:
+                cred = None  # Sin FIREBASE_CREDENTIALS se usan las Application Default Credentials
+                if os.getenv("FIREBASE_CREDENTIALS"):
+                    cred = credentials.Certificate(json.loads(os.getenv("FIREBASE_CREDENTIALS")))
+                firebase_admin.initialize_app(cred, {'databaseURL': os.getenv("FIREBASE_DATABASE_URL")})
     return firebase_admin.get_app()
-
-# Inicializar Firebase al importar el módulo
-initialize_firebase()
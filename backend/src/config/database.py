@@ -1,20 +1,192 @@
 # Configuración de PostgreSQL con SQLAlchemy
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
-from api.models import Base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from fastapi import Request
 from dotenv import load_dotenv
 import os
+import threading
+import time
 
 load_dotenv(dotenv_path="./env.config")
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {})
+# DB_POOL_SIZE/DB_MAX_OVERFLOW son el presupuesto de conexiones de cada worker, repartido entre el
+# engine sync y el async: DB_ASYNC_* es la parte del async (por defecto la mitad) y el sync usa el resto.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", str(max(1, DB_POOL_SIZE // 2))))
+DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", str(DB_MAX_OVERFLOW // 2)))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# 0 deshabilita el límite; solo se aplica en Postgres.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Solo para desarrollo: aplica el esquema en el arranque. En los deploys corre `python migrate.py` una vez.
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "false").lower() == "true"
+
+_pool_lock = threading.Lock()
+_pool_stats = {"checkouts": 0, "timeouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+_async_pool_stats = dict(_pool_stats)
+
+
+class _MeteredPool:
+    """Pool mixin that records in `stats` how many checkouts happened and how long they waited."""
+
+    stats: dict
+
+    def _do_get(self):
+        inicio = time.monotonic()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            with _pool_lock:
+                self.stats["timeouts"] += 1
+            raise
+        espera = time.monotonic() - inicio
+        with _pool_lock:
+            self.stats["checkouts"] += 1
+            self.stats["wait_seconds_total"] += espera
+            self.stats["wait_seconds_max"] = max(self.stats["wait_seconds_max"], espera)
+        return connection
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    stats = _pool_stats
+
+
+class MeteredAsyncQueuePool(_MeteredPool, AsyncAdaptedQueuePool):
+    stats = _async_pool_stats
+
+
+def _engine_kwargs(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}, "poolclass": MeteredQueuePool}
+    connect_args = {}
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    return {
+        "connect_args": connect_args,
+        "poolclass": MeteredQueuePool,
+        "pool_size": max(1, DB_POOL_SIZE - DB_ASYNC_POOL_SIZE),
+        "max_overflow": max(0, DB_MAX_OVERFLOW - DB_ASYNC_MAX_OVERFLOW),
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _async_url(url: str) -> str:
+    """Same database through its async driver: asyncpg for Postgres, aiosqlite for SQLite."""
+    scheme, rest = url.split("://", 1)
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    if scheme.startswith("postgres"):
+        async_url = make_url(f"postgresql+asyncpg://{rest}")
+        if "sslmode" in async_url.query:
+            # asyncpg no acepta el sslmode de libpq; su parámetro ssl toma los mismos valores.
+            query = dict(async_url.query)
+            sslmode = query.pop("sslmode")
+            query.setdefault("ssl", sslmode)
+            async_url = async_url.set(query=query)
+        return async_url.render_as_string(hide_password=False)
+    return url
+
+
+def _async_engine_kwargs(url: str) -> dict:
+    if url.startswith("sqlite"):
+        # aiosqlite abre un thread por conexión; sin pool no quedan conexiones atadas a otro event loop.
+        return {"poolclass": NullPool}
+    connect_args = {}
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+    return {
+        "connect_args": connect_args,
+        "poolclass": MeteredAsyncQueuePool,
+        "pool_size": DB_ASYNC_POOL_SIZE,
+        "max_overflow": DB_ASYNC_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base.metadata.create_all(bind=engine)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_async_engine_kwargs(ASYNC_DATABASE_URL))
+# expire_on_commit=False: los handlers serializan los objetos después del commit sin volver a la base.
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
 
-def get_db():
+def _metrics(pool, pool_stats: dict) -> dict:
+    with _pool_lock:
+        stats = dict(pool_stats)
+    stats["wait_seconds_avg"] = stats["wait_seconds_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(), checked_in=pool.checkedin(), overflow=pool.overflow())
+    return stats
+
+
+def get_pool_metrics() -> dict:
+    return _metrics(engine.pool, _pool_stats)
+
+
+def get_async_pool_metrics() -> dict:
+    # Con SQLite el engine async no tiene pool (NullPool): solo hay contadores en cero.
+    return _metrics(async_engine.pool, _async_pool_stats)
+
+
+def reset_pool_metrics():
+    with _pool_lock:
+        for stats in (_pool_stats, _async_pool_stats):
+            stats.update(checkouts=0, timeouts=0, wait_seconds_total=0.0, wait_seconds_max=0.0)
+
+
+def get_request_db(request: Request):
+    """Session shared by everything that handles this request; the auth middleware closes it."""
+    db = getattr(request.state, "db", None)
+    if db is None:
+        db = SessionLocal()
+        request.state.db = db
+    return db
+
+
+def release_request_db(request: Request):
+    """End the request session's transaction so its connection goes back to the pool.
+
+    The session stays on the request and reconnects if a sync handler uses it;
+    async handlers take their own connection from the async engine.
+    """
+    db = getattr(request.state, "db", None)
+    if db is not None:
+        db.rollback()
+
+
+def close_request_db(request: Request):
+    db = getattr(request.state, "db", None)
+    if db is not None:
+        request.state.db = None
+        db.close()
+
+
+def get_db(request: Request):
+    # Si el middleware ya abrió la sesión del request se reutiliza: una sola conexión por request.
+    db = getattr(request.state, "db", None)
+    if db is not None:
+        yield db
+        return
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """AsyncSession dependency for async handlers; queries await the driver instead of blocking the loop."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,167 @@
+"""Versioned schema migrations applied on top of Base.metadata.create_all.
+
+Schema changes run once per deploy through upgrade_schema (src/migrate.py),
+never on import or worker startup. create_all only creates missing tables; anything added to an existing table
+(indexes, columns) goes here as a new numbered migration. Applied versions are
+recorded in schema_version, so each migration runs once per database.
+Migrations must be idempotent (IF NOT EXISTS) because a fresh database already
+gets the current schema from create_all. A statement that differs per dialect
+is a dict keyed by dialect name; one that needs to look at the schema first is
+a callable that receives the connection.
+"""
+import logging
+from typing import List
+
+from sqlalchemy import DateTime, String, inspect, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from api.models import Base, SchemaVersion
+
+logger = logging.getLogger(__name__)
+
+
+def _indices(*indices):
+    return [
+        f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({', '.join(columnas)})"
+        for nombre, tabla, columnas in indices
+    ]
+
+
+def _sql(sentencia, dialecto: str) -> str:
+    return sentencia[dialecto] if isinstance(sentencia, dict) else sentencia
+
+
+def _ejecutar(conn, sentencia):
+    if callable(sentencia):
+        sentencia(conn)
+    else:
+        conn.exec_driver_sql(_sql(sentencia, conn.dialect.name))
+
+
+def _columna(tabla: str, columna: str, tipo):
+    # SQLite no tiene ADD COLUMN IF NOT EXISTS.
+    def _agregar(conn):
+        if columna not in {c["name"] for c in inspect(conn).get_columns(tabla)}:
+            conn.exec_driver_sql(f"ALTER TABLE {tabla} ADD COLUMN {columna} {tipo.compile(dialect=conn.dialect)}")
+    return _agregar
+
+
+def _indice_fecha_id(nombre, tabla):
+    # Debe coincidir con models._indice_fecha_id: SQLite no acepta NULLS FIRST y ya ordena los NULL primero.
+    return {
+        "postgresql": f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} (fecha_apertura NULLS FIRST, id)",
+        "sqlite": f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} (fecha_apertura, id)",
+    }
+
+
+# Debe coincidir con models.CLAVE_BUCKET_ROLLUP.
+_CLAVE_BUCKET = "tipo, dia, cliente_id, coalesce(zona, ''), coalesce(id_cuadrilla, 0)"
+_MISMO_BUCKET = " AND ".join(
+    f"o.{columna} = mantenimiento_rollup_diario.{columna}" for columna in ("tipo", "dia", "cliente_id")
+) + (
+    " AND coalesce(o.zona, '') = coalesce(mantenimiento_rollup_diario.zona, '')"
+    " AND coalesce(o.id_cuadrilla, 0) = coalesce(mantenimiento_rollup_diario.id_cuadrilla, 0)"
+)
+
+
+MIGRACIONES = [
+    (
+        1,
+        "Índices de paginación del chat",
+        _indices(
+            ("ix_mensaje_correctivo_mantenimiento_fecha", "mensaje_correctivo", ("id_mantenimiento", "created_at", "id")),
+            ("ix_mensaje_preventivo_mantenimiento_fecha", "mensaje_preventivo", ("id_mantenimiento", "created_at", "id")),
+        ),
+    ),
+    (
+        2,
+        "Índices de filtros frecuentes",
+        _indices(
+            ("ix_notificacion_correctivo_uid_mantenimiento", "notificacion_correctivo", ("firebase_uid", "id_mantenimiento", "mensaje", "created_at")),
+            ("ix_notificacion_preventivo_uid_mantenimiento", "notificacion_preventivo", ("firebase_uid", "id_mantenimiento", "mensaje", "created_at")),
+            ("ix_push_subscription_firebase_uid", "push_subscription", ("firebase_uid",)),
+            ("ix_correctivo_seleccionado_cuadrilla_mantenimiento", "correctivo_seleccionado", ("id_cuadrilla", "id_mantenimiento")),
+            ("ix_correctivo_seleccionado_cuadrilla_sucursal", "correctivo_seleccionado", ("id_cuadrilla", "id_sucursal")),
+            ("ix_preventivo_seleccionado_cuadrilla_mantenimiento", "preventivo_seleccionado", ("id_cuadrilla", "id_mantenimiento")),
+            ("ix_preventivo_seleccionado_cuadrilla_sucursal", "preventivo_seleccionado", ("id_cuadrilla", "id_sucursal")),
+            ("ix_mantenimiento_preventivo_sucursal_fecha", "mantenimiento_preventivo", ("sucursal_id", "fecha_apertura")),
+            ("ix_usuario_rol", "usuario", ("rol",)),
+            ("ix_sucursal_cliente_id", "sucursal", ("cliente_id",)),
+            ("ix_mantenimiento_correctivo_foto_mantenimiento_id", "mantenimiento_correctivo_foto", ("mantenimiento_id",)),
+            ("ix_mantenimiento_preventivo_foto_mantenimiento_id", "mantenimiento_preventivo_foto", ("mantenimiento_id",)),
+            ("ix_mantenimiento_preventivo_planilla_mantenimiento_id", "mantenimiento_preventivo_planilla", ("mantenimiento_id",)),
+        ),
+    ),
+    (
+        3,
+        "Índices del keyset de los listados paginados",
+        [
+            _indice_fecha_id("ix_mantenimiento_correctivo_fecha_id", "mantenimiento_correctivo"),
+            _indice_fecha_id("ix_mantenimiento_preventivo_fecha_id", "mantenimiento_preventivo"),
+        ],
+    ),
+    (
+        4,
+        "Clave única de los buckets del rollup diario",
+        [
+            # Funde los buckets duplicados que pudo dejar el select-then-insert antes de crear el índice.
+            f"""UPDATE mantenimiento_rollup_diario SET
+                cantidad = (SELECT SUM(o.cantidad) FROM mantenimiento_rollup_diario o WHERE {_MISMO_BUCKET}),
+                cerrados = (SELECT SUM(o.cerrados) FROM mantenimiento_rollup_diario o WHERE {_MISMO_BUCKET}),
+                dias_resolucion = (SELECT SUM(o.dias_resolucion) FROM mantenimiento_rollup_diario o WHERE {_MISMO_BUCKET})
+            WHERE id IN (SELECT MIN(id) FROM mantenimiento_rollup_diario GROUP BY {_CLAVE_BUCKET} HAVING COUNT(*) > 1)""",
+            f"""DELETE FROM mantenimiento_rollup_diario
+            WHERE id NOT IN (SELECT MIN(id) FROM mantenimiento_rollup_diario GROUP BY {_CLAVE_BUCKET})""",
+            f"CREATE UNIQUE INDEX IF NOT EXISTS ux_rollup_bucket ON mantenimiento_rollup_diario ({_CLAVE_BUCKET})",
+        ],
+    ),
+    (
+        5,
+        "Lease de los jobs del outbox de Sheets",
+        [
+            _columna("sheet_sync_outbox", "procesando_hasta", DateTime()),
+            _columna("sheet_sync_outbox", "reclamado_por", String()),
+            *_indices(("ix_sheet_sync_outbox_estado_proximo", "sheet_sync_outbox", ("estado", "proximo_intento"))),
+        ],
+    ),
+    (
+        6,
+        "Lease de la exportación completa de Sheets",
+        [_columna("sheet_index_estado", "exportando_hasta", DateTime())],
+    ),
+]
+
+
+def current_version(bind: Engine) -> int:
+    SchemaVersion.__table__.create(bind, checkfirst=True)
+    with bind.connect() as conn:
+        return max(conn.execute(select(SchemaVersion.version)).scalars(), default=0)
+
+
+def run_migrations(bind: Engine) -> List[int]:
+    """Apply pending migrations in order, each in its own transaction; returns the versions applied."""
+    SchemaVersion.__table__.create(bind, checkfirst=True)
+    with bind.connect() as conn:
+        aplicadas = set(conn.execute(select(SchemaVersion.version)).scalars())
+    nuevas = []
+    for version, descripcion, sentencias in MIGRACIONES:
+        if version in aplicadas:
+            continue
+        try:
+            with bind.begin() as conn:
+                for sentencia in sentencias:
+                    _ejecutar(conn, sentencia)
+                conn.execute(insert(SchemaVersion).values(version=version, descripcion=descripcion))
+        except IntegrityError:
+            # Otro proceso la aplicó en paralelo; las sentencias son idempotentes.
+            continue
+        logger.info("Migración %s aplicada: %s", version, descripcion)
+        nuevas.append(version)
+    return nuevas
+
+
+def upgrade_schema(bind: Engine) -> List[int]:
+    """Create missing tables and apply pending migrations; returns the versions applied."""
+    Base.metadata.create_all(bind=bind)
+    return run_migrations(bind)
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from config.database import get_db
-from services.auth import verify_user_token, create_firebase_user, update_firebase_user, delete_firebase_user, create_firebase_cuadrilla, update_firebase_cuadrilla, delete_firebase_cuadrilla
+from services.auth import verify_user_token_async, create_firebase_user, update_firebase_user, delete_firebase_user, create_firebase_cuadrilla, update_firebase_cuadrilla, delete_firebase_cuadrilla
 from api.schemas import UserCreate, UserUpdate, CuadrillaCreate, CuadrillaUpdate
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -11,7 +11,7 @@ security = HTTPBearer()
 @router.post("/verify")
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     token = credentials.credentials
-    entity = verify_user_token(token, db)
+    entity = await verify_user_token_async(token, db)
     return entity
 
 @router.post("/create-user", response_model=dict)
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, Request, UploadFile, Form, File
-from sqlalchemy.orm import Session
-from config.database import get_db
+from fastapi import APIRouter, Depends, Request, UploadFile, Form, File, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.database import get_async_db
 from services.chats import get_chat_correctivo, get_chat_preventivo, send_message_correctivo, send_message_preventivo
 from typing import List, Optional
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 @router.get("/correctivo/{mantenimiento_id}", response_model=List[dict])
-def chat_correctivo_get(mantenimiento_id: int, request: Request, db_session: Session = Depends(get_db)):
+async def chat_correctivo_get(
+    mantenimiento_id: int,
+    request: Request,
+    before: Optional[int] = Query(None),
+    after: Optional[int] = Query(None),
+    since_id: Optional[int] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    db_session: AsyncSession = Depends(get_async_db)
+):
     current_entity = request.state.current_entity
-    chat = get_chat_correctivo(db_session, mantenimiento_id, current_entity)
+    chat = await get_chat_correctivo(
+        db_session, mantenimiento_id, current_entity, before=before, after=after, since_id=since_id, limit=limit
+    )
     if isinstance(chat, dict):
         return []
     return [
@@ -26,9 +36,19 @@ def chat_correctivo_get(mantenimiento_id: int, request: Request, db_session: Ses
     ]
 
 @router.get("/preventivo/{mantenimiento_id}", response_model=List[dict])
-def chat_preventivo_get(mantenimiento_id: int, request: Request, db_session: Session = Depends(get_db)):
+async def chat_preventivo_get(
+    mantenimiento_id: int,
+    request: Request,
+    before: Optional[int] = Query(None),
+    after: Optional[int] = Query(None),
+    since_id: Optional[int] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    db_session: AsyncSession = Depends(get_async_db)
+):
     current_entity = request.state.current_entity
-    chat = get_chat_preventivo(db_session, mantenimiento_id, current_entity)
+    chat = await get_chat_preventivo(
+        db_session, mantenimiento_id, current_entity, before=before, after=after, since_id=since_id, limit=limit
+    )
     if isinstance(chat, dict):
         return []
     return [
@@ -52,7 +72,7 @@ async def correctivo_message_send(
     nombre_usuario: str = Form(...),
     texto: Optional[str] = Form(None),
     archivo: Optional[UploadFile] = File(None),
-    db_session: Session = Depends(get_db)
+    db_session: AsyncSession = Depends(get_async_db)
 ):
     current_entity = request.state.current_entity
     new_message = await send_message_correctivo(
@@ -82,7 +102,7 @@ async def preventivo_message_send(
     nombre_usuario: str = Form(...),
     texto: Optional[str] = Form(None),
     archivo: Optional[UploadFile] = File(None),
-    db_session: Session = Depends(get_db)
+    db_session: AsyncSession = Depends(get_async_db)
 ):
     current_entity = request.state.current_entity
     new_message = await send_message_preventivo(
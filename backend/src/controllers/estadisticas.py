@@ -0,0 +1,47 @@
+from datetime import date
+from typing import Annotated, List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from config.database import get_db
+from services.estadisticas import get_resumen, get_reporte_preventivos, get_reporte_correctivos, get_reporte_rubros, get_reporte_zonas, get_reporte_sucursales
+from services.rollups import get_kpis
+from api.schemas import EstadisticasFiltros
+
+router = APIRouter(prefix="/estadisticas", tags=["estadisticas"])
+
+@router.get("/", response_model=dict)
+def estadisticas_resumen_get(filtros: Annotated[EstadisticasFiltros, Query()], db: Session = Depends(get_db)):
+    return get_resumen(db, filtros)
+
+@router.get("/preventivos", response_model=List[dict])
+def estadisticas_preventivos_get(filtros: Annotated[EstadisticasFiltros, Query()], db: Session = Depends(get_db)):
+    return get_reporte_preventivos(db, filtros)
+
+@router.get("/correctivos", response_model=List[dict])
+def estadisticas_correctivos_get(filtros: Annotated[EstadisticasFiltros, Query()], db: Session = Depends(get_db)):
+    return get_reporte_correctivos(db, filtros)
+
+@router.get("/rubros", response_model=dict)
+def estadisticas_rubros_get(filtros: Annotated[EstadisticasFiltros, Query()], db: Session = Depends(get_db)):
+    return get_reporte_rubros(db, filtros)
+
+@router.get("/zonas", response_model=List[dict])
+def estadisticas_zonas_get(filtros: Annotated[EstadisticasFiltros, Query()], db: Session = Depends(get_db)):
+    return get_reporte_zonas(db, filtros)
+
+@router.get("/sucursales", response_model=List[dict])
+def estadisticas_sucursales_get(filtros: Annotated[EstadisticasFiltros, Query()], db: Session = Depends(get_db)):
+    return get_reporte_sucursales(db, filtros)
+
+@router.get("/kpis", response_model=List[dict])
+def estadisticas_kpis_get(
+    agrupar_por: str = "mes",
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    tipo: Optional[str] = None,
+    zona: Optional[str] = None,
+    id_cuadrilla: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    return get_kpis(db, agrupar_por, desde, hasta, tipo, zona, id_cuadrilla, cliente_id)
@@ -1,58 +1,57 @@
-from fastapi import APIRouter, Depends, Request, UploadFile, Form
+from fastapi import APIRouter, Depends, Request, UploadFile, Form, Query
 from sqlalchemy.orm import Session
-from config.database import get_db
-from services.mantenimientos_correctivos import get_mantenimientos_correctivos, get_mantenimiento_correctivo, create_mantenimiento_correctivo, update_mantenimiento_correctivo, delete_mantenimiento_correctivo, delete_mantenimiento_planilla, delete_mantenimiento_photo
-from api.schemas import MantenimientoCorrectivoCreate
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.database import get_db, get_async_db
+from services.mantenimientos_correctivos import get_mantenimientos_correctivos, get_mantenimientos_correctivos_page, get_mantenimiento_correctivo, create_mantenimiento_correctivo, update_mantenimiento_correctivo, delete_mantenimiento_correctivo, delete_mantenimiento_planilla, delete_mantenimiento_photo
+from services.thumbnails import serialize_foto
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from api.schemas import MantenimientoCorrectivoCreate, MantenimientoCorrectivoFiltros
 from typing import List, Optional
 from datetime import date, datetime
 
 router = APIRouter(prefix="/mantenimientos-correctivos", tags=["mantenimientos-correctivos"])
 
+def _serialize_correctivo(m) -> dict:
+    return {
+        "id": m.id,
+        "cliente_id": m.cliente_id,
+        "sucursal_id": m.sucursal_id,
+        "id_cuadrilla": m.id_cuadrilla,
+        "fecha_apertura": m.fecha_apertura,
+        "fecha_cierre": m.fecha_cierre,
+        "numero_caso": m.numero_caso,
+        "incidente": m.incidente,
+        "rubro": m.rubro,
+        "planilla": m.planilla,
+        "fotos": [foto.url for foto in m.fotos],
+        "fotos_variantes": [serialize_foto(foto.url) for foto in m.fotos],
+        "estado": m.estado,
+        "prioridad": m.prioridad,
+        "extendido": m.extendido
+    }
+
 @router.get("/", response_model=List[dict])
-def mantenimientos_correctivos_get(db: Session = Depends(get_db)):
-    mantenimientos = get_mantenimientos_correctivos(db)
-    return [
-        {
-            "id": m.id,
-            "cliente_id": m.cliente_id,
-            "sucursal_id": m.sucursal_id,
-            "id_cuadrilla": m.id_cuadrilla,
-            "fecha_apertura": m.fecha_apertura,
-            "fecha_cierre": m.fecha_cierre,
-            "numero_caso": m.numero_caso,
-            "incidente": m.incidente,
-            "rubro": m.rubro,
-            "planilla": m.planilla,
-            "fotos": [foto.url for foto in m.fotos],
-            "estado": m.estado,
-            "prioridad": m.prioridad,
-            "extendido": m.extendido
-        }
-        for m in mantenimientos
-    ]
+def mantenimientos_correctivos_get(filtros: MantenimientoCorrectivoFiltros = Depends(), db: Session = Depends(get_db)):
+    mantenimientos = get_mantenimientos_correctivos(db, filtros)
+    return [_serialize_correctivo(m) for m in mantenimientos]
+
+@router.get("/paginado", response_model=dict)
+def mantenimientos_correctivos_paginado_get(
+    filtros: MantenimientoCorrectivoFiltros = Depends(),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
+    mantenimientos, next_cursor = get_mantenimientos_correctivos_page(db, filtros, cursor, limit)
+    return {"items": [_serialize_correctivo(m) for m in mantenimientos], "next_cursor": next_cursor}
 
 @router.get("/{mantenimiento_id}", response_model=dict)
 def mantenimiento_correctivo_get(mantenimiento_id: int, db: Session = Depends(get_db)):
     mantenimiento = get_mantenimiento_correctivo(db, mantenimiento_id)
-    return {
-        "id": mantenimiento.id,
-        "cliente_id": mantenimiento.cliente_id,
-        "sucursal_id": mantenimiento.sucursal_id,
-        "id_cuadrilla": mantenimiento.id_cuadrilla,
-        "fecha_apertura": mantenimiento.fecha_apertura,
-        "fecha_cierre": mantenimiento.fecha_cierre,
-        "numero_caso": mantenimiento.numero_caso,
-        "incidente": mantenimiento.incidente,
-        "rubro": mantenimiento.rubro,
-        "planilla": mantenimiento.planilla,
-        "fotos": [foto.url for foto in mantenimiento.fotos],
-        "estado": mantenimiento.estado,
-        "prioridad": mantenimiento.prioridad,
-        "extendido": mantenimiento.extendido
-    }
+    return _serialize_correctivo(mantenimiento)
 
 @router.post("/", response_model=dict)
-async def mantenimiento_correctivo_create(mantenimiento: MantenimientoCorrectivoCreate, request: Request, db: Session = Depends(get_db)):
+async def mantenimiento_correctivo_create(mantenimiento: MantenimientoCorrectivoCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
     current_entity = request.state.current_entity
     new_mantenimiento = await create_mantenimiento_correctivo(
         db,
@@ -97,7 +96,7 @@ async def mantenimiento_correctivo_update(
     estado: Optional[str] = Form(None),
     prioridad: Optional[str] = Form(None),
     extendido: Optional[datetime] = Form(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     current_entity = request.state.current_entity
     updated_mantenimiento = await update_mantenimiento_correctivo(
@@ -130,6 +129,7 @@ async def mantenimiento_correctivo_update(
         "rubro": updated_mantenimiento.rubro,
         "planilla": updated_mantenimiento.planilla,
         "fotos": [foto.url for foto in updated_mantenimiento.fotos],
+        "fotos_variantes": [serialize_foto(foto.url) for foto in updated_mantenimiento.fotos],
         "estado": updated_mantenimiento.estado,
         "prioridad": updated_mantenimiento.prioridad,
         "extendido": updated_mantenimiento.extendido
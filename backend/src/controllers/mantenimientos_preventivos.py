@@ -1,52 +1,54 @@
-from fastapi import APIRouter, Depends, Request, UploadFile, Form
+from fastapi import APIRouter, Depends, Request, UploadFile, Form, Query
 from sqlalchemy.orm import Session
-from config.database import get_db
-from services.mantenimientos_preventivos import get_mantenimientos_preventivos, get_mantenimiento_preventivo, create_mantenimiento_preventivo, update_mantenimiento_preventivo, delete_mantenimiento_preventivo, delete_mantenimiento_planilla, delete_mantenimiento_photo
-from api.schemas import MantenimientoPreventivoCreate
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.database import get_db, get_async_db
+from services.mantenimientos_preventivos import get_mantenimientos_preventivos, get_mantenimientos_preventivos_page, get_mantenimiento_preventivo, create_mantenimiento_preventivo, update_mantenimiento_preventivo, delete_mantenimiento_preventivo, delete_mantenimiento_planilla, delete_mantenimiento_photo
+from services.thumbnails import serialize_foto
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from api.schemas import MantenimientoPreventivoCreate, MantenimientoPreventivoFiltros
 from typing import List, Optional
 from datetime import date, datetime
 
 router = APIRouter(prefix="/mantenimientos-preventivos", tags=["mantenimientos-preventivos"])
 
+def _serialize_preventivo(m) -> dict:
+    return {
+        "id": m.id,
+        "cliente_id": m.cliente_id,
+        "sucursal_id": m.sucursal_id,
+        "frecuencia": m.frecuencia,
+        "id_cuadrilla": m.id_cuadrilla,
+        "fecha_apertura": m.fecha_apertura,
+        "fecha_cierre": m.fecha_cierre,
+        "planillas": [planilla.url for planilla in m.planillas],
+        "fotos": [foto.url for foto in m.fotos],
+        "fotos_variantes": [serialize_foto(foto.url) for foto in m.fotos],
+        "extendido": m.extendido,
+        "estado": m.estado
+    }
+
 @router.get("/", response_model=List[dict])
-def mantenimientos_preventivos_get(db: Session = Depends(get_db)):
-    mantenimientos = get_mantenimientos_preventivos(db)
-    return [
-        {
-            "id": m.id,
-            "cliente_id": m.cliente_id,
-            "sucursal_id": m.sucursal_id,
-            "frecuencia": m.frecuencia,
-            "id_cuadrilla": m.id_cuadrilla,
-            "fecha_apertura": m.fecha_apertura,
-            "fecha_cierre": m.fecha_cierre,
-            "planillas": [planilla.url for planilla in m.planillas],
-            "fotos": [foto.url for foto in m.fotos],
-            "extendido": m.extendido,
-            "estado": m.estado
-        }
-        for m in mantenimientos
-    ]
+def mantenimientos_preventivos_get(filtros: MantenimientoPreventivoFiltros = Depends(), db: Session = Depends(get_db)):
+    mantenimientos = get_mantenimientos_preventivos(db, filtros)
+    return [_serialize_preventivo(m) for m in mantenimientos]
+
+@router.get("/paginado", response_model=dict)
+def mantenimientos_preventivos_paginado_get(
+    filtros: MantenimientoPreventivoFiltros = Depends(),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
+    mantenimientos, next_cursor = get_mantenimientos_preventivos_page(db, filtros, cursor, limit)
+    return {"items": [_serialize_preventivo(m) for m in mantenimientos], "next_cursor": next_cursor}
 
 @router.get("/{mantenimiento_id}", response_model=dict)
 def mantenimiento_preventivo_get(mantenimiento_id: int, db: Session = Depends(get_db)):
     mantenimiento = get_mantenimiento_preventivo(db, mantenimiento_id)
-    return {
-        "id": mantenimiento.id,
-        "cliente_id": mantenimiento.cliente_id,
-        "sucursal_id": mantenimiento.sucursal_id,
-        "frecuencia": mantenimiento.frecuencia,
-        "id_cuadrilla": mantenimiento.id_cuadrilla,
-        "fecha_apertura": mantenimiento.fecha_apertura,
-        "fecha_cierre": mantenimiento.fecha_cierre,
-        "planillas": [planilla.url for planilla in mantenimiento.planillas],
-        "fotos": [foto.url for foto in mantenimiento.fotos],
-        "extendido": mantenimiento.extendido,
-        "estado": mantenimiento.estado
-    }
+    return _serialize_preventivo(mantenimiento)
 
 @router.post("/", response_model=dict)
-async def mantenimiento_preventivo_create(mantenimiento: MantenimientoPreventivoCreate, request: Request, db: Session = Depends(get_db)):
+async def mantenimiento_preventivo_create(mantenimiento: MantenimientoPreventivoCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
     current_entity = request.state.current_entity
     new_mantenimiento = await create_mantenimiento_preventivo(
         db,
@@ -82,7 +84,7 @@ async def mantenimiento_preventivo_update(
     fotos: Optional[List[UploadFile]] = None,
     extendido: Optional[datetime] = Form(None),
     estado: Optional[str] = Form(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     current_entity = request.state.current_entity
     updated_mantenimiento = await update_mantenimiento_preventivo(
@@ -110,6 +112,7 @@ async def mantenimiento_preventivo_update(
         "fecha_cierre": updated_mantenimiento.fecha_cierre,
         "planillas": [planilla.url for planilla in updated_mantenimiento.planillas],
         "fotos": [foto.url for foto in updated_mantenimiento.fotos],
+        "fotos_variantes": [serialize_foto(foto.url) for foto in updated_mantenimiento.fotos],
         "extendido": updated_mantenimiento.extendido,
         "estado": updated_mantenimiento.estado
     }
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Request
+from services.metrics import get_auth_cache_metrics, get_sheets_metrics, get_db_pool_metrics, get_role_cache_metrics
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/auth-cache", response_model=dict)
+def auth_cache_metrics_get(request: Request):
+    current_entity = request.state.current_entity
+    return get_auth_cache_metrics(current_entity)
+
+@router.get("/sheets", response_model=dict)
+def sheets_metrics_get(request: Request):
+    current_entity = request.state.current_entity
+    return get_sheets_metrics(current_entity)
+
+@router.get("/db-pool", response_model=dict)
+def db_pool_metrics_get(request: Request):
+    current_entity = request.state.current_entity
+    return get_db_pool_metrics(current_entity)
+
+@router.get("/role-cache", response_model=dict)
+def role_cache_metrics_get(request: Request):
+    current_entity = request.state.current_entity
+    return get_role_cache_metrics(current_entity)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
-from config.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.database import get_db, get_async_db
 from services.notificaciones import get_notification_correctivo, get_notification_preventivo, notificacion_correctivo_leida, notificacion_preventivo_leida, delete_notificaciones, notify_nearby_maintenances, delete_notificacion
 from typing import List
 from api.schemas import NearbyNotificationCreate
@@ -32,7 +33,7 @@ def notificaciones_delete(firebase_uid: str, db: Session = Depends(get_db)):
     return delete_notificaciones(db, firebase_uid)
 
 @router.post("/nearby", response_model=dict)
-async def notificaciones_nearby(payload: NearbyNotificationCreate, request: Request, db: Session = Depends(get_db)):
+async def notificaciones_nearby(payload: NearbyNotificationCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
     current = request.state.current_entity
     return await notify_nearby_maintenances(db, current, [m.model_dump() for m in payload.mantenimientos])
 
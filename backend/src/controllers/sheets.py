@@ -0,0 +1,12 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+from config.database import get_db
+from services.sheet_export import export_sheets
+
+router = APIRouter(prefix="/sheets", tags=["sheets"])
+
+@router.post("/export", response_model=dict)
+def sheets_export_post(request: Request, tipo: Optional[str] = None, db: Session = Depends(get_db)):
+    current_entity = request.state.current_entity
+    return export_sheets(db, current_entity, tipo)
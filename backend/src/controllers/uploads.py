@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.database import get_db, get_async_db
+from services.uploads import create_upload_url, confirm_upload
+from api.schemas import UploadConfirmacion, UploadUrlRequest
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+@router.post("/signed-url", response_model=dict)
+def upload_signed_url_post(solicitud: UploadUrlRequest, request: Request, db: Session = Depends(get_db)):
+    current_entity = request.state.current_entity
+    return create_upload_url(db, solicitud, current_entity)
+
+@router.post("/confirm", response_model=dict)
+async def upload_confirm_post(confirmacion: UploadConfirmacion, request: Request, db: AsyncSession = Depends(get_async_db)):
+    current_entity = request.state.current_entity
+    return await confirm_upload(db, confirmacion, current_entity)
@@ -4,6 +4,8 @@ from api.models import Usuario
 from api.schemas import Role
 from fastapi import HTTPException
 from firebase_admin import auth
+from auth.firebase import initialize_firebase
+from services.role_cache import bump_role_version
 
 def init_admin(email: str, nombre: str, password: str, rol: Role = Role.ADMIN):
     db: Session = SessionLocal()
@@ -13,6 +15,7 @@ def init_admin(email: str, nombre: str, password: str, rol: Role = Role.ADMIN):
         if existing_admin:
             print(f"Ya existe un administrador: {existing_admin.email}")
             return
+        initialize_firebase()
         try:
             existing_user = auth.get_user_by_email(email)
             firebase_uid = existing_user.uid
@@ -28,6 +31,7 @@ def init_admin(email: str, nombre: str, password: str, rol: Role = Role.ADMIN):
             firebase_uid=firebase_uid
         )
         db.add(db_user)
+        bump_role_version(db)
         db.commit()
         db.refresh(db_user)
         
@@ -0,0 +1,29 @@
+"""One-shot schema step of a deploy: run it once before starting the workers.
+
+    cd backend/src && python migrate.py
+
+Creates missing tables, applies pending migrations and makes sure the initial
+administrator exists. The workers no longer do any of this on startup.
+"""
+import os
+
+from dotenv import load_dotenv
+
+from config.database import engine
+from config.migrations import current_version, upgrade_schema
+from init_admin import init_admin
+
+load_dotenv(dotenv_path="./env.config")
+
+
+def migrate(crear_admin: bool = True):
+    aplicadas = upgrade_schema(engine)
+    if aplicadas:
+        print(f"Migraciones aplicadas: {', '.join(map(str, aplicadas))}")
+    print(f"Versión del esquema: {current_version(engine)}")
+    if crear_admin and os.getenv("TESTING") != "true" and os.getenv("E2E_TESTING") != "true":
+        init_admin(email=os.getenv("EMAIL_ADMIN"), nombre=os.getenv("NOMBRE_ADMIN"), password=os.getenv("PASSWORD_ADMIN"))
+
+
+if __name__ == "__main__":
+    migrate()
@@ -4,73 +4,109 @@ from sqlalchemy.orm import Session
 from api.models import Usuario, Cuadrilla
 from fastapi import HTTPException
 from api.schemas import UserCreate, UserUpdate, CuadrillaCreate, CuadrillaUpdate, Role
+from services.token_cache import bump_token_version, token_cache, token_version
+from services.role_cache import bump_role_version, role_cache
+from auth.firebase import initialize_firebase
 import requests
-import time
+import asyncio
 
-def verify_user_token(token: str, db: Session, retries: int = 3):
-    # In E2E mode, short-circuit and return a static admin entity
-    if os.environ.get("E2E_TESTING") == "true":
-        return {
+FIREBASE_CLOCK_SKEW_SECONDS = int(os.getenv("FIREBASE_CLOCK_SKEW_SECONDS", "5"))
+TOKEN_RETRY_DELAY_SECONDS = float(os.getenv("TOKEN_RETRY_DELAY_SECONDS", "1"))
+
+def _e2e_entity():
+    return {
+        "type": "usuario",
+        "data": {
+            "id": 1,
+            "uid": "test-uid",
+            "nombre": "Test User",
+            "email": "test@example.com",
+            "rol": Role.ADMIN,
+        },
+    }
+
+def _resolve_entity(token: str, decoded_token: dict, db: Session):
+    email = decoded_token.get("email")
+    firebase_uid = decoded_token.get("uid")
+
+    if not email:
+        raise HTTPException(status_code=400, detail="No se proporcionó un email en el token")
+
+    # La versión se lee antes que la entidad: si otro worker la cambia en el medio, la entrada ya nace vencida.
+    version = token_version(db)
+
+    user = db.query(Usuario).filter(Usuario.email == email).first()
+    if user:
+        if user.firebase_uid and user.firebase_uid != firebase_uid:
+            raise HTTPException(status_code=403, detail="El UID de Firebase no coincide con el registrado para este usuario")
+        if not user.firebase_uid:
+            user.firebase_uid = firebase_uid
+            bump_role_version(db)
+            db.commit()
+            role_cache.invalidate()
+            db.refresh(user)
+        entity = {
             "type": "usuario",
             "data": {
-                "id": 1,
-                "uid": "test-uid",
-                "nombre": "Test User",
-                "email": "test@example.com",
-                "rol": Role.ADMIN,
-            },
+                "id": user.id,
+                "uid": user.firebase_uid,
+                "nombre": user.nombre,
+                "email": user.email,
+                "rol": user.rol
+            }
+        }
+        token_cache.set(token, entity, decoded_token.get("exp"), version)
+        return entity
+
+    cuadrilla = db.query(Cuadrilla).filter(Cuadrilla.email == email).first()
+    if cuadrilla:
+        if cuadrilla.firebase_uid and cuadrilla.firebase_uid != firebase_uid:
+            raise HTTPException(status_code=403, detail="El UID de Firebase no coincide con el registrado para esta cuadrilla")
+        if not cuadrilla.firebase_uid:
+            cuadrilla.firebase_uid = firebase_uid
+            db.commit()
+            db.refresh(cuadrilla)
+        entity = {
+            "type": "cuadrilla",
+            "data": {
+                "id": cuadrilla.id,
+                "uid": cuadrilla.firebase_uid,
+                "nombre": cuadrilla.nombre,
+                "email": cuadrilla.email,
+                "zona": cuadrilla.zona
+            }
         }
+        token_cache.set(token, entity, decoded_token.get("exp"), version)
+        return entity
+
+    raise HTTPException(status_code=403, detail="Entidad no registrada en el sistema")
+
+def verify_user_token(token: str, db: Session):
+    # In E2E mode, short-circuit and return a static admin entity
+    if os.environ.get("E2E_TESTING") == "true":
+        return _e2e_entity()
+    try:
+        initialize_firebase()
+        decoded_token = auth.verify_id_token(token, clock_skew_seconds=FIREBASE_CLOCK_SKEW_SECONDS)
+        return _resolve_entity(token, decoded_token, db)
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=f"Token inválido: {str(e)}")
+
+async def verify_user_token_async(token: str, db: Session, retries: int = 3):
+    # Same as verify_user_token, but the signature check runs in a worker thread
+    # and "Token used too early" retries wait without blocking the event loop.
+    if os.environ.get("E2E_TESTING") == "true":
+        return _e2e_entity()
+    initialize_firebase()
     for attempt in range(retries):
         try:
-            decoded_token = auth.verify_id_token(token)
-            email = decoded_token.get("email")
-            firebase_uid = decoded_token.get("uid")
-
-            if not email:
-                raise HTTPException(status_code=400, detail="No se proporcionó un email en el token")
-
-            user = db.query(Usuario).filter(Usuario.email == email).first()
-            if user:
-                if user.firebase_uid and user.firebase_uid != firebase_uid:
-                    raise HTTPException(status_code=403, detail="El UID de Firebase no coincide con el registrado para este usuario")
-                if not user.firebase_uid:
-                    user.firebase_uid = firebase_uid
-                    db.commit()
-                    db.refresh(user)
-                return {
-                    "type": "usuario",
-                    "data": {
-                        "id": user.id,
-                        "uid": user.firebase_uid,
-                        "nombre": user.nombre,
-                        "email": user.email,
-                        "rol": user.rol
-                    }
-                }
-
-            cuadrilla = db.query(Cuadrilla).filter(Cuadrilla.email == email).first()
-            if cuadrilla:
-                if cuadrilla.firebase_uid and cuadrilla.firebase_uid != firebase_uid:
-                    raise HTTPException(status_code=403, detail="El UID de Firebase no coincide con el registrado para esta cuadrilla")
-                if not cuadrilla.firebase_uid:
-                    cuadrilla.firebase_uid = firebase_uid
-                    db.commit()
-                    db.refresh(cuadrilla)
-                return {
-                    "type": "cuadrilla",
-                    "data": {
-                        "id": cuadrilla.id,
-                        "uid": cuadrilla.firebase_uid,
-                        "nombre": cuadrilla.nombre,
-                        "email": cuadrilla.email,
-                        "zona": cuadrilla.zona
-                    }
-                }
-
-            raise HTTPException(status_code=403, detail="Entidad no registrada en el sistema")
+            decoded_token = await asyncio.to_thread(
+                auth.verify_id_token, token, clock_skew_seconds=FIREBASE_CLOCK_SKEW_SECONDS
+            )
+            return _resolve_entity(token, decoded_token, db)
         except Exception as e:
             if "Token used too early" in str(e) and attempt < retries - 1:
-                time.sleep(1)  # Wait before retry
+                await asyncio.sleep(TOKEN_RETRY_DELAY_SECONDS)
                 continue
             raise HTTPException(status_code=401, detail=f"Token inválido: {str(e)}")
 
@@ -98,6 +134,7 @@ def create_firebase_user(user_data: UserCreate, db: Session, current_entity: dic
                 raise HTTPException(status_code=400, detail="El email del token no coincide con el proporcionado")
             
             # Create or fetch Firebase user
+            initialize_firebase()
             try:
                 firebase_user = auth.create_user(email=user_data.email)
                 firebase_uid = firebase_user.uid
@@ -114,7 +151,9 @@ def create_firebase_user(user_data: UserCreate, db: Session, current_entity: dic
             firebase_uid=firebase_uid
         )
         db.add(db_user)
+        bump_role_version(db)
         db.commit()
+        role_cache.invalidate()
         db.refresh(db_user)
         return db_user
     except Exception as e:
@@ -135,9 +174,13 @@ def update_firebase_user(user_id: int, user_data: UserUpdate, db: Session, curre
             db_user.nombre = user_data.nombre
         if user_data.rol is not None:
             db_user.rol = user_data.rol
+            bump_role_version(db)
+        bump_token_version(db)
 
         db.commit()
         db.refresh(db_user)
+        token_cache.invalidate_entity("usuario", db_user.id)
+        role_cache.invalidate()
         return db_user
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error al actualizar usuario: {str(e)}")
@@ -154,9 +197,14 @@ def delete_firebase_user(user_id: int, db: Session, current_entity: dict):
 
     try:
         if os.environ.get("E2E_TESTING") != "true" and db_user.firebase_uid:
+            initialize_firebase()
             auth.delete_user(db_user.firebase_uid)
         db.delete(db_user)
+        bump_role_version(db)
+        bump_token_version(db)
         db.commit()
+        token_cache.invalidate_entity("usuario", user_id)
+        role_cache.invalidate()
         return {"message": f"Usuario {db_user.email} eliminado correctamente"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error al eliminar usuario: {str(e)}")
@@ -185,6 +233,7 @@ def create_firebase_cuadrilla(cuadrilla_data: CuadrillaCreate, db: Session, curr
                 raise HTTPException(status_code=400, detail="El email del token no coincide con el proporcionado")
 
             # Create or fetch Firebase user
+            initialize_firebase()
             try:
                 firebase_user = auth.create_user(email=cuadrilla_data.email)
                 firebase_uid = firebase_user.uid
@@ -222,9 +271,11 @@ def update_firebase_cuadrilla(cuadrilla_id: int, cuadrilla_data: CuadrillaUpdate
             db_cuadrilla.nombre = cuadrilla_data.nombre
         if cuadrilla_data.zona is not None:
             db_cuadrilla.zona = cuadrilla_data.zona
+        bump_token_version(db)
 
         db.commit()
         db.refresh(db_cuadrilla)
+        token_cache.invalidate_entity("cuadrilla", db_cuadrilla.id)
         return db_cuadrilla
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error al actualizar cuadrilla: {str(e)}")
@@ -241,9 +292,12 @@ def delete_firebase_cuadrilla(cuadrilla_id: int, db: Session, current_entity: di
 
     try:
         if os.environ.get("E2E_TESTING") != "true" and db_cuadrilla.firebase_uid:
+            initialize_firebase()
             auth.delete_user(db_cuadrilla.firebase_uid)
         db.delete(db_cuadrilla)
+        bump_token_version(db)
         db.commit()
+        token_cache.invalidate_entity("cuadrilla", cuadrilla_id)
         return {"message": f"Cuadrilla {db_cuadrilla.email} eliminada correctamente"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error al eliminar cuadrilla: {str(e)}")
@@ -1,4 +1,5 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from api.models import MensajeCorrectivo, MensajePreventivo
 from fastapi import HTTPException, UploadFile
 from typing import Optional
@@ -8,30 +9,83 @@ import os
 
 GOOGLE_CLOUD_BUCKET_NAME = os.getenv("GOOGLE_CLOUD_BUCKET_NAME")
 
-def get_chat_correctivo(db_session: Session, mantenimiento_id: int, current_entity: dict):
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "100"))
+CHAT_MAX_PAGE_SIZE = int(os.getenv("CHAT_MAX_PAGE_SIZE", "500"))
+
+async def _get_chat_page(
+    db_session: AsyncSession,
+    model,
+    mantenimiento_id: int,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    since_id: Optional[int] = None,
+    limit: Optional[int] = None,
+):
+    """One page of a chat in chronological (created_at, id) order.
+
+    `before`/`after` are message ids used as keyset cursors: the page holds the
+    `limit` messages right before or after that message. `since_id` returns the
+    messages with a higher id, for clients catching up after a reconnect. With
+    no cursor the latest page is returned.
+    """
+    if sum(cursor is not None for cursor in (before, after, since_id)) > 1:
+        raise HTTPException(status_code=400, detail="Usá solo uno de before, after o since_id")
+    limit = min(CHAT_PAGE_SIZE if limit is None else limit, CHAT_MAX_PAGE_SIZE)
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit debe ser mayor a 0")
+    query = select(model).where(model.id_mantenimiento == mantenimiento_id)
+    cursor_id = before if before is not None else after
+    if cursor_id is not None:
+        cursor = (
+            await db_session.execute(
+                select(model.created_at, model.id).where(model.id == cursor_id, model.id_mantenimiento == mantenimiento_id)
+            )
+        ).first()
+        if cursor is None:
+            raise HTTPException(status_code=404, detail="Mensaje no encontrado")
+        if before is not None:
+            query = query.where(
+                or_(model.created_at < cursor.created_at, and_(model.created_at == cursor.created_at, model.id < cursor.id))
+            )
+        else:
+            query = query.where(
+                or_(model.created_at > cursor.created_at, and_(model.created_at == cursor.created_at, model.id > cursor.id))
+            )
+    elif since_id is not None:
+        query = query.where(model.id > since_id)
+
+    if after is not None or since_id is not None:
+        return list((await db_session.scalars(query.order_by(model.created_at, model.id).limit(limit))).all())
+    # Sin cursor o con before: los últimos `limit` mensajes, devueltos en orden cronológico.
+    page = list((await db_session.scalars(query.order_by(model.created_at.desc(), model.id.desc()).limit(limit))).all())
+    page.reverse()
+    return page
+
+async def get_chat_correctivo(db_session: AsyncSession, mantenimiento_id: int, current_entity: dict, **cursor):
     if not current_entity:
         raise HTTPException(status_code=401, detail="Autenticación requerida")
-    chat = db_session.query(MensajeCorrectivo).filter(MensajeCorrectivo.id_mantenimiento == mantenimiento_id).all()
+    chat = await _get_chat_page(db_session, MensajeCorrectivo, mantenimiento_id, **cursor)
     if not chat:
         return {"message": "No hay mensajes"}
     return chat
 
-def get_chat_preventivo(db_session: Session, mantenimiento_id: int, current_entity: dict):
+async def get_chat_preventivo(db_session: AsyncSession, mantenimiento_id: int, current_entity: dict, **cursor):
     if not current_entity:
         raise HTTPException(status_code=401, detail="Autenticación requerida")
-    chat = db_session.query(MensajePreventivo).filter(MensajePreventivo.id_mantenimiento == mantenimiento_id).all()
+    chat = await _get_chat_page(db_session, MensajePreventivo, mantenimiento_id, **cursor)
     if not chat:
         return {"message": "No hay mensajes"}
     return chat
 
 async def send_message_correctivo(
-    db_session: Session,
+    db_session: AsyncSession,
     id_mantenimiento: int,
     firebase_uid: str,
     nombre_usuario: str,
     current_entity: dict,
     texto: Optional[str] = None,
     archivo: Optional[UploadFile] = None,
+    archivo_url: Optional[str] = None,
     ):
     if not current_entity:
         raise HTTPException(status_code=401, detail="Autenticación requerida")
@@ -51,11 +105,11 @@ async def send_message_correctivo(
             db_message.texto = texto
         if archivo is not None:
             archivo_url = await upload_chat_file_to_gcloud(archivo, bucket_name, f"{base_folder}/chat")
+        if archivo_url is not None:
             db_message.archivo = archivo_url
         
         db_session.add(db_message)
-        db_session.commit()
-        db_session.refresh(db_message)
+        await db_session.commit()
         await chat_manager.send_message(
             id_mantenimiento,
             {
@@ -70,18 +124,19 @@ async def send_message_correctivo(
         )
         return db_message
     except Exception as e:
-        db_session.rollback()
+        await db_session.rollback()
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 
 async def send_message_preventivo(
-    db_session: Session,
+    db_session: AsyncSession,
     id_mantenimiento: int,
     firebase_uid: str,
     nombre_usuario: str,
     current_entity: dict,
     texto: Optional[str] = None,
     archivo: Optional[UploadFile] = None,
+    archivo_url: Optional[str] = None,
     ):
     if not current_entity:
         raise HTTPException(status_code=401, detail="Autenticación requerida")
@@ -101,11 +156,11 @@ async def send_message_preventivo(
             db_message.texto = texto
         if archivo is not None:
             archivo_url = await upload_chat_file_to_gcloud(archivo, bucket_name, f"{base_folder}/chat")
+        if archivo_url is not None:
             db_message.archivo = archivo_url
         
         db_session.add(db_message)
-        db_session.commit()
-        db_session.refresh(db_message)
+        await db_session.commit()
         await chat_manager.send_message(
             id_mantenimiento,
             {
@@ -120,5 +175,5 @@ async def send_message_preventivo(
         )
         return db_message
     except Exception as e:
-        db_session.rollback()
+        await db_session.rollback()
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
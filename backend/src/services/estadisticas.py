@@ -0,0 +1,189 @@
+from sqlalchemy import case, extract, func
+from sqlalchemy.orm import Session
+
+from api.models import Cuadrilla, MantenimientoCorrectivo, MantenimientoPreventivo, Sucursal
+from api.schemas import EstadisticasFiltros
+
+SIN_ZONA = "Sin zona"
+ESTADO_FINALIZADO = "Finalizado"
+
+
+def _redondear(value) -> float:
+    return round(float(value), 2) if value is not None else 0
+
+
+def dias_resolucion(db: Session, model):
+    """Days between fecha_apertura and fecha_cierre, computed by the database."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.julianday(model.fecha_cierre) - func.julianday(model.fecha_apertura)
+    return model.fecha_cierre - model.fecha_apertura
+
+
+def _base_query(db: Session, model, filtros: EstadisticasFiltros, *columns):
+    query = db.query(*columns).select_from(model).join(Sucursal, Sucursal.id == model.sucursal_id)
+    if filtros.meses:
+        query = query.filter(extract("month", model.fecha_apertura).in_(filtros.meses))
+    if filtros.anios:
+        query = query.filter(extract("year", model.fecha_apertura).in_(filtros.anios))
+    if filtros.meses or filtros.anios:
+        query = query.filter(model.fecha_apertura.isnot(None))
+    if filtros.cliente_id is not None:
+        query = query.filter(model.cliente_id == filtros.cliente_id)
+    if filtros.zona:
+        query = query.filter(Sucursal.zona == filtros.zona)
+    if filtros.sucursal_id is not None:
+        query = query.filter(model.sucursal_id == filtros.sucursal_id)
+    if filtros.id_cuadrilla is not None:
+        query = query.filter(model.id_cuadrilla == filtros.id_cuadrilla)
+    if filtros.estado:
+        query = query.filter(model.estado == filtros.estado)
+    return query
+
+
+def _conteo_por(db: Session, model, filtros: EstadisticasFiltros, column) -> dict:
+    rows = _base_query(db, model, filtros, column, func.count(model.id)).group_by(column).all()
+    return {key if key is not None else "": count for key, count in rows}
+
+
+def _reporte_cuadrillas(db: Session, model, filtros: EstadisticasFiltros, resuelto) -> list:
+    resueltos = func.sum(case((resuelto, 1), else_=0))
+    rows = (
+        _base_query(db, model, filtros, Cuadrilla.id, Cuadrilla.nombre, func.count(model.id), resueltos)
+        .join(Cuadrilla, Cuadrilla.id == model.id_cuadrilla)
+        .group_by(Cuadrilla.id, Cuadrilla.nombre)
+        .order_by(Cuadrilla.id)
+        .all()
+    )
+    return [
+        {
+            "id_cuadrilla": cuadrilla_id,
+            "nombre": nombre,
+            "asignados": asignados,
+            "resueltos": int(resueltos or 0),
+            "ratio": _redondear((resueltos or 0) / asignados),
+        }
+        for cuadrilla_id, nombre, asignados, resueltos in rows
+    ]
+
+
+def get_reporte_preventivos(db: Session, filtros: EstadisticasFiltros) -> list:
+    return _reporte_cuadrillas(db, MantenimientoPreventivo, filtros, MantenimientoPreventivo.fecha_cierre.isnot(None))
+
+
+def get_reporte_correctivos(db: Session, filtros: EstadisticasFiltros) -> list:
+    return _reporte_cuadrillas(db, MantenimientoCorrectivo, filtros, MantenimientoCorrectivo.estado == ESTADO_FINALIZADO)
+
+
+def get_reporte_rubros(db: Session, filtros: EstadisticasFiltros) -> dict:
+    filtros = filtros.model_copy(update={"estado": ESTADO_FINALIZADO})
+    dias = dias_resolucion(db, MantenimientoCorrectivo)
+    rows = (
+        _base_query(db, MantenimientoCorrectivo, filtros, MantenimientoCorrectivo.rubro, func.avg(dias), func.count(MantenimientoCorrectivo.id))
+        .group_by(MantenimientoCorrectivo.rubro)
+        .order_by(MantenimientoCorrectivo.rubro)
+        .all()
+    )
+    total_avg, total_count = _base_query(
+        db, MantenimientoCorrectivo, filtros, func.avg(dias), func.count(MantenimientoCorrectivo.id)
+    ).one()
+    return {
+        "rubros": [
+            {"rubro": rubro, "promedio_dias": _redondear(avg), "cantidad": count}
+            for rubro, avg, count in rows
+        ],
+        "promedio_dias": _redondear(total_avg),
+        "cantidad": total_count,
+    }
+
+
+def get_reporte_zonas(db: Session, filtros: EstadisticasFiltros) -> list:
+    zona = func.coalesce(Sucursal.zona, SIN_ZONA)
+    totales = (
+        _base_query(db, MantenimientoCorrectivo, filtros, zona, func.count(MantenimientoCorrectivo.id))
+        .group_by(zona)
+        .order_by(zona)
+        .all()
+    )
+    sucursales_query = db.query(zona, func.count(Sucursal.id))
+    if filtros.cliente_id is not None:
+        sucursales_query = sucursales_query.filter(Sucursal.cliente_id == filtros.cliente_id)
+    if filtros.sucursal_id is not None:
+        sucursales_query = sucursales_query.filter(Sucursal.id == filtros.sucursal_id)
+    sucursales_por_zona = dict(sucursales_query.group_by(zona).all())
+    return [
+        {
+            "zona": nombre,
+            "total_correctivos": total,
+            "promedio_correctivos": _redondear(total / (sucursales_por_zona.get(nombre) or 1)),
+        }
+        for nombre, total in totales
+    ]
+
+
+def get_reporte_sucursales(db: Session, filtros: EstadisticasFiltros) -> list:
+    rows = (
+        _base_query(
+            db, MantenimientoCorrectivo, filtros,
+            Sucursal.id, Sucursal.nombre, Sucursal.zona, func.count(MantenimientoCorrectivo.id),
+        )
+        .group_by(Sucursal.id, Sucursal.nombre, Sucursal.zona)
+        .order_by(Sucursal.id)
+        .all()
+    )
+    return [
+        {"sucursal_id": sucursal_id, "sucursal": nombre, "zona": zona, "total_correctivos": total}
+        for sucursal_id, nombre, zona, total in rows
+    ]
+
+
+def _serie_mensual(db: Session, model, filtros: EstadisticasFiltros) -> dict:
+    anio = extract("year", model.fecha_apertura)
+    mes = extract("month", model.fecha_apertura)
+    rows = (
+        _base_query(db, model, filtros, anio, mes, func.count(model.id))
+        .filter(model.fecha_apertura.isnot(None))
+        .group_by(anio, mes)
+        .all()
+    )
+    return {(int(a), int(m)): count for a, m, count in rows}
+
+
+def _promedio_resolucion(db: Session, model, filtros: EstadisticasFiltros) -> float:
+    avg = (
+        _base_query(db, model, filtros, func.avg(dias_resolucion(db, model)))
+        .filter(model.fecha_cierre.isnot(None))
+        .scalar()
+    )
+    return _redondear(avg)
+
+
+def get_resumen(db: Session, filtros: EstadisticasFiltros) -> dict:
+    correctivos_por_mes = _serie_mensual(db, MantenimientoCorrectivo, filtros)
+    preventivos_por_mes = _serie_mensual(db, MantenimientoPreventivo, filtros)
+    periodos = sorted(set(correctivos_por_mes) | set(preventivos_por_mes))
+    zona = func.coalesce(Sucursal.zona, SIN_ZONA)
+    return {
+        "correctivos": {
+            "por_estado": _conteo_por(db, MantenimientoCorrectivo, filtros, MantenimientoCorrectivo.estado),
+            "por_prioridad": _conteo_por(db, MantenimientoCorrectivo, filtros, MantenimientoCorrectivo.prioridad),
+            "por_rubro": _conteo_por(db, MantenimientoCorrectivo, filtros, MantenimientoCorrectivo.rubro),
+            "por_zona": _conteo_por(db, MantenimientoCorrectivo, filtros, zona),
+            "por_cuadrilla": _conteo_por(db, MantenimientoCorrectivo, filtros, MantenimientoCorrectivo.id_cuadrilla),
+            "promedio_dias_resolucion": _promedio_resolucion(db, MantenimientoCorrectivo, filtros),
+        },
+        "preventivos": {
+            "por_estado": _conteo_por(db, MantenimientoPreventivo, filtros, MantenimientoPreventivo.estado),
+            "por_zona": _conteo_por(db, MantenimientoPreventivo, filtros, zona),
+            "por_cuadrilla": _conteo_por(db, MantenimientoPreventivo, filtros, MantenimientoPreventivo.id_cuadrilla),
+            "promedio_dias_resolucion": _promedio_resolucion(db, MantenimientoPreventivo, filtros),
+        },
+        "por_mes": [
+            {
+                "anio": anio,
+                "mes": mes,
+                "correctivos": correctivos_por_mes.get((anio, mes), 0),
+                "preventivos": preventivos_por_mes.get((anio, mes), 0),
+            }
+            for anio, mes in periodos
+        ],
+    }
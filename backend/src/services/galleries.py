@@ -0,0 +1,125 @@
+import html
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from google.api_core.exceptions import NotFound
+from sqlalchemy.orm import Session
+
+from api.models import MantenimientoCorrectivoFoto, MantenimientoPreventivoFoto, MantenimientoPreventivoPlanilla
+from config.database import SessionLocal
+from services.gcloud_storage import get_bucket
+from services.sheet_outbox import enqueue_sheet_sync
+from services.thumbnails import variant_url
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CLOUD_BUCKET_NAME = os.getenv("GOOGLE_CLOUD_BUCKET_NAME")
+GALLERY_DEBOUNCE_SECONDS = float(os.getenv("GALLERY_DEBOUNCE_SECONDS", "3"))
+
+CARPETAS = {
+    ("correctivo", "fotos"): MantenimientoCorrectivoFoto,
+    ("preventivo", "fotos"): MantenimientoPreventivoFoto,
+    ("preventivo", "planillas"): MantenimientoPreventivoPlanilla,
+}
+PREFIJOS = {"correctivo": "mantenimientos_correctivos", "preventivo": "mantenimientos_preventivos"}
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic")
+
+GalleryKey = Tuple[str, int, str]
+
+_lock = threading.Lock()
+_pendientes: Dict[GalleryKey, threading.Timer] = {}
+
+
+def gallery_folder(tipo: str, mantenimiento_id: int, carpeta: str) -> str:
+    return f"{PREFIJOS[tipo]}/{mantenimiento_id}/{carpeta}"
+
+
+def render_gallery_html(urls: List[str], con_variantes: bool = False) -> str:
+    items = []
+    for url in urls:
+        href = html.escape(url, quote=True)
+        if url.lower().endswith(IMAGE_EXTENSIONS) and con_variantes:
+            web = html.escape(variant_url(url, "web"), quote=True)
+            thumb = html.escape(variant_url(url, "thumb"), quote=True)
+            items.append(f'<a href="{web}" target="_blank"><img src="{thumb}" loading="lazy"></a>')
+        elif url.lower().endswith(IMAGE_EXTENSIONS):
+            items.append(f'<a href="{href}" target="_blank"><img src="{href}" loading="lazy"></a>')
+        else:
+            items.append(f'<a href="{href}" target="_blank">{html.escape(url.rsplit("/", 1)[-1])}</a>')
+    return (
+        "<!DOCTYPE html><html><head><style>"
+        ".gallery { display: flex; flex-wrap: wrap; gap: 10px; }"
+        ".gallery img { max-width: 200px; height: auto; border: 1px solid #ddd; }"
+        '</style></head><body><div class="gallery">'
+        + "".join(items)
+        + "</div></body></html>"
+    )
+
+
+def rebuild_gallery(db: Session, tipo: str, mantenimiento_id: int, carpeta: str) -> Optional[str]:
+    """Rewrite index.html of one folder from the DB rows; removes it when the folder is empty."""
+    model = CARPETAS[(tipo, carpeta)]
+    urls = [
+        url
+        for (url,) in db.query(model.url).filter(model.mantenimiento_id == mantenimiento_id).order_by(model.id)
+    ]
+    path = f"{gallery_folder(tipo, mantenimiento_id, carpeta)}/index.html"
+    blob = get_bucket(GOOGLE_CLOUD_BUCKET_NAME).blob(path)
+    if urls:
+        blob.cache_control = "no-cache, max-age=0"
+        blob.upload_from_string(render_gallery_html(urls, con_variantes=carpeta == "fotos"), content_type="text/html")
+    else:
+        try:
+            blob.delete()
+        except NotFound:
+            pass
+    # El link a la galería en la planilla depende de que exista el index.html.
+    enqueue_sheet_sync(db, tipo, "update", mantenimiento_id)
+    db.commit()
+    return f"https://storage.googleapis.com/{GOOGLE_CLOUD_BUCKET_NAME}/{path}" if urls else None
+
+
+def _ejecutar(key: GalleryKey, timer: Optional[threading.Timer]):
+    with _lock:
+        if timer is not None and _pendientes.get(key) is not timer:
+            return  # reprogramada mientras esperaba: la corrida más nueva se encarga
+        _pendientes.pop(key, None)
+    db = SessionLocal()
+    try:
+        rebuild_gallery(db, *key)
+    except Exception as exc:
+        logger.warning("No se pudo regenerar la galería %s: %s", gallery_folder(*key), exc, exc_info=True)
+    finally:
+        db.close()
+
+
+def schedule_gallery(tipo: str, mantenimiento_id: int, carpeta: str):
+    """Rebuild a gallery in the background once changes to its folder stop for a short window.
+
+    Call after committing the photo rows; repeated calls for the same folder
+    inside GALLERY_DEBOUNCE_SECONDS collapse into a single rebuild.
+    """
+    if not GOOGLE_CLOUD_BUCKET_NAME:
+        return
+    key = (tipo, mantenimiento_id, carpeta)
+    with _lock:
+        anterior = _pendientes.get(key)
+        if anterior is not None:
+            anterior.cancel()
+        timer = threading.Timer(GALLERY_DEBOUNCE_SECONDS, lambda: _ejecutar(key, timer))
+        timer.daemon = True
+        _pendientes[key] = timer
+        timer.start()
+
+
+def flush_galleries():
+    """Run every pending rebuild now, e.g. on shutdown."""
+    with _lock:
+        pendientes = list(_pendientes.items())
+        for _, timer in pendientes:
+            timer.cancel()
+        _pendientes.clear()
+    for key, _ in pendientes:
+        _ejecutar(key, None)
@@ -1,142 +1,284 @@
 from google.cloud import storage
-from google.api_core.exceptions import GoogleAPIError
+from google.api_core.exceptions import GoogleAPIError, NotFound
 from fastapi import HTTPException, UploadFile
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+import asyncio
+import functools
+import io
+import logging
+import threading
 import uuid
 import os
 import json
 
-GOOGLE_CREDENTIALS = json.loads(os.getenv("GOOGLE_CREDENTIALS"))
+from services.thumbnails import VARIANTES, build_variants, variant_url
+
+logger = logging.getLogger(__name__)
+
+# Se parsea recién al crear el cliente: importar el módulo no requiere credenciales.
+GOOGLE_CREDENTIALS = os.getenv("GOOGLE_CREDENTIALS")
+GCS_POOL_MAXSIZE = int(os.getenv("GCS_POOL_MAXSIZE", "32"))
+# Subidas/lecturas bloqueantes simultáneas por worker; el pool HTTP debería ser al menos igual de grande.
+GCS_MAX_WORKERS = int(os.getenv("GCS_MAX_WORKERS", "8"))
+# Subidas en paralelo de un mismo request (lote de fotos/planillas).
+GCS_UPLOAD_FANOUT = int(os.getenv("GCS_UPLOAD_FANOUT", "4"))
+# GCS exige múltiplos de 256 KiB para los chunks de una subida resumable.
+GCS_UPLOAD_CHUNK_SIZE = max(1, int(os.getenv("GCS_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024))) // (256 * 1024)) * 256 * 1024
+
+# Los prefijos de GCS no necesitan objetos "carpeta"; se mantienen sólo si se pide explícitamente.
+GCS_FOLDER_MARKERS = os.getenv("GCS_FOLDER_MARKERS", "false").lower() == "true"
+
+# Un único cliente por proceso: cada Client nuevo significa autenticación y pool HTTP nuevos.
+_client_lock = threading.Lock()
+_storage_client = None
+_buckets = {}
+_known_prefixes = set()
+_executor: Optional[ThreadPoolExecutor] = None
+
+def _gcs_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _client_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=GCS_MAX_WORKERS, thread_name_prefix="gcs")
+        return _executor
+
+async def run_in_gcs_executor(fn, *args, **kwargs):
+    """Run a blocking GCS call on the bounded pool so the event loop keeps serving requests."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_gcs_executor(), functools.partial(fn, *args, **kwargs))
+
+def submit_to_gcs_executor(fn, *args, **kwargs):
+    """Fire-and-forget a blocking GCS task on the bounded pool from sync code."""
+    return _gcs_executor().submit(fn, *args, **kwargs)
+
+def _configure_pool(client):
+    http = getattr(client, "_http", None)
+    if http is None or not hasattr(http, "mount"):
+        return
+    adapter = HTTPAdapter(pool_connections=GCS_POOL_MAXSIZE, pool_maxsize=GCS_POOL_MAXSIZE)
+    http.mount("https://", adapter)
+
+def get_storage_client():
+    """Return the process-wide storage client, creating it on first use."""
+    global _storage_client
+    if not GOOGLE_CREDENTIALS:
+        raise HTTPException(status_code=500, detail="Google Cloud credentials not configured")
+    with _client_lock:
+        if _storage_client is None:
+            client = storage.Client.from_service_account_info(json.loads(GOOGLE_CREDENTIALS))
+            _configure_pool(client)
+            _storage_client = client
+        return _storage_client
+
+def get_bucket(bucket_name: str):
+    """Return a cached bucket handle bound to the shared client."""
+    client = get_storage_client()
+    with _client_lock:
+        bucket = _buckets.get(bucket_name)
+        if bucket is None:
+            bucket = _buckets[bucket_name] = client.bucket(bucket_name)
+        return bucket
+
+def reset_storage_client():
+    global _storage_client
+    with _client_lock:
+        _storage_client = None
+        _buckets.clear()
+        _known_prefixes.clear()
 
 def create_folder_if_not_exists(bucket_name: str, folder_path: str):
+    """Write the legacy folder marker object, only when GCS_FOLDER_MARKERS is enabled.
+
+    GCS prefixes exist implicitly, so by default this is a no-op; with markers on,
+    prefixes already seen by this process are not checked again.
+    """
+    if not GCS_FOLDER_MARKERS:
+        return
+    if not folder_path.endswith('/'):
+        folder_path += '/'
+    key = (bucket_name, folder_path)
+    if key in _known_prefixes:
+        return
     try:
-        if not GOOGLE_CREDENTIALS:
-            raise HTTPException(status_code=500, detail="Google Cloud credentials not configured")
-        
-        storage_client = storage.Client.from_service_account_info(GOOGLE_CREDENTIALS)
-        bucket = storage_client.bucket(bucket_name)
-        if not folder_path.endswith('/'):
-            folder_path += '/'
+        bucket = get_bucket(bucket_name)
         blob = bucket.blob(folder_path)
         if not blob.exists():
             blob.upload_from_string('', content_type='application/x-directory')
+        _known_prefixes.add(key)
     except GoogleAPIError as e:
         raise HTTPException(status_code=500, detail=f"Failed to create folder in GCS: {str(e)}")
 
-def generate_gallery_html(bucket_name: str, folder: str):
-    """Generate an HTML gallery for photos in the specified GCS folder."""
+def delete_folder_markers(bucket_name: str, prefix: str = "", dry_run: bool = False) -> List[str]:
+    """Remove the empty "folder/" marker objects left under a prefix; returns their names."""
+    bucket = get_bucket(bucket_name)
+    markers = [
+        blob
+        for blob in bucket.list_blobs(prefix=prefix)
+        if blob.name.endswith("/") and not blob.size
+    ]
+    if not dry_run:
+        for blob in markers:
+            blob.delete()
+    return [blob.name for blob in markers]
+
+def _upload_blob(file: UploadFile, bucket_name: str, folder: str, cache_control: Optional[str] = None):
+    bucket = get_bucket(bucket_name)
+    file_extension = file.filename.split(".")[-1]
+    destination_blob_name = f"{folder.rstrip('/')}/{uuid.uuid4()}.{file_extension}"
+
+    blob = bucket.blob(destination_blob_name)
+    if cache_control:
+        # Se envía con la subida; no hace falta un patch() aparte.
+        blob.cache_control = cache_control
+    if (file.size or 0) > GCS_UPLOAD_CHUNK_SIZE:
+        # Subida resumable por chunks desde el spool del UploadFile, sin cargar el archivo en memoria.
+        blob.chunk_size = GCS_UPLOAD_CHUNK_SIZE
+    file.file.seek(0)
+    blob.upload_from_file(file.file, content_type=file.content_type)
+    return blob
+
+def _upload_variants(bucket, blob, file: UploadFile):
+    """Store the downscaled variants of an uploaded photo next to its folder."""
+    variantes = build_variants(file.file)
+    for variante in VARIANTES:
+        nombre = variant_url(blob.name, variante)
+        if variante not in variantes:
+            # No se pudo reducir (formato no soportado): el link de la variante igual tiene que existir.
+            bucket.copy_blob(blob, bucket, nombre)
+            continue
+        contenido, content_type = variantes[variante]
+        variant_blob = bucket.blob(nombre)
+        # Los nombres son únicos (uuid) y nunca se sobreescriben.
+        variant_blob.cache_control = "public, max-age=86400"
+        variant_blob.upload_from_string(contenido, content_type=content_type)
+
+def ensure_photo_variants(bucket_name: str, blob_name: str) -> bool:
+    """Create the variants of an already stored photo if missing; True if they were created."""
+    bucket = get_bucket(bucket_name)
+    if bucket.blob(variant_url(blob_name, "thumb")).exists():
+        return False
+    blob = bucket.blob(blob_name)
+    contenido = io.BytesIO()
+    blob.download_to_file(contenido)
+    _upload_variants(bucket, blob, UploadFile(file=contenido, filename=blob_name))
+    return True
+
+def _delete_blob(bucket, blob, variantes: bool):
+    for nombre in [blob.name] + ([variant_url(blob.name, variante) for variante in VARIANTES] if variantes else []):
+        try:
+            bucket.blob(nombre).delete()
+        except NotFound:
+            pass
+
+def _upload_photo(file: UploadFile, bucket_name: str, folder: str, cache_control: Optional[str] = None):
+    blob = _upload_blob(file, bucket_name, folder, cache_control)
+    bucket = get_bucket(bucket_name)
     try:
-        if not GOOGLE_CREDENTIALS:
-            raise HTTPException(status_code=500, detail="Google Cloud credentials not configured")
-        
-        storage_client = storage.Client.from_service_account_info(GOOGLE_CREDENTIALS)
-        bucket = storage_client.bucket(bucket_name)
-        prefix = folder.rstrip("/") + "/"
-        
-        # Borrar el index.html si ya existe
-        index_blob = bucket.blob(f"{prefix}index.html")
-        if index_blob.exists():
-            index_blob.delete()
-        
-        blobs = bucket.list_blobs(prefix=prefix)
-        urls = [
-            f"https://storage.googleapis.com/{bucket_name}/{blob.name}"
-            for blob in blobs
-            if not blob.name.endswith("index.html") and blob.content_type.startswith("image/")
-        ]
-        
-        if not urls:
-            return None  # No photos, no gallery needed
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                .gallery {{ display: flex; flex-wrap: wrap; gap: 10px; }}
-                .gallery img {{ max-width: 200px; height: auto; border: 1px solid #ddd; }}
-            </style>
-        </head>
-        <body>
-            <div class="gallery">
-        """
-        for url in urls:
-            html_content += f'<a href="{url}" target="_blank"><img src="{url}"></a>'
-        html_content += """
-            </div>
-        </body>
-        </html>
-        """
-        
-        blob = bucket.blob(f"{prefix}index.html")
-        blob.cache_control = "no-cache, max-age=0"
-        blob.upload_from_string(html_content, content_type="text/html")
-        blob.patch()
-        return f"https://storage.googleapis.com/{bucket_name}/{prefix}index.html"
-    except GoogleAPIError as e:
-        raise HTTPException(status_code=500, detail=f"Failed to generate gallery HTML: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+        _upload_variants(bucket, blob, file)
+    except Exception:
+        # Sin sus variantes la foto no se registra: no se deja el original huérfano.
+        _delete_blob(bucket, blob, variantes=True)
+        raise
+    return blob
+
+def _delete_uploaded(bucket_name: str, subidos):
+    bucket = get_bucket(bucket_name)
+    for blob, variantes in subidos:
+        try:
+            _delete_blob(bucket, blob, variantes)
+        except GoogleAPIError as e:
+            logger.warning("No se pudo borrar %s tras una subida fallida: %s", blob.name, e)
+
+def _upload_error(e: Exception) -> HTTPException:
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, GoogleAPIError):
+        return HTTPException(status_code=500, detail=f"Failed to upload file to GCS: {str(e)}")
+    return HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 async def upload_file_to_gcloud(file: UploadFile, bucket_name: str, folder: str = "") -> str:
     try:
-        if not GOOGLE_CREDENTIALS:
-            raise HTTPException(status_code=500, detail="Google Cloud credentials not configured")
-        
-        storage_client = storage.Client.from_service_account_info(GOOGLE_CREDENTIALS)
-        bucket = storage_client.bucket(bucket_name)
-        
-        create_folder_if_not_exists(bucket_name, folder)
-        
-        file_extension = file.filename.split(".")[-1]
-        destination_blob_name = f"{folder.rstrip('/')}/{uuid.uuid4()}.{file_extension}"
-        
-        blob = bucket.blob(destination_blob_name)
-        blob.cache_control = "no-cache, max-age=0"
-        blob.upload_from_file(file.file, content_type=file.content_type)
-        blob.patch()
-        
-        generate_gallery_html(bucket_name, folder)
-        
+        await run_in_gcs_executor(create_folder_if_not_exists, bucket_name, folder)
+        blob = await run_in_gcs_executor(_upload_blob, file, bucket_name, folder, "no-cache, max-age=0")
         return blob.public_url
     except GoogleAPIError as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload file to GCS: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
     
+async def upload_file_groups_to_gcloud(
+    grupos: Sequence[Tuple[List[UploadFile], str, bool]], bucket_name: str
+) -> List[List[str]]:
+    """Upload several (files, folder, variantes) groups in one concurrent fan-out.
+
+    At most GCS_UPLOAD_FANOUT uploads of the whole call are in flight at a time,
+    so a single request cannot take over the GCS executor. URLs are returned per
+    group, in the same order as its files. With variantes=True each photo also
+    gets its thumbnail and web-sized copies (see services.thumbnails). If any
+    upload fails, the blobs already stored by the call are deleted before the
+    error is raised, so a failed request leaves no orphan files behind.
+    """
+    semaphore = asyncio.Semaphore(GCS_UPLOAD_FANOUT)
+
+    async def _subir(file: UploadFile, folder: str, variantes: bool):
+        async with semaphore:
+            subir = _upload_photo if variantes else _upload_blob
+            return await run_in_gcs_executor(subir, file, bucket_name, folder, "no-cache, max-age=0")
+
+    subidas = [(indice, variantes, file, folder) for indice, (files, folder, variantes) in enumerate(grupos) for file in files or []]
+    urls = [[] for _ in grupos]
+    if not subidas:
+        return urls
+    try:
+        for folder in dict.fromkeys(folder for _, _, _, folder in subidas):
+            await run_in_gcs_executor(create_folder_if_not_exists, bucket_name, folder)
+    except Exception as e:
+        raise _upload_error(e)
+
+    resultados = await asyncio.gather(
+        *(_subir(file, folder, variantes) for _, variantes, file, folder in subidas), return_exceptions=True
+    )
+    errores = [r for r in resultados if isinstance(r, BaseException)]
+    if errores:
+        subidos = [(r, variantes) for (_, variantes, _, _), r in zip(subidas, resultados) if not isinstance(r, BaseException)]
+        if subidos:
+            await run_in_gcs_executor(_delete_uploaded, bucket_name, subidos)
+        if not isinstance(errores[0], Exception):
+            raise errores[0]
+        raise _upload_error(errores[0])
+    for (indice, _, _, _), blob in zip(subidas, resultados):
+        urls[indice].append(blob.public_url)
+    return urls
+
+async def upload_files_to_gcloud(files: List[UploadFile], bucket_name: str, folder: str = "", variantes: bool = False) -> List[str]:
+    """Upload several files of one folder concurrently; see upload_file_groups_to_gcloud."""
+    return (await upload_file_groups_to_gcloud([(files, folder, variantes)], bucket_name))[0]
+
 async def upload_chat_file_to_gcloud(file: UploadFile, bucket_name: str, folder: str = "") -> str:
     try:
-        if not GOOGLE_CREDENTIALS:
-            raise HTTPException(status_code=500, detail="Google Cloud credentials not configured")
-        
-        storage_client = storage.Client.from_service_account_info(GOOGLE_CREDENTIALS)
-        bucket = storage_client.bucket(bucket_name)
-        
-        create_folder_if_not_exists(bucket_name, folder)
-        
-        file_extension = file.filename.split(".")[-1]
-        destination_blob_name = f"{folder.rstrip('/')}/{uuid.uuid4()}.{file_extension}"
-        
-        blob = bucket.blob(destination_blob_name)
-        blob.upload_from_file(file.file, content_type=file.content_type)
-        
+        await run_in_gcs_executor(create_folder_if_not_exists, bucket_name, folder)
+        blob = await run_in_gcs_executor(_upload_blob, file, bucket_name, folder)
         return blob.public_url
     except GoogleAPIError as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload file to GCS: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
-def delete_file_in_folder(bucket_name: str, folder: str, file_path: str) -> bool:
+def delete_file_in_folder(bucket_name: str, folder: str, file_path: str, variantes: bool = False) -> bool:
     try:
-        if not GOOGLE_CREDENTIALS:
-            raise HTTPException(status_code=500, detail="Google Cloud credentials not configured")
-        
-        storage_client = storage.Client.from_service_account_info(GOOGLE_CREDENTIALS)
-        bucket = storage_client.bucket(bucket_name)
+        bucket = get_bucket(bucket_name)
         blob = bucket.blob(f"{folder.rstrip('/')}/{file_path.lstrip('/')}")
         exists = blob.exists()
         if exists:
             blob.delete()
-        generate_gallery_html(bucket_name, folder)
+        if variantes:
+            for variante in VARIANTES:
+                try:
+                    bucket.blob(variant_url(blob.name, variante)).delete()
+                except NotFound:
+                    pass
         return exists
     except GoogleAPIError as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete file in GCS: {str(e)}")
\ No newline at end of file
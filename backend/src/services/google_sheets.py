@@ -1,20 +1,18 @@
 import os
+import re
 import json
 import logging
+import threading
+from collections import Counter
 from datetime import date, datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
 
 import gspread
 from gspread.exceptions import APIError
-try:
-    from gspread.exceptions import CellNotFound
-except ImportError:
-    class CellNotFound(Exception):
-        """Fallback when gspread does not expose CellNotFound."""
-        pass
-from oauth2client.service_account import ServiceAccountCredentials
-from google.cloud import storage
+from google.oauth2 import service_account
 
 from api.models import MantenimientoCorrectivo, MantenimientoPreventivo
+from services.gcloud_storage import get_bucket
 
 logger = logging.getLogger(__name__)
 
@@ -22,11 +20,6 @@ GOOGLE_CREDENTIALS = os.getenv("GOOGLE_CREDENTIALS")
 GOOGLE_CLOUD_BUCKET_NAME = os.getenv("GOOGLE_CLOUD_BUCKET_NAME")
 SHEET_ID = os.getenv("GOOGLE_SHEET_ID")
 GOOGLE_CREDENTIALS_DICT = json.loads(GOOGLE_CREDENTIALS) if GOOGLE_CREDENTIALS else None
-storage_client = (
-    storage.Client.from_service_account_info(GOOGLE_CREDENTIALS_DICT)
-    if GOOGLE_CREDENTIALS_DICT
-    else None
-)
 
 TRACKING_COLUMN_NAME = "_mantenimiento_id"
 
@@ -62,24 +55,101 @@ PREVENTIVO_HEADER = [
 ]
 PREVENTIVO_VISIBLE_COLUMNS = len(PREVENTIVO_HEADER) - 1
 
+SHEETS_SCOPES = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive",
+]
+
+# Un único cliente autorizado por proceso; el outbox y los scripts comparten las
+# mismas credenciales, spreadsheet y handles de worksheet.
+_client_lock = threading.RLock()
+_client = None
+_spreadsheet = None
+_worksheets: Dict[str, object] = {}
+_metrics = {"clients_created": 0, "auth_refreshes": 0}
+_api_calls: Counter = Counter()
+_api_errors: Counter = Counter()
+
+
+class _SheetsCredentials(service_account.Credentials):
+    """Service account credentials that count token refreshes.
+
+    gspread's authorized session refreshes the access token on its own when it
+    expires, so the cached client never has to be rebuilt for that.
+    """
+
+    def refresh(self, request):
+        super().refresh(request)
+        with _client_lock:
+            _metrics["auth_refreshes"] += 1
+
+
+def _api_call(operation: str, fn, *args, **kwargs):
+    with _client_lock:
+        _api_calls[operation] += 1
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        with _client_lock:
+            _api_errors[operation] += 1
+        raise
+
+
+def get_sheets_metrics() -> dict:
+    """Return the client/auth counters and the Sheets API calls made per operation."""
+    with _client_lock:
+        return {
+            "client_initialized": _client is not None,
+            "clients_created": _metrics["clients_created"],
+            "auth_refreshes": _metrics["auth_refreshes"],
+            "cached_worksheets": sorted(_worksheets),
+            "api_calls": dict(_api_calls),
+            "api_errors": dict(_api_errors),
+        }
+
+
+def reset_sheets_client():
+    """Drop the cached client and handles so the next call authorizes again."""
+    global _client, _spreadsheet
+    with _client_lock:
+        _client = None
+        _spreadsheet = None
+        _worksheets.clear()
+
+
+def reset_sheets_metrics():
+    with _client_lock:
+        _metrics["clients_created"] = 0
+        _metrics["auth_refreshes"] = 0
+        _api_calls.clear()
+        _api_errors.clear()
+
+
 def get_client():
+    global _client
     if not GOOGLE_CREDENTIALS_DICT:
         return None
-    scope = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/drive",
-    ]
-    try:
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(GOOGLE_CREDENTIALS_DICT, scope)
-        return gspread.authorize(creds)
-    except Exception as exc:
-        logger.warning("Failed to initialize Google Sheets client: %s", exc, exc_info=True)
+    with _client_lock:
+        if _client is not None:
+            return _client
+        try:
+            creds = _SheetsCredentials.from_service_account_info(GOOGLE_CREDENTIALS_DICT, scopes=SHEETS_SCOPES)
+            _client = gspread.authorize(creds)
+        except Exception as exc:
+            logger.warning("Failed to initialize Google Sheets client: %s", exc, exc_info=True)
+            return None
+        _metrics["clients_created"] += 1
+        return _client
+
+def _gallery_bucket():
+    if not GOOGLE_CREDENTIALS_DICT or not GOOGLE_CLOUD_BUCKET_NAME:
         return None
+    return get_bucket(GOOGLE_CLOUD_BUCKET_NAME)
 
 def _blob_exists(path: str) -> bool:
-    if not storage_client or not GOOGLE_CLOUD_BUCKET_NAME:
+    bucket = _gallery_bucket()
+    if not bucket:
         return False
-    bucket = storage_client.bucket(GOOGLE_CLOUD_BUCKET_NAME)
     return bucket.blob(path).exists()
 
 def get_fotos_gallery_url(mantenimiento_id, tipo):
@@ -94,19 +164,55 @@ def get_planillas_gallery_url(mantenimiento_id):
         return None
     return f"https://storage.googleapis.com/{GOOGLE_CLOUD_BUCKET_NAME}/{blob_path}"
 
-def _get_worksheet(sheet_name: str):
+GALLERY_FOLDERS = {"correctivo": "correctivos", "preventivo": "preventivos"}
+_GALLERY_INDEX = re.compile(r"^mantenimientos_[a-z]+/(\d+)/(fotos|planillas)/index\.html$")
+
+def list_galleries(tipo: str) -> Set[Tuple[int, str]]:
+    """(mantenimiento id, carpeta) of every gallery of a tipo, from a single bucket listing."""
+    bucket = _gallery_bucket()
+    if not bucket:
+        return set()
+    galerias = set()
+    for blob in bucket.list_blobs(prefix=f"mantenimientos_{GALLERY_FOLDERS[tipo]}/", match_glob="**/index.html"):
+        match = _GALLERY_INDEX.match(blob.name)
+        if match:
+            galerias.add((int(match.group(1)), match.group(2)))
+    return galerias
+
+def _listed_gallery_url(galerias: Set[Tuple[int, str]], tipo_folder: str, mantenimiento_id, carpeta: str) -> str:
+    if (mantenimiento_id, carpeta) not in galerias:
+        return ""
+    return f"https://storage.googleapis.com/{GOOGLE_CLOUD_BUCKET_NAME}/mantenimientos_{tipo_folder}/{mantenimiento_id}/{carpeta}/index.html"
+
+def _get_spreadsheet():
+    global _spreadsheet
     if not SHEET_ID:
         return None
-    client = get_client()
-    if not client:
-        return None
-    return client.open_by_key(SHEET_ID).worksheet(sheet_name)
+    with _client_lock:
+        if _spreadsheet is not None:
+            return _spreadsheet
+        client = get_client()
+        if not client:
+            return None
+        _spreadsheet = _api_call("open_spreadsheet", client.open_by_key, SHEET_ID)
+        return _spreadsheet
 
-def _safe_sheet_operation(operation_name: str, callback):
-    try:
-        callback()
-    except Exception as exc:
-        logger.warning("Google Sheets %s failed: %s", operation_name, exc, exc_info=True)
+def _get_worksheet(sheet_name: str):
+    with _client_lock:
+        worksheet = _worksheets.get(sheet_name)
+        if worksheet is not None:
+            return worksheet
+        spreadsheet = _get_spreadsheet()
+        if not spreadsheet:
+            return None
+        worksheet = _api_call("open_worksheet", spreadsheet.worksheet, sheet_name)
+        _worksheets[sheet_name] = worksheet
+        return worksheet
+
+def _forget_worksheet(sheet_name: str):
+    """Drop a cached handle after a failed write; the sheet may have been renamed or recreated."""
+    with _client_lock:
+        _worksheets.pop(sheet_name, None)
 
 def _column_letter(index: int) -> str:
     if index <= 0:
@@ -121,35 +227,41 @@ def _apply_filters(worksheet, visible_columns: int):
     if visible_columns <= 0:
         return
     last_col_letter = _column_letter(visible_columns)
-    last_row = worksheet.row_count or 1
     try:
-        worksheet.set_basic_filter(f"A1:{last_col_letter}{max(last_row, 1)}")
+        # Rango abierto por filas: cubre también las filas que se agreguen después.
+        _api_call("set_basic_filter", worksheet.set_basic_filter, f"A:{last_col_letter}")
     except APIError:
         pass
     except Exception:
         pass
 
-def _append_row_with_filters(worksheet, row_values, visible_columns: int):
-    worksheet.append_row(row_values)
-    _apply_filters(worksheet, visible_columns)
-
 def _hide_column(worksheet, column_index: int):
     if column_index <= 0:
         return
     if not hasattr(worksheet, "hide_columns"):
         return
     try:
-        worksheet.hide_columns(column_index)
+        _api_call("hide_columns", worksheet.hide_columns, column_index)
     except APIError:
         pass
     except Exception:
         pass
 
+_prepared_worksheets = set()
+
+def reset_sheet_setup():
+    """Forget which worksheets were prepared so the next write re-checks header and filters."""
+    _prepared_worksheets.clear()
+
 def _ensure_header(worksheet, header, visible_columns: int):
-    if not worksheet.row_values(1):
-        worksheet.append_row(header)
+    key = (getattr(worksheet, "id", None), tuple(header))
+    if key in _prepared_worksheets:
+        return
+    if not _api_call("read_header", worksheet.row_values, 1):
+        _api_call("write_header", worksheet.append_row, header)
     _apply_filters(worksheet, visible_columns)
     _hide_column(worksheet, visible_columns + 1)
+    _prepared_worksheets.add(key)
 
 def _tracking_token(source) -> str:
     mantenimiento_id = source if isinstance(source, int) else getattr(source, "id", None)
@@ -171,9 +283,11 @@ def _resolve_related_name(mantenimiento, attr: str) -> str:
     fallback = getattr(mantenimiento, f"{attr}_nombre", None)
     return fallback or ""
 
-def _build_correctivo_row(mantenimiento: MantenimientoCorrectivo, include_links: bool = False):
+def _build_correctivo_row(mantenimiento: MantenimientoCorrectivo, include_links: bool = False, galerias=None):
     foto_url = ""
-    if include_links:
+    if galerias is not None:
+        foto_url = _listed_gallery_url(galerias, "correctivos", mantenimiento.id, "fotos")
+    elif include_links:
         foto_url = get_fotos_gallery_url(mantenimiento.id, "correctivos") or ""
     return [
         _resolve_related_name(mantenimiento, "cliente"),
@@ -192,10 +306,13 @@ def _build_correctivo_row(mantenimiento: MantenimientoCorrectivo, include_links:
         _tracking_token(mantenimiento),
     ]
 
-def _build_preventivo_row(mantenimiento: MantenimientoPreventivo, include_links: bool = False):
+def _build_preventivo_row(mantenimiento: MantenimientoPreventivo, include_links: bool = False, galerias=None):
     planillas_url = ""
     fotos_url = ""
-    if include_links:
+    if galerias is not None:
+        planillas_url = _listed_gallery_url(galerias, "preventivos", mantenimiento.id, "planillas")
+        fotos_url = _listed_gallery_url(galerias, "preventivos", mantenimiento.id, "fotos")
+    elif include_links:
         planillas_url = get_planillas_gallery_url(mantenimiento.id) or ""
         fotos_url = get_fotos_gallery_url(mantenimiento.id, "preventivos") or ""
     return [
@@ -211,116 +328,170 @@ def _build_preventivo_row(mantenimiento: MantenimientoPreventivo, include_links:
         _tracking_token(mantenimiento),
     ]
 
-def append_correctivo(mantenimiento: MantenimientoCorrectivo):
-    def _operation():
-        worksheet = _get_worksheet("MantenimientosCorrectivos")
-        if not worksheet:
-            return
-        _ensure_header(worksheet, CORRECTIVO_HEADER, CORRECTIVO_VISIBLE_COLUMNS)
-        _append_row_with_filters(
-            worksheet,
-            _build_correctivo_row(mantenimiento, include_links=False),
-            CORRECTIVO_VISIBLE_COLUMNS,
-        )
-    _safe_sheet_operation("append_correctivo", _operation)
-
-def update_correctivo(mantenimiento: MantenimientoCorrectivo):
-    def _operation():
-        worksheet = _get_worksheet("MantenimientosCorrectivos")
-        if not worksheet:
-            return
-        _ensure_header(worksheet, CORRECTIVO_HEADER, CORRECTIVO_VISIBLE_COLUMNS)
+SHEET_LAYOUTS = {
+    "correctivo": ("MantenimientosCorrectivos", CORRECTIVO_HEADER, CORRECTIVO_VISIBLE_COLUMNS, _build_correctivo_row),
+    "preventivo": ("MantenimientosPreventivos", PREVENTIVO_HEADER, PREVENTIVO_VISIBLE_COLUMNS, _build_preventivo_row),
+}
+
+class SheetSyncResult(NamedTuple):
+    snapshot: Optional[Dict[str, int]]  # tracking column as read from the sheet, if it was read
+    deleted_rows: List[int]  # sheet rows removed, highest first
+    appended: Optional[List[Tuple[str, int]]]  # (token, row) of new rows; None if the sheet did not report them
+
+_UPDATED_RANGE_START = re.compile(r"!\$?[A-Z]+\$?(\d+)")
+
+def _read_tracking_rows(worksheet, header) -> Dict[str, int]:
+    tracking = _api_call("read_tracking", worksheet.col_values, len(header))
+    return {value: index for index, value in enumerate(tracking, start=1) if value and index > 1}
+
+def read_tracking_rows(tipo: str) -> Optional[Dict[str, int]]:
+    """Read the hidden tracking column of a worksheet in one call: {mantenimiento id: row}."""
+    sheet_name, header, visible_columns, _ = SHEET_LAYOUTS[tipo]
+    worksheet = _get_worksheet(sheet_name)
+    if not worksheet:
+        return None
+    _ensure_header(worksheet, header, visible_columns)
+    return _read_tracking_rows(worksheet, header)
+
+def _rows_hold_tokens(worksheet, header, expected: Dict[int, str]) -> bool:
+    """Check with one batch_get that each {row: token} of the row index still holds that ticket."""
+    if not expected:
+        return True
+    tracking_col = _column_letter(len(header))
+    rows = sorted(expected)
+    values = _api_call("verify_tracking", worksheet.batch_get, [f"{tracking_col}{row}" for row in rows])
+    for row, value in zip(rows, values):
+        actual = value[0][0] if value and value[0] else ""
+        if actual != expected[row]:
+            return False
+    return len(values) == len(rows)
+
+def _appended_rows(response, tokens: List[str]) -> Optional[List[Tuple[str, int]]]:
+    if not isinstance(response, dict):
+        return None
+    match = _UPDATED_RANGE_START.search(response.get("updates", {}).get("updatedRange", ""))
+    if not match:
+        return None
+    first_row = int(match.group(1))
+    return [(token, first_row + offset) for offset, token in enumerate(tokens)]
+
+def sync_worksheet(tipo: str, upserts, delete_ids, rows_by_token: Optional[Dict[str, int]] = None) -> SheetSyncResult:
+    """Write every pending change of one worksheet with a fixed number of API calls.
+
+    Existing rows are located through rows_by_token (the persisted row index),
+    after checking in one batch_get that the target rows still hold their
+    tickets; when it is None or any row moved, the tracking column is read
+    once instead and returned as the snapshot. Updates go out in
+    a single batch_update, deletions in a single spreadsheet batch_update and new
+    rows in a single append_rows. Gallery links come from one bucket listing
+    per batch, as in export_worksheet. Errors propagate so the caller can retry.
+    """
+    sheet_name, header, visible_columns, build_row = SHEET_LAYOUTS[tipo]
+    if not upserts and not delete_ids:
+        return SheetSyncResult(None, [], [])
+    worksheet = _get_worksheet(sheet_name)
+    if not worksheet:
+        return SheetSyncResult(None, [], [])
+    galerias = list_galleries(tipo) if upserts else set()
+    try:
+        return _write_worksheet(worksheet, header, visible_columns, build_row, upserts, delete_ids, rows_by_token, galerias)
+    except Exception:
+        _forget_worksheet(sheet_name)
+        raise
+
+def _write_worksheet(worksheet, header, visible_columns, build_row, upserts, delete_ids, rows_by_token, galerias) -> SheetSyncResult:
+    _ensure_header(worksheet, header, visible_columns)
+
+    snapshot = None
+    if rows_by_token is None:
+        snapshot = rows_by_token = _read_tracking_rows(worksheet, header)
+    else:
+        # El índice persistido puede haber quedado viejo (otro proceso movió filas, alguien editó la hoja):
+        # antes de escribir se confirma que cada fila destino sigue teniendo su ticket.
+        tokens = {_tracking_token(m) for m in upserts} | {_tracking_token(mid) for mid in delete_ids}
+        expected = {rows_by_token[token]: token for token in tokens if token in rows_by_token}
+        known = sum(1 for token in tokens if token in rows_by_token)
+        if len(expected) != known or not _rows_hold_tokens(worksheet, header, expected):
+            snapshot = rows_by_token = _read_tracking_rows(worksheet, header)
+    end_col = _column_letter(len(header))
+
+    updates = []
+    appends = []
+    appended_tokens = []
+    for mantenimiento in upserts:
         token = _tracking_token(mantenimiento)
-        if not token:
-            _append_row_with_filters(
-                worksheet,
-                _build_correctivo_row(mantenimiento, include_links=False),
-                CORRECTIVO_VISIBLE_COLUMNS,
-            )
-            return
-        try:
-            cell = worksheet.find(token, in_column=len(CORRECTIVO_HEADER))
-        except CellNotFound:
-            _append_row_with_filters(
-                worksheet,
-                _build_correctivo_row(mantenimiento, include_links=False),
-                CORRECTIVO_VISIBLE_COLUMNS,
-            )
-            return
-        row = _build_correctivo_row(mantenimiento, include_links=True)
-        end_col = _column_letter(len(CORRECTIVO_HEADER))
-        worksheet.update(f"A{cell.row}:{end_col}{cell.row}", [row])
-    _safe_sheet_operation("update_correctivo", _operation)
-
-def delete_correctivo(mantenimiento_id: int):
-    def _operation():
-        worksheet = _get_worksheet("MantenimientosCorrectivos")
-        if not worksheet:
-            return
-        _ensure_header(worksheet, CORRECTIVO_HEADER, CORRECTIVO_VISIBLE_COLUMNS)
-        token = _tracking_token(mantenimiento_id)
-        if not token:
-            return
-        try:
-            cell = worksheet.find(token, in_column=len(CORRECTIVO_HEADER))
-        except CellNotFound:
-            return
-        worksheet.delete_rows(cell.row)
-    _safe_sheet_operation("delete_correctivo", _operation)
-
-def append_preventivo(mantenimiento: MantenimientoPreventivo):
-    def _operation():
-        worksheet = _get_worksheet("MantenimientosPreventivos")
-        if not worksheet:
-            return
-        _ensure_header(worksheet, PREVENTIVO_HEADER, PREVENTIVO_VISIBLE_COLUMNS)
-        _append_row_with_filters(
-            worksheet,
-            _build_preventivo_row(mantenimiento, include_links=False),
-            PREVENTIVO_VISIBLE_COLUMNS,
+        row_number = rows_by_token.get(token)
+        if row_number:
+            updates.append({
+                "range": f"A{row_number}:{end_col}{row_number}",
+                "values": [build_row(mantenimiento, galerias=galerias)],
+            })
+        else:
+            appends.append(build_row(mantenimiento, galerias=galerias))
+            appended_tokens.append(token)
+
+    if updates:
+        _api_call("update_rows", worksheet.batch_update, updates)
+
+    delete_rows = sorted(
+        {rows_by_token[token] for token in map(_tracking_token, delete_ids) if token in rows_by_token},
+        reverse=True,
+    )
+    if delete_rows:
+        _api_call("delete_rows", worksheet.spreadsheet.batch_update, {
+            "requests": [
+                {
+                    "deleteDimension": {
+                        "range": {
+                            "sheetId": worksheet.id,
+                            "dimension": "ROWS",
+                            "startIndex": row_number - 1,
+                            "endIndex": row_number,
+                        }
+                    }
+                }
+                for row_number in delete_rows
+            ]
+        })
+
+    appended = []
+    if appends:
+        response = _api_call("append_rows", worksheet.append_rows, appends)
+        appended = _appended_rows(response, appended_tokens)
+    return SheetSyncResult(snapshot, delete_rows, appended)
+
+def export_worksheet(tipo: str, mantenimientos: Iterable) -> Optional[Dict[str, int]]:
+    """Rewrite a whole worksheet from the given maintenances and return {token: row}.
+
+    Gallery links come from one bucket listing instead of a blob lookup per row,
+    and header plus rows go out in a single update of the range; rows left over
+    from the previous contents are dropped by shrinking the sheet.
+    """
+    sheet_name, header, visible_columns, build_row = SHEET_LAYOUTS[tipo]
+    worksheet = _get_worksheet(sheet_name)
+    if not worksheet:
+        return None
+    galerias = list_galleries(tipo)
+    values = [header]
+    rows_by_token = {}
+    for mantenimiento in mantenimientos:
+        values.append(build_row(mantenimiento, galerias=galerias))
+        rows_by_token[_tracking_token(mantenimiento)] = len(values)
+    try:
+        _api_call(
+            "export_rows",
+            worksheet.update,
+            values=values,
+            range_name=f"A1:{_column_letter(len(header))}{len(values)}",
         )
-    _safe_sheet_operation("append_preventivo", _operation)
-
-def update_preventivo(mantenimiento: MantenimientoPreventivo):
-    def _operation():
-        worksheet = _get_worksheet("MantenimientosPreventivos")
-        if not worksheet:
-            return
-        _ensure_header(worksheet, PREVENTIVO_HEADER, PREVENTIVO_VISIBLE_COLUMNS)
-        token = _tracking_token(mantenimiento)
-        if not token:
-            _append_row_with_filters(
-                worksheet,
-                _build_preventivo_row(mantenimiento, include_links=False),
-                PREVENTIVO_VISIBLE_COLUMNS,
-            )
-            return
-        try:
-            cell = worksheet.find(token, in_column=len(PREVENTIVO_HEADER))
-        except CellNotFound:
-            _append_row_with_filters(
-                worksheet,
-                _build_preventivo_row(mantenimiento, include_links=False),
-                PREVENTIVO_VISIBLE_COLUMNS,
-            )
-            return
-        row = _build_preventivo_row(mantenimiento, include_links=True)
-        end_col = _column_letter(len(PREVENTIVO_HEADER))
-        worksheet.update(f"A{cell.row}:{end_col}{cell.row}", [row])
-    _safe_sheet_operation("update_preventivo", _operation)
-
-def delete_preventivo(mantenimiento_id: int):
-    def _operation():
-        worksheet = _get_worksheet("MantenimientosPreventivos")
-        if not worksheet:
-            return
-        _ensure_header(worksheet, PREVENTIVO_HEADER, PREVENTIVO_VISIBLE_COLUMNS)
-        token = _tracking_token(mantenimiento_id)
-        if not token:
-            return
-        try:
-            cell = worksheet.find(token, in_column=len(PREVENTIVO_HEADER))
-        except CellNotFound:
-            return
-        worksheet.delete_rows(cell.row)
-    _safe_sheet_operation("delete_preventivo", _operation)
+        if worksheet.row_count > len(values):
+            _api_call("resize", worksheet.resize, rows=len(values))
+        key = (getattr(worksheet, "id", None), tuple(header))
+        if key not in _prepared_worksheets:
+            _apply_filters(worksheet, visible_columns)
+            _hide_column(worksheet, visible_columns + 1)
+            _prepared_worksheets.add(key)
+    except Exception:
+        _forget_worksheet(sheet_name)
+        raise
+    return rows_by_token
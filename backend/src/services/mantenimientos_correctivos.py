@@ -3,12 +3,18 @@ from typing import List, Optional
 import os
 
 from fastapi import HTTPException, UploadFile
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
 from api.models import Cliente, Cuadrilla, MantenimientoCorrectivo, MantenimientoCorrectivoFoto, Sucursal
-from services.gcloud_storage import delete_file_in_folder, upload_file_to_gcloud
-from services.google_sheets import append_correctivo, delete_correctivo, update_correctivo
+from api.schemas import MantenimientoCorrectivoFiltros
+from services.gcloud_storage import delete_file_in_folder, upload_file_to_gcloud, upload_files_to_gcloud
+from services.galleries import schedule_gallery
 from services.notificaciones import notify_user, notify_users_correctivo
+from services.pagination import DEFAULT_PAGE_SIZE, fetch_fecha_id_page
+from services.rollups import TIPO_CORRECTIVO, contribucion, registrar_cambio
+from services.sheet_outbox import enqueue_sheet_sync
 
 GOOGLE_CLOUD_BUCKET_NAME = os.getenv("GOOGLE_CLOUD_BUCKET_NAME")
 
@@ -20,15 +26,15 @@ def _ensure_usuario(current_entity: dict):
         raise HTTPException(status_code=403, detail="No tienes permisos")
 
 
-def _get_cliente(db: Session, cliente_id: int) -> Cliente:
-    cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+async def _get_cliente(db: AsyncSession, cliente_id: int) -> Cliente:
+    cliente = await db.get(Cliente, cliente_id)
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     return cliente
 
 
-def _get_sucursal(db: Session, sucursal_id: int) -> Sucursal:
-    sucursal = db.query(Sucursal).filter(Sucursal.id == sucursal_id).first()
+async def _get_sucursal(db: AsyncSession, sucursal_id: int) -> Sucursal:
+    sucursal = await db.get(Sucursal, sucursal_id)
     if not sucursal:
         raise HTTPException(status_code=404, detail="Sucursal no encontrada")
     return sucursal
@@ -39,26 +45,76 @@ def _ensure_cliente_sucursal(cliente_id: int, sucursal: Sucursal):
         raise HTTPException(status_code=400, detail="La sucursal no pertenece al cliente seleccionado")
 
 
-def _get_cuadrilla(db: Session, cuadrilla_id: int) -> Cuadrilla:
-    cuadrilla = db.query(Cuadrilla).filter(Cuadrilla.id == cuadrilla_id).first()
+async def _get_cuadrilla(db: AsyncSession, cuadrilla_id: int) -> Cuadrilla:
+    cuadrilla = await db.get(Cuadrilla, cuadrilla_id)
     if not cuadrilla:
         raise HTTPException(status_code=404, detail="Cuadrilla no encontrada")
     return cuadrilla
 
 
-def get_mantenimientos_correctivos(db: Session):
-    return db.query(MantenimientoCorrectivo).all()
+def _apply_filtros(query, filtros: Optional[MantenimientoCorrectivoFiltros]):
+    if filtros is None:
+        return query
+    if filtros.estado:
+        query = query.filter(MantenimientoCorrectivo.estado == filtros.estado.value)
+    if filtros.prioridad:
+        query = query.filter(MantenimientoCorrectivo.prioridad == filtros.prioridad.value)
+    if filtros.cliente_id is not None:
+        query = query.filter(MantenimientoCorrectivo.cliente_id == filtros.cliente_id)
+    if filtros.sucursal_id is not None:
+        query = query.filter(MantenimientoCorrectivo.sucursal_id == filtros.sucursal_id)
+    if filtros.id_cuadrilla is not None:
+        query = query.filter(MantenimientoCorrectivo.id_cuadrilla == filtros.id_cuadrilla)
+    if filtros.apertura_desde is not None:
+        query = query.filter(MantenimientoCorrectivo.fecha_apertura >= filtros.apertura_desde)
+    if filtros.apertura_hasta is not None:
+        query = query.filter(MantenimientoCorrectivo.fecha_apertura <= filtros.apertura_hasta)
+    if filtros.cierre_desde is not None:
+        query = query.filter(MantenimientoCorrectivo.fecha_cierre >= filtros.cierre_desde)
+    if filtros.cierre_hasta is not None:
+        query = query.filter(MantenimientoCorrectivo.fecha_cierre <= filtros.cierre_hasta)
+    return query
+
+
+def _query_with_fotos(db: Session):
+    return db.query(MantenimientoCorrectivo).options(selectinload(MantenimientoCorrectivo.fotos))
+
+
+def get_mantenimientos_correctivos(db: Session, filtros: Optional[MantenimientoCorrectivoFiltros] = None):
+    return _apply_filtros(_query_with_fotos(db), filtros).all()
+
+
+def get_mantenimientos_correctivos_page(
+    db: Session,
+    filtros: Optional[MantenimientoCorrectivoFiltros] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    query = _apply_filtros(_query_with_fotos(db), filtros)
+    return fetch_fecha_id_page(query, MantenimientoCorrectivo, cursor, limit)
 
 
 def get_mantenimiento_correctivo(db: Session, mantenimiento_id: int):
-    mantenimiento = db.query(MantenimientoCorrectivo).filter(MantenimientoCorrectivo.id == mantenimiento_id).first()
+    mantenimiento = _query_with_fotos(db).filter(MantenimientoCorrectivo.id == mantenimiento_id).first()
+    if not mantenimiento:
+        raise HTTPException(status_code=404, detail="Mantenimiento correctivo no encontrado")
+    return mantenimiento
+
+
+async def _load_mantenimiento_correctivo(db: AsyncSession, mantenimiento_id: int, populate_existing: bool = False) -> MantenimientoCorrectivo:
+    mantenimiento = await db.scalar(
+        select(MantenimientoCorrectivo)
+        .options(selectinload(MantenimientoCorrectivo.fotos))
+        .where(MantenimientoCorrectivo.id == mantenimiento_id)
+        .execution_options(populate_existing=populate_existing)
+    )
     if not mantenimiento:
         raise HTTPException(status_code=404, detail="Mantenimiento correctivo no encontrado")
     return mantenimiento
 
 
 async def create_mantenimiento_correctivo(
-    db: Session,
+    db: AsyncSession,
     cliente_id: int,
     sucursal_id: int,
     id_cuadrilla: Optional[int],
@@ -72,11 +128,11 @@ async def create_mantenimiento_correctivo(
 ):
     _ensure_usuario(current_entity)
 
-    cliente = _get_cliente(db, cliente_id)
-    sucursal = _get_sucursal(db, sucursal_id)
+    cliente = await _get_cliente(db, cliente_id)
+    sucursal = await _get_sucursal(db, sucursal_id)
     _ensure_cliente_sucursal(cliente.id, sucursal)
 
-    cuadrilla = _get_cuadrilla(db, id_cuadrilla) if id_cuadrilla else None
+    cuadrilla = await _get_cuadrilla(db, id_cuadrilla) if id_cuadrilla else None
 
     db_mantenimiento = MantenimientoCorrectivo(
         cliente_id=cliente_id,
@@ -90,12 +146,14 @@ async def create_mantenimiento_correctivo(
         prioridad=prioridad,
     )
     db.add(db_mantenimiento)
-    db.commit()
-    db.refresh(db_mantenimiento)
-    append_correctivo(db_mantenimiento)
+    await db.flush()
+    # Los rollups usan la API sync de Session; run_sync los ejecuta sobre la misma conexión async.
+    await db.run_sync(lambda session: registrar_cambio(session, None, contribucion(session, TIPO_CORRECTIVO, db_mantenimiento)))
+    enqueue_sheet_sync(db, TIPO_CORRECTIVO, "append", db_mantenimiento.id)
+    await db.commit()
     if cuadrilla is not None:
         if prioridad == "Alta":
-            notify_user(
+            await notify_user(
                 db_session=db,
                 firebase_uid=cuadrilla.firebase_uid,
                 id_mantenimiento=db_mantenimiento.id,
@@ -113,7 +171,7 @@ async def create_mantenimiento_correctivo(
 
 
 async def update_mantenimiento_correctivo(
-    db: Session,
+    db: AsyncSession,
     mantenimiento_id: int,
     current_entity: dict,
     cliente_id: Optional[int] = None,
@@ -132,7 +190,8 @@ async def update_mantenimiento_correctivo(
 ):
     _ensure_usuario(current_entity)
 
-    db_mantenimiento = get_mantenimiento_correctivo(db, mantenimiento_id)
+    db_mantenimiento = await _load_mantenimiento_correctivo(db, mantenimiento_id)
+    rollup_antes = await db.run_sync(contribucion, TIPO_CORRECTIVO, db_mantenimiento)
 
     bucket_name = GOOGLE_CLOUD_BUCKET_NAME
     if not bucket_name:
@@ -141,8 +200,8 @@ async def update_mantenimiento_correctivo(
 
     final_cliente_id = cliente_id if cliente_id is not None else db_mantenimiento.cliente_id
     final_sucursal_id = sucursal_id if sucursal_id is not None else db_mantenimiento.sucursal_id
-    cliente = _get_cliente(db, final_cliente_id)
-    sucursal = _get_sucursal(db, final_sucursal_id)
+    cliente = await _get_cliente(db, final_cliente_id)
+    sucursal = await _get_sucursal(db, final_sucursal_id)
     _ensure_cliente_sucursal(cliente.id, sucursal)
 
     db_mantenimiento.cliente_id = cliente.id
@@ -158,20 +217,18 @@ async def update_mantenimiento_correctivo(
         db_mantenimiento.rubro = rubro
 
     if id_cuadrilla:
-        cuadrilla = _get_cuadrilla(db, id_cuadrilla)
+        cuadrilla = await _get_cuadrilla(db, id_cuadrilla)
         db_mantenimiento.id_cuadrilla = id_cuadrilla
     else:
-        cuadrilla = _get_cuadrilla(db, db_mantenimiento.id_cuadrilla) if db_mantenimiento.id_cuadrilla else None
+        cuadrilla = await _get_cuadrilla(db, db_mantenimiento.id_cuadrilla) if db_mantenimiento.id_cuadrilla else None
 
     if planilla is not None:
         planilla_url = await upload_file_to_gcloud(planilla, bucket_name, f"{base_folder}/planilla")
         db_mantenimiento.planilla = planilla_url
 
-    if fotos is not None:
-        for foto in fotos:
-            url = await upload_file_to_gcloud(foto, bucket_name, f"{base_folder}/fotos")
-            new_foto = MantenimientoCorrectivoFoto(mantenimiento_id=mantenimiento_id, url=url)
-            db.add(new_foto)
+    if fotos:
+        urls = await upload_files_to_gcloud(fotos, bucket_name, f"{base_folder}/fotos", variantes=True)
+        await db.execute(insert(MantenimientoCorrectivoFoto), [{"mantenimiento_id": mantenimiento_id, "url": url} for url in urls])
 
     if fecha_cierre is not None:
         if fecha_cierre == date(1, 1, 1):
@@ -179,17 +236,15 @@ async def update_mantenimiento_correctivo(
         else:
             db_mantenimiento.fecha_cierre = fecha_cierre
 
+    # Las notificaciones se mandan después del commit: _send_notifications confirma la sesión que recibe
+    # y, antes, dejaría el mantenimiento guardado sin su rollup ni su job de Sheets si algo falla después.
+    avisos = []
     if estado is not None:
         db_mantenimiento.estado = estado
         if estado not in ("Solucionado", "Finalizado"):
             db_mantenimiento.fecha_cierre = None
         if estado == "Solucionado":
-            await notify_users_correctivo(
-                db_session=db,
-                id_mantenimiento=mantenimiento_id,
-                mensaje=f"Correctivo Solucionado - Sucursal: {sucursal.nombre} | Incidente: {db_mantenimiento.incidente}",
-                firebase_uid=None,
-            )
+            avisos.append(f"Correctivo Solucionado - Sucursal: {sucursal.nombre} | Incidente: {db_mantenimiento.incidente}")
 
     if prioridad is not None:
         db_mantenimiento.prioridad = prioridad
@@ -199,19 +254,20 @@ async def update_mantenimiento_correctivo(
     if extendido is not None:
         db_mantenimiento.extendido = extendido
         if cuadrilla:
-            await notify_users_correctivo(
-                db_session=db,
-                id_mantenimiento=mantenimiento_id,
-                mensaje=f"Extendido solicitado - Sucursal: {sucursal.nombre} | Cuadrilla: {cuadrilla.nombre}",
-                firebase_uid=None,
-            )
-
-    db.commit()
-    db.refresh(db_mantenimiento)
-    update_correctivo(db_mantenimiento)
+            avisos.append(f"Extendido solicitado - Sucursal: {sucursal.nombre} | Cuadrilla: {cuadrilla.nombre}")
+
+    await db.run_sync(lambda session: registrar_cambio(session, rollup_antes, contribucion(session, TIPO_CORRECTIVO, db_mantenimiento)))
+    enqueue_sheet_sync(db, TIPO_CORRECTIVO, "update", db_mantenimiento.id)
+    await db.commit()
+    # Como el refresh de la versión sync: se devuelve lo que quedó guardado, archivos nuevos incluidos.
+    db_mantenimiento = await _load_mantenimiento_correctivo(db, mantenimiento_id, populate_existing=True)
+    if fotos:
+        schedule_gallery(TIPO_CORRECTIVO, mantenimiento_id, "fotos")
+    for mensaje in avisos:
+        await notify_users_correctivo(db_session=db, id_mantenimiento=mantenimiento_id, mensaje=mensaje, firebase_uid=None)
 
     if cuadrilla is not None and prioridad_actual == "Alta":
-        notify_user(
+        await notify_user(
             db_session=db,
             firebase_uid=cuadrilla.firebase_uid,
             id_mantenimiento=db_mantenimiento.id,
@@ -232,9 +288,10 @@ async def update_mantenimiento_correctivo(
 def delete_mantenimiento_correctivo(db: Session, mantenimiento_id: int, current_entity: dict):
     _ensure_usuario(current_entity)
     db_mantenimiento = get_mantenimiento_correctivo(db, mantenimiento_id)
+    registrar_cambio(db, contribucion(db, TIPO_CORRECTIVO, db_mantenimiento), None)
     db.delete(db_mantenimiento)
+    enqueue_sheet_sync(db, TIPO_CORRECTIVO, "delete", mantenimiento_id)
     db.commit()
-    delete_correctivo(mantenimiento_id)
     return {"message": f"Mantenimiento correctivo con id {mantenimiento_id} eliminado"}
 
 
@@ -246,9 +303,9 @@ def delete_mantenimiento_planilla(db: Session, mantenimiento_id: int, file_name:
 
     db_mantenimiento.planilla = None
 
+    enqueue_sheet_sync(db, TIPO_CORRECTIVO, "update", mantenimiento_id)
     db.commit()
     db.refresh(db_mantenimiento)
-    update_correctivo(db_mantenimiento)
     return True
 
 
@@ -268,8 +325,9 @@ def delete_mantenimiento_photo(db: Session, mantenimiento_id: int, file_name: st
     if not foto:
         raise HTTPException(status_code=404, detail="Foto no encontrada")
 
-    delete_file_in_folder(GOOGLE_CLOUD_BUCKET_NAME, f"mantenimientos_correctivos/{mantenimiento_id}/fotos/", file_name)
+    delete_file_in_folder(GOOGLE_CLOUD_BUCKET_NAME, f"mantenimientos_correctivos/{mantenimiento_id}/fotos/", file_name, variantes=True)
     db.delete(foto)
+    enqueue_sheet_sync(db, TIPO_CORRECTIVO, "update", mantenimiento_id)
     db.commit()
-    update_correctivo(db_mantenimiento)
+    schedule_gallery(TIPO_CORRECTIVO, mantenimiento_id, "fotos")
     return True
@@ -4,7 +4,9 @@ from typing import List, Optional, Tuple
 import os
 
 from fastapi import HTTPException, UploadFile
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
 from api.models import (
     Cliente,
@@ -14,9 +16,13 @@ from api.models import (
     MantenimientoPreventivoPlanilla,
     Sucursal,
 )
-from services.gcloud_storage import delete_file_in_folder, upload_file_to_gcloud
-from services.google_sheets import append_preventivo, delete_preventivo, update_preventivo
+from api.schemas import MantenimientoPreventivoFiltros
+from services.gcloud_storage import delete_file_in_folder, upload_file_groups_to_gcloud
+from services.galleries import schedule_gallery
 from services.notificaciones import notify_users_preventivo
+from services.pagination import DEFAULT_PAGE_SIZE, fetch_fecha_id_page
+from services.rollups import TIPO_PREVENTIVO, contribucion, registrar_cambio
+from services.sheet_outbox import enqueue_sheet_sync
 
 GOOGLE_CLOUD_BUCKET_NAME = os.getenv("GOOGLE_CLOUD_BUCKET_NAME")
 FRECUENCIA_PERIODOS = {
@@ -34,22 +40,22 @@ def _ensure_usuario(current_entity: dict):
         raise HTTPException(status_code=403, detail="No tienes permisos")
 
 
-def _get_cliente(db: Session, cliente_id: int) -> Cliente:
-    cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+async def _get_cliente(db: AsyncSession, cliente_id: int) -> Cliente:
+    cliente = await db.get(Cliente, cliente_id)
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     return cliente
 
 
-def _get_sucursal(db: Session, sucursal_id: int) -> Sucursal:
-    sucursal = db.query(Sucursal).filter(Sucursal.id == sucursal_id).first()
+async def _get_sucursal(db: AsyncSession, sucursal_id: int) -> Sucursal:
+    sucursal = await db.get(Sucursal, sucursal_id)
     if not sucursal:
         raise HTTPException(status_code=404, detail="Sucursal no encontrada")
     return sucursal
 
 
-def _get_cuadrilla(db: Session, cuadrilla_id: int) -> Cuadrilla:
-    cuadrilla = db.query(Cuadrilla).filter(Cuadrilla.id == cuadrilla_id).first()
+async def _get_cuadrilla(db: AsyncSession, cuadrilla_id: int) -> Cuadrilla:
+    cuadrilla = await db.get(Cuadrilla, cuadrilla_id)
     if not cuadrilla:
         raise HTTPException(status_code=404, detail="Cuadrilla no encontrada")
     return cuadrilla
@@ -84,22 +90,22 @@ def _calculate_period_range(fecha: date, frecuencia: str) -> Tuple[date, date]:
     return start_date, end_date
 
 
-def _ensure_preventivo_period(
-    db: Session,
+async def _ensure_preventivo_period(
+    db: AsyncSession,
     sucursal_id: int,
     fecha: date,
     frecuencia: str,
     exclude_id: Optional[int] = None,
 ):
     inicio, fin = _calculate_period_range(fecha, frecuencia)
-    query = db.query(MantenimientoPreventivo).filter(
+    query = select(MantenimientoPreventivo.id).where(
         MantenimientoPreventivo.sucursal_id == sucursal_id,
         MantenimientoPreventivo.fecha_apertura >= inicio,
         MantenimientoPreventivo.fecha_apertura <= fin,
     )
     if exclude_id:
-        query = query.filter(MantenimientoPreventivo.id != exclude_id)
-    existe = query.first()
+        query = query.where(MantenimientoPreventivo.id != exclude_id)
+    existe = (await db.execute(query.limit(1))).first()
     if existe:
         raise HTTPException(
             status_code=400,
@@ -107,19 +113,70 @@ def _ensure_preventivo_period(
         )
 
 
-def get_mantenimientos_preventivos(db: Session):
-    return db.query(MantenimientoPreventivo).all()
+def _apply_filtros(query, filtros: Optional[MantenimientoPreventivoFiltros]):
+    if filtros is None:
+        return query
+    if filtros.estado:
+        query = query.filter(MantenimientoPreventivo.estado == filtros.estado.value)
+    if filtros.cliente_id is not None:
+        query = query.filter(MantenimientoPreventivo.cliente_id == filtros.cliente_id)
+    if filtros.sucursal_id is not None:
+        query = query.filter(MantenimientoPreventivo.sucursal_id == filtros.sucursal_id)
+    if filtros.id_cuadrilla is not None:
+        query = query.filter(MantenimientoPreventivo.id_cuadrilla == filtros.id_cuadrilla)
+    if filtros.apertura_desde is not None:
+        query = query.filter(MantenimientoPreventivo.fecha_apertura >= filtros.apertura_desde)
+    if filtros.apertura_hasta is not None:
+        query = query.filter(MantenimientoPreventivo.fecha_apertura <= filtros.apertura_hasta)
+    if filtros.cierre_desde is not None:
+        query = query.filter(MantenimientoPreventivo.fecha_cierre >= filtros.cierre_desde)
+    if filtros.cierre_hasta is not None:
+        query = query.filter(MantenimientoPreventivo.fecha_cierre <= filtros.cierre_hasta)
+    return query
+
+
+def _query_with_archivos(db: Session):
+    return db.query(MantenimientoPreventivo).options(
+        selectinload(MantenimientoPreventivo.planillas),
+        selectinload(MantenimientoPreventivo.fotos),
+    )
+
+
+def get_mantenimientos_preventivos(db: Session, filtros: Optional[MantenimientoPreventivoFiltros] = None):
+    return _apply_filtros(_query_with_archivos(db), filtros).all()
+
+
+def get_mantenimientos_preventivos_page(
+    db: Session,
+    filtros: Optional[MantenimientoPreventivoFiltros] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    query = _apply_filtros(_query_with_archivos(db), filtros)
+    return fetch_fecha_id_page(query, MantenimientoPreventivo, cursor, limit)
 
 
 def get_mantenimiento_preventivo(db: Session, mantenimiento_id: int):
-    mantenimiento = db.query(MantenimientoPreventivo).filter(MantenimientoPreventivo.id == mantenimiento_id).first()
+    mantenimiento = _query_with_archivos(db).filter(MantenimientoPreventivo.id == mantenimiento_id).first()
+    if not mantenimiento:
+        raise HTTPException(status_code=404, detail="Mantenimiento preventivo no encontrado")
+    return mantenimiento
+
+
+async def _load_mantenimiento_preventivo(db: AsyncSession, mantenimiento_id: int, populate_existing: bool = False) -> MantenimientoPreventivo:
+    mantenimiento = await db.scalar(
+        select(MantenimientoPreventivo)
+        .options(selectinload(MantenimientoPreventivo.planillas), selectinload(MantenimientoPreventivo.fotos))
+        .where(MantenimientoPreventivo.id == mantenimiento_id)
+        .execution_options(populate_existing=populate_existing)
+    )
     if not mantenimiento:
         raise HTTPException(status_code=404, detail="Mantenimiento preventivo no encontrado")
     return mantenimiento
 
 
 async def create_mantenimiento_preventivo(
-    db: Session,
+    db: AsyncSession,
     cliente_id: int,
     sucursal_id: int,
     frecuencia: str,
@@ -130,8 +187,8 @@ async def create_mantenimiento_preventivo(
 ):
     _ensure_usuario(current_entity)
 
-    cliente = _get_cliente(db, cliente_id)
-    sucursal = _get_sucursal(db, sucursal_id)
+    cliente = await _get_cliente(db, cliente_id)
+    sucursal = await _get_sucursal(db, sucursal_id)
     _ensure_cliente_sucursal(cliente.id, sucursal)
 
     if not sucursal.frecuencia_preventivo:
@@ -144,8 +201,8 @@ async def create_mantenimiento_preventivo(
             detail="La frecuencia seleccionada no coincide con la configuración de la sucursal",
         )
 
-    _ensure_preventivo_period(db, sucursal.id, fecha_apertura, sucursal_frecuencia)
-    cuadrilla = _get_cuadrilla(db, id_cuadrilla)
+    await _ensure_preventivo_period(db, sucursal.id, fecha_apertura, sucursal_frecuencia)
+    cuadrilla = await _get_cuadrilla(db, id_cuadrilla)
 
     db_mantenimiento = MantenimientoPreventivo(
         cliente_id=cliente_id,
@@ -156,9 +213,11 @@ async def create_mantenimiento_preventivo(
         estado=estado,
     )
     db.add(db_mantenimiento)
-    db.commit()
-    db.refresh(db_mantenimiento)
-    append_preventivo(db_mantenimiento)
+    await db.flush()
+    # Los rollups usan la API sync de Session; run_sync los ejecuta sobre la misma conexión async.
+    await db.run_sync(lambda session: registrar_cambio(session, None, contribucion(session, TIPO_PREVENTIVO, db_mantenimiento)))
+    enqueue_sheet_sync(db, TIPO_PREVENTIVO, "append", db_mantenimiento.id)
+    await db.commit()
     await notify_users_preventivo(
         db_session=db,
         id_mantenimiento=db_mantenimiento.id,
@@ -169,7 +228,7 @@ async def create_mantenimiento_preventivo(
 
 
 async def update_mantenimiento_preventivo(
-    db: Session,
+    db: AsyncSession,
     mantenimiento_id: int,
     current_entity: dict,
     cliente_id: Optional[int] = None,
@@ -185,7 +244,8 @@ async def update_mantenimiento_preventivo(
 ):
     _ensure_usuario(current_entity)
 
-    db_mantenimiento = get_mantenimiento_preventivo(db, mantenimiento_id)
+    db_mantenimiento = await _load_mantenimiento_preventivo(db, mantenimiento_id)
+    rollup_antes = await db.run_sync(contribucion, TIPO_PREVENTIVO, db_mantenimiento)
 
     bucket_name = GOOGLE_CLOUD_BUCKET_NAME
     if not bucket_name:
@@ -195,8 +255,8 @@ async def update_mantenimiento_preventivo(
     final_cliente_id = cliente_id if cliente_id is not None else db_mantenimiento.cliente_id
     final_sucursal_id = sucursal_id if sucursal_id is not None else db_mantenimiento.sucursal_id
 
-    cliente = _get_cliente(db, final_cliente_id)
-    sucursal = _get_sucursal(db, final_sucursal_id)
+    cliente = await _get_cliente(db, final_cliente_id)
+    sucursal = await _get_sucursal(db, final_sucursal_id)
     _ensure_cliente_sucursal(cliente.id, sucursal)
 
     if not sucursal.frecuencia_preventivo:
@@ -209,7 +269,7 @@ async def update_mantenimiento_preventivo(
         )
 
     nueva_fecha_apertura = fecha_apertura or db_mantenimiento.fecha_apertura
-    _ensure_preventivo_period(
+    await _ensure_preventivo_period(
         db,
         sucursal.id,
         nueva_fecha_apertura,
@@ -224,50 +284,49 @@ async def update_mantenimiento_preventivo(
     if fecha_apertura is not None:
         db_mantenimiento.fecha_apertura = fecha_apertura
     if id_cuadrilla:
-        cuadrilla = _get_cuadrilla(db, id_cuadrilla)
+        cuadrilla = await _get_cuadrilla(db, id_cuadrilla)
         db_mantenimiento.id_cuadrilla = id_cuadrilla
     else:
-        cuadrilla = _get_cuadrilla(db, db_mantenimiento.id_cuadrilla)
+        cuadrilla = await _get_cuadrilla(db, db_mantenimiento.id_cuadrilla)
 
+    # Las notificaciones se mandan después del commit: _send_notifications confirma la sesión que recibe
+    # y, antes, dejaría el mantenimiento guardado sin su rollup ni su job de Sheets si algo falla después.
+    avisos = []
     if fecha_cierre is not None:
         if fecha_cierre == date(1, 1, 1):
             db_mantenimiento.fecha_cierre = None
         else:
             db_mantenimiento.fecha_cierre = fecha_cierre
-            await notify_users_preventivo(
-                db_session=db,
-                id_mantenimiento=db_mantenimiento.id,
-                mensaje=f"Preventivo Solucionado - Sucursal: {sucursal.nombre}",
-                firebase_uid=None,
-            )
-
-    if planillas is not None:
-        for planilla in planillas:
-            url = await upload_file_to_gcloud(planilla, bucket_name, f"{base_folder}/planillas")
-            new_planilla = MantenimientoPreventivoPlanilla(mantenimiento_id=mantenimiento_id, url=url)
-            db.add(new_planilla)
-
-    if fotos is not None:
-        for foto in fotos:
-            url = await upload_file_to_gcloud(foto, bucket_name, f"{base_folder}/fotos")
-            new_foto = MantenimientoPreventivoFoto(mantenimiento_id=mantenimiento_id, url=url)
-            db.add(new_foto)
+            avisos.append(f"Preventivo Solucionado - Sucursal: {sucursal.nombre}")
+
+    if planillas or fotos:
+        # Planillas y fotos salen en una sola tanda concurrente; si algo falla no queda nada subido.
+        urls_planillas, urls_fotos = await upload_file_groups_to_gcloud(
+            [(planillas, f"{base_folder}/planillas", False), (fotos, f"{base_folder}/fotos", True)], bucket_name
+        )
+        if urls_planillas:
+            await db.execute(insert(MantenimientoPreventivoPlanilla), [{"mantenimiento_id": mantenimiento_id, "url": url} for url in urls_planillas])
+        if urls_fotos:
+            await db.execute(insert(MantenimientoPreventivoFoto), [{"mantenimiento_id": mantenimiento_id, "url": url} for url in urls_fotos])
 
     if extendido is not None:
         db_mantenimiento.extendido = extendido
-        await notify_users_preventivo(
-            db_session=db,
-            id_mantenimiento=mantenimiento_id,
-            mensaje=f"Extendido solicitado - Sucursal: {sucursal.nombre} | Cuadrilla: {cuadrilla.nombre}",
-            firebase_uid=None,
-        )
+        avisos.append(f"Extendido solicitado - Sucursal: {sucursal.nombre} | Cuadrilla: {cuadrilla.nombre}")
 
     if estado is not None:
         db_mantenimiento.estado = estado
 
-    db.commit()
-    db.refresh(db_mantenimiento)
-    update_preventivo(db_mantenimiento)
+    await db.run_sync(lambda session: registrar_cambio(session, rollup_antes, contribucion(session, TIPO_PREVENTIVO, db_mantenimiento)))
+    enqueue_sheet_sync(db, TIPO_PREVENTIVO, "update", db_mantenimiento.id)
+    await db.commit()
+    # Como el refresh de la versión sync: se devuelve lo que quedó guardado, archivos nuevos incluidos.
+    db_mantenimiento = await _load_mantenimiento_preventivo(db, mantenimiento_id, populate_existing=True)
+    if planillas:
+        schedule_gallery(TIPO_PREVENTIVO, mantenimiento_id, "planillas")
+    if fotos:
+        schedule_gallery(TIPO_PREVENTIVO, mantenimiento_id, "fotos")
+    for mensaje in avisos:
+        await notify_users_preventivo(db_session=db, id_mantenimiento=mantenimiento_id, mensaje=mensaje, firebase_uid=None)
     return db_mantenimiento
 
 
@@ -275,9 +334,10 @@ def delete_mantenimiento_preventivo(db: Session, mantenimiento_id: int, current_
     _ensure_usuario(current_entity)
 
     db_mantenimiento = get_mantenimiento_preventivo(db, mantenimiento_id)
+    registrar_cambio(db, contribucion(db, TIPO_PREVENTIVO, db_mantenimiento), None)
     db.delete(db_mantenimiento)
+    enqueue_sheet_sync(db, TIPO_PREVENTIVO, "delete", mantenimiento_id)
     db.commit()
-    delete_preventivo(mantenimiento_id)
     return {"message": f"Mantenimiento preventivo con id {mantenimiento_id} eliminado"}
 
 
@@ -299,8 +359,9 @@ def delete_mantenimiento_planilla(db: Session, mantenimiento_id: int, file_name:
 
     delete_file_in_folder(GOOGLE_CLOUD_BUCKET_NAME, f"mantenimientos_preventivos/{mantenimiento_id}/planillas/", file_name)
     db.delete(planilla)
+    enqueue_sheet_sync(db, TIPO_PREVENTIVO, "update", mantenimiento_id)
     db.commit()
-    update_preventivo(db_mantenimiento)
+    schedule_gallery(TIPO_PREVENTIVO, mantenimiento_id, "planillas")
     return True
 
 
@@ -320,8 +381,9 @@ def delete_mantenimiento_photo(db: Session, mantenimiento_id: int, file_name: st
     if not foto:
         raise HTTPException(status_code=404, detail="Foto no encontrada")
 
-    delete_file_in_folder(GOOGLE_CLOUD_BUCKET_NAME, f"mantenimientos_preventivos/{mantenimiento_id}/fotos/", file_name)
+    delete_file_in_folder(GOOGLE_CLOUD_BUCKET_NAME, f"mantenimientos_preventivos/{mantenimiento_id}/fotos/", file_name, variantes=True)
     db.delete(foto)
+    enqueue_sheet_sync(db, TIPO_PREVENTIVO, "update", mantenimiento_id)
     db.commit()
-    update_preventivo(db_mantenimiento)
+    schedule_gallery(TIPO_PREVENTIVO, mantenimiento_id, "fotos")
     return True
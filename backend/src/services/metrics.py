@@ -0,0 +1,28 @@
+from fastapi import HTTPException
+from api.schemas import Role
+from services.token_cache import token_cache
+from services.role_cache import role_cache
+from services.google_sheets import get_sheets_metrics as _get_sheets_metrics
+from config.database import get_async_pool_metrics, get_pool_metrics
+
+def _ensure_admin(current_entity: dict):
+    if not current_entity:
+        raise HTTPException(status_code=401, detail="Autenticación requerida")
+    if current_entity["type"] != "usuario" or current_entity["data"]["rol"] != Role.ADMIN:
+        raise HTTPException(status_code=403, detail="No tienes permisos de administrador")
+
+def get_auth_cache_metrics(current_entity: dict):
+    _ensure_admin(current_entity)
+    return token_cache.stats()
+
+def get_sheets_metrics(current_entity: dict):
+    _ensure_admin(current_entity)
+    return _get_sheets_metrics()
+
+def get_db_pool_metrics(current_entity: dict):
+    _ensure_admin(current_entity)
+    return {**get_pool_metrics(), "async": get_async_pool_metrics()}
+
+def get_role_cache_metrics(current_entity: dict):
+    _ensure_admin(current_entity)
+    return role_cache.stats()
@@ -1,32 +1,38 @@
 from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from api.models import Notificacion_Correctivo, Notificacion_Preventivo, Usuario
-from .webpush import send_webpush_notification
+from api.models import Notificacion_Correctivo, Notificacion_Preventivo
+from .webpush import send_webpush_notification_async
 from .notification_ws import notification_manager
+from services.role_cache import role_cache
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from typing import Optional
+from typing import Iterable, List, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
     
-def notify_user(db_session: Session, firebase_uid: str, id_mantenimiento: int, mensaje: str, title: str, body: str):
-    existing_notification = db_session.query(Notificacion_Correctivo).filter(
-        Notificacion_Correctivo.firebase_uid == firebase_uid,
-        Notificacion_Correctivo.id_mantenimiento == id_mantenimiento,
-        Notificacion_Correctivo.mensaje == mensaje,
-        Notificacion_Correctivo.created_at >= datetime.now(ZoneInfo("America/Argentina/Buenos_Aires")).replace(hour=0, minute=0, second=0, microsecond=0),
-        Notificacion_Correctivo.created_at < datetime.now(ZoneInfo("America/Argentina/Buenos_Aires")).replace(hour=23, minute=59, second=59, microsecond=999999)
-    ).first()
-
-    if not existing_notification:
-        existing_notification = db_session.query(Notificacion_Preventivo).filter(
-            Notificacion_Preventivo.firebase_uid == firebase_uid,
-            Notificacion_Preventivo.id_mantenimiento == id_mantenimiento,
-            Notificacion_Preventivo.mensaje == mensaje,
-            Notificacion_Preventivo.created_at >= datetime.now(ZoneInfo("America/Argentina/Buenos_Aires")).replace(hour=0, minute=0, second=0, microsecond=0),
-        Notificacion_Preventivo.created_at < datetime.now(ZoneInfo("America/Argentina/Buenos_Aires")).replace(hour=23, minute=59, second=59, microsecond=999999)
-        ).first()
-
-        if not existing_notification:
-            send_webpush_notification(db_session, firebase_uid, title, body)
+def _hoy_filter(model, id_mantenimiento: int, mensaje: str):
+    ahora = datetime.now(ZoneInfo("America/Argentina/Buenos_Aires"))
+    return (
+        model.id_mantenimiento == id_mantenimiento,
+        model.mensaje == mensaje,
+        model.created_at >= ahora.replace(hour=0, minute=0, second=0, microsecond=0),
+        model.created_at < ahora.replace(hour=23, minute=59, second=59, microsecond=999999),
+    )
+
+async def _ya_notificado(db_session: AsyncSession, model, firebase_uid: str, id_mantenimiento: int, mensaje: str) -> bool:
+    result = await db_session.execute(
+        select(model.id).where(model.firebase_uid == firebase_uid, *_hoy_filter(model, id_mantenimiento, mensaje)).limit(1)
+    )
+    return result.first() is not None
+
+async def notify_user(db_session: AsyncSession, firebase_uid: str, id_mantenimiento: int, mensaje: str, title: str, body: str):
+    if not await _ya_notificado(db_session, Notificacion_Correctivo, firebase_uid, id_mantenimiento, mensaje):
+        if not await _ya_notificado(db_session, Notificacion_Preventivo, firebase_uid, id_mantenimiento, mensaje):
+            await send_webpush_notification_async(db_session, firebase_uid, title, body)
             return {"message": "Notification sent"}
     return {"message": "Notification already sent"}
 
@@ -50,87 +56,77 @@ def notificacion_preventivo_leida(db_session: Session, id_notificacion: int):
     db_session.refresh(db_notificacion)
     return db_notificacion
 
-async def send_notification_correctivo(db_session: Session, firebase_uid: str, id_mantenimiento: int, mensaje: str):
-    existing_notification = db_session.query(Notificacion_Correctivo).filter(
-        Notificacion_Correctivo.firebase_uid == firebase_uid,
-        Notificacion_Correctivo.id_mantenimiento == id_mantenimiento,
-        Notificacion_Correctivo.mensaje == mensaje,
-        Notificacion_Correctivo.created_at >= datetime.now(ZoneInfo("America/Argentina/Buenos_Aires")).replace(hour=0, minute=0, second=0, microsecond=0),
-        Notificacion_Correctivo.created_at < datetime.now(ZoneInfo("America/Argentina/Buenos_Aires")).replace(hour=23, minute=59, second=59, microsecond=999999)
-    ).first()
-    if not existing_notification:
-        db_notificacion = Notificacion_Correctivo(firebase_uid=firebase_uid, id_mantenimiento=id_mantenimiento, mensaje=mensaje)
-        db_session.add(db_notificacion)
-        db_session.commit()
-        db_session.refresh(db_notificacion)
-        await notification_manager.send_notification(
-            firebase_uid,
-            {
-                "id": db_notificacion.id,
-                "firebase_uid": firebase_uid,
-                "id_mantenimiento": id_mantenimiento,
-                "mensaje": mensaje,
-                "leida": db_notificacion.leida,
-                "created_at": db_notificacion.created_at.isoformat(),
-                "tipo": "correctivo",
-            },
-        )
-        return True
-    return False
-
-async def send_notification_preventivo(db_session: Session, firebase_uid: str, id_mantenimiento: int, mensaje: str):
-    existing_notification = db_session.query(Notificacion_Preventivo).filter(
-        Notificacion_Preventivo.firebase_uid == firebase_uid,
-        Notificacion_Preventivo.id_mantenimiento == id_mantenimiento,
-        Notificacion_Preventivo.mensaje == mensaje, 
-        Notificacion_Preventivo.created_at >= datetime.now(ZoneInfo("America/Argentina/Buenos_Aires")).replace(hour=0, minute=0, second=0, microsecond=0),
-        Notificacion_Preventivo.created_at < datetime.now(ZoneInfo("America/Argentina/Buenos_Aires")).replace(hour=23, minute=59, second=59, microsecond=999999)
-    ).first()
-    if not existing_notification:
-        db_notificacion = Notificacion_Preventivo(firebase_uid=firebase_uid, id_mantenimiento=id_mantenimiento, mensaje=mensaje)
-        db_session.add(db_notificacion)
-        db_session.commit()
-        db_session.refresh(db_notificacion)
-        await notification_manager.send_notification(
-            firebase_uid,
-            {
-                "id": db_notificacion.id,
-                "firebase_uid": firebase_uid,
-                "id_mantenimiento": id_mantenimiento,
-                "mensaje": mensaje,
-                "leida": db_notificacion.leida,
-                "created_at": db_notificacion.created_at.isoformat(),
-                "tipo": "preventivo",
-            },
+def _payload(notificacion, tipo: str) -> dict:
+    return {
+        "id": notificacion.id,
+        "firebase_uid": notificacion.firebase_uid,
+        "id_mantenimiento": notificacion.id_mantenimiento,
+        "mensaje": notificacion.mensaje,
+        "leida": notificacion.leida,
+        "created_at": notificacion.created_at.isoformat(),
+        "tipo": tipo,
+    }
+
+async def _send_notifications(db_session: AsyncSession, model, tipo: str, firebase_uids: Iterable[str], id_mantenimiento: int, mensaje: str) -> List:
+    """Notify every recipient not yet notified today about this maintenance and message.
+
+    One dedup query, one bulk insert and one commit for the whole batch; the
+    websocket pushes go out concurrently afterwards. Returns the new rows.
+    """
+    firebase_uids = list(dict.fromkeys(firebase_uids))
+    if not firebase_uids:
+        return []
+    ya_notificados = set(
+        await db_session.scalars(
+            select(model.firebase_uid).where(model.firebase_uid.in_(firebase_uids), *_hoy_filter(model, id_mantenimiento, mensaje))
         )
-        return True
-    return False
+    )
+    nuevas = [
+        {"firebase_uid": uid, "id_mantenimiento": id_mantenimiento, "mensaje": mensaje}
+        for uid in firebase_uids
+        if uid not in ya_notificados
+    ]
+    if not nuevas:
+        return []
+    # Un solo INSERT ... RETURNING para el lote. Sin sort_by_parameter_order, que en SQLite vuelve a fila por fila:
+    # cada fila devuelta ya trae su firebase_uid.
+    notificaciones = (
+        await db_session.scalars(insert(model).returning(model), nuevas)
+    ).all()
+    await db_session.commit()
+    resultados = await asyncio.gather(
+        *(notification_manager.send_notification(n.firebase_uid, _payload(n, tipo)) for n in notificaciones),
+        return_exceptions=True,
+    )
+    for notificacion, resultado in zip(notificaciones, resultados):
+        if isinstance(resultado, Exception):
+            # La notificación ya quedó guardada; el cliente la ve al recargar.
+            logger.warning("No se pudo enviar la notificación %s por websocket: %s", notificacion.id, resultado)
+    return notificaciones
 
-async def notify_users_correctivo(db_session: Session, id_mantenimiento: int, mensaje: str, firebase_uid: Optional[str] = None):
-    if firebase_uid is not None:
-        await send_notification_correctivo(db_session, firebase_uid, id_mantenimiento, mensaje)
-    else:
-        encargados = db_session.query(Usuario).filter(Usuario.rol == "Encargado de Mantenimiento").all()
-        for encargado in encargados:
-            await send_notification_correctivo(db_session, encargado.firebase_uid, id_mantenimiento, mensaje)
-        if "Solucionado" in mensaje:
-            admins = db_session.query(Usuario).filter(Usuario.rol == "Administrador").all()
-            for admin in admins:
-                await send_notification_correctivo(db_session, admin.firebase_uid, id_mantenimiento, mensaje)
-
-async def notify_users_preventivo(db_session: Session, id_mantenimiento: int, mensaje: str, firebase_uid: Optional[str] = None):
+async def send_notification_correctivo(db_session: AsyncSession, firebase_uid: str, id_mantenimiento: int, mensaje: str):
+    return bool(await _send_notifications(db_session, Notificacion_Correctivo, "correctivo", [firebase_uid], id_mantenimiento, mensaje))
+
+async def send_notification_preventivo(db_session: AsyncSession, firebase_uid: str, id_mantenimiento: int, mensaje: str):
+    return bool(await _send_notifications(db_session, Notificacion_Preventivo, "preventivo", [firebase_uid], id_mantenimiento, mensaje))
+
+async def _destinatarios(db_session: AsyncSession, mensaje: str, firebase_uid: Optional[str]):
     if firebase_uid is not None:
-        await send_notification_preventivo(db_session, firebase_uid, id_mantenimiento, mensaje)
-    else:
-        encargados = db_session.query(Usuario).filter(Usuario.rol == "Encargado de Mantenimiento").all()
-        for encargado in encargados:
-            await send_notification_preventivo(db_session, encargado.firebase_uid, id_mantenimiento, mensaje)
-        if "Solucionado" in mensaje:
-            admins = db_session.query(Usuario).filter(Usuario.rol == "Administrador").all()
-            for admin in admins:
-                await send_notification_preventivo(db_session, admin.firebase_uid, id_mantenimiento, mensaje)
-
-async def notify_nearby_maintenances(db_session: Session, current_entity: dict, mantenimientos: list[dict]):
+        return [firebase_uid]
+    roles = ["Encargado de Mantenimiento"]
+    if "Solucionado" in mensaje:
+        roles.append("Administrador")
+    return await role_cache.get_uids(db_session, roles)
+
+async def notify_users_correctivo(db_session: AsyncSession, id_mantenimiento: int, mensaje: str, firebase_uid: Optional[str] = None):
+    destinatarios = await _destinatarios(db_session, mensaje, firebase_uid)
+    await _send_notifications(db_session, Notificacion_Correctivo, "correctivo", destinatarios, id_mantenimiento, mensaje)
+
+async def notify_users_preventivo(db_session: AsyncSession, id_mantenimiento: int, mensaje: str, firebase_uid: Optional[str] = None):
+    destinatarios = await _destinatarios(db_session, mensaje, firebase_uid)
+    await _send_notifications(db_session, Notificacion_Preventivo, "preventivo", destinatarios, id_mantenimiento, mensaje)
+
+async def notify_nearby_maintenances(db_session: AsyncSession, current_entity: dict, mantenimientos: list[dict]):
     if not current_entity:
         raise HTTPException(status_code=401, detail="Autenticación requerida")
     firebase_uid = current_entity["data"]["uid"]
@@ -140,7 +136,7 @@ async def notify_nearby_maintenances(db_session: Session, current_entity: dict,
         else:
             created = await send_notification_preventivo(db_session, firebase_uid, m['id'], m.get('mensaje', ''))
         if created:
-            send_webpush_notification(db_session, firebase_uid, 'Mantenimiento cercano', m.get('mensaje', ''))
+            await send_webpush_notification_async(db_session, firebase_uid, 'Mantenimiento cercano', m.get('mensaje', ''))
     return {"message": "Notificaciones enviadas"}
 
 def delete_notificaciones(db_session: Session, firebase_uid: str):
@@ -0,0 +1,66 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(*values: Any) -> str:
+    """Serialize the keyset values of the last row into an opaque cursor."""
+    payload = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Return the raw keyset values stored in a cursor produced by encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return values
+
+
+def apply_fecha_id_keyset(query, model, cursor: Optional[str]):
+    """Order by (fecha_apertura, id) descending, NULL dates last, and skip rows up to the cursor.
+
+    The order is the backward scan of the (fecha_apertura NULLS FIRST, id)
+    index declared on both mantenimiento tables.
+    """
+    if cursor:
+        fecha_raw, last_id = decode_cursor(cursor, 2)
+        try:
+            last_fecha = date.fromisoformat(fecha_raw) if fecha_raw is not None else None
+            last_id = int(last_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        if last_fecha is None:
+            query = query.filter(model.fecha_apertura.is_(None), model.id < last_id)
+        else:
+            query = query.filter(
+                or_(
+                    model.fecha_apertura < last_fecha,
+                    and_(model.fecha_apertura == last_fecha, model.id < last_id),
+                    model.fecha_apertura.is_(None),
+                )
+            )
+    return query.order_by(model.fecha_apertura.desc().nulls_last(), model.id.desc())
+
+
+def fetch_fecha_id_page(query, model, cursor: Optional[str], limit: int):
+    """Return one keyset page of rows and the cursor for the next one."""
+    rows = apply_fecha_id_keyset(query, model, cursor).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.fecha_apertura, last.id)
+    return rows, next_cursor
@@ -0,0 +1,86 @@
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from api.models import CacheVersion, Usuario
+
+ROLE_CACHE_KEY = "usuario_roles"
+
+
+def bump_cache_version(db: Session, nombre: str) -> None:
+    """Increment the cache_version counter `nombre`, creating it on first use."""
+    # Un solo upsert: si la fila todavía no existe, dos requests que la crean a la vez no chocan en la clave.
+    dialecto = sqlite if db.get_bind().dialect.name == "sqlite" else postgresql
+    stmt = dialecto.insert(CacheVersion).values(nombre=nombre, version=1)
+    db.execute(
+        stmt.on_conflict_do_update(index_elements=[CacheVersion.nombre], set_={"version": CacheVersion.version + 1})
+    )
+
+
+def bump_role_version(db: Session) -> None:
+    """Mark the role lists stale in every worker; call in the same transaction that changes usuario."""
+    bump_cache_version(db, ROLE_CACHE_KEY)
+
+
+class RoleCache:
+    """Firebase UIDs of the users of each rol, shared by the notification fan-outs of this process.
+
+    Each lookup reads the usuario_roles counter of cache_version (a primary key
+    lookup) and reloads the whole table only when another worker, or this one,
+    changed a user since the last load.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._version: Optional[int] = None
+        self._uids: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    async def get_uids(self, db: AsyncSession, roles: Iterable[str]) -> List[str]:
+        roles = list(roles)
+        version = await db.scalar(select(CacheVersion.version).where(CacheVersion.nombre == ROLE_CACHE_KEY)) or 0
+        with self._lock:
+            if version == self._version:
+                self.hits += 1
+                return [uid for rol in roles for uid in self._uids.get(rol, [])]
+        # La versión se lee antes que los usuarios: si cambian en el medio, la próxima consulta recarga.
+        result = await db.execute(select(Usuario.rol, Usuario.firebase_uid).where(Usuario.firebase_uid.isnot(None)))
+        uids: Dict[str, List[str]] = {}
+        for rol, firebase_uid in result:
+            uids.setdefault(rol, []).append(firebase_uid)
+        with self._lock:
+            self.misses += 1
+            self._version = version
+            self._uids = uids
+        return [uid for rol in roles for uid in uids.get(rol, [])]
+
+    def invalidate(self) -> None:
+        """Drop the local copy; other workers notice through the version counter."""
+        with self._lock:
+            self._version = None
+            self._uids = {}
+
+    def clear(self) -> None:
+        """Drop the local copy and reset the counters."""
+        with self._lock:
+            self._version = None
+            self._uids = {}
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "version": self._version,
+                "roles": {rol: len(uids) for rol, uids in self._uids.items()},
+            }
+
+
+role_cache = RoleCache()
@@ -0,0 +1,225 @@
+from datetime import date
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import extract, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from api.models import (
+    CLAVE_BUCKET_ROLLUP,
+    MantenimientoCorrectivo,
+    MantenimientoPreventivo,
+    MantenimientoRollupDiario,
+    Sucursal,
+)
+from services.estadisticas import dias_resolucion
+
+TIPO_CORRECTIVO = "correctivo"
+TIPO_PREVENTIVO = "preventivo"
+MODELOS = {TIPO_CORRECTIVO: MantenimientoCorrectivo, TIPO_PREVENTIVO: MantenimientoPreventivo}
+AGRUPACIONES = ("dia", "mes", "anio", "zona", "id_cuadrilla", "cliente_id", "tipo")
+
+
+class Contribucion(NamedTuple):
+    """What a single maintenance adds to its rollup bucket."""
+    dia: date
+    zona: Optional[str]
+    id_cuadrilla: Optional[int]
+    cliente_id: int
+    tipo: str
+    cerrado: bool
+    dias_resolucion: int
+
+
+def contribucion(db: Session, tipo: str, mantenimiento) -> Optional[Contribucion]:
+    """Snapshot the rollup bucket of a maintenance; None if it has no fecha_apertura."""
+    if mantenimiento.fecha_apertura is None:
+        return None
+    sucursal = db.get(Sucursal, mantenimiento.sucursal_id)
+    cerrado = mantenimiento.fecha_cierre is not None
+    return Contribucion(
+        dia=mantenimiento.fecha_apertura,
+        zona=sucursal.zona if sucursal else None,
+        id_cuadrilla=mantenimiento.id_cuadrilla,
+        cliente_id=mantenimiento.cliente_id,
+        tipo=tipo,
+        cerrado=cerrado,
+        dias_resolucion=(mantenimiento.fecha_cierre - mantenimiento.fecha_apertura).days if cerrado else 0,
+    )
+
+
+def _sumar(db: Session, tipo: str, dia: date, zona: Optional[str], id_cuadrilla: Optional[int], cliente_id: int,
+           cantidad: int, cerrados: int, dias: int):
+    # Un solo INSERT ... ON CONFLICT DO UPDATE: dos transacciones que abren el mismo bucket suman sobre la misma fila.
+    dialecto = sqlite if db.get_bind().dialect.name == "sqlite" else postgresql
+    r = MantenimientoRollupDiario
+    stmt = dialecto.insert(r).values(
+        dia=dia,
+        zona=zona,
+        id_cuadrilla=id_cuadrilla,
+        cliente_id=cliente_id,
+        tipo=tipo,
+        cantidad=cantidad,
+        cerrados=cerrados,
+        dias_resolucion=dias,
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=CLAVE_BUCKET_ROLLUP,
+            set_={
+                "cantidad": r.cantidad + stmt.excluded.cantidad,
+                "cerrados": r.cerrados + stmt.excluded.cerrados,
+                "dias_resolucion": r.dias_resolucion + stmt.excluded.dias_resolucion,
+            },
+        )
+    )
+
+
+def _aplicar(db: Session, c: Contribucion, signo: int):
+    _sumar(
+        db, c.tipo, c.dia, c.zona, c.id_cuadrilla, c.cliente_id,
+        signo, signo if c.cerrado else 0, signo * c.dias_resolucion,
+    )
+
+
+def registrar_cambio(db: Session, antes: Optional[Contribucion], despues: Optional[Contribucion]):
+    """Move a maintenance from one bucket to another inside the caller's transaction.
+
+    Pass antes=None for inserts and despues=None for deletes; the caller commits.
+    """
+    if antes == despues:
+        return
+    if antes is not None:
+        _aplicar(db, antes, -1)
+    if despues is not None:
+        _aplicar(db, despues, 1)
+
+
+def cambiar_zona_sucursal(db: Session, sucursal_id: int, zona_anterior: Optional[str], zona_nueva: Optional[str]):
+    """Move every maintenance of a sucursal from its old zona buckets to the new ones.
+
+    The buckets store the zona the row was counted under, so a zona change has
+    to move them in the same transaction; the caller commits.
+    """
+    if zona_anterior == zona_nueva:
+        return
+    for tipo, model in MODELOS.items():
+        rows = (
+            db.query(
+                model.fecha_apertura,
+                model.id_cuadrilla,
+                model.cliente_id,
+                func.count(model.id),
+                func.count(model.fecha_cierre),
+                func.coalesce(func.sum(dias_resolucion(db, model)), 0),
+            )
+            .filter(model.sucursal_id == sucursal_id, model.fecha_apertura.isnot(None))
+            .group_by(model.fecha_apertura, model.id_cuadrilla, model.cliente_id)
+            .all()
+        )
+        for dia, id_cuadrilla, cliente_id, cantidad, cerrados, dias in rows:
+            dias = int(round(dias))
+            _sumar(db, tipo, dia, zona_anterior, id_cuadrilla, cliente_id, -cantidad, -cerrados, -dias)
+            _sumar(db, tipo, dia, zona_nueva, id_cuadrilla, cliente_id, cantidad, cerrados, dias)
+
+
+def rebuild_rollups(db: Session) -> int:
+    """Recompute every bucket from the raw maintenance tables and return the row count."""
+    db.query(MantenimientoRollupDiario).delete(synchronize_session=False)
+    total = 0
+    for tipo, model in MODELOS.items():
+        rows = (
+            db.query(
+                model.fecha_apertura,
+                Sucursal.zona,
+                model.id_cuadrilla,
+                model.cliente_id,
+                func.count(model.id),
+                func.count(model.fecha_cierre),
+                func.coalesce(func.sum(dias_resolucion(db, model)), 0),
+            )
+            .outerjoin(Sucursal, Sucursal.id == model.sucursal_id)
+            .filter(model.fecha_apertura.isnot(None))
+            .group_by(model.fecha_apertura, Sucursal.zona, model.id_cuadrilla, model.cliente_id)
+            .all()
+        )
+        db.add_all(
+            MantenimientoRollupDiario(
+                dia=dia,
+                zona=zona,
+                id_cuadrilla=id_cuadrilla,
+                cliente_id=cliente_id,
+                tipo=tipo,
+                cantidad=cantidad,
+                cerrados=cerrados,
+                dias_resolucion=int(round(dias)),
+            )
+            for dia, zona, id_cuadrilla, cliente_id, cantidad, cerrados, dias in rows
+        )
+        total += len(rows)
+    db.commit()
+    return total
+
+
+def get_kpis(
+    db: Session,
+    agrupar_por: str = "mes",
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    tipo: Optional[str] = None,
+    zona: Optional[str] = None,
+    id_cuadrilla: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+) -> list:
+    """Aggregate the daily rollup without touching the raw maintenance tables."""
+    if agrupar_por not in AGRUPACIONES:
+        raise HTTPException(status_code=400, detail=f"agrupar_por debe ser uno de: {', '.join(AGRUPACIONES)}")
+    if tipo is not None and tipo not in MODELOS:
+        raise HTTPException(status_code=400, detail="Tipo de mantenimiento inválido")
+
+    r = MantenimientoRollupDiario
+    if agrupar_por == "mes":
+        claves = [extract("year", r.dia), extract("month", r.dia)]
+    elif agrupar_por == "anio":
+        claves = [extract("year", r.dia)]
+    else:
+        claves = [getattr(r, agrupar_por)]
+
+    query = db.query(*claves, func.sum(r.cantidad), func.sum(r.cerrados), func.sum(r.dias_resolucion))
+    if desde is not None:
+        query = query.filter(r.dia >= desde)
+    if hasta is not None:
+        query = query.filter(r.dia <= hasta)
+    if tipo is not None:
+        query = query.filter(r.tipo == tipo)
+    if zona is not None:
+        query = query.filter(r.zona == zona)
+    if id_cuadrilla is not None:
+        query = query.filter(r.id_cuadrilla == id_cuadrilla)
+    if cliente_id is not None:
+        query = query.filter(r.cliente_id == cliente_id)
+    rows = query.group_by(*claves).order_by(*claves).all()
+
+    resultado = []
+    for row in rows:
+        *valores, cantidad, cerrados, dias = row
+        if agrupar_por == "mes":
+            clave = f"{int(valores[0]):04d}-{int(valores[1]):02d}"
+        elif agrupar_por == "anio":
+            clave = int(valores[0])
+        else:
+            clave = valores[0]
+        cantidad = int(cantidad or 0)
+        cerrados = int(cerrados or 0)
+        if cantidad == 0:
+            continue
+        resultado.append(
+            {
+                "clave": clave,
+                "cantidad": cantidad,
+                "cerrados": cerrados,
+                "promedio_dias_resolucion": round(int(dias or 0) / cerrados, 2) if cerrados else 0,
+            }
+        )
+    return resultado
@@ -0,0 +1,59 @@
+import logging
+import os
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session, joinedload
+
+from api.schemas import Role
+from services import google_sheets, sheet_row_index
+from services.sheet_outbox import MODELOS, acquire_export_lease, release_export_lease
+
+logger = logging.getLogger(__name__)
+
+SHEET_EXPORT_CHUNK_SIZE = int(os.getenv("SHEET_EXPORT_CHUNK_SIZE", "1000"))
+
+
+def _stream_mantenimientos(db: Session, model):
+    return (
+        db.query(model)
+        .options(joinedload(model.cliente), joinedload(model.sucursal), joinedload(model.cuadrilla))
+        .order_by(model.id)
+        .yield_per(SHEET_EXPORT_CHUNK_SIZE)
+    )
+
+
+def export_sheet(db: Session, tipo: str) -> int:
+    """Rebuild one worksheet from the database and re-seed its row index; returns the row count.
+
+    The worksheet is leased for the whole rewrite, so the outbox drainers of
+    every worker hold its jobs until the new row index is committed.
+    """
+    if not acquire_export_lease(db, tipo):
+        raise HTTPException(status_code=409, detail="La planilla se está sincronizando, intente nuevamente en unos minutos")
+    try:
+        rows_by_token = google_sheets.export_worksheet(tipo, _stream_mantenimientos(db, MODELOS[tipo]))
+        if rows_by_token is None:
+            return 0
+        sheet_row_index.replace_rows(db, tipo, rows_by_token)
+        db.commit()
+    except Exception:
+        db.rollback()
+        # La hoja pudo quedar a medio escribir: el próximo flush relee la columna de tracking.
+        sheet_row_index.mark_stale(db, tipo)
+        raise
+    finally:
+        release_export_lease(db, tipo)
+    logger.info("Planilla %s reconstruida con %s filas", tipo, len(rows_by_token))
+    return len(rows_by_token)
+
+
+def export_sheets(db: Session, current_entity: dict, tipo: Optional[str] = None) -> dict:
+    if not current_entity:
+        raise HTTPException(status_code=401, detail="Autenticación requerida")
+    if current_entity["type"] != "usuario" or current_entity["data"]["rol"] != Role.ADMIN:
+        raise HTTPException(status_code=403, detail="No tienes permisos de administrador")
+    if tipo is not None and tipo not in MODELOS:
+        raise HTTPException(status_code=400, detail="Tipo de mantenimiento inválido")
+    tipos = [tipo] if tipo else list(MODELOS)
+    return {t: export_sheet(db, t) for t in tipos}
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from gspread.exceptions import APIError
+from sqlalchemy import exists, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, aliased
+
+from api.models import MantenimientoCorrectivo, MantenimientoPreventivo, SheetIndexEstado, SheetSyncOutbox
+from config.database import SessionLocal
+from services import google_sheets, sheet_row_index
+
+logger = logging.getLogger(__name__)
+
+SHEET_SYNC_INTERVAL_SECONDS = float(os.getenv("SHEET_SYNC_INTERVAL_SECONDS", "5"))
+SHEET_SYNC_BATCH_SIZE = int(os.getenv("SHEET_SYNC_BATCH_SIZE", "500"))
+SHEET_SYNC_MAX_ATTEMPTS = int(os.getenv("SHEET_SYNC_MAX_ATTEMPTS", "8"))
+SHEET_SYNC_BACKOFF_SECONDS = float(os.getenv("SHEET_SYNC_BACKOFF_SECONDS", "30"))
+SHEET_SYNC_MAX_BACKOFF_SECONDS = float(os.getenv("SHEET_SYNC_MAX_BACKOFF_SECONDS", "3600"))
+# Cuánto tiempo un job reclamado queda reservado al drainer que lo tomó; si el proceso muere, otro lo retoma al vencer.
+SHEET_SYNC_LEASE_SECONDS = float(os.getenv("SHEET_SYNC_LEASE_SECONDS", "300"))
+# Tope de la reserva de una hoja durante export_sheet, por si el proceso que exporta muere sin liberarla.
+SHEET_EXPORT_LEASE_SECONDS = float(os.getenv("SHEET_EXPORT_LEASE_SECONDS", "900"))
+
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_FALLIDO = "fallido"
+
+MODELOS = {"correctivo": MantenimientoCorrectivo, "preventivo": MantenimientoPreventivo}
+OPERACIONES = ("append", "update", "delete")
+
+
+def enqueue_sheet_sync(db: Session, tipo: str, operacion: str, mantenimiento_id: int) -> SheetSyncOutbox:
+    """Queue a sheet sync in the caller's transaction; it is only visible once the caller commits."""
+    if tipo not in MODELOS or operacion not in OPERACIONES:
+        raise ValueError(f"Operación de sincronización desconocida: {tipo}/{operacion}")
+    job = SheetSyncOutbox(tipo=tipo, operacion=operacion, mantenimiento_id=mantenimiento_id)
+    db.add(job)
+    return job
+
+
+def _backoff(intentos: int) -> timedelta:
+    return timedelta(seconds=min(SHEET_SYNC_BACKOFF_SECONDS * 2 ** (intentos - 1), SHEET_SYNC_MAX_BACKOFF_SECONDS))
+
+
+def _marcar_fallidos(jobs, exc: Exception, now: datetime):
+    for job in jobs:
+        job.procesando_hasta = None
+        job.reclamado_por = None
+        job.intentos += 1
+        job.ultimo_error = str(exc)[:2000]
+        if job.intentos >= SHEET_SYNC_MAX_ATTEMPTS:
+            job.estado = ESTADO_FALLIDO
+        else:
+            job.proximo_intento = now + _backoff(job.intentos)
+
+
+def _falla_del_lote(exc: Exception) -> bool:
+    # Cuota, error del servicio o de red: no depende de ninguna fila, partir el lote solo multiplica las llamadas.
+    if isinstance(exc, APIError):
+        return exc.code == 429 or exc.code >= 500
+    return isinstance(exc, OSError)
+
+
+def _exportando(tipo_col, now: datetime):
+    return exists().where(SheetIndexEstado.tipo == tipo_col, SheetIndexEstado.exportando_hasta > now)
+
+
+def acquire_export_lease(db: Session, tipo: str, now: Optional[datetime] = None) -> bool:
+    """Reserve a worksheet for export_sheet and commit; False if it is being exported or flushed.
+
+    While the lease holds, _reclamar leaves the jobs of that tipo alone and
+    drain_sheet_outbox does not reconcile its row index. Jobs already leased
+    by a drainer mean a write is in flight, so the export is refused instead
+    of racing it.
+    """
+    now = now or datetime.utcnow()
+    hasta = now + timedelta(seconds=SHEET_EXPORT_LEASE_SECONDS)
+    dialecto = sqlite if db.get_bind().dialect.name == "sqlite" else postgresql
+    stmt = dialecto.insert(SheetIndexEstado).values(tipo=tipo, exportando_hasta=hasta)
+    tomado = db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[SheetIndexEstado.tipo],
+            set_={"exportando_hasta": hasta},
+            where=or_(SheetIndexEstado.exportando_hasta.is_(None), SheetIndexEstado.exportando_hasta <= now),
+        )
+    ).rowcount
+    en_curso = db.scalar(
+        select(exists().where(SheetSyncOutbox.tipo == tipo, SheetSyncOutbox.procesando_hasta > now))
+    )
+    if not tomado or en_curso:
+        db.rollback()
+        return False
+    db.commit()
+    return True
+
+
+def release_export_lease(db: Session, tipo: str):
+    db.execute(update(SheetIndexEstado).where(SheetIndexEstado.tipo == tipo).values(exportando_hasta=None))
+    db.commit()
+
+
+def _reclamar(db: Session, batch_size: int, now: datetime) -> list:
+    """Lease up to batch_size due jobs to this drainer and return them.
+
+    Every app worker runs a drainer; the lease (procesando_hasta/reclamado_por)
+    makes each job go to exactly one of them. On Postgres the candidate rows are
+    also locked with SKIP LOCKED so concurrent drainers do not wait on each other.
+    A maintenance with any job still waiting for its backoff is skipped entirely,
+    and so is every job of a worksheet that export_sheet is rewriting.
+    """
+    en_espera = aliased(SheetSyncOutbox)
+    libre = (
+        or_(SheetSyncOutbox.procesando_hasta.is_(None), SheetSyncOutbox.procesando_hasta <= now)
+        & ~_exportando(SheetSyncOutbox.tipo, now)
+    )
+    ids = db.scalars(
+        select(SheetSyncOutbox.id)
+        .where(
+            SheetSyncOutbox.estado == ESTADO_PENDIENTE,
+            SheetSyncOutbox.proximo_intento <= now,
+            libre,
+            ~exists().where(
+                en_espera.tipo == SheetSyncOutbox.tipo,
+                en_espera.mantenimiento_id == SheetSyncOutbox.mantenimiento_id,
+                en_espera.estado == ESTADO_PENDIENTE,
+                en_espera.proximo_intento > now,
+            ),
+        )
+        .order_by(SheetSyncOutbox.proximo_intento, SheetSyncOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not ids:
+        db.rollback()
+        return []
+    reclamo = uuid.uuid4().hex
+    # El UPDATE vuelve a evaluar el lease: si otro drainer tomó la fila entre el SELECT y acá, no se pisa.
+    db.execute(
+        update(SheetSyncOutbox)
+        .where(SheetSyncOutbox.id.in_(ids), libre)
+        .values(procesando_hasta=now + timedelta(seconds=SHEET_SYNC_LEASE_SECONDS), reclamado_por=reclamo)
+    )
+    db.commit()
+    return db.query(SheetSyncOutbox).filter(SheetSyncOutbox.reclamado_por == reclamo).order_by(SheetSyncOutbox.id).all()
+
+
+def process_sheet_outbox(db: Session, batch_size: int = SHEET_SYNC_BATCH_SIZE, now: Optional[datetime] = None) -> int:
+    """Flush due outbox jobs and return how many were completed.
+
+    Jobs are first claimed through _reclamar, so concurrent drainers never
+    flush the same job. Jobs of the same maintenance are coalesced into a
+    single final state (upsert or delete) and all dirty rows of a worksheet
+    are written together through google_sheets.sync_worksheet, which locates
+    rows through the persisted sheet_row_index.
+    """
+    now = now or datetime.utcnow()
+    jobs = _reclamar(db, batch_size, now)
+    grupos = defaultdict(list)
+    for job in jobs:
+        grupos[(job.tipo, job.mantenimiento_id)].append(job)
+
+    procesados = 0
+    for tipo in MODELOS:
+        pendientes = {
+            mantenimiento_id: grupo
+            for (grupo_tipo, mantenimiento_id), grupo in grupos.items()
+            if grupo_tipo == tipo
+        }
+        if not pendientes:
+            continue
+        rows_by_token = None if sheet_row_index.needs_reconcile(db, tipo) else sheet_row_index.load_rows(db, tipo)
+        procesados += _sincronizar(db, tipo, pendientes, now, rows_by_token)
+    return procesados
+
+
+def _sincronizar(db: Session, tipo: str, pendientes: dict, now: datetime, rows_by_token) -> int:
+    """Write {mantenimiento_id: jobs} to one worksheet and return how many jobs were completed.
+
+    When the write fails for a reason that is not transient (see
+    _falla_del_lote) the maintenances are split in halves and retried, so only
+    the one whose row Sheets rejects is charged an attempt.
+    """
+    model = MODELOS[tipo]
+    delete_ids = [mid for mid, grupo in pendientes.items() if any(job.operacion == "delete" for job in grupo)]
+    upsert_ids = [mid for mid in pendientes if mid not in delete_ids]
+    # Si el mantenimiento ya no existe, el job de delete correspondiente limpia la planilla.
+    upserts = db.query(model).filter(model.id.in_(upsert_ids)).all() if upsert_ids else []
+    jobs = [job for grupo in pendientes.values() for job in grupo]
+    try:
+        result = google_sheets.sync_worksheet(tipo, upserts, delete_ids, rows_by_token)
+    except Exception as exc:
+        db.rollback()
+        # Parte de los cambios pudo haberse escrito: el índice de filas ya no es confiable.
+        sheet_row_index.mark_stale(db, tipo)
+        if len(pendientes) > 1 and not _falla_del_lote(exc):
+            ids = list(pendientes)
+            mitad = len(ids) // 2
+            # Cada mitad relee la columna de tracking en vez de usar el índice.
+            return sum(
+                _sincronizar(db, tipo, {mid: pendientes[mid] for mid in parte}, now, None)
+                for parte in (ids[:mitad], ids[mitad:])
+            )
+        _marcar_fallidos(jobs, exc, now)
+        logger.warning("Sheet sync de %s falló para %s jobs: %s", tipo, len(jobs), exc)
+        db.commit()
+        return 0
+    sheet_row_index.apply_sync_result(db, tipo, result)
+    for job in jobs:
+        db.delete(job)
+    db.commit()
+    return len(jobs)
+
+
+def drain_sheet_outbox() -> int:
+    db = SessionLocal()
+    try:
+        procesados = process_sheet_outbox(db)
+        now = datetime.utcnow()
+        for tipo in MODELOS:
+            # Durante una exportación la columna de tracking está a medio escribir; export_sheet resiembra el índice.
+            if db.scalar(select(_exportando(tipo, now))):
+                continue
+            if sheet_row_index.needs_reconcile(db, tipo):
+                sheet_row_index.reconcile(db, tipo)
+        return procesados
+    finally:
+        db.close()
+
+
+async def run_sheet_outbox_worker(interval: float = SHEET_SYNC_INTERVAL_SECONDS):
+    """Background loop started from the app lifespan; Sheets I/O runs in a worker thread."""
+    while True:
+        try:
+            await asyncio.to_thread(drain_sheet_outbox)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Sheet outbox worker error: %s", exc, exc_info=True)
+        await asyncio.sleep(interval)
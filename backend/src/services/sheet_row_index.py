@@ -0,0 +1,80 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from api.models import SheetIndexEstado, SheetRowIndex
+from services import google_sheets
+
+logger = logging.getLogger(__name__)
+
+SHEET_INDEX_RECONCILE_SECONDS = float(os.getenv("SHEET_INDEX_RECONCILE_SECONDS", "900"))
+
+
+def _marcar(db: Session, tipo: str, reconciliado_en: Optional[datetime]):
+    # El estado vive en la base: todos los workers ven cuándo se releyó la hoja por última vez.
+    dialecto = sqlite if db.get_bind().dialect.name == "sqlite" else postgresql
+    stmt = dialecto.insert(SheetIndexEstado).values(tipo=tipo, reconciliado_en=reconciliado_en)
+    db.execute(stmt.on_conflict_do_update(index_elements=[SheetIndexEstado.tipo], set_={"reconciliado_en": reconciliado_en}))
+
+
+def needs_reconcile(db: Session, tipo: str) -> bool:
+    reconciliado_en = db.scalar(select(SheetIndexEstado.reconciliado_en).where(SheetIndexEstado.tipo == tipo))
+    return reconciliado_en is None or datetime.utcnow() - reconciliado_en >= timedelta(seconds=SHEET_INDEX_RECONCILE_SECONDS)
+
+
+def mark_stale(db: Session, tipo: str):
+    """Force a full re-read of the tracking column on the next flush; the caller commits."""
+    _marcar(db, tipo, None)
+
+
+def load_rows(db: Session, tipo: str) -> Dict[str, int]:
+    rows = db.query(SheetRowIndex.mantenimiento_id, SheetRowIndex.fila).filter(SheetRowIndex.tipo == tipo)
+    return {str(mantenimiento_id): fila for mantenimiento_id, fila in rows}
+
+
+def replace_rows(db: Session, tipo: str, rows_by_token: Dict[str, int]):
+    db.query(SheetRowIndex).filter(SheetRowIndex.tipo == tipo).delete(synchronize_session=False)
+    db.add_all(
+        SheetRowIndex(tipo=tipo, mantenimiento_id=int(token), fila=fila)
+        for token, fila in rows_by_token.items()
+        if token.isdigit()
+    )
+    _marcar(db, tipo, datetime.utcnow())
+
+
+def apply_sync_result(db: Session, tipo: str, result: google_sheets.SheetSyncResult):
+    """Mirror on the index what sync_worksheet did on the sheet; the caller commits."""
+    if result.snapshot is not None:
+        replace_rows(db, tipo, result.snapshot)
+        db.flush()
+    for fila in result.deleted_rows:
+        db.query(SheetRowIndex).filter(SheetRowIndex.tipo == tipo, SheetRowIndex.fila == fila).delete(synchronize_session=False)
+        db.query(SheetRowIndex).filter(SheetRowIndex.tipo == tipo, SheetRowIndex.fila > fila).update(
+            {SheetRowIndex.fila: SheetRowIndex.fila - 1}, synchronize_session=False
+        )
+    if result.appended is None:
+        mark_stale(db, tipo)
+        return
+    ids = [int(token) for token, _ in result.appended if token.isdigit()]
+    if ids:
+        db.query(SheetRowIndex).filter(SheetRowIndex.tipo == tipo, SheetRowIndex.mantenimiento_id.in_(ids)).delete(synchronize_session=False)
+    db.add_all(
+        SheetRowIndex(tipo=tipo, mantenimiento_id=int(token), fila=fila)
+        for token, fila in result.appended
+        if token.isdigit()
+    )
+
+
+def reconcile(db: Session, tipo: str) -> bool:
+    """Rebuild the index of one worksheet from a single read of its tracking column."""
+    rows = google_sheets.read_tracking_rows(tipo)
+    if rows is None:
+        return False
+    replace_rows(db, tipo, rows)
+    db.commit()
+    return True
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 
 from api.models import Cliente, Sucursal
 from auth.firebase import initialize_firebase
+from services.rollups import cambiar_zona_sucursal
 
 ALLOWED_FRECUENCIAS = {"Mensual", "Trimestral", "Cuatrimestral", "Semestral"}
 
@@ -163,7 +164,9 @@ def update_sucursal(
 
     if nombre is not None:
         sucursal.nombre = nombre
-    if zona is not None:
+    if zona is not None and zona != sucursal.zona:
+        # Los buckets de KPIs guardan la zona: se mueven en la misma transacción que el cambio.
+        cambiar_zona_sucursal(db_session, sucursal.id, sucursal.zona, zona)
         sucursal.zona = zona
     if direccion is not None:
         _validate_direccion(direccion)
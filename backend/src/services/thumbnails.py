@@ -0,0 +1,56 @@
+import io
+import logging
+import os
+from typing import BinaryIO, Dict, Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow es parte de requirements.txt
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "320"))
+WEB_IMAGE_SIZE = int(os.getenv("WEB_IMAGE_SIZE", "1600"))
+VARIANTES = {"thumb": THUMBNAIL_SIZE, "web": WEB_IMAGE_SIZE}
+JPEG_QUALITY = 80
+
+
+def variant_url(url: str, variante: str) -> str:
+    """URL of a variant, stored under a sibling prefix: .../fotos/x.jpg -> .../fotos_thumb/x.jpg."""
+    carpeta, nombre = url.rsplit("/", 1)
+    return f"{carpeta}_{variante}/{nombre}"
+
+
+def serialize_foto(url: str) -> dict:
+    return {"url": url, "thumbnail": variant_url(url, "thumb"), "web": variant_url(url, "web")}
+
+
+def build_variants(file: BinaryIO) -> Dict[str, Tuple[bytes, str]]:
+    """Downscale an image to every variant size: {variante: (contenido, content_type)}.
+
+    Returns an empty dict if Pillow is missing or the file is not a decodable
+    image; callers then store the original under the variant names.
+    """
+    if Image is None:
+        return {}
+    try:
+        file.seek(0)
+        with Image.open(file) as original:
+            original = ImageOps.exif_transpose(original)
+            if original.mode not in ("RGB", "L"):
+                original = original.convert("RGB")
+            variantes = {}
+            for variante, size in VARIANTES.items():
+                image = original.copy()
+                image.thumbnail((size, size))
+                buffer = io.BytesIO()
+                image.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+                variantes[variante] = (buffer.getvalue(), "image/jpeg")
+            return variantes
+    except Exception as exc:
+        logger.info("No se pudieron generar variantes de la imagen: %s", exc)
+        return {}
+    finally:
+        file.seek(0)
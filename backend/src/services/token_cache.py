@@ -0,0 +1,110 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from api.models import CacheVersion
+from services.role_cache import bump_cache_version
+
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "1024"))
+TOKEN_CACHE_KEY = "token_entidades"
+
+
+def token_version(db: Session) -> int:
+    """Current token_entidades counter of cache_version (a primary key lookup)."""
+    return db.scalar(select(CacheVersion.version).where(CacheVersion.nombre == TOKEN_CACHE_KEY)) or 0
+
+
+def bump_token_version(db: Session) -> None:
+    """Drop the cached tokens of every worker; call in the same transaction that changes or deletes the entity."""
+    bump_cache_version(db, TOKEN_CACHE_KEY)
+
+
+class TokenCache:
+    """LRU cache of resolved entities keyed by the hash of a Firebase ID token.
+
+    Each entry remembers the token_entidades version it was resolved under and
+    is only served while the caller passes that same version, so an update or
+    delete of a usuario/cuadrilla in any worker retires the entries of all of them.
+    """
+
+    def __init__(self, ttl_seconds: int = TOKEN_CACHE_TTL_SECONDS, max_size: int = TOKEN_CACHE_MAX_SIZE) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, int, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str, version: int = 0) -> Optional[dict]:
+        """Return the cached entity for a token, or None if missing, expired or from another version."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, entry_version, entity = entry
+            if expires_at <= time.time() or entry_version != version:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entity
+
+    def set(self, token: str, entity: dict, token_exp: Optional[float] = None, version: int = 0) -> None:
+        """Store an entity resolved under `version`, expiring no later than the token's exp claim."""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, float(token_exp))
+        if expires_at <= now or self.max_size <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, version, entity)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_entity(self, entity_type: str, entity_id: int) -> None:
+        """Drop this process's cached tokens of the given usuario/cuadrilla; other workers go by the version."""
+        with self._lock:
+            stale = [
+                key
+                for key, (_, _, entity) in self._entries.items()
+                if entity.get("type") == entity_type and entity.get("data", {}).get("id") == entity_id
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current size of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+token_cache = TokenCache()
@@ -0,0 +1,123 @@
+import os
+import uuid
+from datetime import timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from api.models import (
+    MantenimientoCorrectivo,
+    MantenimientoCorrectivoFoto,
+    MantenimientoPreventivo,
+    MantenimientoPreventivoFoto,
+    MantenimientoPreventivoPlanilla,
+)
+from api.schemas import UploadConfirmacion, UploadUrlRequest
+from services.chats import send_message_correctivo, send_message_preventivo
+from services.galleries import gallery_folder, schedule_gallery
+from services.gcloud_storage import ensure_photo_variants, get_bucket, run_in_gcs_executor, submit_to_gcs_executor
+from services.sheet_outbox import enqueue_sheet_sync
+
+GOOGLE_CLOUD_BUCKET_NAME = os.getenv("GOOGLE_CLOUD_BUCKET_NAME")
+UPLOAD_URL_EXPIRATION_SECONDS = int(os.getenv("UPLOAD_URL_EXPIRATION_SECONDS", "900"))
+# fake-gcs-server u otro emulador local: las URLs firmadas apuntan ahí en lugar de a storage.googleapis.com.
+STORAGE_EMULATOR_HOST = os.getenv("STORAGE_EMULATOR_HOST")
+
+MODELOS = {"correctivo": MantenimientoCorrectivo, "preventivo": MantenimientoPreventivo}
+ARCHIVOS = {
+    ("correctivo", "fotos"): MantenimientoCorrectivoFoto,
+    ("preventivo", "fotos"): MantenimientoPreventivoFoto,
+    ("preventivo", "planillas"): MantenimientoPreventivoPlanilla,
+}
+DESTINOS = set(ARCHIVOS) | {("correctivo", "planilla"), ("correctivo", "chat"), ("preventivo", "chat")}
+
+
+def _validar_destino(tipo: str, carpeta: str, current_entity: dict):
+    if not current_entity:
+        raise HTTPException(status_code=401, detail="Autenticación requerida")
+    if (tipo, carpeta) not in DESTINOS:
+        raise HTTPException(status_code=400, detail="Destino de subida inválido")
+    if carpeta != "chat" and current_entity.get("type") != "usuario":
+        raise HTTPException(status_code=403, detail="No tienes permisos")
+    if not GOOGLE_CLOUD_BUCKET_NAME:
+        raise HTTPException(status_code=500, detail="Google Cloud Bucket name not configured")
+
+
+def _ensure_mantenimiento(mantenimiento):
+    if not mantenimiento:
+        raise HTTPException(status_code=404, detail="Mantenimiento no encontrado")
+    return mantenimiento
+
+
+def create_upload_url(db: Session, solicitud: UploadUrlRequest, current_entity: dict) -> dict:
+    """Issue a V4 signed PUT URL so the client uploads the file straight to GCS."""
+    _validar_destino(solicitud.tipo, solicitud.carpeta, current_entity)
+    _ensure_mantenimiento(db.get(MODELOS[solicitud.tipo], solicitud.mantenimiento_id))
+    extension = solicitud.filename.rsplit(".", 1)[-1].lower() if "." in solicitud.filename else "bin"
+    object_name = f"{gallery_folder(solicitud.tipo, solicitud.mantenimiento_id, solicitud.carpeta)}/{uuid.uuid4()}.{extension}"
+    blob = get_bucket(GOOGLE_CLOUD_BUCKET_NAME).blob(object_name)
+    extra = {"api_access_endpoint": STORAGE_EMULATOR_HOST} if STORAGE_EMULATOR_HOST else {}
+    upload_url = blob.generate_signed_url(
+        version="v4",
+        expiration=timedelta(seconds=UPLOAD_URL_EXPIRATION_SECONDS),
+        method="PUT",
+        content_type=solicitud.content_type,
+        **extra,
+    )
+    return {
+        "upload_url": upload_url,
+        "method": "PUT",
+        "headers": {"Content-Type": solicitud.content_type},
+        "object_name": object_name,
+        "expires_in": UPLOAD_URL_EXPIRATION_SECONDS,
+    }
+
+
+async def confirm_upload(db: AsyncSession, confirmacion: UploadConfirmacion, current_entity: dict) -> dict:
+    """Record the row of a file the client already uploaded with a signed URL."""
+    tipo, mantenimiento_id, carpeta = confirmacion.tipo, confirmacion.mantenimiento_id, confirmacion.carpeta
+    _validar_destino(tipo, carpeta, current_entity)
+    mantenimiento = _ensure_mantenimiento(await db.get(MODELOS[tipo], mantenimiento_id))
+    prefijo = f"{gallery_folder(tipo, mantenimiento_id, carpeta)}/"
+    nombre = confirmacion.object_name[len(prefijo):]
+    if not confirmacion.object_name.startswith(prefijo) or not nombre or "/" in nombre:
+        raise HTTPException(status_code=400, detail="El archivo no pertenece a la carpeta del mantenimiento")
+    if carpeta == "chat" and not (confirmacion.firebase_uid and confirmacion.nombre_usuario):
+        raise HTTPException(status_code=400, detail="firebase_uid y nombre_usuario son obligatorios para el chat")
+
+    blob = get_bucket(GOOGLE_CLOUD_BUCKET_NAME).blob(confirmacion.object_name)
+    if not await run_in_gcs_executor(blob.exists):
+        raise HTTPException(status_code=404, detail="El archivo no fue subido")
+    url = blob.public_url
+
+    if carpeta == "chat":
+        send_message = send_message_correctivo if tipo == "correctivo" else send_message_preventivo
+        mensaje = await send_message(
+            db,
+            mantenimiento_id,
+            confirmacion.firebase_uid,
+            confirmacion.nombre_usuario,
+            current_entity,
+            texto=confirmacion.texto,
+            archivo_url=url,
+        )
+        return {"url": url, "object_name": confirmacion.object_name, "mensaje_id": mensaje.id}
+
+    if carpeta == "planilla":
+        mantenimiento.planilla = url
+        enqueue_sheet_sync(db, tipo, "update", mantenimiento_id)
+        await db.commit()
+        return {"url": url, "object_name": confirmacion.object_name}
+
+    model = ARCHIVOS[(tipo, carpeta)]
+    registro = await db.scalar(select(model).where(model.mantenimiento_id == mantenimiento_id, model.url == url))
+    if registro is None:
+        registro = model(mantenimiento_id=mantenimiento_id, url=url)
+        db.add(registro)
+        await db.commit()
+        if carpeta == "fotos":
+            submit_to_gcs_executor(ensure_photo_variants, GOOGLE_CLOUD_BUCKET_NAME, confirmacion.object_name)
+        schedule_gallery(tipo, mantenimiento_id, carpeta)
+    return {"id": registro.id, "url": url, "object_name": confirmacion.object_name}
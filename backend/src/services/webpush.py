@@ -1,7 +1,11 @@
+import asyncio
 import json
 import os
+from typing import List
 from pywebpush import webpush
 from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from api.models import PushSubscription
 
@@ -9,17 +13,10 @@ load_dotenv(dotenv_path="./env.config")
 VAPID_PRIVATE_KEY = os.getenv("VAPID_PRIVATE_KEY")
 
 
-def send_webpush_notification(db_session: Session, firebase_uid: str, title: str, body: str):
-    if not VAPID_PRIVATE_KEY:
-        return {"message": "Web push not configured"}
-    
-    subscriptions = db_session.query(PushSubscription).filter(PushSubscription.firebase_uid == firebase_uid).all()
+def _enviar(subscriptions: List[dict], title: str, body: str):
+    # pywebpush bloquea (firma VAPID y HTTP): los llamadores async lo corren en un thread.
     payload = json.dumps({"title": title, "body": body})
-    for sub in subscriptions:
-        subscription_info = {
-            "endpoint": sub.endpoint,
-            "keys": {"p256dh": sub.p256dh, "auth": sub.auth}
-        }
+    for subscription_info in subscriptions:
         try:
             webpush(
                 subscription_info,
@@ -29,4 +26,37 @@ def send_webpush_notification(db_session: Session, firebase_uid: str, title: str
             )
         except Exception:
             continue
+
+
+def _subscription_info(sub: PushSubscription) -> dict:
+    return {"endpoint": sub.endpoint, "keys": {"p256dh": sub.p256dh, "auth": sub.auth}}
+
+
+def send_webpush_notification(db_session: Session, firebase_uid: str, title: str, body: str):
+    if not VAPID_PRIVATE_KEY:
+        return {"message": "Web push not configured"}
+    
+    subscriptions = db_session.query(PushSubscription).filter(PushSubscription.firebase_uid == firebase_uid).all()
+    _enviar([_subscription_info(sub) for sub in subscriptions], title, body)
+    return {"message": "Web push sent"}
+
+
+async def send_webpush_notification_async(db_session: AsyncSession, firebase_uid: str, title: str, body: str):
+    """Same as send_webpush_notification for async handlers.
+
+    The subscriptions are read with the async session and the pushes go out
+    from a worker thread, so the event loop is not blocked and no database
+    connection is held while waiting on the push services. The session is
+    committed before sending: call it with no pending changes.
+    """
+    if not VAPID_PRIVATE_KEY:
+        return {"message": "Web push not configured"}
+
+    subscriptions = (
+        await db_session.scalars(select(PushSubscription).where(PushSubscription.firebase_uid == firebase_uid))
+    ).all()
+    infos = [_subscription_info(sub) for sub in subscriptions]
+    # Se libera la conexión antes de esperar a los push services.
+    await db_session.commit()
+    await asyncio.to_thread(_enviar, infos, title, body)
     return {"message": "Web push sent"}
@@ -1,9 +1,12 @@
+import asyncio
 import os
 import sys
 from pathlib import Path
 
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker
 
 # Configurar variables de entorno antes de importar la aplicación
@@ -19,7 +22,7 @@ sys.path.append(str(BASE_DIR / "src"))
 
 from src.api.routes import app
 from src.api.models import Base
-from src.config.database import SessionLocal as AppSessionLocal, engine as app_engine, get_db
+from src.config.database import AsyncSessionLocal, SessionLocal as AppSessionLocal, engine as app_engine, get_db
 
 engine = app_engine
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -40,6 +43,36 @@ def db_session():
     finally:
         session.close()
 
+@pytest.fixture(scope="function")
+def async_db_session(db_session):
+    """AsyncSession over the same test database, for the services ported to the async engine.
+
+    Use it inside asyncio.run; seed data with db_session and commit first so
+    both sessions see it.
+    """
+    session = AsyncSessionLocal()
+    yield session
+    asyncio.run(session.close())
+
+@pytest.fixture
+def query_counter():
+    @contextmanager
+    def _count(bind=None):
+        # bind=async_engine.sync_engine cuenta las consultas de las sesiones async.
+        bind = bind if bind is not None else engine
+        statements = []
+
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(bind, "before_cursor_execute", _before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(bind, "before_cursor_execute", _before_cursor_execute)
+
+    return _count
+
 @pytest.fixture(scope="function")
 def client(db_session):
     def override_get_db():
@@ -76,4 +109,19 @@ def mock_firebase(monkeypatch):
     monkeypatch.setattr("firebase_admin.db.reference", dummy_reference)
     monkeypatch.setattr("src.services.sucursales.initialize_firebase", lambda: None)
     monkeypatch.setattr("src.services.maps.initialize_firebase", lambda: None)
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    from services.token_cache import token_cache
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+@pytest.fixture(autouse=True)
+def clear_role_cache():
+    # Cada test recrea las tablas: la versión vuelve a 0 y no alcanza para detectar el cambio.
+    from services.role_cache import role_cache
+    role_cache.clear()
+    yield
+    role_cache.clear()
     
\ No newline at end of file
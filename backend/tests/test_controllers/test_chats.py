@@ -1,3 +1,4 @@
+import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
 
 def test_chat_correctivo_get(client):
@@ -33,3 +34,19 @@ def test_preventivo_message_send(client):
         )
     assert resp.status_code == 200
     assert resp.json() == {"id": 1, "firebase_uid": "u", "nombre_usuario": "N", "id_mantenimiento": 1, "texto": "t", "archivo": None, "fecha": "now"}
+
+def test_chat_correctivo_get_passes_cursor(client):
+    with patch("controllers.chats.get_chat_correctivo", return_value=[]) as mock_get:
+        resp = client.get("/chat/correctivo/1?before=10&limit=20")
+    assert resp.status_code == 200
+    assert resp.json() == []
+    assert mock_get.call_args.kwargs == {"before": 10, "after": None, "since_id": None, "limit": 20}
+
+@pytest.mark.parametrize("path", ["/chat/correctivo/1", "/chat/preventivo/1"])
+def test_chat_get_rejects_non_positive_limit(client, path):
+    with patch("controllers.chats.get_chat_correctivo", return_value=[]) as mock_correctivo, \
+         patch("controllers.chats.get_chat_preventivo", return_value=[]) as mock_preventivo:
+        resp = client.get(f"{path}?limit=0")
+    assert resp.status_code == 422
+    mock_correctivo.assert_not_called()
+    mock_preventivo.assert_not_called()
@@ -0,0 +1,37 @@
+from datetime import date
+from unittest.mock import patch
+
+
+def test_estadisticas_correctivos_parses_filters(client):
+    report = [{"id_cuadrilla": 1, "nombre": "C1", "asignados": 2, "resueltos": 1, "ratio": 0.5}]
+    with patch("controllers.estadisticas.get_reporte_correctivos", return_value=report) as mock_report:
+        resp = client.get("/estadisticas/correctivos?meses=1&meses=2&anios=2024&zona=Norte")
+    assert resp.status_code == 200
+    assert resp.json() == report
+    filtros = mock_report.call_args.args[1]
+    assert filtros.meses == [1, 2]
+    assert filtros.anios == [2024]
+    assert filtros.zona == "Norte"
+
+
+def test_estadisticas_resumen_get(client):
+    resumen = {"correctivos": {}, "preventivos": {}, "por_mes": []}
+    with patch("controllers.estadisticas.get_resumen", return_value=resumen):
+        resp = client.get("/estadisticas/")
+    assert resp.status_code == 200
+    assert resp.json() == resumen
+
+
+def test_estadisticas_rejects_invalid_month(client):
+    resp = client.get("/estadisticas/rubros?meses=enero")
+    assert resp.status_code == 422
+
+
+def test_estadisticas_kpis_get(client):
+    kpis = [{"clave": "2024-01", "cantidad": 4, "cerrados": 3, "promedio_dias_resolucion": 4.0}]
+    with patch("controllers.estadisticas.get_kpis", return_value=kpis) as mock_kpis:
+        resp = client.get("/estadisticas/kpis?agrupar_por=mes&desde=2024-01-01&tipo=correctivo")
+    assert resp.status_code == 200
+    assert resp.json() == kpis
+    args = mock_kpis.call_args.args
+    assert args[1:5] == ("mes", date(2024, 1, 1), None, "correctivo")
@@ -29,6 +29,42 @@ def test_list_mantenimientos_correctivos(client):
     assert resp.json()[0]["fotos"] == ["https://example.com/foto-1.jpg"]
 
 
+def test_list_mantenimientos_correctivos_passes_filters(client):
+    with patch("controllers.mantenimientos_correctivos.get_mantenimientos_correctivos", return_value=[]) as mock_get:
+        resp = client.get("/mantenimientos-correctivos/?estado=Pendiente&prioridad=Alta&apertura_desde=2025-01-01")
+    assert resp.status_code == 200
+    filtros = mock_get.call_args.args[1]
+    assert filtros.estado == "Pendiente"
+    assert filtros.prioridad == "Alta"
+    assert filtros.apertura_desde == date(2025, 1, 1)
+
+
+def test_list_mantenimientos_correctivos_rejects_unknown_estado(client):
+    resp = client.get("/mantenimientos-correctivos/paginado?estado=pendiente")
+    assert resp.status_code == 422
+
+
+def test_list_mantenimientos_correctivos_paginado(client):
+    m = _correctivo_mock()
+    with patch(
+        "controllers.mantenimientos_correctivos.get_mantenimientos_correctivos_page",
+        return_value=([m], "next"),
+    ) as mock_page:
+        resp = client.get("/mantenimientos-correctivos/paginado?limit=1&cursor=abc&id_cuadrilla=1")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["next_cursor"] == "next"
+    assert data["items"][0]["numero_caso"] == "1"
+    args = mock_page.call_args.args
+    assert args[1].id_cuadrilla == 1
+    assert args[2:] == ("abc", 1)
+
+
+def test_list_mantenimientos_correctivos_paginado_rejects_large_limit(client):
+    resp = client.get("/mantenimientos-correctivos/paginado?limit=100000")
+    assert resp.status_code == 422
+
+
 def test_get_mantenimiento_correctivo(client):
     m = _correctivo_mock()
     with patch("controllers.mantenimientos_correctivos.get_mantenimiento_correctivo", return_value=m):
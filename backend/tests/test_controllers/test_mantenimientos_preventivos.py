@@ -11,7 +11,7 @@ def _preventivo_mock():
         fecha_apertura="2025-01-01",
         fecha_cierre=None,
         planillas=[MagicMock(url="https://example.com/planilla.pdf")],
-        fotos=[MagicMock(url="https://example.com/foto.jpg")],
+        fotos=[MagicMock(url="https://example.com/fotos/foto.jpg")],
         extendido=None,
         estado="Pendiente",
     )
@@ -25,12 +25,47 @@ def test_list_mantenimientos_preventivos(client):
     assert resp.json()[0]["planillas"] == ["https://example.com/planilla.pdf"]
 
 
+def test_list_mantenimientos_preventivos_paginado(client):
+    m = _preventivo_mock()
+    with patch(
+        "controllers.mantenimientos_preventivos.get_mantenimientos_preventivos_page",
+        return_value=([m], None),
+    ):
+        resp = client.get("/mantenimientos-preventivos/paginado?sucursal_id=1")
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "items": [
+            {
+                "id": 1,
+                "cliente_id": 10,
+                "sucursal_id": 1,
+                "frecuencia": "Mensual",
+                "id_cuadrilla": 1,
+                "fecha_apertura": "2025-01-01",
+                "fecha_cierre": None,
+                "planillas": ["https://example.com/planilla.pdf"],
+                "fotos": ["https://example.com/fotos/foto.jpg"],
+                "fotos_variantes": [
+                    {
+                        "url": "https://example.com/fotos/foto.jpg",
+                        "thumbnail": "https://example.com/fotos_thumb/foto.jpg",
+                        "web": "https://example.com/fotos_web/foto.jpg",
+                    }
+                ],
+                "extendido": None,
+                "estado": "Pendiente",
+            }
+        ],
+        "next_cursor": None,
+    }
+
+
 def test_get_mantenimiento_preventivo(client):
     m = _preventivo_mock()
     with patch("controllers.mantenimientos_preventivos.get_mantenimiento_preventivo", return_value=m):
         resp = client.get("/mantenimientos-preventivos/1")
     assert resp.status_code == 200
-    assert resp.json()["fotos"] == ["https://example.com/foto.jpg"]
+    assert resp.json()["fotos"] == ["https://example.com/fotos/foto.jpg"]
 
 
 def test_create_mantenimiento_preventivo_passes_enum_value(client):
@@ -0,0 +1,29 @@
+from unittest.mock import patch
+
+def test_auth_cache_metrics_get(client):
+    stats = {"hits": 3, "misses": 1, "size": 1, "max_size": 10, "ttl_seconds": 60}
+    with patch("controllers.metrics.get_auth_cache_metrics", return_value=stats):
+        resp = client.get("/metrics/auth-cache")
+    assert resp.status_code == 200
+    assert resp.json() == stats
+
+def test_sheets_metrics_get(client):
+    stats = {"client_initialized": True, "auth_refreshes": 2, "api_calls": {"append_rows": 4}}
+    with patch("controllers.metrics.get_sheets_metrics", return_value=stats):
+        resp = client.get("/metrics/sheets")
+    assert resp.status_code == 200
+    assert resp.json() == stats
+
+def test_db_pool_metrics_get(client):
+    stats = {"size": 5, "checked_out": 1, "checkouts": 10, "timeouts": 0}
+    with patch("controllers.metrics.get_db_pool_metrics", return_value=stats):
+        resp = client.get("/metrics/db-pool")
+    assert resp.status_code == 200
+    assert resp.json() == stats
+
+def test_role_cache_metrics_get(client):
+    stats = {"hits": 8, "misses": 1, "version": 3, "roles": {"Administrador": 2}}
+    with patch("controllers.metrics.get_role_cache_metrics", return_value=stats):
+        resp = client.get("/metrics/role-cache")
+    assert resp.status_code == 200
+    assert resp.json() == stats
@@ -0,0 +1,8 @@
+from unittest.mock import patch
+
+def test_sheets_export_post(client):
+    with patch("controllers.sheets.export_sheets", return_value={"correctivo": 3}) as mock_export:
+        resp = client.post("/sheets/export?tipo=correctivo")
+    assert resp.status_code == 200
+    assert resp.json() == {"correctivo": 3}
+    assert mock_export.call_args.args[2] == "correctivo"
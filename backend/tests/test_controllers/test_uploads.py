@@ -0,0 +1,23 @@
+from unittest.mock import AsyncMock, patch
+
+
+def test_upload_signed_url_post(client):
+    firmado = {"upload_url": "https://signed", "method": "PUT", "headers": {}, "object_name": "x", "expires_in": 900}
+    with patch("controllers.uploads.create_upload_url", return_value=firmado) as mock_sign:
+        resp = client.post(
+            "/uploads/signed-url",
+            json={"tipo": "preventivo", "mantenimiento_id": 1, "carpeta": "fotos", "filename": "a.jpg", "content_type": "image/jpeg"},
+        )
+    assert resp.status_code == 200
+    assert resp.json() == firmado
+    assert mock_sign.call_args.args[1].carpeta == "fotos"
+
+
+def test_upload_confirm_post(client):
+    with patch("controllers.uploads.confirm_upload", AsyncMock(return_value={"id": 1, "url": "u", "object_name": "x"})):
+        resp = client.post(
+            "/uploads/confirm",
+            json={"tipo": "preventivo", "mantenimiento_id": 1, "carpeta": "fotos", "object_name": "x"},
+        )
+    assert resp.status_code == 200
+    assert resp.json()["id"] == 1
@@ -0,0 +1,131 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect, text
+from starlette.requests import Request
+
+from src.config import database
+
+
+def _request():
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""})
+
+
+def test_engine_kwargs_for_postgres(monkeypatch):
+    monkeypatch.setattr(database, "DB_POOL_SIZE", 20)
+    monkeypatch.setattr(database, "DB_MAX_OVERFLOW", 5)
+    monkeypatch.setattr(database, "DB_ASYNC_POOL_SIZE", 8)
+    monkeypatch.setattr(database, "DB_ASYNC_MAX_OVERFLOW", 2)
+    monkeypatch.setattr(database, "DB_STATEMENT_TIMEOUT_MS", 15000)
+
+    kwargs = database._engine_kwargs("postgresql://user:pass@db/app")
+
+    assert kwargs["poolclass"] is database.MeteredQueuePool
+    # El engine sync usa lo que el async deja del presupuesto del worker.
+    assert kwargs["pool_size"] == 12
+    assert kwargs["max_overflow"] == 3
+    assert kwargs["pool_pre_ping"] is True
+    assert kwargs["connect_args"] == {"options": "-c statement_timeout=15000"}
+
+
+def test_async_engine_kwargs_take_their_share_of_the_budget(monkeypatch):
+    monkeypatch.setattr(database, "DB_ASYNC_POOL_SIZE", 8)
+    monkeypatch.setattr(database, "DB_ASYNC_MAX_OVERFLOW", 2)
+    monkeypatch.setattr(database, "DB_STATEMENT_TIMEOUT_MS", 15000)
+
+    kwargs = database._async_engine_kwargs("postgresql+asyncpg://user:pass@db/app")
+
+    assert kwargs["poolclass"] is database.MeteredAsyncQueuePool
+    assert kwargs["pool_size"] == 8
+    assert kwargs["max_overflow"] == 2
+    assert kwargs["connect_args"] == {"server_settings": {"statement_timeout": "15000"}}
+
+
+def test_async_url_translates_sslmode_for_asyncpg():
+    url = database._async_url("postgresql://user:p%40ss@db:5432/app?sslmode=require&application_name=api")
+
+    assert url == "postgresql+asyncpg://user:p%40ss@db:5432/app?application_name=api&ssl=require"
+    assert database._async_url("postgres://user:pass@db/app") == "postgresql+asyncpg://user:pass@db/app"
+    assert database._async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+
+
+def test_engine_kwargs_for_sqlite_skip_pool_sizing():
+    kwargs = database._engine_kwargs("sqlite:///./test.db")
+
+    assert kwargs["connect_args"] == {"check_same_thread": False}
+    assert "pool_size" not in kwargs
+
+
+def test_pool_metrics_count_checkouts():
+    database.reset_pool_metrics()
+    with database.engine.connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+        during = database.get_pool_metrics()
+
+    after = database.get_pool_metrics()
+    assert during["checked_out"] == 1
+    assert after["checked_out"] == 0
+    assert after["checkouts"] >= 1
+    assert after["timeouts"] == 0
+    assert after["wait_seconds_max"] >= 0
+
+
+def test_async_pool_metrics_without_pool():
+    database.reset_pool_metrics()
+
+    stats = database.get_async_pool_metrics()
+
+    # En los tests el engine async usa NullPool: hay contadores pero no tamaño de pool.
+    assert stats["checkouts"] == 0
+    assert stats["wait_seconds_avg"] == 0.0
+    assert "size" not in stats
+
+
+def test_release_request_db_returns_connection():
+    request = _request()
+    db = database.get_request_db(request)
+    db.execute(text("SELECT 1"))
+    assert database.get_pool_metrics()["checked_out"] == 1
+
+    database.release_request_db(request)
+
+    assert database.get_pool_metrics()["checked_out"] == 0
+    assert request.state.db is db
+    database.close_request_db(request)
+
+
+def test_get_db_reuses_request_session():
+    request = _request()
+    shared = database.get_request_db(request)
+
+    dependency = database.get_db(request)
+    assert next(dependency) is shared
+    dependency.close()
+
+    assert request.state.db is shared
+    database.close_request_db(request)
+    assert request.state.db is None
+
+
+def test_get_db_opens_own_session_without_middleware():
+    request = _request()
+    dependency = database.get_db(request)
+    db = next(dependency)
+
+    assert getattr(request.state, "db", None) is None
+    dependency.close()
+    assert db is not None
+
+
+def test_import_does_not_touch_schema(tmp_path):
+    # Un proceso limpio: el módulo ya importado en la sesión de tests no sirve para medirlo.
+    db_path = tmp_path / "import.db"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "DB_AUTO_MIGRATE": "false"}
+    src = Path(database.__file__).resolve().parents[1]
+    subprocess.run([sys.executable, "-c", "import config.database"], cwd=src, env=env, check=True)
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    assert inspect(engine).get_table_names() == []
+    engine.dispose()
@@ -0,0 +1,98 @@
+from sqlalchemy import create_engine, inspect
+
+from src.api.models import Base, SchemaVersion
+from src.config import migrations
+
+
+def test_run_migrations_adds_indexes_to_existing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    # Simula una base creada antes de los índices.
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_usuario_rol")
+        conn.exec_driver_sql("DROP INDEX ix_mensaje_correctivo_mantenimiento_fecha")
+        conn.exec_driver_sql("DROP INDEX ix_mantenimiento_correctivo_fecha_id")
+    SchemaVersion.__table__.drop(engine)
+
+    aplicadas = migrations.run_migrations(engine)
+
+    assert aplicadas == [version for version, _, _ in migrations.MIGRACIONES]
+    assert migrations.current_version(engine) == migrations.MIGRACIONES[-1][0]
+    inspector = inspect(engine)
+    assert "ix_usuario_rol" in {index["name"] for index in inspector.get_indexes("usuario")}
+    assert "ix_mensaje_correctivo_mantenimiento_fecha" in {index["name"] for index in inspector.get_indexes("mensaje_correctivo")}
+    assert "ix_mantenimiento_correctivo_fecha_id" in {index["name"] for index in inspector.get_indexes("mantenimiento_correctivo")}
+    engine.dispose()
+
+
+def test_rollup_migration_merges_duplicate_buckets(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollup.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ux_rollup_bucket")
+        conn.exec_driver_sql(
+            "INSERT INTO mantenimiento_rollup_diario (dia, zona, id_cuadrilla, cliente_id, tipo, cantidad, cerrados, dias_resolucion) "
+            "VALUES ('2024-01-01', NULL, NULL, 1, 'correctivo', 1, 1, 3), ('2024-01-01', NULL, NULL, 1, 'correctivo', 2, 0, 0), "
+            "('2024-01-01', 'Norte', NULL, 1, 'correctivo', 5, 0, 0)"
+        )
+    SchemaVersion.__table__.drop(engine)
+
+    migrations.run_migrations(engine)
+
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT zona, cantidad, cerrados, dias_resolucion FROM mantenimiento_rollup_diario ORDER BY id"
+        ).fetchall()
+        # El inspector no refleja índices de expresiones.
+        indices = conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").scalars().all()
+    assert rows == [(None, 3, 1, 3), ("Norte", 5, 0, 0)]
+    assert "ux_rollup_bucket" in indices
+    engine.dispose()
+
+
+def test_run_migrations_adds_outbox_lease_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE sheet_sync_outbox DROP COLUMN procesando_hasta")
+        conn.exec_driver_sql("ALTER TABLE sheet_sync_outbox DROP COLUMN reclamado_por")
+    SchemaVersion.__table__.drop(engine)
+
+    migrations.run_migrations(engine)
+
+    columnas = {c["name"] for c in inspect(engine).get_columns("sheet_sync_outbox")}
+    assert {"procesando_hasta", "reclamado_por"} <= columnas
+    engine.dispose()
+
+
+def test_run_migrations_skips_applied_versions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'new.db'}")
+    Base.metadata.create_all(bind=engine)
+    migrations.run_migrations(engine)
+
+    assert migrations.run_migrations(engine) == []
+    engine.dispose()
+
+
+def test_upgrade_schema_creates_empty_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+
+    aplicadas = migrations.upgrade_schema(engine)
+
+    assert set(Base.metadata.tables) <= set(inspect(engine).get_table_names())
+    assert aplicadas == [version for version, _, _ in migrations.MIGRACIONES]
+    assert migrations.upgrade_schema(engine) == []
+    engine.dispose()
+
+
+def test_migrations_match_model_indexes():
+    model_indexes = {index.name for table in Base.metadata.sorted_tables for index in table.indexes}
+    migrated = {
+        sql.split()[sql.split().index("EXISTS") + 1]
+        for _, _, sentencias in migrations.MIGRACIONES
+        for sentencia in sentencias
+        for dialecto in ("sqlite", "postgresql")
+        for sql in [migrations._sql(sentencia, dialecto)]
+        if isinstance(sql, str) and sql.startswith("CREATE")
+    }
+    assert migrated <= model_indexes
@@ -0,0 +1,281 @@
+"""EXPLAIN harness: each hot filter in services/ must be served by an index.
+
+Each entry runs the real service function and EXPLAINs the statement it sends
+for the given table, so the harness follows the services when their queries
+change. Runs on the SQLite test database and, when EXPLAIN_DATABASE_URL points
+to a Postgres database, also there (with sequential scans disabled so the
+planner reports the index it would pick on a real-sized table).
+"""
+import asyncio
+import inspect
+import os
+import re
+from contextlib import contextmanager, suppress
+from datetime import date, datetime
+from functools import partial
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from src.api.models import (
+    Base,
+    CacheVersion,
+    Cliente,
+    CorrectivoSeleccionado,
+    MantenimientoCorrectivo,
+    MantenimientoCorrectivoFoto,
+    MantenimientoPreventivo,
+    MantenimientoPreventivoFoto,
+    MantenimientoPreventivoPlanilla,
+    MensajeCorrectivo,
+    MensajePreventivo,
+    Notificacion_Correctivo,
+    Notificacion_Preventivo,
+    PreventivoSeleccionado,
+    PushSubscription,
+    SheetSyncOutbox,
+    Sucursal,
+)
+from src.config.database import _async_url, async_engine as sqlite_async_engine
+from src.services import chats, maps, mantenimientos_correctivos, mantenimientos_preventivos, notificaciones
+from src.services import push_subscriptions, sheet_outbox, sucursales
+from src.services.pagination import encode_cursor
+from src.services.role_cache import RoleCache
+from tests.conftest import engine as sqlite_engine
+
+EXPLAIN_DATABASE_URL = os.getenv("EXPLAIN_DATABASE_URL")
+ENTIDAD = {"type": "usuario"}
+CURSOR = encode_cursor(date(2024, 1, 1), 10)
+# Cómo reporta cada motor una búsqueda por clave primaria (p. ej. el cursor del chat o un refresh).
+CLAVE_PRIMARIA = ("USING INTEGER PRIMARY KEY", "_pkey")
+
+
+def _sembrar(db: Session):
+    """Rows the services look up before the hot query (cliente, mantenimiento, cursor del chat)."""
+    db.merge(Cliente(id=1, nombre="Cliente", contacto="Contacto", email="cliente@test.com"))
+    db.merge(Sucursal(id=1, nombre="Sucursal", cliente_id=1))
+    db.merge(MantenimientoCorrectivo(id=1, cliente_id=1, sucursal_id=1, fecha_apertura=date(2024, 1, 1)))
+    db.merge(MantenimientoPreventivo(id=1, cliente_id=1, sucursal_id=1, fecha_apertura=date(2024, 1, 1)))
+    for model in (MensajeCorrectivo, MensajePreventivo):
+        db.merge(model(id=10, firebase_uid="uid", nombre_usuario="Usuario", id_mantenimiento=1, texto="Hola"))
+    db.commit()
+
+
+# (servicio que la ejecuta, tabla consultada, índices aceptables)
+# La función recibe una Session; las corrutinas (partial de un servicio async) una AsyncSession.
+# Cada SELECT que el servicio manda a la tabla debe usar uno de los índices o la clave primaria.
+HOT_QUERIES = {
+    "notificaciones.notify_user correctivo": (
+        partial(notificaciones._ya_notificado, model=Notificacion_Correctivo, firebase_uid="uid", id_mantenimiento=1, mensaje="Nuevo mensaje"),
+        Notificacion_Correctivo,
+        ("ix_notificacion_correctivo_uid_mantenimiento",),
+    ),
+    "notificaciones.notify_user preventivo": (
+        partial(notificaciones._ya_notificado, model=Notificacion_Preventivo, firebase_uid="uid", id_mantenimiento=1, mensaje="Nuevo mensaje"),
+        Notificacion_Preventivo,
+        ("ix_notificacion_preventivo_uid_mantenimiento",),
+    ),
+    "notificaciones.get_notification_correctivo": (
+        lambda db: notificaciones.get_notification_correctivo(db, "uid"),
+        Notificacion_Correctivo,
+        ("ix_notificacion_correctivo_uid_mantenimiento",),
+    ),
+    "notificaciones.get_notification_preventivo": (
+        lambda db: notificaciones.get_notification_preventivo(db, "uid"),
+        Notificacion_Preventivo,
+        ("ix_notificacion_preventivo_uid_mantenimiento",),
+    ),
+    "role_cache.get_uids versión": (
+        partial(RoleCache().get_uids, roles=["Administrador"]),
+        CacheVersion,
+        ("sqlite_autoindex_cache_version_1", "cache_version_pkey"),
+    ),
+    "chats.get_chat_correctivo": (
+        partial(chats.get_chat_correctivo, mantenimiento_id=1, current_entity=ENTIDAD),
+        MensajeCorrectivo,
+        ("ix_mensaje_correctivo_mantenimiento_fecha",),
+    ),
+    "chats.get_chat_correctivo before": (
+        partial(chats.get_chat_correctivo, mantenimiento_id=1, current_entity=ENTIDAD, before=10),
+        MensajeCorrectivo,
+        ("ix_mensaje_correctivo_mantenimiento_fecha",),
+    ),
+    "chats.get_chat_preventivo": (
+        partial(chats.get_chat_preventivo, mantenimiento_id=1, current_entity=ENTIDAD),
+        MensajePreventivo,
+        ("ix_mensaje_preventivo_mantenimiento_fecha",),
+    ),
+    "chats.get_chat_preventivo since_id": (
+        partial(chats.get_chat_preventivo, mantenimiento_id=1, current_entity=ENTIDAD, since_id=10),
+        MensajePreventivo,
+        ("ix_mensaje_preventivo_mantenimiento_fecha",),
+    ),
+    "push_subscriptions.get_subscriptions": (
+        lambda db: push_subscriptions.get_subscriptions(db, "uid"),
+        PushSubscription,
+        ("ix_push_subscription_firebase_uid",),
+    ),
+    "maps.update_correctivo": (
+        lambda db: maps.update_correctivo(db, 1, 1, 1, ENTIDAD),
+        CorrectivoSeleccionado,
+        ("ix_correctivo_seleccionado_cuadrilla_mantenimiento",),
+    ),
+    "maps.update_preventivo": (
+        lambda db: maps.update_preventivo(db, 1, 1, 1, ENTIDAD),
+        PreventivoSeleccionado,
+        ("ix_preventivo_seleccionado_cuadrilla_mantenimiento",),
+    ),
+    "maps.delete_sucursal correctivo": (
+        lambda db: maps.delete_sucursal(db, 1, 1, ENTIDAD),
+        CorrectivoSeleccionado,
+        ("ix_correctivo_seleccionado_cuadrilla_sucursal",),
+    ),
+    "maps.delete_sucursal preventivo": (
+        lambda db: maps.delete_sucursal(db, 1, 1, ENTIDAD),
+        PreventivoSeleccionado,
+        ("ix_preventivo_seleccionado_cuadrilla_sucursal",),
+    ),
+    "maps.get_correctivos": (
+        lambda db: maps.get_correctivos(db, 1, ENTIDAD),
+        CorrectivoSeleccionado,
+        ("ix_correctivo_seleccionado_cuadrilla_mantenimiento", "ix_correctivo_seleccionado_cuadrilla_sucursal"),
+    ),
+    "mantenimientos_preventivos._ensure_preventivo_period": (
+        partial(mantenimientos_preventivos._ensure_preventivo_period, sucursal_id=1, fecha=date(2024, 1, 15), frecuencia="mensual"),
+        MantenimientoPreventivo,
+        ("ix_mantenimiento_preventivo_sucursal_fecha",),
+    ),
+    "mantenimientos_correctivos.get_mantenimientos_correctivos_page": (
+        lambda db: mantenimientos_correctivos.get_mantenimientos_correctivos_page(db, None, None, 20),
+        MantenimientoCorrectivo,
+        ("ix_mantenimiento_correctivo_fecha_id",),
+    ),
+    "mantenimientos_correctivos.get_mantenimientos_correctivos_page cursor": (
+        lambda db: mantenimientos_correctivos.get_mantenimientos_correctivos_page(db, None, CURSOR, 20),
+        MantenimientoCorrectivo,
+        ("ix_mantenimiento_correctivo_fecha_id",),
+    ),
+    "mantenimientos_preventivos.get_mantenimientos_preventivos_page": (
+        lambda db: mantenimientos_preventivos.get_mantenimientos_preventivos_page(db, None, None, 20),
+        MantenimientoPreventivo,
+        ("ix_mantenimiento_preventivo_fecha_id",),
+    ),
+    "mantenimientos_preventivos.get_mantenimientos_preventivos_page cursor": (
+        lambda db: mantenimientos_preventivos.get_mantenimientos_preventivos_page(db, None, CURSOR, 20),
+        MantenimientoPreventivo,
+        ("ix_mantenimiento_preventivo_fecha_id",),
+    ),
+    "sheet_outbox._reclamar": (
+        lambda db: sheet_outbox._reclamar(db, 10, datetime(2024, 1, 1)),
+        SheetSyncOutbox,
+        ("ix_sheet_sync_outbox_estado_proximo",),
+    ),
+    "sucursales.get_sucursales_by_cliente": (
+        lambda db: sucursales.get_sucursales_by_cliente(db, 1),
+        Sucursal,
+        ("ix_sucursal_cliente_id",),
+    ),
+    "mantenimientos_correctivos fotos": (
+        lambda db: mantenimientos_correctivos.get_mantenimiento_correctivo(db, 1),
+        MantenimientoCorrectivoFoto,
+        ("ix_mantenimiento_correctivo_foto_mantenimiento_id",),
+    ),
+    "mantenimientos_preventivos fotos": (
+        lambda db: mantenimientos_preventivos.get_mantenimiento_preventivo(db, 1),
+        MantenimientoPreventivoFoto,
+        ("ix_mantenimiento_preventivo_foto_mantenimiento_id",),
+    ),
+    "mantenimientos_preventivos planillas": (
+        lambda db: mantenimientos_preventivos.get_mantenimiento_preventivo(db, 1),
+        MantenimientoPreventivoPlanilla,
+        ("ix_mantenimiento_preventivo_planilla_mantenimiento_id",),
+    ),
+}
+
+
+@contextmanager
+def _capturar(sync_engine):
+    """Collect the (statement, parameters) sent through sync_engine inside the block."""
+    capturadas = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        capturadas.append((statement, parameters))
+
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        # Algunos servicios validan después de consultar (p. ej. una selección que ya existe).
+        with suppress(HTTPException):
+            yield capturadas
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def _consultas_de(capturadas, model):
+    patron = re.compile(rf'^\s*SELECT\b.*?\bFROM "?{model.__tablename__}"?\b', re.S | re.I)
+    consultas = [(statement, parameters) for statement, parameters in capturadas if patron.search(statement)]
+    assert consultas, f"El servicio no consultó {model.__tablename__}: {[s for s, _ in capturadas]}"
+    return consultas
+
+
+def explain(conn, statement, parameters) -> str:
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        return "\n".join(row[-1] for row in rows)
+    conn.exec_driver_sql("SET enable_seqscan = off")
+    rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).fetchall()
+    return "\n".join(row[0] for row in rows)
+
+
+async def _planes_async(async_engine, ejecutar, model) -> list:
+    async with async_sessionmaker(async_engine)() as db:
+        with _capturar(async_engine.sync_engine) as capturadas:
+            await ejecutar(db)
+    async with async_engine.connect() as conn:
+        return [await conn.run_sync(explain, *consulta) for consulta in _consultas_de(capturadas, model)]
+
+
+def planes_de(motores, ejecutar, model) -> list:
+    """EXPLAIN of every SELECT that ejecutar sends to model's table."""
+    engine, async_engine = motores
+    with Session(bind=engine) as db:
+        _sembrar(db)
+    if inspect.iscoroutinefunction(ejecutar):
+        if async_engine is None:
+            pytest.skip("Sin driver async para EXPLAIN_DATABASE_URL")
+        return asyncio.run(_planes_async(async_engine, ejecutar, model))
+    with Session(bind=engine) as db, _capturar(engine) as capturadas:
+        ejecutar(db)
+    with engine.connect() as conn:
+        return [explain(conn, *consulta) for consulta in _consultas_de(capturadas, model)]
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def motores(request, db_session):
+    if request.param == "sqlite":
+        yield sqlite_engine, sqlite_async_engine
+        return
+    if not EXPLAIN_DATABASE_URL:
+        pytest.skip("EXPLAIN_DATABASE_URL no configurada")
+    postgres = create_engine(EXPLAIN_DATABASE_URL)
+    Base.metadata.create_all(bind=postgres)
+    try:
+        postgres_async = create_async_engine(_async_url(EXPLAIN_DATABASE_URL))
+    except ImportError:
+        postgres_async = None
+    yield postgres, postgres_async
+    if postgres_async is not None:
+        asyncio.run(postgres_async.dispose())
+    postgres.dispose()
+
+
+@pytest.mark.parametrize("nombre", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(motores, nombre):
+    ejecutar, model, indices = HOT_QUERIES[nombre]
+
+    planes = planes_de(motores, ejecutar, model)
+
+    for plan in planes:
+        assert any(index in plan for index in indices + CLAVE_PRIMARIA), f"{nombre} no usa {indices}:\n{plan}"
@@ -1,6 +1,7 @@
 import os
 import json
 import asyncio
+from unittest.mock import MagicMock
 from starlette.requests import Request
 from starlette.responses import Response
 from fastapi import HTTPException
@@ -52,7 +53,11 @@ def test_routes_registered():
         "/notificaciones",
         "/push",
         "/chat",
-        "/preferences"
+        "/preferences",
+        "/metrics",
+        "/estadisticas",
+        "/sheets",
+        "/uploads"
     ]
 
     app_routes = [route.path for route in app.routes]
@@ -66,6 +71,32 @@ def test_lifespan_runs():
             return True
     assert asyncio.run(run())
 
+def test_lifespan_skips_schema_by_default(monkeypatch):
+    upgrade = MagicMock()
+    monkeypatch.setattr(routes, "upgrade_schema", upgrade)
+    monkeypatch.setattr(routes, "DB_AUTO_MIGRATE", False)
+
+    async def run():
+        async with routes.lifespan(app):
+            pass
+    asyncio.run(run())
+    upgrade.assert_not_called()
+
+def test_lifespan_auto_migrate(monkeypatch):
+    upgrade = MagicMock(return_value=[])
+    admin = MagicMock()
+    monkeypatch.setattr(routes, "upgrade_schema", upgrade)
+    monkeypatch.setattr(routes, "init_admin", admin)
+    monkeypatch.setattr(routes, "DB_AUTO_MIGRATE", True)
+
+    async def run():
+        async with routes.lifespan(app):
+            pass
+    asyncio.run(run())
+    upgrade.assert_called_once_with(routes.engine)
+    # En tests no se crea el admin: requiere Firebase.
+    admin.assert_not_called()
+
 def test_auth_middleware_options_request():
     request = build_request(method="OPTIONS")
     response = asyncio.run(routes.auth_middleware(request, dummy_call_next))
@@ -77,42 +108,96 @@ def test_auth_middleware_sets_default_entity_when_testing():
     assert request.state.current_entity == routes.DEFAULT_TEST_ENTITY
     assert response.status_code == 200
 
-def test_auth_middleware_valid_token(monkeypatch):
-    class DummyDB:
-        def close(self):
-            pass
+class DummyDB:
+    def __init__(self, token_version=None):
+        self.closed = False
+        self.rolled_back = False
+        self.token_version = token_version
 
-    def fake_get_db():
-        yield DummyDB()
+    def scalar(self, statement):
+        return self.token_version
 
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        self.closed = True
+
+def test_auth_middleware_valid_token(monkeypatch):
+    db = DummyDB()
     monkeypatch.setenv("TESTING", "false")
-    monkeypatch.setattr(routes, "get_db", fake_get_db)
-    monkeypatch.setattr(routes, "verify_user_token", lambda token, db: {"user": "ok"})
+    monkeypatch.setattr("config.database.SessionLocal", lambda: db)
+    async def fake_verify(token, session):
+        assert session is db
+        return {"user": "ok"}
+
+    monkeypatch.setattr(routes, "verify_user_token_async", fake_verify)
+    seen = {}
+
+    async def call_next(request):
+        seen["db"] = request.state.db
+        # La conexión de la verificación ya volvió al pool cuando corre el handler.
+        seen["released"] = db.rolled_back
+        return Response("ok")
 
     request = build_request(headers=[(b"authorization", b"Bearer token")])
-    response = asyncio.run(routes.auth_middleware(request, dummy_call_next))
+    response = asyncio.run(routes.auth_middleware(request, call_next))
     assert request.state.current_entity == {"user": "ok"}
     assert response.status_code == 200
+    assert seen["released"]
+    # Los handlers reciben la misma sesión y se cierra al terminar el request.
+    assert seen["db"] is db
+    assert db.closed
 
-def test_auth_middleware_http_exception(monkeypatch):
-    class DummyDB:
-        def close(self):
-            pass
+def test_auth_middleware_uses_token_cache(monkeypatch):
+    db = DummyDB(token_version=3)
+
+    async def fail_verify(token, db):
+        raise AssertionError("No debería verificar el token en caché")
+
+    monkeypatch.setenv("TESTING", "false")
+    monkeypatch.setattr("config.database.SessionLocal", lambda: db)
+    monkeypatch.setattr(routes, "verify_user_token_async", fail_verify)
+    routes.token_cache.set("cached", {"type": "usuario", "data": {"id": 1}}, version=3)
+
+    request = build_request(headers=[(b"authorization", b"Bearer cached")])
+    response = asyncio.run(routes.auth_middleware(request, dummy_call_next))
+    assert request.state.current_entity == {"type": "usuario", "data": {"id": 1}}
+    assert response.status_code == 200
+    # Sólo se leyó la versión; la conexión vuelve al pool antes del handler.
+    assert db.rolled_back
+
+def test_auth_middleware_reverifies_after_version_change(monkeypatch):
+    # Otro worker borró o cambió una entidad: la versión de la base ya no es la de la entrada.
+    db = DummyDB(token_version=4)
+
+    async def fake_verify(token, session):
+        return {"type": "usuario", "data": {"id": 1, "rol": "Encargado"}}
 
-    def fake_get_db():
-        yield DummyDB()
+    monkeypatch.setenv("TESTING", "false")
+    monkeypatch.setattr("config.database.SessionLocal", lambda: db)
+    monkeypatch.setattr(routes, "verify_user_token_async", fake_verify)
+    routes.token_cache.set("cached", {"type": "usuario", "data": {"id": 1, "rol": "Admin"}}, version=3)
+
+    request = build_request(headers=[(b"authorization", b"Bearer cached")])
+    asyncio.run(routes.auth_middleware(request, dummy_call_next))
+    assert request.state.current_entity["data"]["rol"] == "Encargado"
+
+def test_auth_middleware_http_exception(monkeypatch):
+    db = DummyDB()
 
-    def fake_verify(token, db):
+    async def fake_verify(token, db):
         raise HTTPException(status_code=403, detail="invalid")
 
     monkeypatch.setenv("TESTING", "false")
-    monkeypatch.setattr(routes, "get_db", fake_get_db)
-    monkeypatch.setattr(routes, "verify_user_token", fake_verify)
+    monkeypatch.setattr("config.database.SessionLocal", lambda: db)
+    monkeypatch.setattr(routes, "verify_user_token_async", fake_verify)
 
     request = build_request(headers=[(b"authorization", b"Bearer bad")])
     response = asyncio.run(routes.auth_middleware(request, dummy_call_next))
     assert response.status_code == 403
     assert json.loads(response.body) == {"detail": "invalid"}
+    assert db.closed
 
 def test_auth_middleware_call_next_exception():
     async def failing_call_next(request):
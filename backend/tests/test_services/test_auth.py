@@ -1,6 +1,11 @@
+import asyncio
+import threading
+import time
+
 import pytest
 from fastapi import HTTPException
 from src.services import auth as auth_service
+from src.services.token_cache import TokenCache
 from src.api.schemas import UserCreate, UserUpdate, CuadrillaCreate, CuadrillaUpdate, Role
 from src.api.models import Usuario, Cuadrilla
 
@@ -10,7 +15,7 @@ def test_verify_user_token(db_session, monkeypatch):
     db_session.commit()
     db_session.refresh(user)
 
-    def mock_verify_id_token(token):
+    def mock_verify_id_token(token, **kwargs):
         return {"email": "user@example.com", "uid": "uid123"}
 
     monkeypatch.setattr(auth_service.auth, "verify_id_token", mock_verify_id_token)
@@ -22,6 +27,59 @@ def test_verify_user_token(db_session, monkeypatch):
     assert result["data"]["uid"] == "uid123"
     assert db_session.query(Usuario).filter_by(email="user@example.com").first().firebase_uid == "uid123"
 
+def test_verify_user_token_populates_cache(db_session, monkeypatch):
+    user = Usuario(nombre="Test", email="user@example.com", rol="Admin", firebase_uid="uid123")
+    db_session.add(user)
+    db_session.commit()
+
+    monkeypatch.setattr(auth_service.auth, "verify_id_token", lambda token, **kwargs: {"email": "user@example.com", "uid": "uid123", "exp": 4102444800})
+
+    result = auth_service.verify_user_token("cached-token", db_session)
+
+    assert auth_service.token_cache.get("cached-token", auth_service.token_version(db_session)) == result
+
+def test_user_update_retires_cached_tokens_in_other_workers(db_session, monkeypatch):
+    user = Usuario(nombre="Test", email="user@example.com", rol=Role.ADMIN, firebase_uid="uid123")
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    monkeypatch.setattr(auth_service.auth, "verify_id_token", lambda token, **kwargs: {"email": "user@example.com", "uid": "uid123", "exp": 4102444800})
+
+    # El token quedó en la caché de otro worker; el admin degrada al usuario en este.
+    otro_worker = TokenCache(ttl_seconds=60, max_size=10)
+    monkeypatch.setattr(auth_service, "token_cache", otro_worker)
+    auth_service.verify_user_token("user-token", db_session)
+    monkeypatch.undo()
+
+    current = {"type": "usuario", "data": {"rol": Role.ADMIN}}
+    auth_service.update_firebase_user(user.id, UserUpdate(rol=Role.ENCARGADO), db_session, current)
+
+    assert otro_worker.get("user-token", auth_service.token_version(db_session)) is None
+
+def test_update_firebase_user_invalidates_cache(db_session):
+    user = Usuario(nombre="Old", email="old@example.com", rol=Role.ENCARGADO, firebase_uid="u1")
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    auth_service.token_cache.set("user-token", {"type": "usuario", "data": {"id": user.id}})
+
+    current = {"type": "usuario", "data": {"rol": Role.ADMIN}}
+    auth_service.update_firebase_user(user.id, UserUpdate(rol=Role.ADMIN), db_session, current)
+
+    assert auth_service.token_cache.get("user-token") is None
+
+def test_delete_firebase_cuadrilla_invalidates_cache(db_session, monkeypatch):
+    cuadrilla = Cuadrilla(nombre="Del", zona="Z", email="d@example.com", firebase_uid="uid123")
+    db_session.add(cuadrilla)
+    db_session.commit()
+    db_session.refresh(cuadrilla)
+    auth_service.token_cache.set("cuadrilla-token", {"type": "cuadrilla", "data": {"id": cuadrilla.id}})
+    monkeypatch.setattr(auth_service.auth, "delete_user", lambda uid: None)
+
+    auth_service.delete_firebase_cuadrilla(cuadrilla.id, db_session, {"type": "usuario"})
+
+    assert auth_service.token_cache.get("cuadrilla-token") is None
+
 def test_create_firebase_user(db_session, monkeypatch):
     user_data = UserCreate(nombre="Nuevo", email="new@example.com", rol=Role.ENCARGADO, id_token="t")
     current = {"type": "usuario", "data": {"rol": Role.ADMIN}}
@@ -113,7 +171,7 @@ def test_delete_firebase_cuadrilla(db_session, monkeypatch):
     assert "eliminada" in result["message"]
 
 def test_verify_user_token_invalid_token(db_session, monkeypatch):
-    def mock_verify_id_token(token):
+    def mock_verify_id_token(token, **kwargs):
         raise Exception("bad token")
 
     monkeypatch.setattr(auth_service.auth, "verify_id_token", mock_verify_id_token)
@@ -174,3 +232,72 @@ def test_delete_firebase_cuadrilla_not_found(db_session):
         auth_service.delete_firebase_cuadrilla(999, db_session, current)
 
     assert exc_info.value.status_code == 404
+
+def test_verify_user_token_passes_clock_skew(db_session, monkeypatch):
+    user = Usuario(nombre="Test", email="user@example.com", rol="Admin", firebase_uid="uid123")
+    db_session.add(user)
+    db_session.commit()
+    received = {}
+
+    def mock_verify_id_token(token, **kwargs):
+        received.update(kwargs)
+        return {"email": "user@example.com", "uid": "uid123"}
+
+    monkeypatch.setattr(auth_service.auth, "verify_id_token", mock_verify_id_token)
+
+    auth_service.verify_user_token("token", db_session)
+
+    assert received["clock_skew_seconds"] == auth_service.FIREBASE_CLOCK_SKEW_SECONDS
+
+def test_verify_user_token_async_retries_without_blocking_loop(db_session, monkeypatch):
+    user = Usuario(nombre="Test", email="user@example.com", rol="Admin", firebase_uid="uid123")
+    db_session.add(user)
+    db_session.commit()
+    calls = []
+    threads = []
+
+    def mock_verify_id_token(token, **kwargs):
+        calls.append(token)
+        threads.append(threading.current_thread())
+        if len(calls) == 1:
+            raise Exception("Token used too early, 1 < 2")
+        return {"email": "user@example.com", "uid": "uid123"}
+
+    monkeypatch.setattr(auth_service.auth, "verify_id_token", mock_verify_id_token)
+    monkeypatch.setattr(auth_service, "TOKEN_RETRY_DELAY_SECONDS", 0.2)
+
+    async def other_request(served):
+        # Simula otras solicitudes atendidas mientras el token espera su reintento
+        deadline = time.monotonic() + 0.15
+        while time.monotonic() < deadline:
+            served.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def verify(finished):
+        result = await auth_service.verify_user_token_async("skewed", db_session)
+        finished.append(time.monotonic())
+        return result
+
+    async def run():
+        served, finished = [], []
+        result, _ = await asyncio.gather(verify(finished), other_request(served))
+        return result, served, finished[0]
+
+    result, served, finished_at = asyncio.run(run())
+
+    assert result["data"]["uid"] == "uid123"
+    assert len(calls) == 2
+    assert len([t for t in served if t < finished_at]) >= 5
+    assert all(thread is not threading.main_thread() for thread in threads)
+
+def test_verify_user_token_async_gives_up_after_retries(db_session, monkeypatch):
+    def mock_verify_id_token(token, **kwargs):
+        raise Exception("Token used too early, 1 < 2")
+
+    monkeypatch.setattr(auth_service.auth, "verify_id_token", mock_verify_id_token)
+    monkeypatch.setattr(auth_service, "TOKEN_RETRY_DELAY_SECONDS", 0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(auth_service.verify_user_token_async("skewed", db_session, retries=2))
+
+    assert exc_info.value.status_code == 401
@@ -1,32 +1,34 @@
 from unittest.mock import AsyncMock, patch
 import asyncio
+from datetime import datetime, timedelta
 from io import BytesIO
 import pytest
 from fastapi import UploadFile, HTTPException
+from sqlalchemy import text
 from src.services import chats as chat_service
 from src.api.models import MensajeCorrectivo, MensajePreventivo
 
-def test_get_chat_correctivo(db_session):
+def test_get_chat_correctivo(db_session, async_db_session):
     msg = MensajeCorrectivo(firebase_uid="uid", nombre_usuario="N", id_mantenimiento=1, texto="hola")
     db_session.add(msg)
     db_session.commit()
 
-    result = chat_service.get_chat_correctivo(db_session, 1, {"type": "usuario"})
+    result = asyncio.run(chat_service.get_chat_correctivo(async_db_session, 1, {"type": "usuario"}))
 
     assert len(result) == 1
     assert result[0].texto == "hola"
 
-def test_get_chat_preventivo(db_session):
+def test_get_chat_preventivo(db_session, async_db_session):
     msg = MensajePreventivo(firebase_uid="uid", nombre_usuario="N", id_mantenimiento=1, texto="hola")
     db_session.add(msg)
     db_session.commit()
 
-    result = chat_service.get_chat_preventivo(db_session, 1, {"type": "usuario"})
+    result = asyncio.run(chat_service.get_chat_preventivo(async_db_session, 1, {"type": "usuario"}))
 
     assert len(result) == 1
     assert result[0].texto == "hola"
 
-def test_send_message_correctivo(db_session):
+def test_send_message_correctivo(db_session, async_db_session):
     with patch(
         "src.services.chats.upload_chat_file_to_gcloud", AsyncMock(return_value="http://file")
     ) as mock_upload, patch(
@@ -34,7 +36,7 @@ def test_send_message_correctivo(db_session):
     ) as mock_send:
         result = asyncio.run(
             chat_service.send_message_correctivo(
-                db_session,
+                async_db_session,
                 1,
                 "uid",
                 "N",
@@ -50,7 +52,7 @@ def test_send_message_correctivo(db_session):
     assert len(stored) == 1
     assert stored[0].texto == "hola"
 
-def test_send_message_preventivo(db_session):
+def test_send_message_preventivo(db_session, async_db_session):
     upload = UploadFile(filename="t.txt", file=BytesIO(b"data"))
     with patch(
         "src.services.chats.upload_chat_file_to_gcloud",
@@ -60,7 +62,7 @@ def test_send_message_preventivo(db_session):
     ) as mock_send:
         result = asyncio.run(
             chat_service.send_message_preventivo(
-                db_session,
+                async_db_session,
                 1,
                 "uid",
                 "N",
@@ -76,52 +78,114 @@ def test_send_message_preventivo(db_session):
     assert len(stored) == 1
     assert stored[0].archivo == "http://uploaded"
 
-def test_get_chat_correctivo_no_auth(db_session):
+def test_get_chat_correctivo_no_auth(db_session, async_db_session):
     with pytest.raises(HTTPException):
-        chat_service.get_chat_correctivo(db_session, 1, None)
+        asyncio.run(chat_service.get_chat_correctivo(async_db_session, 1, None))
 
-def test_get_chat_correctivo_no_messages(db_session):
-    result = chat_service.get_chat_correctivo(db_session, 1, {"type": "usuario"})
+def test_get_chat_correctivo_no_messages(db_session, async_db_session):
+    result = asyncio.run(chat_service.get_chat_correctivo(async_db_session, 1, {"type": "usuario"}))
     assert result == {"message": "No hay mensajes"}
 
-def test_get_chat_preventivo_no_auth(db_session):
+def test_get_chat_preventivo_no_auth(db_session, async_db_session):
     with pytest.raises(HTTPException):
-        chat_service.get_chat_preventivo(db_session, 1, None)
+        asyncio.run(chat_service.get_chat_preventivo(async_db_session, 1, None))
 
-def test_get_chat_preventivo_no_messages(db_session):
-    result = chat_service.get_chat_preventivo(db_session, 1, {"type": "usuario"})
+def test_get_chat_preventivo_no_messages(db_session, async_db_session):
+    result = asyncio.run(chat_service.get_chat_preventivo(async_db_session, 1, {"type": "usuario"}))
     assert result == {"message": "No hay mensajes"}
 
-def test_send_message_correctivo_no_auth(db_session):
+def test_send_message_correctivo_no_auth(db_session, async_db_session):
     with pytest.raises(HTTPException):
         asyncio.run(
             chat_service.send_message_correctivo(
-                db_session, 1, "uid", "N", None, texto="hola"
+                async_db_session, 1, "uid", "N", None, texto="hola"
             )
         )
 
-def test_send_message_correctivo_no_bucket(db_session, monkeypatch):
+def test_send_message_correctivo_no_bucket(db_session, async_db_session, monkeypatch):
     monkeypatch.setattr(chat_service, "GOOGLE_CLOUD_BUCKET_NAME", None)
     with pytest.raises(HTTPException):
         asyncio.run(
             chat_service.send_message_correctivo(
-                db_session, 1, "uid", "N", {"type": "usuario"}, texto="hola"
+                async_db_session, 1, "uid", "N", {"type": "usuario"}, texto="hola"
             )
         )
 
-def test_send_message_preventivo_no_auth(db_session):
+def test_send_message_preventivo_no_auth(db_session, async_db_session):
     with pytest.raises(HTTPException):
         asyncio.run(
             chat_service.send_message_preventivo(
-                db_session, 1, "uid", "N", None, texto="hola"
+                async_db_session, 1, "uid", "N", None, texto="hola"
             )
         )
 
-def test_send_message_preventivo_no_bucket(db_session, monkeypatch):
+def test_send_message_preventivo_no_bucket(db_session, async_db_session, monkeypatch):
     monkeypatch.setattr(chat_service, "GOOGLE_CLOUD_BUCKET_NAME", None)
     with pytest.raises(HTTPException):
         asyncio.run(
             chat_service.send_message_preventivo(
-                db_session, 1, "uid", "N", {"type": "usuario"}, texto="hola"
+                async_db_session, 1, "uid", "N", {"type": "usuario"}, texto="hola"
             )
         )
+
+def _seed_chat(db_session, model, cantidad, mantenimiento_id=1):
+    base = datetime(2024, 1, 1, 12, 0)
+    mensajes = [
+        # Dos mensajes por timestamp para ejercitar el desempate por id.
+        model(firebase_uid="uid", nombre_usuario="N", id_mantenimiento=mantenimiento_id, texto=str(i), created_at=base + timedelta(minutes=i // 2))
+        for i in range(cantidad)
+    ]
+    db_session.add_all(mensajes)
+    db_session.add(model(firebase_uid="uid", nombre_usuario="N", id_mantenimiento=mantenimiento_id + 1, texto="otro", created_at=base))
+    db_session.commit()
+    return mensajes
+
+def test_get_chat_correctivo_returns_latest_page_in_order(db_session, async_db_session):
+    _seed_chat(db_session, MensajeCorrectivo, 7)
+
+    result = asyncio.run(chat_service.get_chat_correctivo(async_db_session, 1, {"type": "usuario"}, limit=3))
+
+    assert [m.texto for m in result] == ["4", "5", "6"]
+
+def test_get_chat_correctivo_rejects_zero_limit(db_session, async_db_session):
+    _seed_chat(db_session, MensajeCorrectivo, 3)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(chat_service.get_chat_correctivo(async_db_session, 1, {"type": "usuario"}, limit=0))
+
+    assert exc.value.status_code == 400
+
+def test_get_chat_correctivo_before_and_after_cursors(db_session, async_db_session):
+    mensajes = _seed_chat(db_session, MensajeCorrectivo, 7)
+
+    older = asyncio.run(chat_service.get_chat_correctivo(async_db_session, 1, {"type": "usuario"}, before=mensajes[4].id, limit=3))
+    newer = asyncio.run(chat_service.get_chat_correctivo(async_db_session, 1, {"type": "usuario"}, after=mensajes[2].id, limit=3))
+
+    assert [m.texto for m in older] == ["1", "2", "3"]
+    assert [m.texto for m in newer] == ["3", "4", "5"]
+
+def test_get_chat_preventivo_since_id(db_session, async_db_session):
+    mensajes = _seed_chat(db_session, MensajePreventivo, 5)
+
+    result = asyncio.run(chat_service.get_chat_preventivo(async_db_session, 1, {"type": "usuario"}, since_id=mensajes[2].id))
+
+    assert [m.texto for m in result] == ["3", "4"]
+
+def test_get_chat_rejects_unknown_or_combined_cursors(db_session, async_db_session):
+    mensajes = _seed_chat(db_session, MensajePreventivo, 2)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(chat_service.get_chat_preventivo(async_db_session, 1, {"type": "usuario"}, before=999))
+    assert exc.value.status_code == 404
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(chat_service.get_chat_preventivo(async_db_session, 1, {"type": "usuario"}, before=mensajes[1].id, since_id=mensajes[0].id))
+    assert exc.value.status_code == 400
+
+def test_get_chat_page_uses_composite_index(db_session):
+    plan = db_session.execute(
+        text(
+            "EXPLAIN QUERY PLAN SELECT * FROM mensaje_correctivo WHERE id_mantenimiento = 1 "
+            "ORDER BY created_at DESC, id DESC LIMIT 10"
+        )
+    ).fetchall()
+    assert any("ix_mensaje_correctivo_mantenimiento_fecha" in row[-1] for row in plan)
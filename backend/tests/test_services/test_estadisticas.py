@@ -0,0 +1,112 @@
+from datetime import date
+
+import pytest
+
+from src.api.models import Cliente, Cuadrilla, MantenimientoCorrectivo, MantenimientoPreventivo, Sucursal
+from src.api.schemas import EstadisticasFiltros
+from src.services import estadisticas
+
+
+@pytest.fixture
+def datos(db_session):
+    cliente = Cliente(nombre="ACME", contacto="Jane", email="acme@example.com")
+    db_session.add(cliente)
+    db_session.flush()
+    norte = Sucursal(nombre="Norte 1", zona="Norte", direccion="Dir", superficie="100", cliente_id=cliente.id)
+    norte_2 = Sucursal(nombre="Norte 2", zona="Norte", direccion="Dir", superficie="100", cliente_id=cliente.id)
+    sur = Sucursal(nombre="Sur 1", zona="Sur", direccion="Dir", superficie="100", cliente_id=cliente.id)
+    c1 = Cuadrilla(nombre="C1", zona="Norte", email="c1@example.com")
+    c2 = Cuadrilla(nombre="C2", zona="Sur", email="c2@example.com")
+    db_session.add_all([norte, norte_2, sur, c1, c2])
+    db_session.flush()
+
+    def correctivo(sucursal, cuadrilla, apertura, cierre, estado, rubro="Electricidad", prioridad="Media"):
+        return MantenimientoCorrectivo(
+            cliente_id=cliente.id,
+            sucursal_id=sucursal.id,
+            id_cuadrilla=cuadrilla.id,
+            fecha_apertura=apertura,
+            fecha_cierre=cierre,
+            numero_caso="NC",
+            incidente="Incidente",
+            rubro=rubro,
+            estado=estado,
+            prioridad=prioridad,
+        )
+
+    db_session.add_all([
+        correctivo(norte, c1, date(2024, 1, 1), date(2024, 1, 5), "Finalizado"),
+        correctivo(norte, c1, date(2024, 1, 10), date(2024, 1, 12), "Finalizado", rubro="Otros", prioridad="Alta"),
+        correctivo(norte_2, c1, date(2024, 2, 1), None, "Pendiente"),
+        correctivo(sur, c2, date(2024, 1, 15), date(2024, 1, 21), "Finalizado"),
+        correctivo(sur, c2, date(2023, 1, 15), None, "Pendiente"),
+        MantenimientoPreventivo(
+            cliente_id=cliente.id, sucursal_id=norte.id, frecuencia="Mensual", id_cuadrilla=c1.id,
+            fecha_apertura=date(2024, 1, 1), fecha_cierre=date(2024, 1, 3), estado="Finalizado",
+        ),
+        MantenimientoPreventivo(
+            cliente_id=cliente.id, sucursal_id=sur.id, frecuencia="Mensual", id_cuadrilla=c2.id,
+            fecha_apertura=date(2024, 2, 1), estado="Pendiente",
+        ),
+    ])
+    db_session.commit()
+    return {"cliente": cliente, "norte": norte, "sur": sur, "c1": c1, "c2": c2}
+
+
+def test_reporte_correctivos_groups_by_cuadrilla(db_session, datos):
+    result = estadisticas.get_reporte_correctivos(db_session, EstadisticasFiltros(anios=[2024]))
+    assert result == [
+        {"id_cuadrilla": datos["c1"].id, "nombre": "C1", "asignados": 3, "resueltos": 2, "ratio": 0.67},
+        {"id_cuadrilla": datos["c2"].id, "nombre": "C2", "asignados": 1, "resueltos": 1, "ratio": 1.0},
+    ]
+
+
+def test_reporte_preventivos_counts_closed_as_resueltos(db_session, datos):
+    result = estadisticas.get_reporte_preventivos(db_session, EstadisticasFiltros(meses=[1]))
+    assert [(r["nombre"], r["asignados"], r["resueltos"]) for r in result] == [("C1", 1, 1)]
+
+
+def test_reporte_rubros_averages_resolution_days(db_session, datos):
+    result = estadisticas.get_reporte_rubros(db_session, EstadisticasFiltros(anios=[2024], meses=[1]))
+    assert result == {
+        "rubros": [
+            {"rubro": "Electricidad", "promedio_dias": 5.0, "cantidad": 2},
+            {"rubro": "Otros", "promedio_dias": 2.0, "cantidad": 1},
+        ],
+        "promedio_dias": 4.0,
+        "cantidad": 3,
+    }
+
+
+def test_reporte_zonas_divides_by_sucursales(db_session, datos):
+    result = estadisticas.get_reporte_zonas(db_session, EstadisticasFiltros(anios=[2024]))
+    assert result == [
+        {"zona": "Norte", "total_correctivos": 3, "promedio_correctivos": 1.5},
+        {"zona": "Sur", "total_correctivos": 1, "promedio_correctivos": 1.0},
+    ]
+
+
+def test_reporte_sucursales_filters_by_zona(db_session, datos):
+    result = estadisticas.get_reporte_sucursales(db_session, EstadisticasFiltros(zona="Sur"))
+    assert result == [
+        {"sucursal_id": datos["sur"].id, "sucursal": "Sur 1", "zona": "Sur", "total_correctivos": 2},
+    ]
+
+
+def test_resumen_returns_counts_and_monthly_series(db_session, datos):
+    result = estadisticas.get_resumen(db_session, EstadisticasFiltros(anios=[2024]))
+    assert result["correctivos"]["por_estado"] == {"Finalizado": 3, "Pendiente": 1}
+    assert result["correctivos"]["por_prioridad"] == {"Media": 3, "Alta": 1}
+    assert result["correctivos"]["por_zona"] == {"Norte": 3, "Sur": 1}
+    assert result["correctivos"]["promedio_dias_resolucion"] == 4.0
+    assert result["preventivos"]["promedio_dias_resolucion"] == 2.0
+    assert result["por_mes"] == [
+        {"anio": 2024, "mes": 1, "correctivos": 3, "preventivos": 1},
+        {"anio": 2024, "mes": 2, "correctivos": 1, "preventivos": 1},
+    ]
+
+
+def test_resumen_without_data_returns_empty_series(db_session):
+    result = estadisticas.get_resumen(db_session, EstadisticasFiltros())
+    assert result["por_mes"] == []
+    assert result["correctivos"]["promedio_dias_resolucion"] == 0
@@ -0,0 +1,91 @@
+import threading
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.api.models import (
+    Cliente,
+    Cuadrilla,
+    MantenimientoPreventivo,
+    MantenimientoPreventivoFoto,
+    SheetSyncOutbox,
+    Sucursal,
+)
+from src.services import galleries
+
+
+@pytest.fixture
+def preventivo(db_session):
+    cliente = Cliente(nombre="ACME", contacto="Jane", email="acme@example.com")
+    db_session.add(cliente)
+    db_session.flush()
+    sucursal = Sucursal(nombre="Central", zona="Norte", direccion="Dir", superficie="100", cliente_id=cliente.id)
+    cuadrilla = Cuadrilla(nombre="C1", zona="Norte", email="c1@example.com", firebase_uid="uid-1")
+    db_session.add_all([sucursal, cuadrilla])
+    db_session.flush()
+    record = MantenimientoPreventivo(
+        cliente_id=cliente.id,
+        sucursal_id=sucursal.id,
+        frecuencia="Mensual",
+        id_cuadrilla=cuadrilla.id,
+        fecha_apertura=date(2024, 1, 1),
+        estado="Pendiente",
+    )
+    db_session.add(record)
+    db_session.commit()
+    return record
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = MagicMock()
+    monkeypatch.setattr(galleries, "get_bucket", lambda name: bucket)
+    monkeypatch.setattr(galleries, "GOOGLE_CLOUD_BUCKET_NAME", "test-bucket")
+    return bucket
+
+
+def test_rebuild_gallery_uses_db_rows_without_listing(db_session, preventivo, bucket):
+    db_session.add_all(
+        MantenimientoPreventivoFoto(mantenimiento_id=preventivo.id, url=f"https://files/{i}.jpg") for i in range(3)
+    )
+    db_session.commit()
+
+    url = galleries.rebuild_gallery(db_session, "preventivo", preventivo.id, "fotos")
+
+    assert url == f"https://storage.googleapis.com/test-bucket/mantenimientos_preventivos/{preventivo.id}/fotos/index.html"
+    bucket.list_blobs.assert_not_called()
+    blob = bucket.blob.return_value
+    (content,), kwargs = blob.upload_from_string.call_args
+    assert kwargs["content_type"] == "text/html"
+    assert content.count("<img") == 3
+    blob.patch.assert_not_called()
+    jobs = db_session.query(SheetSyncOutbox).all()
+    assert [(j.tipo, j.operacion, j.mantenimiento_id) for j in jobs] == [("preventivo", "update", preventivo.id)]
+
+
+def test_rebuild_gallery_removes_index_of_empty_folder(db_session, preventivo, bucket):
+    assert galleries.rebuild_gallery(db_session, "preventivo", preventivo.id, "fotos") is None
+    bucket.blob.return_value.delete.assert_called_once()
+    bucket.blob.return_value.upload_from_string.assert_not_called()
+
+
+def test_schedule_gallery_coalesces_calls(monkeypatch):
+    monkeypatch.setattr(galleries, "GOOGLE_CLOUD_BUCKET_NAME", "test-bucket")
+    monkeypatch.setattr(galleries, "GALLERY_DEBOUNCE_SECONDS", 0.05)
+    done = threading.Event()
+    calls = []
+
+    def rebuild(db, *key):
+        calls.append(key)
+        done.set()
+
+    monkeypatch.setattr(galleries, "rebuild_gallery", rebuild)
+    monkeypatch.setattr(galleries, "SessionLocal", MagicMock())
+
+    for _ in range(5):
+        galleries.schedule_gallery("correctivo", 7, "fotos")
+
+    assert done.wait(2)
+    galleries.flush_galleries()
+    assert calls == [("correctivo", 7, "fotos")]
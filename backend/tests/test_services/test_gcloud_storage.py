@@ -8,6 +8,7 @@ from src.services import gcloud_storage
 
 def test_create_folder(monkeypatch):
     monkeypatch.setenv("GOOGLE_CREDENTIALS", "{\"project_id\": \"test\"}")
+    monkeypatch.setenv("GCS_FOLDER_MARKERS", "true")
     importlib.reload(gcloud_storage)
 
     class DummyBlob:
@@ -39,58 +40,39 @@ def test_create_folder(monkeypatch):
     gcloud_storage.create_folder_if_not_exists("bucket", "folder")
 
     assert client.bucket_obj.blob_obj.uploaded
+    client.bucket_obj.blob_obj.uploaded = False
+    gcloud_storage.create_folder_if_not_exists("bucket", "folder/")
+    assert not client.bucket_obj.blob_obj.uploaded
+    gcloud_storage.reset_storage_client()
+
+def test_create_folder_without_markers_skips_gcs(monkeypatch):
+    monkeypatch.setattr(gcloud_storage, "GCS_FOLDER_MARKERS", False)
+    get_bucket = lambda name: pytest.fail("no debería tocar GCS")
+    monkeypatch.setattr(gcloud_storage, "get_bucket", get_bucket)
+    gcloud_storage.create_folder_if_not_exists("bucket", "folder")
 
-def test_generate_gallery_html(monkeypatch):
-    monkeypatch.setenv("GOOGLE_CREDENTIALS", "{\"project_id\": \"test\"}")
-    importlib.reload(gcloud_storage)
-
+def test_delete_folder_markers(monkeypatch):
     class DummyBlob:
-        def __init__(self, name=None):
+        def __init__(self, name, size):
             self.name = name
-            self.uploaded_content = None
-            self.content_type = 'image/jpeg' if self.name.endswith('.jpg') else 'image/png' if self.name.endswith('.png') else None
-
-        def upload_from_string(self, content, content_type=None):
-            self.uploaded_content = content
-            
-        def exists(self):
-            return False
+            self.size = size
+            self.deleted = False
 
         def delete(self):
-            pass
+            self.deleted = True
 
-        def patch(self):
-            pass
+    blobs = [DummyBlob("a/", 0), DummyBlob("a/foto.jpg", 10), DummyBlob("a/b/", 0)]
 
     class DummyBucket:
-        def __init__(self):
-            self.created = {}
-
         def list_blobs(self, prefix):
-            return [DummyBlob(f"{prefix}a.jpg"), DummyBlob(f"{prefix}b.png")]
+            return blobs
 
-        def blob(self, name):
-            blob = self.created.get(name)
-            if not blob:
-                blob = DummyBlob(name)
-                self.created[name] = blob
-            return blob
-
-    class DummyClient:
-        def __init__(self):
-            self.bucket_obj = DummyBucket()
-
-        def bucket(self, name):
-            return self.bucket_obj
+    monkeypatch.setattr(gcloud_storage, "get_bucket", lambda name: DummyBucket())
 
-    client = DummyClient()
-    monkeypatch.setattr(gcloud_storage.storage.Client, "from_service_account_info", lambda info: client)
-
-    url = gcloud_storage.generate_gallery_html("bucket", "photos")
-
-    assert url == "https://storage.googleapis.com/bucket/photos/index.html"
-    index_blob = client.bucket_obj.created["photos/index.html"]
-    assert "<div class=\"gallery\">" in index_blob.uploaded_content
+    assert gcloud_storage.delete_folder_markers("bucket", dry_run=True) == ["a/", "a/b/"]
+    assert not any(b.deleted for b in blobs)
+    gcloud_storage.delete_folder_markers("bucket")
+    assert [b.deleted for b in blobs] == [True, False, True]
 
 def test_upload_file_to_gcloud(monkeypatch):
     monkeypatch.setenv("GOOGLE_CREDENTIALS", "{\"project_id\": \"test\"}")
@@ -132,9 +114,6 @@ def test_upload_file_to_gcloud(monkeypatch):
     monkeypatch.setattr(
         gcloud_storage, "create_folder_if_not_exists", lambda *args, **kwargs: None
     )
-    monkeypatch.setattr(
-        gcloud_storage, "generate_gallery_html", lambda *args, **kwargs: None
-    )
 
     upload = UploadFile(filename="test.txt", file=io.BytesIO(b"data"))
     upload.headers = Headers({"content-type": "text/plain"})
@@ -180,14 +159,10 @@ def test_delete_file_in_folder(monkeypatch):
     client = DummyClient(bucket)
     monkeypatch.setattr(gcloud_storage.storage.Client, "from_service_account_info", lambda info: client)
 
-    called = {}
-    monkeypatch.setattr(gcloud_storage, "generate_gallery_html", lambda bn, fd: called.setdefault("gallery", (bn, fd)))
-
     result = gcloud_storage.delete_file_in_folder("bucket", "folder/", "/file.txt")
 
     assert result is True
     assert dummy_blob.deleted
-    assert called["gallery"] == ("bucket", "folder/")
     assert bucket.last_path == "folder/file.txt"
 
 def test_upload_chat_file_to_gcloud(monkeypatch):
@@ -241,14 +216,10 @@ def test_upload_chat_file_to_gcloud(monkeypatch):
 
 def test_create_folder_missing_credentials(monkeypatch):
     monkeypatch.setattr(gcloud_storage, "GOOGLE_CREDENTIALS", None)
+    monkeypatch.setattr(gcloud_storage, "GCS_FOLDER_MARKERS", True)
     with pytest.raises(HTTPException):
         gcloud_storage.create_folder_if_not_exists("bucket", "folder")
 
-def test_generate_gallery_html_missing_credentials(monkeypatch):
-    monkeypatch.setattr(gcloud_storage, "GOOGLE_CREDENTIALS", None)
-    with pytest.raises(HTTPException):
-        gcloud_storage.generate_gallery_html("bucket", "folder")
-
 def test_upload_file_to_gcloud_missing_credentials(monkeypatch):
     monkeypatch.setattr(gcloud_storage, "GOOGLE_CREDENTIALS", None)
     upload = UploadFile(filename="t.txt", file=io.BytesIO(b"data"))
@@ -269,3 +240,165 @@ def test_delete_file_in_folder_missing_credentials(monkeypatch):
     monkeypatch.setattr(gcloud_storage, "GOOGLE_CREDENTIALS", None)
     with pytest.raises(HTTPException):
         gcloud_storage.delete_file_in_folder("bucket", "folder", "/file")
+
+def test_storage_client_and_bucket_are_shared(monkeypatch):
+    monkeypatch.setenv("GOOGLE_CREDENTIALS", "{\"project_id\": \"test\"}")
+    importlib.reload(gcloud_storage)
+
+    created = []
+
+    class DummyClient:
+        def __init__(self):
+            self.buckets = []
+
+        def bucket(self, name):
+            self.buckets.append(name)
+            return object()
+
+    def from_info(info):
+        client = DummyClient()
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(gcloud_storage.storage.Client, "from_service_account_info", from_info)
+
+    first = gcloud_storage.get_bucket("bucket")
+    second = gcloud_storage.get_bucket("bucket")
+
+    assert first is second
+    assert len(created) == 1
+    assert created[0].buckets == ["bucket"]
+    gcloud_storage.reset_storage_client()
+
+def test_upload_runs_off_event_loop_with_chunked_streaming(monkeypatch):
+    import threading
+
+    monkeypatch.setenv("GOOGLE_CREDENTIALS", "{\"project_id\": \"test\"}")
+    importlib.reload(gcloud_storage)
+    monkeypatch.setattr(gcloud_storage, "GCS_UPLOAD_CHUNK_SIZE", 256 * 1024)
+
+    class DummyBlob:
+        chunk_size = None
+        public_url = "https://example.com/big.jpg"
+
+        def upload_from_file(self, file, content_type=None):
+            self.thread = threading.current_thread()
+
+    blob = DummyBlob()
+
+    class DummyBucket:
+        def blob(self, path):
+            return blob
+
+    monkeypatch.setattr(gcloud_storage, "get_bucket", lambda name: DummyBucket())
+    monkeypatch.setattr(gcloud_storage, "create_folder_if_not_exists", lambda *args, **kwargs: None)
+
+    upload = UploadFile(filename="big.jpg", file=io.BytesIO(b"x" * (300 * 1024)), size=300 * 1024)
+    upload.headers = Headers({"content-type": "image/jpeg"})
+
+    url = asyncio.run(gcloud_storage.upload_file_to_gcloud(upload, "bucket", "folder"))
+
+    assert url == blob.public_url
+    assert blob.chunk_size == 256 * 1024
+    assert blob.thread is not threading.main_thread()
+    assert blob.thread.name.startswith("gcs")
+
+def test_upload_files_to_gcloud_uploads_batch_concurrently(monkeypatch):
+    monkeypatch.setenv("GOOGLE_CREDENTIALS", "{\"project_id\": \"test\"}")
+    importlib.reload(gcloud_storage)
+
+    class DummyBlob:
+        def __init__(self, path):
+            self.public_url = f"https://example.com/{path}"
+
+        def upload_from_file(self, file, content_type=None):
+            pass
+
+    class DummyBucket:
+        def blob(self, path):
+            return DummyBlob(path)
+
+    calls = {"folder": 0}
+    monkeypatch.setattr(gcloud_storage, "get_bucket", lambda name: DummyBucket())
+    monkeypatch.setattr(gcloud_storage.uuid, "uuid4", iter(range(5)).__next__)
+    monkeypatch.setattr(gcloud_storage, "create_folder_if_not_exists", lambda *args: calls.__setitem__("folder", calls["folder"] + 1))
+
+    uploads = []
+    for i in range(5):
+        upload = UploadFile(filename=f"{i}.jpg", file=io.BytesIO(b"data"))
+        upload.headers = Headers({"content-type": "image/jpeg"})
+        uploads.append(upload)
+
+    urls = asyncio.run(gcloud_storage.upload_files_to_gcloud(uploads, "bucket", "fotos"))
+
+    assert sorted(urls) == [f"https://example.com/fotos/{i}.jpg" for i in range(5)]
+    assert calls == {"folder": 1}
+
+def test_upload_file_groups_deletes_uploaded_blobs_when_one_fails(monkeypatch):
+    monkeypatch.setenv("GOOGLE_CREDENTIALS", "{\"project_id\": \"test\"}")
+    importlib.reload(gcloud_storage)
+    deleted = []
+
+    class DummyBlob:
+        def __init__(self, name):
+            self.name = name
+            self.public_url = f"https://example.com/{name}"
+
+        def upload_from_file(self, file, content_type=None):
+            if self.name.startswith("fotos/"):
+                raise RuntimeError("upload failed")
+
+        def delete(self):
+            deleted.append(self.name)
+
+    class DummyBucket:
+        def blob(self, path):
+            return DummyBlob(path)
+
+    monkeypatch.setattr(gcloud_storage, "get_bucket", lambda name: DummyBucket())
+    monkeypatch.setattr(gcloud_storage, "create_folder_if_not_exists", lambda *args: None)
+    monkeypatch.setattr(gcloud_storage.uuid, "uuid4", iter(range(3)).__next__)
+
+    def _upload(name):
+        upload = UploadFile(filename=name, file=io.BytesIO(b"data"))
+        upload.headers = Headers({"content-type": "application/pdf"})
+        return upload
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(
+            gcloud_storage.upload_file_groups_to_gcloud(
+                [([_upload("a.pdf"), _upload("b.pdf")], "planillas", False), ([_upload("c.jpg")], "fotos", True)], "bucket"
+            )
+        )
+
+    assert exc.value.status_code == 500
+    assert sorted(deleted) == ["planillas/0.pdf", "planillas/1.pdf"]
+
+def test_upload_photo_stores_variants_or_copies_original(monkeypatch):
+    class DummyBlob:
+        def __init__(self, name):
+            self.name = name
+            self.uploaded = None
+
+        def upload_from_string(self, content, content_type=None):
+            self.uploaded = (content, content_type)
+
+    class DummyBucket:
+        def __init__(self):
+            self.blobs = {}
+            self.copies = []
+
+        def blob(self, name):
+            return self.blobs.setdefault(name, DummyBlob(name))
+
+        def copy_blob(self, blob, bucket, new_name):
+            self.copies.append((blob.name, new_name))
+
+    bucket = DummyBucket()
+    original = DummyBlob("fotos/x.jpg")
+    monkeypatch.setattr(gcloud_storage, "build_variants", lambda f: {"thumb": (b"t", "image/jpeg")})
+
+    gcloud_storage._upload_variants(bucket, original, UploadFile(filename="x.jpg", file=io.BytesIO(b"img")))
+
+    assert bucket.blobs["fotos_thumb/x.jpg"].uploaded == (b"t", "image/jpeg")
+    assert bucket.copies == [("fotos/x.jpg", "fotos_web/x.jpg")]
@@ -1,10 +1,10 @@
 from datetime import date
-from types import SimpleNamespace
 from unittest.mock import MagicMock
 
+import pytest
+
 from src.api.models import MantenimientoCorrectivo, MantenimientoPreventivo
 from src.services import google_sheets
-from src.services.google_sheets import CellNotFound
 
 
 def _correctivo():
@@ -62,7 +62,7 @@ def test_column_letter_conversion():
 def test_apply_filters_sets_range(monkeypatch):
     worksheet = MagicMock(row_count=10)
     google_sheets._apply_filters(worksheet, 5)
-    worksheet.set_basic_filter.assert_called_once_with("A1:E10")
+    worksheet.set_basic_filter.assert_called_once_with("A:E")
 
 
 def test_build_correctivo_row_includes_links(monkeypatch):
@@ -80,133 +80,221 @@ def test_build_preventivo_row_includes_links(monkeypatch):
     assert row[-2] == "https://files/fotos.html"
 
 
-def test_append_correctivo_ensures_header(monkeypatch):
-    worksheet = MagicMock()
-    monkeypatch.setattr(google_sheets, "_get_worksheet", lambda _: worksheet)
-    ensure = MagicMock()
-    append = MagicMock()
-    monkeypatch.setattr(google_sheets, "_ensure_header", ensure)
-    monkeypatch.setattr(google_sheets, "_append_row_with_filters", append)
-
-    google_sheets.append_correctivo(_correctivo())
+def test_ensure_header_runs_once_per_worksheet():
+    google_sheets.reset_sheet_setup()
+    worksheet = MagicMock(id=7)
+    worksheet.row_values.return_value = []
 
-    ensure.assert_called_once_with(worksheet, google_sheets.CORRECTIVO_HEADER, google_sheets.CORRECTIVO_VISIBLE_COLUMNS)
-    append.assert_called_once()
+    google_sheets._ensure_header(worksheet, google_sheets.CORRECTIVO_HEADER, google_sheets.CORRECTIVO_VISIBLE_COLUMNS)
+    google_sheets._ensure_header(worksheet, google_sheets.CORRECTIVO_HEADER, google_sheets.CORRECTIVO_VISIBLE_COLUMNS)
 
-
-def test_append_correctivo_skips_without_sheet(monkeypatch):
-    monkeypatch.setattr(google_sheets, "_get_worksheet", lambda _: None)
-    append = MagicMock()
-    monkeypatch.setattr(google_sheets, "_append_row_with_filters", append)
-    google_sheets.append_correctivo(_correctivo())
-    append.assert_not_called()
+    worksheet.append_row.assert_called_once_with(google_sheets.CORRECTIVO_HEADER)
+    worksheet.set_basic_filter.assert_called_once()
+    google_sheets._ensure_header(worksheet, google_sheets.CORRECTIVO_HEADER + ["nueva"], google_sheets.CORRECTIVO_VISIBLE_COLUMNS)
+    assert worksheet.row_values.call_count == 2
+    google_sheets.reset_sheet_setup()
 
 
-def test_update_correctivo_updates_row(monkeypatch):
-    worksheet = MagicMock()
-    worksheet.find.return_value = SimpleNamespace(row=3)
+def test_sync_worksheet_batches_updates_deletes_and_appends(monkeypatch):
+    worksheet = MagicMock(id=3)
+    worksheet.col_values.return_value = [google_sheets.TRACKING_COLUMN_NAME, "1", "", "5", "9"]
     monkeypatch.setattr(google_sheets, "_get_worksheet", lambda _: worksheet)
     monkeypatch.setattr(google_sheets, "_ensure_header", MagicMock())
-
-    google_sheets.update_correctivo(_correctivo())
-
-    worksheet.update.assert_called_once()
-    args, _ = worksheet.update.call_args
-    assert args[0] == "A3:N3"
-
-
-def test_update_correctivo_appends_when_not_found(monkeypatch):
-    worksheet = MagicMock()
-    worksheet.find.side_effect = CellNotFound("missing")
+    monkeypatch.setattr(google_sheets, "list_galleries", lambda _: set())
+    existing = _correctivo()
+    new = _correctivo()
+    new.id = 2
+
+    worksheet.append_rows.return_value = {"updates": {"updatedRange": "MantenimientosCorrectivos!A4:N4"}}
+
+    result = google_sheets.sync_worksheet("correctivo", [existing, new], [5, 9, 77])
+
+    worksheet.find.assert_not_called()
+    assert result.snapshot == {"1": 2, "5": 4, "9": 5}
+    assert result.deleted_rows == [5, 4]
+    assert result.appended == [("2", 4)]
+    worksheet.batch_update.assert_called_once()
+    (updates,), _ = worksheet.batch_update.call_args
+    assert [u["range"] for u in updates] == ["A2:N2"]
+    (body,), _ = worksheet.spreadsheet.batch_update.call_args
+    assert [r["deleteDimension"]["range"]["startIndex"] for r in body["requests"]] == [4, 3]
+    (appended,), _ = worksheet.append_rows.call_args
+    assert [row[-1] for row in appended] == ["2"]
+
+
+def test_sync_worksheet_lists_galleries_once_per_batch(monkeypatch):
+    worksheet = MagicMock(id=3)
+    worksheet.col_values.return_value = [google_sheets.TRACKING_COLUMN_NAME, "1", "2"]
     monkeypatch.setattr(google_sheets, "_get_worksheet", lambda _: worksheet)
-    append = MagicMock()
-    monkeypatch.setattr(google_sheets, "_append_row_with_filters", append)
     monkeypatch.setattr(google_sheets, "_ensure_header", MagicMock())
-
-    google_sheets.update_correctivo(_correctivo())
-
-    append.assert_called_once()
-
-
-def test_delete_correctivo(monkeypatch):
-    worksheet = MagicMock()
-    worksheet.find.return_value = SimpleNamespace(row=4)
+    monkeypatch.setattr(google_sheets, "GOOGLE_CLOUD_BUCKET_NAME", "test-bucket")
+    list_galleries = MagicMock(return_value={(2, "fotos"), (3, "fotos")})
+    monkeypatch.setattr(google_sheets, "list_galleries", list_galleries)
+    blob_exists = MagicMock()
+    monkeypatch.setattr(google_sheets, "_blob_exists", blob_exists)
+    mantenimientos = [_correctivo() for _ in range(3)]
+    for index, mantenimiento in enumerate(mantenimientos, start=1):
+        mantenimiento.id = index
+
+    google_sheets.sync_worksheet("correctivo", mantenimientos, [])
+
+    list_galleries.assert_called_once_with("correctivo")
+    blob_exists.assert_not_called()
+    (updates,), _ = worksheet.batch_update.call_args
+    assert [u["values"][0][-2] for u in updates] == ["", "https://storage.googleapis.com/test-bucket/mantenimientos_correctivos/2/fotos/index.html"]
+    (appended,), _ = worksheet.append_rows.call_args
+    assert appended[0][-2].endswith("mantenimientos_correctivos/3/fotos/index.html")
+
+
+def test_sync_worksheet_without_changes_skips_sheet(monkeypatch):
+    get_worksheet = MagicMock()
+    monkeypatch.setattr(google_sheets, "_get_worksheet", get_worksheet)
+    google_sheets.sync_worksheet("preventivo", [], [])
+    get_worksheet.assert_not_called()
+
+
+def test_sync_worksheet_uses_row_index_without_reading_column(monkeypatch):
+    worksheet = MagicMock(id=3)
+    worksheet.append_rows.return_value = {}
     monkeypatch.setattr(google_sheets, "_get_worksheet", lambda _: worksheet)
     monkeypatch.setattr(google_sheets, "_ensure_header", MagicMock())
-
-    google_sheets.delete_correctivo(10)
-
-    worksheet.delete_rows.assert_called_once_with(4)
-
-
-def test_delete_correctivo_ignores_missing(monkeypatch):
-    worksheet = MagicMock()
-    worksheet.find.side_effect = CellNotFound("missing")
+    monkeypatch.setattr(google_sheets, "list_galleries", lambda _: set())
+    worksheet.batch_get.return_value = [[["1"]]]
+    new = _preventivo()
+    new.id = 8
+
+    result = google_sheets.sync_worksheet("preventivo", [_preventivo(), new], [], {"1": 6})
+
+    worksheet.batch_get.assert_called_once_with(["J6"])
+    worksheet.col_values.assert_not_called()
+    (updates,), _ = worksheet.batch_update.call_args
+    assert [u["range"] for u in updates] == ["A6:J6"]
+    assert result.snapshot is None
+    assert result.appended is None
+
+
+def test_sync_worksheet_rereads_column_when_indexed_row_moved(monkeypatch):
+    worksheet = MagicMock(id=3)
+    worksheet.append_rows.return_value = {}
+    # La fila 5 del índice ahora tiene otro ticket: el 1 se movió a la 3 y el 9 a la 4.
+    worksheet.batch_get.return_value = [[["9"]], [["4"]]]
+    worksheet.col_values.return_value = [google_sheets.TRACKING_COLUMN_NAME, "4", "1", "9"]
     monkeypatch.setattr(google_sheets, "_get_worksheet", lambda _: worksheet)
     monkeypatch.setattr(google_sheets, "_ensure_header", MagicMock())
+    monkeypatch.setattr(google_sheets, "list_galleries", lambda _: set())
 
-    google_sheets.delete_correctivo(10)
-
-    worksheet.delete_rows.assert_not_called()
-
-
-def test_append_preventivo(monkeypatch):
-    worksheet = MagicMock()
-    monkeypatch.setattr(google_sheets, "_get_worksheet", lambda _: worksheet)
-    ensure = MagicMock()
-    append = MagicMock()
-    monkeypatch.setattr(google_sheets, "_ensure_header", ensure)
-    monkeypatch.setattr(google_sheets, "_append_row_with_filters", append)
+    result = google_sheets.sync_worksheet("correctivo", [_correctivo()], [9], {"1": 5, "9": 6})
 
-    google_sheets.append_preventivo(_preventivo())
+    worksheet.batch_get.assert_called_once_with(["N5", "N6"])
+    assert result.snapshot == {"4": 2, "1": 3, "9": 4}
+    (updates,), _ = worksheet.batch_update.call_args
+    assert [u["range"] for u in updates] == ["A3:N3"]
+    (body,), _ = worksheet.spreadsheet.batch_update.call_args
+    assert [r["deleteDimension"]["range"]["startIndex"] for r in body["requests"]] == [3]
 
-    ensure.assert_called_once_with(worksheet, google_sheets.PREVENTIVO_HEADER, google_sheets.PREVENTIVO_VISIBLE_COLUMNS)
-    append.assert_called_once()
 
-
-def test_update_preventivo_updates_existing_row(monkeypatch):
-    worksheet = MagicMock()
-    worksheet.find.return_value = SimpleNamespace(row=2)
-    monkeypatch.setattr(google_sheets, "_get_worksheet", lambda _: worksheet)
+def test_sync_worksheet_skips_without_sheet(monkeypatch):
+    monkeypatch.setattr(google_sheets, "_get_worksheet", lambda _: None)
+    result = google_sheets.sync_worksheet("correctivo", [_correctivo()], [3])
+    assert result == google_sheets.SheetSyncResult(None, [], [])
+
+
+@pytest.fixture
+def sheets_client(monkeypatch):
+    google_sheets.reset_sheets_client()
+    google_sheets.reset_sheets_metrics()
+    client = MagicMock()
+    authorize = MagicMock(return_value=client)
+    monkeypatch.setattr(google_sheets, "GOOGLE_CREDENTIALS_DICT", {"type": "service_account"})
+    monkeypatch.setattr(google_sheets, "SHEET_ID", "sheet-id")
+    monkeypatch.setattr(google_sheets._SheetsCredentials, "from_service_account_info", MagicMock())
+    monkeypatch.setattr(google_sheets.gspread, "authorize", authorize)
+    yield client, authorize
+    google_sheets.reset_sheets_client()
+    google_sheets.reset_sheets_metrics()
+
+
+def test_client_spreadsheet_and_worksheet_are_reused(sheets_client):
+    client, authorize = sheets_client
+
+    first = google_sheets._get_worksheet("MantenimientosCorrectivos")
+    second = google_sheets._get_worksheet("MantenimientosCorrectivos")
+
+    assert first is second
+    authorize.assert_called_once()
+    client.open_by_key.assert_called_once_with("sheet-id")
+    client.open_by_key.return_value.worksheet.assert_called_once_with("MantenimientosCorrectivos")
+    metrics = google_sheets.get_sheets_metrics()
+    assert metrics["clients_created"] == 1
+    assert metrics["api_calls"] == {"open_spreadsheet": 1, "open_worksheet": 1}
+    assert metrics["cached_worksheets"] == ["MantenimientosCorrectivos"]
+
+
+def test_sync_worksheet_error_drops_cached_worksheet(sheets_client, monkeypatch):
+    client, _ = sheets_client
+    worksheet = client.open_by_key.return_value.worksheet.return_value
+    worksheet.append_rows.side_effect = RuntimeError("boom")
     monkeypatch.setattr(google_sheets, "_ensure_header", MagicMock())
+    monkeypatch.setattr(google_sheets, "list_galleries", lambda _: set())
 
-    google_sheets.update_preventivo(_preventivo())
+    with pytest.raises(RuntimeError):
+        google_sheets.sync_worksheet("correctivo", [_correctivo()], [], {})
 
-    worksheet.update.assert_called_once()
-    args, _ = worksheet.update.call_args
-    assert args[0] == "A2:J2"
+    metrics = google_sheets.get_sheets_metrics()
+    assert metrics["cached_worksheets"] == []
+    assert metrics["api_errors"] == {"append_rows": 1}
+    google_sheets._get_worksheet("MantenimientosCorrectivos")
+    assert client.open_by_key.return_value.worksheet.call_count == 2
+    client.open_by_key.assert_called_once()
 
 
-def test_update_preventivo_appends_when_missing(monkeypatch):
-    worksheet = MagicMock()
-    worksheet.find.side_effect = CellNotFound("missing")
-    monkeypatch.setattr(google_sheets, "_get_worksheet", lambda _: worksheet)
-    append = MagicMock()
-    monkeypatch.setattr(google_sheets, "_ensure_header", MagicMock())
-    monkeypatch.setattr(google_sheets, "_append_row_with_filters", append)
+def test_credentials_refresh_is_counted(monkeypatch):
+    google_sheets.reset_sheets_metrics()
+    monkeypatch.setattr(google_sheets.service_account.Credentials, "refresh", lambda self, request: None)
+    creds = object.__new__(google_sheets._SheetsCredentials)
 
-    google_sheets.update_preventivo(_preventivo())
+    creds.refresh(MagicMock())
+    creds.refresh(MagicMock())
 
-    append.assert_called_once()
+    assert google_sheets.get_sheets_metrics()["auth_refreshes"] == 2
+    google_sheets.reset_sheets_metrics()
 
 
-def test_delete_preventivo(monkeypatch):
-    worksheet = MagicMock()
-    worksheet.find.return_value = SimpleNamespace(row=5)
-    monkeypatch.setattr(google_sheets, "_get_worksheet", lambda _: worksheet)
-    monkeypatch.setattr(google_sheets, "_ensure_header", MagicMock())
-
-    google_sheets.delete_preventivo(5)
+def test_list_galleries_uses_one_listing(monkeypatch):
+    bucket = MagicMock()
+    bucket.list_blobs.return_value = [
+        MagicMock(name="a"),
+        MagicMock(name="b"),
+    ]
+    bucket.list_blobs.return_value[0].name = "mantenimientos_preventivos/4/fotos/index.html"
+    bucket.list_blobs.return_value[1].name = "mantenimientos_preventivos/4/planillas/index.html"
+    monkeypatch.setattr(google_sheets, "_gallery_bucket", lambda: bucket)
 
-    worksheet.delete_rows.assert_called_once_with(5)
+    assert google_sheets.list_galleries("preventivo") == {(4, "fotos"), (4, "planillas")}
+    bucket.list_blobs.assert_called_once_with(prefix="mantenimientos_preventivos/", match_glob="**/index.html")
 
 
-def test_delete_preventivo_not_found(monkeypatch):
-    worksheet = MagicMock()
-    worksheet.find.side_effect = CellNotFound("missing")
+def test_export_worksheet_writes_everything_in_one_update(monkeypatch):
+    google_sheets.reset_sheet_setup()
+    worksheet = MagicMock(id=5, row_count=10)
     monkeypatch.setattr(google_sheets, "_get_worksheet", lambda _: worksheet)
-    monkeypatch.setattr(google_sheets, "_ensure_header", MagicMock())
+    monkeypatch.setattr(google_sheets, "GOOGLE_CLOUD_BUCKET_NAME", "test-bucket")
+    monkeypatch.setattr(google_sheets, "list_galleries", lambda _: {(2, "fotos")})
+    blob_exists = MagicMock()
+    monkeypatch.setattr(google_sheets, "_blob_exists", blob_exists)
+    second = _correctivo()
+    second.id = 2
 
-    google_sheets.delete_preventivo(5)
+    rows = google_sheets.export_worksheet("correctivo", [_correctivo(), second])
 
-    worksheet.delete_rows.assert_not_called()
+    assert rows == {"1": 2, "2": 3}
+    blob_exists.assert_not_called()
+    worksheet.update.assert_called_once()
+    values = worksheet.update.call_args.kwargs["values"]
+    assert worksheet.update.call_args.kwargs["range_name"] == "A1:N3"
+    assert values[0] == google_sheets.CORRECTIVO_HEADER
+    assert values[1][-2] == ""
+    assert values[2][-2].endswith("mantenimientos_correctivos/2/fotos/index.html")
+    worksheet.resize.assert_called_once_with(rows=3)
+    worksheet.append_rows.assert_not_called()
+    google_sheets.reset_sheet_setup()
@@ -10,8 +10,10 @@ from src.api.models import (
     Cuadrilla,
     MantenimientoCorrectivo,
     MantenimientoCorrectivoFoto,
+    SheetSyncOutbox,
     Sucursal,
 )
+from src.api.schemas import MantenimientoCorrectivoFiltros
 from src.services import mantenimientos_correctivos as mc
 
 
@@ -56,25 +58,27 @@ def cuadrilla(db_session):
 @pytest.fixture
 def correctivo_integrations(monkeypatch):
     patches = {
-        "append": MagicMock(),
-        "update": MagicMock(),
-        "delete": MagicMock(),
         "upload": AsyncMock(return_value="https://files.local/resource"),
+        "upload_batch": AsyncMock(side_effect=lambda files, bucket, folder, **kwargs: [f"https://files.local/{f.filename}" for f in files]),
         "delete_file": MagicMock(return_value=True),
-        "notify_user": MagicMock(),
+        "notify_user": AsyncMock(),
         "notify_users": AsyncMock(),
     }
-    monkeypatch.setattr(mc, "append_correctivo", patches["append"])
-    monkeypatch.setattr(mc, "update_correctivo", patches["update"])
-    monkeypatch.setattr(mc, "delete_correctivo", patches["delete"])
     monkeypatch.setattr(mc, "upload_file_to_gcloud", patches["upload"])
+    monkeypatch.setattr(mc, "upload_files_to_gcloud", patches["upload_batch"])
     monkeypatch.setattr(mc, "delete_file_in_folder", patches["delete_file"])
     monkeypatch.setattr(mc, "notify_user", patches["notify_user"])
     monkeypatch.setattr(mc, "notify_users_correctivo", patches["notify_users"])
+    patches["gallery"] = MagicMock()
+    monkeypatch.setattr(mc, "schedule_gallery", patches["gallery"])
     monkeypatch.setattr(mc, "GOOGLE_CLOUD_BUCKET_NAME", "test-bucket")
     return patches
 
 
+def _outbox_jobs(db_session):
+    return [(job.tipo, job.operacion, job.mantenimiento_id) for job in db_session.query(SheetSyncOutbox).order_by(SheetSyncOutbox.id)]
+
+
 @pytest.fixture
 def correctivo(db_session, cliente, sucursal, cuadrilla):
     record = MantenimientoCorrectivo(
@@ -94,10 +98,10 @@ def correctivo(db_session, cliente, sucursal, cuadrilla):
     return record
 
 
-def test_create_correctivo_high_priority_notifies(db_session, cliente, sucursal, cuadrilla, auth_entity, correctivo_integrations):
+def test_create_correctivo_high_priority_notifies(db_session, async_db_session, cliente, sucursal, cuadrilla, auth_entity, correctivo_integrations):
     result = asyncio.run(
         mc.create_mantenimiento_correctivo(
-            db_session,
+            async_db_session,
             cliente.id,
             sucursal.id,
             cuadrilla.id,
@@ -112,17 +116,17 @@ def test_create_correctivo_high_priority_notifies(db_session, cliente, sucursal,
     )
     assert result.numero_caso == "NC-1"
     correctivo_integrations["notify_user"].assert_called_once()
-    assert correctivo_integrations["append"].called
+    assert _outbox_jobs(db_session) == [("correctivo", "append", result.id)]
 
 
-def test_create_correctivo_requires_matching_cliente(db_session, sucursal, cuadrilla, auth_entity):
+def test_create_correctivo_requires_matching_cliente(db_session, async_db_session, sucursal, cuadrilla, auth_entity):
     other_cliente = Cliente(nombre="Wayne", contacto="Bruce", email="wayne@example.com")
     db_session.add(other_cliente)
     db_session.commit()
     with pytest.raises(HTTPException) as exc:
         asyncio.run(
             mc.create_mantenimiento_correctivo(
-                db_session,
+                async_db_session,
                 other_cliente.id,
                 sucursal.id,
                 cuadrilla.id,
@@ -138,11 +142,11 @@ def test_create_correctivo_requires_matching_cliente(db_session, sucursal, cuadr
     assert exc.value.status_code == 400
 
 
-def test_create_correctivo_requires_auth(db_session, cliente, sucursal, cuadrilla):
+def test_create_correctivo_requires_auth(db_session, async_db_session, cliente, sucursal, cuadrilla):
     with pytest.raises(HTTPException) as exc:
         asyncio.run(
             mc.create_mantenimiento_correctivo(
-                db_session,
+                async_db_session,
                 cliente.id,
                 sucursal.id,
                 cuadrilla.id,
@@ -158,32 +162,35 @@ def test_create_correctivo_requires_auth(db_session, cliente, sucursal, cuadrill
     assert exc.value.status_code == 401
 
 
-def test_update_correctivo_handles_files_and_notifications(db_session, correctivo, cuadrilla, auth_entity, correctivo_integrations):
+def test_update_correctivo_handles_files_and_notifications(db_session, async_db_session, correctivo, cuadrilla, auth_entity, correctivo_integrations):
     extendido = datetime.now(UTC)
     updated = asyncio.run(
         mc.update_mantenimiento_correctivo(
-            db_session,
+            async_db_session,
             correctivo.id,
             auth_entity,
             estado="Solucionado",
             prioridad="Alta",
             extendido=extendido,
             planilla=MagicMock(filename="planilla.pdf"),
-            fotos=[MagicMock(filename="foto.jpg")],
+            fotos=[MagicMock(filename=f"foto{i}.jpg") for i in range(3)],
         )
     )
     assert updated.estado == "Solucionado"
     assert updated.extendido == extendido.replace(tzinfo=None)
-    assert db_session.query(MantenimientoCorrectivoFoto).filter_by(mantenimiento_id=correctivo.id).count() == 1
+    fotos = db_session.query(MantenimientoCorrectivoFoto).filter_by(mantenimiento_id=correctivo.id).order_by(MantenimientoCorrectivoFoto.id)
+    assert [f.url for f in fotos] == [f"https://files.local/foto{i}.jpg" for i in range(3)]
+    correctivo_integrations["upload_batch"].assert_awaited_once()
+    correctivo_integrations["gallery"].assert_called_once_with("correctivo", correctivo.id, "fotos")
     assert correctivo_integrations["notify_users"].await_count >= 1
-    correctivo_integrations["update"].assert_called_once()
+    assert _outbox_jobs(db_session) == [("correctivo", "update", updated.id)]
 
 
-def test_update_correctivo_not_found(db_session, auth_entity):
+def test_update_correctivo_not_found(db_session, async_db_session, auth_entity):
     with pytest.raises(HTTPException) as exc:
         asyncio.run(
             mc.update_mantenimiento_correctivo(
-                db_session,
+                async_db_session,
                 999,
                 auth_entity,
                 estado="Solucionado",
@@ -192,11 +199,11 @@ def test_update_correctivo_not_found(db_session, auth_entity):
     assert exc.value.status_code == 404
 
 
-def test_delete_correctivo_calls_sheet_cleanup(db_session, correctivo, auth_entity, correctivo_integrations):
+def test_delete_correctivo_enqueues_sheet_cleanup(db_session, correctivo, auth_entity, correctivo_integrations):
     record_id = correctivo.id
     response = mc.delete_mantenimiento_correctivo(db_session, record_id, auth_entity)
     assert "eliminado" in response["message"]
-    correctivo_integrations["delete"].assert_called_once_with(record_id)
+    assert _outbox_jobs(db_session) == [("correctivo", "delete", record_id)]
 
 
 def test_delete_correctivo_not_found(db_session, auth_entity):
@@ -222,6 +229,7 @@ def test_delete_photo_removes_entry(db_session, correctivo, auth_entity, correct
     assert result is True
     assert db_session.query(MantenimientoCorrectivoFoto).count() == 0
     correctivo_integrations["delete_file"].assert_called_once()
+    correctivo_integrations["gallery"].assert_called_once()
 
 
 def test_delete_photo_not_found(db_session, correctivo, auth_entity):
@@ -236,6 +244,112 @@ def test_get_mantenimientos_correctivos_returns_list(db_session, correctivo):
     assert result[0].id == correctivo.id
 
 
+def _add_correctivos(db_session, cliente, sucursal, cuadrilla, count):
+    for i in range(count):
+        db_session.add(
+            MantenimientoCorrectivo(
+                cliente_id=cliente.id,
+                sucursal_id=sucursal.id,
+                id_cuadrilla=cuadrilla.id if i % 2 == 0 else None,
+                fecha_apertura=date(2024, 1 + i % 3, 1),
+                numero_caso=f"NC-{i}",
+                incidente="Incidente",
+                rubro="Otros",
+                estado="Pendiente" if i % 2 == 0 else "Finalizado",
+                prioridad="Alta" if i % 3 == 0 else "Baja",
+            )
+        )
+    db_session.commit()
+
+
+def test_get_mantenimientos_correctivos_applies_filters(db_session, cliente, sucursal, cuadrilla):
+    _add_correctivos(db_session, cliente, sucursal, cuadrilla, 6)
+    filtros = MantenimientoCorrectivoFiltros(
+        estado="Pendiente",
+        id_cuadrilla=cuadrilla.id,
+        apertura_desde=date(2024, 2, 1),
+    )
+    result = mc.get_mantenimientos_correctivos(db_session, filtros)
+    assert sorted(m.numero_caso for m in result) == ["NC-2", "NC-4"]
+
+
+def test_get_mantenimientos_correctivos_page_walks_all_rows(db_session, cliente, sucursal, cuadrilla):
+    _add_correctivos(db_session, cliente, sucursal, cuadrilla, 7)
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = mc.get_mantenimientos_correctivos_page(db_session, None, cursor, 3)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert len(seen) == 7
+    assert len({m.id for m in seen}) == 7
+    keys = [(m.fecha_apertura, m.id) for m in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_get_mantenimientos_correctivos_page_puts_null_fecha_last(db_session, cliente, sucursal, cuadrilla):
+    _add_correctivos(db_session, cliente, sucursal, cuadrilla, 4)
+    for numero in ("SF-1", "SF-2", "SF-3"):
+        db_session.add(
+            MantenimientoCorrectivo(
+                cliente_id=cliente.id, sucursal_id=sucursal.id, numero_caso=numero, estado="Pendiente", prioridad="Baja"
+            )
+        )
+    db_session.commit()
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = mc.get_mantenimientos_correctivos_page(db_session, None, cursor, 2)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert len({m.id for m in seen}) == 7
+    assert [m.numero_caso for m in seen[4:]] == ["SF-3", "SF-2", "SF-1"]
+    assert all(m.fecha_apertura is not None for m in seen[:4])
+
+
+def test_get_mantenimientos_correctivos_page_rejects_bad_cursor(db_session):
+    with pytest.raises(HTTPException) as exc:
+        mc.get_mantenimientos_correctivos_page(db_session, None, "no-es-un-cursor", 10)
+    assert exc.value.status_code == 400
+
+
+def _list_and_touch_fotos(db_session, query_counter):
+    db_session.expire_all()
+    with query_counter() as statements:
+        for m in mc.get_mantenimientos_correctivos(db_session):
+            [foto.url for foto in m.fotos]
+    return len(statements)
+
+
+def test_get_mantenimientos_correctivos_query_count_is_constant(db_session, cliente, sucursal, cuadrilla, query_counter):
+    _add_correctivos(db_session, cliente, sucursal, cuadrilla, 2)
+    for m in db_session.query(MantenimientoCorrectivo).all():
+        db_session.add(MantenimientoCorrectivoFoto(mantenimiento_id=m.id, url=f"https://files/{m.id}.jpg"))
+    db_session.commit()
+    few = _list_and_touch_fotos(db_session, query_counter)
+
+    _add_correctivos(db_session, cliente, sucursal, cuadrilla, 10)
+    for m in db_session.query(MantenimientoCorrectivo).all():
+        db_session.add(MantenimientoCorrectivoFoto(mantenimiento_id=m.id, url=f"https://files/{m.id}-b.jpg"))
+    db_session.commit()
+    many = _list_and_touch_fotos(db_session, query_counter)
+
+    assert few == many == 2
+
+
+def test_get_mantenimiento_correctivo_loads_fotos_eagerly(db_session, correctivo, query_counter):
+    db_session.add(MantenimientoCorrectivoFoto(mantenimiento_id=correctivo.id, url="https://files/a.jpg"))
+    db_session.commit()
+    record_id = correctivo.id
+    db_session.expire_all()
+    with query_counter() as statements:
+        m = mc.get_mantenimiento_correctivo(db_session, record_id)
+        assert [foto.url for foto in m.fotos] == ["https://files/a.jpg"]
+    assert len(statements) == 2
+
+
 def test_get_mantenimiento_correctivo_not_found(db_session):
     with pytest.raises(HTTPException) as exc:
         mc.get_mantenimiento_correctivo(db_session, 999)
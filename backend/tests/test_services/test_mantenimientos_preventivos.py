@@ -11,8 +11,10 @@ from src.api.models import (
     MantenimientoPreventivo,
     MantenimientoPreventivoFoto,
     MantenimientoPreventivoPlanilla,
+    SheetSyncOutbox,
     Sucursal,
 )
+from src.api.schemas import MantenimientoPreventivoFiltros
 from src.services import mantenimientos_preventivos as mp
 
 
@@ -71,30 +73,32 @@ def preventivo(db_session, cliente, sucursal, cuadrilla):
     return record
 
 
+def _outbox_jobs(db_session):
+    return [(job.tipo, job.operacion, job.mantenimiento_id) for job in db_session.query(SheetSyncOutbox).order_by(SheetSyncOutbox.id)]
+
+
 @pytest.fixture
 def preventivo_integrations(monkeypatch):
     patches = {
-        "append": MagicMock(),
-        "update": MagicMock(),
-        "delete": MagicMock(),
-        "upload": AsyncMock(return_value="https://files.local/resource"),
+        "upload_batch": AsyncMock(
+            side_effect=lambda grupos, bucket: [[f"https://files.local/{f.filename}" for f in files or []] for files, _, _ in grupos]
+        ),
         "delete_file": MagicMock(return_value=True),
         "notify": AsyncMock(),
     }
-    monkeypatch.setattr(mp, "append_preventivo", patches["append"])
-    monkeypatch.setattr(mp, "update_preventivo", patches["update"])
-    monkeypatch.setattr(mp, "delete_preventivo", patches["delete"])
-    monkeypatch.setattr(mp, "upload_file_to_gcloud", patches["upload"])
+    monkeypatch.setattr(mp, "upload_file_groups_to_gcloud", patches["upload_batch"])
     monkeypatch.setattr(mp, "delete_file_in_folder", patches["delete_file"])
     monkeypatch.setattr(mp, "notify_users_preventivo", patches["notify"])
+    patches["gallery"] = MagicMock()
+    monkeypatch.setattr(mp, "schedule_gallery", patches["gallery"])
     monkeypatch.setattr(mp, "GOOGLE_CLOUD_BUCKET_NAME", "test-bucket")
     return patches
 
 
-def test_create_preventivo_success(db_session, cliente, sucursal, cuadrilla, auth_entity, preventivo_integrations):
+def test_create_preventivo_success(db_session, async_db_session, cliente, sucursal, cuadrilla, auth_entity, preventivo_integrations):
     mantenimiento = asyncio.run(
         mp.create_mantenimiento_preventivo(
-            db_session,
+            async_db_session,
             cliente.id,
             sucursal.id,
             "Mensual",
@@ -105,14 +109,14 @@ def test_create_preventivo_success(db_session, cliente, sucursal, cuadrilla, aut
         )
     )
     assert mantenimiento.frecuencia == "Mensual"
-    preventivo_integrations["append"].assert_called_once()
+    assert _outbox_jobs(db_session) == [("preventivo", "append", mantenimiento.id)]
 
 
-def test_create_preventivo_mismatched_frequency(db_session, cliente, sucursal, cuadrilla, auth_entity):
+def test_create_preventivo_mismatched_frequency(db_session, async_db_session, cliente, sucursal, cuadrilla, auth_entity):
     with pytest.raises(HTTPException) as exc:
         asyncio.run(
             mp.create_mantenimiento_preventivo(
-                db_session,
+                async_db_session,
                 cliente.id,
                 sucursal.id,
                 "Trimestral",
@@ -125,11 +129,11 @@ def test_create_preventivo_mismatched_frequency(db_session, cliente, sucursal, c
     assert exc.value.status_code == 400
 
 
-def test_create_preventivo_requires_auth(db_session, cliente, sucursal, cuadrilla):
+def test_create_preventivo_requires_auth(db_session, async_db_session, cliente, sucursal, cuadrilla):
     with pytest.raises(HTTPException) as exc:
         asyncio.run(
             mp.create_mantenimiento_preventivo(
-                db_session,
+                async_db_session,
                 cliente.id,
                 sucursal.id,
                 "Mensual",
@@ -143,12 +147,12 @@ def test_create_preventivo_requires_auth(db_session, cliente, sucursal, cuadrill
 
 
 def test_update_preventivo_handles_files_and_notifications(
-    db_session, preventivo, cliente, sucursal, cuadrilla, auth_entity, preventivo_integrations
+    db_session, async_db_session, preventivo, cliente, sucursal, cuadrilla, auth_entity, preventivo_integrations
 ):
     extendido = datetime.now(UTC)
     updated = asyncio.run(
         mp.update_mantenimiento_preventivo(
-            db_session,
+            async_db_session,
             preventivo.id,
             auth_entity,
             cliente_id=cliente.id,
@@ -166,15 +170,60 @@ def test_update_preventivo_handles_files_and_notifications(
     assert updated.extendido == extendido.replace(tzinfo=None)
     assert db_session.query(MantenimientoPreventivoPlanilla).count() == 1
     assert db_session.query(MantenimientoPreventivoFoto).count() == 1
+    assert preventivo_integrations["upload_batch"].await_count == 1
     assert preventivo_integrations["notify"].await_count >= 1
-    preventivo_integrations["update"].assert_called_once()
+    assert _outbox_jobs(db_session) == [("preventivo", "update", updated.id)]
+
+
+def test_update_preventivo_failure_after_close_saves_nothing(
+    db_session, async_db_session, preventivo, auth_entity, preventivo_integrations
+):
+    # El notify real confirma la sesión que recibe: si corriera antes del commit final guardaría el cierre a medias.
+    async def _notify_commits(db_session, **kwargs):
+        await db_session.commit()
+
+    preventivo_integrations["notify"].side_effect = _notify_commits
+    preventivo_integrations["upload_batch"].side_effect = HTTPException(status_code=500, detail="Error al subir")
+
+    with pytest.raises(HTTPException):
+        asyncio.run(
+            mp.update_mantenimiento_preventivo(
+                async_db_session,
+                preventivo.id,
+                auth_entity,
+                fecha_cierre=date(2024, 1, 9),
+                fotos=[MagicMock(filename="foto.jpg")],
+            )
+        )
+    asyncio.run(async_db_session.rollback())
+
+    db_session.expire_all()
+    assert db_session.get(MantenimientoPreventivo, preventivo.id).fecha_cierre is None
+    assert _outbox_jobs(db_session) == []
+    preventivo_integrations["notify"].assert_not_awaited()
+
+
+def test_update_preventivo_notifies_after_commit(
+    db_session, async_db_session, preventivo, auth_entity, preventivo_integrations
+):
+    vistos = []
+
+    async def _notify(**kwargs):
+        # Cuando se notifica, el cierre y su job de Sheets ya están confirmados.
+        vistos.append(_outbox_jobs(db_session))
+
+    preventivo_integrations["notify"].side_effect = _notify
+
+    asyncio.run(mp.update_mantenimiento_preventivo(async_db_session, preventivo.id, auth_entity, fecha_cierre=date(2024, 1, 9)))
+
+    assert vistos == [[("preventivo", "update", preventivo.id)]]
 
 
-def test_update_preventivo_not_found(db_session, auth_entity):
+def test_update_preventivo_not_found(db_session, async_db_session, auth_entity):
     with pytest.raises(HTTPException) as exc:
         asyncio.run(
             mp.update_mantenimiento_preventivo(
-                db_session,
+                async_db_session,
                 999,
                 auth_entity,
             )
@@ -182,11 +231,11 @@ def test_update_preventivo_not_found(db_session, auth_entity):
     assert exc.value.status_code == 404
 
 
-def test_delete_preventivo_calls_sheet_cleanup(db_session, preventivo, auth_entity, preventivo_integrations):
+def test_delete_preventivo_enqueues_sheet_cleanup(db_session, preventivo, auth_entity, preventivo_integrations):
     record_id = preventivo.id
     response = mp.delete_mantenimiento_preventivo(db_session, record_id, auth_entity)
     assert "eliminado" in response["message"]
-    preventivo_integrations["delete"].assert_called_once_with(record_id)
+    assert _outbox_jobs(db_session) == [("preventivo", "delete", record_id)]
 
 
 def test_delete_preventivo_not_found(db_session, auth_entity):
@@ -221,6 +270,65 @@ def test_get_mantenimientos_preventivos_returns_list(db_session, preventivo):
     assert result[0].id == preventivo.id
 
 
+def test_get_mantenimientos_preventivos_page_filters_by_cierre(db_session, cliente, sucursal, cuadrilla):
+    for month in range(1, 6):
+        db_session.add(
+            MantenimientoPreventivo(
+                cliente_id=cliente.id,
+                sucursal_id=sucursal.id,
+                frecuencia="Mensual",
+                id_cuadrilla=cuadrilla.id,
+                fecha_apertura=date(2024, month, 1),
+                fecha_cierre=date(2024, month, 20) if month % 2 else None,
+                estado="Pendiente",
+            )
+        )
+    db_session.commit()
+    filtros = MantenimientoPreventivoFiltros(cierre_desde=date(2024, 2, 1), cierre_hasta=date(2024, 12, 31))
+
+    first, cursor = mp.get_mantenimientos_preventivos_page(db_session, filtros, None, 1)
+    second, last_cursor = mp.get_mantenimientos_preventivos_page(db_session, filtros, cursor, 1)
+
+    assert [m.fecha_apertura for m in first] == [date(2024, 5, 1)]
+    assert [m.fecha_apertura for m in second] == [date(2024, 3, 1)]
+    assert last_cursor is None
+
+
+def _add_preventivos_con_archivos(db_session, cliente, sucursal, cuadrilla, count):
+    for i in range(count):
+        m = MantenimientoPreventivo(
+            cliente_id=cliente.id,
+            sucursal_id=sucursal.id,
+            frecuencia="Mensual",
+            id_cuadrilla=cuadrilla.id,
+            fecha_apertura=date(2024, 1, 1),
+            estado="Pendiente",
+        )
+        db_session.add(m)
+        db_session.flush()
+        db_session.add(MantenimientoPreventivoFoto(mantenimiento_id=m.id, url=f"https://files/{m.id}.jpg"))
+        db_session.add(MantenimientoPreventivoPlanilla(mantenimiento_id=m.id, url=f"https://files/{m.id}.pdf"))
+    db_session.commit()
+
+
+def _count_list_queries(db_session, query_counter):
+    db_session.expire_all()
+    with query_counter() as statements:
+        page, _ = mp.get_mantenimientos_preventivos_page(db_session, None, None, 50)
+        for m in page:
+            [p.url for p in m.planillas]
+            [f.url for f in m.fotos]
+    return len(statements)
+
+
+def test_get_mantenimientos_preventivos_query_count_is_constant(db_session, cliente, sucursal, cuadrilla, query_counter):
+    _add_preventivos_con_archivos(db_session, cliente, sucursal, cuadrilla, 2)
+    few = _count_list_queries(db_session, query_counter)
+    _add_preventivos_con_archivos(db_session, cliente, sucursal, cuadrilla, 10)
+    many = _count_list_queries(db_session, query_counter)
+    assert few == many == 3
+
+
 def test_get_mantenimiento_preventivo_not_found(db_session):
     with pytest.raises(HTTPException) as exc:
         mp.get_mantenimiento_preventivo(db_session, 999)
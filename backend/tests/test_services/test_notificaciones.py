@@ -4,38 +4,49 @@ import pytest
 from fastapi import HTTPException
 from src.services import notificaciones as notif_service
 from src.api.models import Usuario, Notificacion_Correctivo, Notificacion_Preventivo
+from src.config.database import async_engine
 
-def test_notify_user_sends_webpush(db_session):
-    with patch("src.services.notificaciones.send_webpush_notification") as mock_push:
-        result = notif_service.notify_user(db_session, "uid", 1, "mensaje", "title", "body")
+def test_notify_user_sends_webpush(db_session, async_db_session):
+    with patch("src.services.notificaciones.send_webpush_notification_async", new=AsyncMock()) as mock_push:
+        result = asyncio.run(notif_service.notify_user(async_db_session, "uid", 1, "mensaje", "title", "body"))
         assert result == {"message": "Notification sent"}
-        mock_push.assert_called_once()
+        mock_push.assert_awaited_once_with(async_db_session, "uid", "title", "body")
 
-def test_notify_users_correctivo_roles(db_session):
+def test_notify_users_correctivo_roles(db_session, async_db_session, query_counter):
     encargado = Usuario(email="enc@example.com", rol="Encargado de Mantenimiento", firebase_uid="enc")
     admin = Usuario(email="adm@example.com", rol="Administrador", firebase_uid="adm")
     db_session.add_all([encargado, admin])
     db_session.commit()
 
-    with patch("src.services.notificaciones.send_notification_correctivo", new=AsyncMock()) as mock_send:
-        asyncio.run(notif_service.notify_users_correctivo(db_session, 1, "Solucionado"))
-        assert mock_send.await_count == 2
-        mock_send.assert_any_await(db_session, "enc", 1, "Solucionado")
-        mock_send.assert_any_await(db_session, "adm", 1, "Solucionado")
+    with patch(
+        "src.services.notificaciones.notification_manager.send_notification", new=AsyncMock()
+    ) as mock_ws, query_counter(async_engine.sync_engine) as statements:
+        asyncio.run(notif_service.notify_users_correctivo(async_db_session, 1, "Solucionado"))
+
+    assert sorted(n.firebase_uid for n in db_session.query(Notificacion_Correctivo)) == ['adm', 'enc']
+    assert sorted(call.args[0] for call in mock_ws.await_args_list) == ['adm', 'enc']
+    # Versión de la caché de roles, destinatarios (caché fría), dedup e insert en lote:
+    # no crece con la cantidad de usuarios.
+    assert len([s for s in statements if s.lstrip().upper().startswith(("SELECT", "INSERT"))]) == 4
 
-def test_notify_users_preventivo_roles(db_session):
+def test_notify_users_preventivo_roles(db_session, async_db_session, query_counter):
     encargado = Usuario(email="encp@example.com", rol="Encargado de Mantenimiento", firebase_uid="encp")
     admin = Usuario(email="admp@example.com", rol="Administrador", firebase_uid="admp")
     db_session.add_all([encargado, admin])
     db_session.commit()
 
-    with patch("src.services.notificaciones.send_notification_preventivo", new=AsyncMock()) as mock_send:
-        asyncio.run(notif_service.notify_users_preventivo(db_session, 2, "Solucionado"))
-        assert mock_send.await_count == 2
-        mock_send.assert_any_await(db_session, "encp", 2, "Solucionado")
-        mock_send.assert_any_await(db_session, "admp", 2, "Solucionado")
+    with patch(
+        "src.services.notificaciones.notification_manager.send_notification", new=AsyncMock()
+    ) as mock_ws, query_counter(async_engine.sync_engine) as statements:
+        asyncio.run(notif_service.notify_users_preventivo(async_db_session, 2, "Solucionado"))
+
+    assert sorted(n.firebase_uid for n in db_session.query(Notificacion_Preventivo)) == ['admp', 'encp']
+    assert sorted(call.args[0] for call in mock_ws.await_args_list) == ['admp', 'encp']
+    # Versión de la caché de roles, destinatarios (caché fría), dedup e insert en lote:
+    # no crece con la cantidad de usuarios.
+    assert len([s for s in statements if s.lstrip().upper().startswith(("SELECT", "INSERT"))]) == 4
 
-def test_notify_nearby_maintenances_sends_webpush(db_session):
+def test_notify_nearby_maintenances_sends_webpush(db_session, async_db_session):
     current = {"data": {"uid": "user"}}
     mantenimientos = [
         {"id": 1, "mensaje": "mc", "tipo": "correctivo"},
@@ -49,15 +60,16 @@ def test_notify_nearby_maintenances_sends_webpush(db_session):
         "src.services.notificaciones.send_notification_preventivo",
         new=AsyncMock(return_value=True),
     ) as mock_preventivo, patch(
-        "src.services.notificaciones.send_webpush_notification"
+        "src.services.notificaciones.send_webpush_notification_async",
+        new=AsyncMock(),
     ) as mock_push:
         result = asyncio.run(
-            notif_service.notify_nearby_maintenances(db_session, current, mantenimientos)
+            notif_service.notify_nearby_maintenances(async_db_session, current, mantenimientos)
         )
         assert result == {"message": "Notificaciones enviadas"}
-        mock_correctivo.assert_awaited_once_with(db_session, "user", 1, "mc")
-        mock_preventivo.assert_awaited_once_with(db_session, "user", 2, "mp")
-        assert mock_push.call_count == 2
+        mock_correctivo.assert_awaited_once_with(async_db_session, "user", 1, "mc")
+        mock_preventivo.assert_awaited_once_with(async_db_session, "user", 2, "mp")
+        assert mock_push.await_count == 2
 
 def test_get_notification_correctivo(db_session):
     n1 = Notificacion_Correctivo(firebase_uid="uid", id_mantenimiento=1, mensaje="m1")
@@ -105,39 +117,39 @@ def test_notificacion_preventivo_leida(db_session):
         is True
     )
 
-def test_send_notification_correctivo(db_session):
+def test_send_notification_correctivo(db_session, async_db_session):
     with patch(
         "src.services.notificaciones.notification_manager.send_notification",
         new=AsyncMock(),
     ) as mock_ws:
         created = asyncio.run(
-            notif_service.send_notification_correctivo(db_session, "uid", 1, "msg")
+            notif_service.send_notification_correctivo(async_db_session, "uid", 1, "msg")
         )
         assert created is True
         assert db_session.query(Notificacion_Correctivo).count() == 1
         mock_ws.assert_awaited_once()
 
         created_again = asyncio.run(
-            notif_service.send_notification_correctivo(db_session, "uid", 1, "msg")
+            notif_service.send_notification_correctivo(async_db_session, "uid", 1, "msg")
         )
         assert created_again is False
         assert db_session.query(Notificacion_Correctivo).count() == 1
         assert mock_ws.await_count == 1
 
-def test_send_notification_preventivo(db_session):
+def test_send_notification_preventivo(db_session, async_db_session):
     with patch(
         "src.services.notificaciones.notification_manager.send_notification",
         new=AsyncMock(),
     ) as mock_ws:
         created = asyncio.run(
-            notif_service.send_notification_preventivo(db_session, "uid", 1, "msg")
+            notif_service.send_notification_preventivo(async_db_session, "uid", 1, "msg")
         )
         assert created is True
         assert db_session.query(Notificacion_Preventivo).count() == 1
         mock_ws.assert_awaited_once()
 
         created_again = asyncio.run(
-            notif_service.send_notification_preventivo(db_session, "uid", 1, "msg")
+            notif_service.send_notification_preventivo(async_db_session, "uid", 1, "msg")
         )
         assert created_again is False
         assert db_session.query(Notificacion_Preventivo).count() == 1
@@ -174,28 +186,30 @@ def test_delete_notificacion(db_session):
     assert result_p == {"detail": "Notificación eliminada"}
     assert db_session.query(Notificacion_Preventivo).filter_by(id=np_id).first() is None
 
-def test_notify_user_already_sent(db_session):
+def test_notify_user_already_sent(db_session, async_db_session):
     existing = Notificacion_Correctivo(firebase_uid="uid", id_mantenimiento=1, mensaje="m")
     db_session.add(existing)
     db_session.commit()
-    with patch("src.services.notificaciones.send_webpush_notification") as mock_push:
-        result = notif_service.notify_user(db_session, "uid", 1, "m", "t", "b")
+    with patch("src.services.notificaciones.send_webpush_notification_async", new=AsyncMock()) as mock_push:
+        result = asyncio.run(notif_service.notify_user(async_db_session, "uid", 1, "m", "t", "b"))
         assert result == {"message": "Notification already sent"}
-        mock_push.assert_not_called()
+        mock_push.assert_not_awaited()
 
-def test_notify_users_correctivo_no_roles(db_session):
-    with patch("src.services.notificaciones.send_notification_correctivo", new=AsyncMock()) as mock_send:
-        asyncio.run(notif_service.notify_users_correctivo(db_session, 1, "msg"))
-        mock_send.assert_not_awaited()
+def test_notify_users_correctivo_no_roles(db_session, async_db_session):
+    with patch("src.services.notificaciones.notification_manager.send_notification", new=AsyncMock()) as mock_ws:
+        asyncio.run(notif_service.notify_users_correctivo(async_db_session, 1, "msg"))
+        mock_ws.assert_not_awaited()
+    assert db_session.query(Notificacion_Correctivo).count() == 0
 
-def test_notify_users_preventivo_no_roles(db_session):
-    with patch("src.services.notificaciones.send_notification_preventivo", new=AsyncMock()) as mock_send:
-        asyncio.run(notif_service.notify_users_preventivo(db_session, 1, "msg"))
-        mock_send.assert_not_awaited()
+def test_notify_users_preventivo_no_roles(db_session, async_db_session):
+    with patch("src.services.notificaciones.notification_manager.send_notification", new=AsyncMock()) as mock_ws:
+        asyncio.run(notif_service.notify_users_preventivo(async_db_session, 1, "msg"))
+        mock_ws.assert_not_awaited()
+    assert db_session.query(Notificacion_Preventivo).count() == 0
 
-def test_notify_nearby_maintenances_requires_auth(db_session):
+def test_notify_nearby_maintenances_requires_auth(db_session, async_db_session):
     with pytest.raises(HTTPException) as exc:
-        asyncio.run(notif_service.notify_nearby_maintenances(db_session, None, []))
+        asyncio.run(notif_service.notify_nearby_maintenances(async_db_session, None, []))
     assert exc.value.status_code == 401
 
 def test_get_notification_correctivo_empty(db_session):
@@ -214,24 +228,24 @@ def test_notificacion_preventivo_leida_not_found(db_session):
     with pytest.raises(AttributeError):
         notif_service.notificacion_preventivo_leida(db_session, 999)
 
-def test_send_notification_correctivo_duplicate(db_session):
+def test_send_notification_correctivo_duplicate(db_session, async_db_session):
     with patch(
         "src.services.notificaciones.notification_manager.send_notification",
         new=AsyncMock(),
     ) as mock_ws:
-        asyncio.run(notif_service.send_notification_correctivo(db_session, "uid", 1, "m"))
-        dup = asyncio.run(notif_service.send_notification_correctivo(db_session, "uid", 1, "m"))
+        asyncio.run(notif_service.send_notification_correctivo(async_db_session, "uid", 1, "m"))
+        dup = asyncio.run(notif_service.send_notification_correctivo(async_db_session, "uid", 1, "m"))
         assert dup is False
         assert db_session.query(Notificacion_Correctivo).count() == 1
         assert mock_ws.await_count == 1
 
-def test_send_notification_preventivo_duplicate(db_session):
+def test_send_notification_preventivo_duplicate(db_session, async_db_session):
     with patch(
         "src.services.notificaciones.notification_manager.send_notification",
         new=AsyncMock(),
     ) as mock_ws:
-        asyncio.run(notif_service.send_notification_preventivo(db_session, "uid", 1, "m"))
-        dup = asyncio.run(notif_service.send_notification_preventivo(db_session, "uid", 1, "m"))
+        asyncio.run(notif_service.send_notification_preventivo(async_db_session, "uid", 1, "m"))
+        dup = asyncio.run(notif_service.send_notification_preventivo(async_db_session, "uid", 1, "m"))
         assert dup is False
         assert db_session.query(Notificacion_Preventivo).count() == 1
         assert mock_ws.await_count == 1
@@ -247,3 +261,33 @@ def test_delete_notificaciones_no_match(db_session):
 def test_delete_notificacion_not_found(db_session):
     result = notif_service.delete_notificacion(db_session, 999)
     assert result == {"detail": "No se encontró la notificación"}
+
+def test_notify_users_correctivo_skips_already_notified(db_session, async_db_session):
+    db_session.add_all([
+        Usuario(email="a@example.com", rol="Encargado de Mantenimiento", firebase_uid="a"),
+        Usuario(email="b@example.com", rol="Encargado de Mantenimiento", firebase_uid="b"),
+        Notificacion_Correctivo(firebase_uid="a", id_mantenimiento=1, mensaje="m"),
+    ])
+    db_session.commit()
+
+    with patch("src.services.notificaciones.notification_manager.send_notification", new=AsyncMock()) as mock_ws:
+        asyncio.run(notif_service.notify_users_correctivo(async_db_session, 1, "m"))
+
+    assert [call.args[0] for call in mock_ws.await_args_list] == ["b"]
+    assert db_session.query(Notificacion_Correctivo).filter_by(firebase_uid="a").count() == 1
+
+def test_notify_users_preventivo_websocket_failure_keeps_rows(db_session, async_db_session):
+    db_session.add_all([
+        Usuario(email="a@example.com", rol="Encargado de Mantenimiento", firebase_uid="a"),
+        Usuario(email="b@example.com", rol="Encargado de Mantenimiento", firebase_uid="b"),
+    ])
+    db_session.commit()
+
+    with patch(
+        "src.services.notificaciones.notification_manager.send_notification",
+        new=AsyncMock(side_effect=[RuntimeError("socket cerrado"), None]),
+    ) as mock_ws:
+        asyncio.run(notif_service.notify_users_preventivo(async_db_session, 1, "m"))
+
+    assert mock_ws.await_count == 2
+    assert db_session.query(Notificacion_Preventivo).count() == 2
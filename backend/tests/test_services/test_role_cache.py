@@ -0,0 +1,83 @@
+import asyncio
+
+from src.api.models import CacheVersion, Usuario
+from src.api.schemas import Role, UserCreate, UserUpdate
+from src.config.database import async_engine
+from src.services import auth as auth_service
+from services.role_cache import ROLE_CACHE_KEY, RoleCache, bump_role_version, role_cache
+
+
+def _seed(db_session):
+    db_session.add_all([
+        Usuario(email="enc@example.com", rol=Role.ENCARGADO, firebase_uid="enc"),
+        Usuario(email="adm@example.com", rol=Role.ADMIN, firebase_uid="adm"),
+        Usuario(email="sin-uid@example.com", rol=Role.ENCARGADO),
+    ])
+    db_session.commit()
+
+
+def _version(db_session):
+    db_session.expire_all()
+    fila = db_session.get(CacheVersion, ROLE_CACHE_KEY)
+    return fila.version if fila else 0
+
+
+def test_steady_state_skips_usuario_queries(db_session, async_db_session, query_counter):
+    _seed(db_session)
+    assert asyncio.run(role_cache.get_uids(async_db_session, [Role.ENCARGADO, Role.ADMIN])) == ["enc", "adm"]
+
+    with query_counter(async_engine.sync_engine) as statements:
+        assert asyncio.run(role_cache.get_uids(async_db_session, [Role.ENCARGADO])) == ["enc"]
+
+    assert not any("usuario" in statement for statement in statements)
+    assert role_cache.stats()["hits"] == 1
+    assert role_cache.stats()["misses"] == 1
+
+
+def test_other_worker_reloads_after_role_change(db_session, async_db_session):
+    _seed(db_session)
+    otro_worker = RoleCache()
+    assert asyncio.run(otro_worker.get_uids(async_db_session, [Role.ADMIN])) == ["adm"]
+
+    enc = db_session.query(Usuario).filter_by(firebase_uid="enc").one()
+    auth_service.update_firebase_user(enc.id, UserUpdate(rol=Role.ADMIN), db_session, {"type": "usuario", "data": {"rol": Role.ADMIN}})
+
+    assert sorted(asyncio.run(otro_worker.get_uids(async_db_session, [Role.ADMIN]))) == ["adm", "enc"]
+    assert otro_worker.stats()["misses"] == 2
+
+
+def test_user_create_and_delete_bump_version(db_session, monkeypatch):
+    monkeypatch.setattr(auth_service.auth, "delete_user", lambda uid: None)
+    monkeypatch.setenv("E2E_TESTING", "true")
+    current = {"type": "usuario", "data": {"rol": Role.ADMIN}}
+
+    user = auth_service.create_firebase_user(
+        UserCreate(nombre="N", email="n@example.com", rol=Role.ENCARGADO, id_token="t"), db_session, current, "t"
+    )
+    assert _version(db_session) == 1
+
+    auth_service.delete_firebase_user(user.id, db_session, current)
+    assert _version(db_session) == 2
+
+
+def test_name_change_keeps_version(db_session):
+    _seed(db_session)
+    enc = db_session.query(Usuario).filter_by(firebase_uid="enc").one()
+
+    auth_service.update_firebase_user(enc.id, UserUpdate(nombre="Otro"), db_session, {"type": "usuario", "data": {"rol": Role.ADMIN}})
+
+    assert _version(db_session) == 0
+
+
+def test_bump_role_version_upserts_the_counter(db_session, query_counter):
+    with query_counter() as statements:
+        bump_role_version(db_session)
+        db_session.commit()
+        bump_role_version(db_session)
+        db_session.commit()
+
+    assert _version(db_session) == 2
+    # Crear la fila y sumarle uno es la misma sentencia: no hay carrera entre un UPDATE vacío y el INSERT.
+    escrituras = [s for s in statements if s.lstrip().upper().startswith(("INSERT", "UPDATE"))]
+    assert len(escrituras) == 2
+    assert all("ON CONFLICT" in s for s in escrituras)
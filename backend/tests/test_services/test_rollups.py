@@ -0,0 +1,182 @@
+import asyncio
+from datetime import date
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException
+
+from src.api.models import Cliente, Cuadrilla, MantenimientoCorrectivo, MantenimientoPreventivo, MantenimientoRollupDiario, Sucursal
+from src.services import mantenimientos_correctivos as mc
+from src.services import rollups
+
+
+@pytest.fixture
+def base(db_session):
+    cliente = Cliente(nombre="ACME", contacto="Jane", email="acme@example.com")
+    db_session.add(cliente)
+    db_session.flush()
+    norte = Sucursal(nombre="Norte 1", zona="Norte", direccion="Dir", superficie="100", cliente_id=cliente.id, frecuencia_preventivo="Mensual")
+    sur = Sucursal(nombre="Sur 1", zona="Sur", direccion="Dir", superficie="100", cliente_id=cliente.id)
+    cuadrilla = Cuadrilla(nombre="C1", zona="Norte", email="c1@example.com", firebase_uid="uid-1")
+    db_session.add_all([norte, sur, cuadrilla])
+    db_session.commit()
+    return {"cliente": cliente, "norte": norte, "sur": sur, "cuadrilla": cuadrilla}
+
+
+@pytest.fixture
+def integrations(monkeypatch):
+    monkeypatch.setattr(mc, "notify_user", AsyncMock())
+    monkeypatch.setattr(mc, "notify_users_correctivo", AsyncMock())
+    monkeypatch.setattr(mc, "GOOGLE_CLOUD_BUCKET_NAME", "test-bucket")
+
+
+def _buckets(db_session):
+    rows = db_session.query(MantenimientoRollupDiario).filter(MantenimientoRollupDiario.cantidad != 0).all()
+    return sorted((r.tipo, r.dia, r.zona, r.cantidad, r.cerrados, r.dias_resolucion) for r in rows)
+
+
+def _create(async_db_session, base, sucursal, fecha):
+    return asyncio.run(
+        mc.create_mantenimiento_correctivo(
+            async_db_session, base["cliente"].id, sucursal.id, base["cuadrilla"].id, fecha,
+            "NC", "Incidente", "Otros", "Pendiente", "Media", {"type": "usuario"},
+        )
+    )
+
+
+def test_create_update_delete_keep_rollup_in_sync(db_session, async_db_session, base, integrations):
+    m = _create(async_db_session, base, base["norte"], date(2024, 1, 1))
+    _create(async_db_session, base, base["norte"], date(2024, 1, 1))
+    assert _buckets(db_session) == [("correctivo", date(2024, 1, 1), "Norte", 2, 0, 0)]
+
+    asyncio.run(
+        mc.update_mantenimiento_correctivo(
+            async_db_session, m.id, {"type": "usuario"}, sucursal_id=base["sur"].id,
+            fecha_cierre=date(2024, 1, 4), estado="Finalizado",
+        )
+    )
+    assert _buckets(db_session) == [
+        ("correctivo", date(2024, 1, 1), "Norte", 1, 0, 0),
+        ("correctivo", date(2024, 1, 1), "Sur", 1, 1, 3),
+    ]
+
+    mc.delete_mantenimiento_correctivo(db_session, m.id, {"type": "usuario"})
+    assert _buckets(db_session) == [("correctivo", date(2024, 1, 1), "Norte", 1, 0, 0)]
+
+
+def test_rebuild_matches_incremental_rollup(db_session, async_db_session, base, integrations):
+    m = _create(async_db_session, base, base["norte"], date(2024, 1, 1))
+    _create(async_db_session, base, base["sur"], date(2024, 3, 2))
+    asyncio.run(
+        mc.update_mantenimiento_correctivo(async_db_session, m.id, {"type": "usuario"}, fecha_cierre=date(2024, 1, 11), estado="Finalizado")
+    )
+    db_session.add(
+        MantenimientoPreventivo(
+            cliente_id=base["cliente"].id, sucursal_id=base["norte"].id, frecuencia="Mensual",
+            id_cuadrilla=base["cuadrilla"].id, fecha_apertura=date(2024, 1, 1), fecha_cierre=date(2024, 1, 2),
+        )
+    )
+    db_session.commit()
+
+    incremental = [b for b in _buckets(db_session) if b[0] == "correctivo"]
+    assert rollups.rebuild_rollups(db_session) == 3
+    rebuilt = _buckets(db_session)
+    assert [b for b in rebuilt if b[0] == "correctivo"] == incremental
+    assert ("preventivo", date(2024, 1, 1), "Norte", 1, 1, 1) in rebuilt
+
+
+def test_registrar_cambio_upserts_one_bucket_with_null_keys(db_session, base):
+    c = rollups.Contribucion(
+        dia=date(2024, 1, 1), zona=None, id_cuadrilla=None, cliente_id=base["cliente"].id,
+        tipo="correctivo", cerrado=True, dias_resolucion=2,
+    )
+    rollups.registrar_cambio(db_session, None, c)
+    rollups.registrar_cambio(db_session, None, c)
+    rollups.registrar_cambio(db_session, c, None)
+    db_session.commit()
+
+    rows = db_session.query(MantenimientoRollupDiario).all()
+    assert [(r.zona, r.id_cuadrilla, r.cantidad, r.cerrados, r.dias_resolucion) for r in rows] == [(None, None, 1, 1, 2)]
+
+
+def test_get_kpis_groups_by_month_and_zona(db_session, base):
+    for dia, zona, cantidad, cerrados, dias in (
+        (date(2023, 12, 31), "Norte", 2, 1, 4),
+        (date(2024, 1, 5), "Norte", 3, 2, 10),
+        (date(2024, 1, 20), "Sur", 1, 1, 2),
+    ):
+        db_session.add(
+            MantenimientoRollupDiario(
+                dia=dia, zona=zona, cliente_id=base["cliente"].id, tipo="correctivo",
+                cantidad=cantidad, cerrados=cerrados, dias_resolucion=dias,
+            )
+        )
+    db_session.commit()
+
+    assert rollups.get_kpis(db_session, "mes") == [
+        {"clave": "2023-12", "cantidad": 2, "cerrados": 1, "promedio_dias_resolucion": 4.0},
+        {"clave": "2024-01", "cantidad": 4, "cerrados": 3, "promedio_dias_resolucion": 4.0},
+    ]
+    assert rollups.get_kpis(db_session, "zona", desde=date(2024, 1, 1)) == [
+        {"clave": "Norte", "cantidad": 3, "cerrados": 2, "promedio_dias_resolucion": 5.0},
+        {"clave": "Sur", "cantidad": 1, "cerrados": 1, "promedio_dias_resolucion": 2.0},
+    ]
+
+
+def test_get_kpis_rejects_unknown_grouping(db_session):
+    with pytest.raises(HTTPException) as exc:
+        rollups.get_kpis(db_session, "rubro")
+    assert exc.value.status_code == 400
+
+
+def test_failure_after_notify_keeps_row_and_rollup_together(db_session, async_db_session, base, integrations, monkeypatch):
+    m_id = _create(async_db_session, base, base["norte"], date(2024, 1, 1)).id
+
+    # El notify real confirma la sesión que recibe; el fallo llega después, al encolar el job de Sheets.
+    async def _notify_commits(db_session, **kwargs):
+        await db_session.commit()
+
+    def _falla(*args, **kwargs):
+        raise RuntimeError("outbox caído")
+
+    monkeypatch.setattr(mc, "notify_users_correctivo", AsyncMock(side_effect=_notify_commits))
+    monkeypatch.setattr(mc, "enqueue_sheet_sync", _falla)
+    with pytest.raises(RuntimeError):
+        asyncio.run(
+            mc.update_mantenimiento_correctivo(
+                async_db_session, m_id, {"type": "usuario"}, fecha_cierre=date(2024, 1, 4), estado="Solucionado",
+            )
+        )
+    asyncio.run(async_db_session.rollback())
+
+    db_session.expire_all()
+    assert db_session.get(MantenimientoCorrectivo, m_id).fecha_cierre is None
+    assert _buckets(db_session) == [("correctivo", date(2024, 1, 1), "Norte", 1, 0, 0)]
+
+
+def test_sucursal_zona_change_moves_its_buckets(db_session, async_db_session, base, integrations):
+    from src.services import sucursales
+
+    m = _create(async_db_session, base, base["norte"], date(2024, 1, 5))
+    cerrado = _create(async_db_session, base, base["norte"], date(2024, 1, 5))
+    asyncio.run(
+        mc.update_mantenimiento_correctivo(
+            async_db_session, cerrado.id, {"type": "usuario"}, fecha_cierre=date(2024, 1, 7), estado="Finalizado",
+        )
+    )
+
+    sucursales.update_sucursal(db_session, base["norte"].id, {"type": "usuario"}, zona="Sur")
+    assert _buckets(db_session) == [("correctivo", date(2024, 1, 5), "Sur", 2, 1, 2)]
+
+    # Una edición posterior resta y suma sobre la zona nueva: no quedan buckets negativos en ninguna.
+    asyncio.run(
+        mc.update_mantenimiento_correctivo(async_db_session, m.id, {"type": "usuario"}, fecha_apertura=date(2024, 2, 1))
+    )
+    esperado = [
+        ("correctivo", date(2024, 1, 5), "Sur", 1, 1, 2),
+        ("correctivo", date(2024, 2, 1), "Sur", 1, 0, 0),
+    ]
+    assert _buckets(db_session) == esperado
+    assert db_session.query(MantenimientoRollupDiario).filter(MantenimientoRollupDiario.cantidad < 0).count() == 0
+    rollups.rebuild_rollups(db_session)
+    assert _buckets(db_session) == esperado
@@ -0,0 +1,129 @@
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException
+
+from src.api.models import Cliente, Cuadrilla, MantenimientoCorrectivo, SheetIndexEstado, SheetRowIndex, Sucursal
+from src.services import sheet_export, sheet_outbox
+
+
+@pytest.fixture
+def correctivos(db_session):
+    cliente = Cliente(nombre="ACME", contacto="Jane", email="acme@example.com")
+    db_session.add(cliente)
+    db_session.flush()
+    sucursal = Sucursal(nombre="Central", zona="Norte", direccion="Dir", superficie="100", cliente_id=cliente.id)
+    cuadrilla = Cuadrilla(nombre="C1", zona="Norte", email="c1@example.com", firebase_uid="uid-1")
+    db_session.add_all([sucursal, cuadrilla])
+    db_session.flush()
+    for _ in range(3):
+        db_session.add(
+            MantenimientoCorrectivo(
+                cliente_id=cliente.id,
+                sucursal_id=sucursal.id,
+                id_cuadrilla=cuadrilla.id,
+                fecha_apertura=date(2024, 1, 1),
+                numero_caso="NC",
+                incidente="Incidente",
+                rubro="Rubro",
+                estado="Pendiente",
+                prioridad="Alta",
+            )
+        )
+    db_session.commit()
+    return db_session.query(MantenimientoCorrectivo).order_by(MantenimientoCorrectivo.id).all()
+
+
+def test_export_sheet_rebuilds_sheet_and_row_index(db_session, correctivos, monkeypatch, query_counter):
+    worksheet = MagicMock(id=1, row_count=2)
+    monkeypatch.setattr(sheet_export.google_sheets, "_get_worksheet", lambda _: worksheet)
+    monkeypatch.setattr(sheet_export.google_sheets, "list_galleries", lambda _: set())
+    db_session.expire_all()
+
+    with query_counter() as statements:
+        total = sheet_export.export_sheet(db_session, "correctivo")
+
+    assert total == 3
+    values = worksheet.update.call_args.kwargs["values"]
+    assert [row[:3] for row in values[1:]] == [["ACME", "Central", "C1"]] * 3
+    # Fuera del chequeo del lease, los mantenimientos se leen en un solo SELECT con sus relaciones.
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT") and "FROM mantenimiento_correctivo" in s]
+    assert len(selects) == 1
+    index = {r.mantenimiento_id: r.fila for r in db_session.query(SheetRowIndex).filter_by(tipo="correctivo")}
+    assert index == {m.id: fila for fila, m in enumerate(correctivos, start=2)}
+
+
+def test_drainer_waits_for_export_to_finish(db_session, correctivos, monkeypatch):
+    sheet_outbox.enqueue_sheet_sync(db_session, "correctivo", "update", correctivos[0].id)
+    db_session.commit()
+    escrituras = []
+
+    def sync_worksheet(tipo, upserts, delete_ids, rows_by_token):
+        escrituras.append(([m.id for m in upserts], rows_by_token))
+        return sheet_outbox.google_sheets.SheetSyncResult(None, [], [])
+
+    monkeypatch.setattr(sheet_outbox.google_sheets, "sync_worksheet", sync_worksheet)
+    reconcile = MagicMock()
+    monkeypatch.setattr(sheet_outbox.sheet_row_index, "reconcile", reconcile)
+    drenados = []
+
+    def export_worksheet(tipo, mantenimientos):
+        rows = {str(m.id): fila for fila, m in enumerate(mantenimientos, start=2)}
+        # Otro worker drena en medio de la reescritura de la hoja.
+        drenados.append(sheet_outbox.drain_sheet_outbox())
+        return rows
+
+    monkeypatch.setattr(sheet_export.google_sheets, "export_worksheet", export_worksheet)
+
+    assert sheet_export.export_sheet(db_session, "correctivo") == 3
+
+    assert drenados == [0]
+    assert escrituras == []
+    assert [tipo for (_, tipo), _ in reconcile.call_args_list] == ["preventivo"]
+    assert db_session.query(SheetIndexEstado).filter_by(tipo="correctivo").one().exportando_hasta is None
+
+    # Liberada la hoja, el job se escribe contra el índice que dejó la exportación.
+    assert sheet_outbox.drain_sheet_outbox() == 1
+    assert escrituras == [([correctivos[0].id], {str(m.id): fila for fila, m in enumerate(correctivos, start=2)})]
+
+
+def test_export_refused_while_a_drainer_holds_jobs(db_session, correctivos, monkeypatch):
+    job = sheet_outbox.enqueue_sheet_sync(db_session, "correctivo", "update", correctivos[0].id)
+    job.procesando_hasta = datetime.utcnow() + timedelta(minutes=5)
+    job.reclamado_por = "otro-drainer"
+    db_session.commit()
+    export_worksheet = MagicMock()
+    monkeypatch.setattr(sheet_export.google_sheets, "export_worksheet", export_worksheet)
+
+    with pytest.raises(HTTPException) as exc:
+        sheet_export.export_sheet(db_session, "correctivo")
+
+    assert exc.value.status_code == 409
+    export_worksheet.assert_not_called()
+    estado = db_session.query(SheetIndexEstado).filter_by(tipo="correctivo").one_or_none()
+    assert estado is None or estado.exportando_hasta is None
+
+
+def test_failed_export_releases_the_sheet_and_marks_index_stale(db_session, correctivos, monkeypatch):
+    monkeypatch.setattr(sheet_export.google_sheets, "export_worksheet", MagicMock(side_effect=RuntimeError("quota")))
+
+    with pytest.raises(RuntimeError):
+        sheet_export.export_sheet(db_session, "correctivo")
+
+    estado = db_session.query(SheetIndexEstado).filter_by(tipo="correctivo").one()
+    assert estado.exportando_hasta is None
+    assert estado.reconciliado_en is None
+
+
+def test_export_sheets_requires_admin(db_session):
+    with pytest.raises(HTTPException) as exc:
+        sheet_export.export_sheets(db_session, {"type": "cuadrilla", "data": {"id": 1}})
+    assert exc.value.status_code == 403
+
+
+def test_export_sheets_rejects_unknown_tipo(db_session):
+    admin = {"type": "usuario", "data": {"id": 1, "rol": "Administrador"}}
+    with pytest.raises(HTTPException) as exc:
+        sheet_export.export_sheets(db_session, admin, "otro")
+    assert exc.value.status_code == 400
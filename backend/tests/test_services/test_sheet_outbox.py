@@ -0,0 +1,189 @@
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+from gspread.exceptions import APIError
+
+from src.api.models import Cliente, MantenimientoCorrectivo, SheetSyncOutbox, Sucursal
+from src.services import sheet_outbox
+
+
+@pytest.fixture
+def correctivo(db_session):
+    cliente = Cliente(nombre="ACME", contacto="Jane", email="acme@example.com")
+    db_session.add(cliente)
+    db_session.flush()
+    sucursal = Sucursal(nombre="Central", zona="Norte", direccion="Dir", superficie="100", cliente_id=cliente.id)
+    db_session.add(sucursal)
+    db_session.flush()
+    record = MantenimientoCorrectivo(
+        cliente_id=cliente.id, sucursal_id=sucursal.id, fecha_apertura=date(2024, 1, 1),
+        numero_caso="NC-1", incidente="Incidente", rubro="Otros", estado="Pendiente", prioridad="Media",
+    )
+    db_session.add(record)
+    db_session.commit()
+    return record
+
+
+@pytest.fixture
+def sync(monkeypatch):
+    mock = MagicMock(return_value=sheet_outbox.google_sheets.SheetSyncResult(None, [], []))
+    monkeypatch.setattr(sheet_outbox.google_sheets, "sync_worksheet", mock)
+    return mock
+
+
+def _api_error(code, message):
+    return APIError(MagicMock(json=lambda: {"error": {"code": code, "message": message, "status": ""}}))
+
+
+def _jobs(db_session):
+    return db_session.query(SheetSyncOutbox).order_by(SheetSyncOutbox.id).all()
+
+
+def _enqueue(db_session, *jobs):
+    for tipo, operacion, mantenimiento_id in jobs:
+        sheet_outbox.enqueue_sheet_sync(db_session, tipo, operacion, mantenimiento_id)
+    db_session.commit()
+
+
+def test_enqueue_rejects_unknown_operation(db_session):
+    with pytest.raises(ValueError):
+        sheet_outbox.enqueue_sheet_sync(db_session, "correctivo", "upsert", 1)
+
+
+def test_process_coalesces_jobs_into_one_write_per_worksheet(db_session, correctivo, sync):
+    _enqueue(
+        db_session,
+        ("correctivo", "append", correctivo.id),
+        ("correctivo", "update", correctivo.id),
+        ("correctivo", "update", correctivo.id),
+        ("correctivo", "append", 98),
+        ("correctivo", "delete", 98),
+        ("correctivo", "delete", 99),
+    )
+
+    assert sheet_outbox.process_sheet_outbox(db_session) == 6
+
+    sync.assert_called_once()
+    tipo, upserts, delete_ids, rows_by_token = sync.call_args.args
+    assert tipo == "correctivo"
+    assert rows_by_token is None
+    assert [m.id for m in upserts] == [correctivo.id]
+    assert delete_ids == [98, 99]
+    assert _jobs(db_session) == []
+
+
+def test_failed_flush_backs_off_every_job_of_the_worksheet(db_session, correctivo, sync):
+    error = _api_error(429, "quota exceeded")
+    sync.side_effect = error
+    _enqueue(db_session, ("correctivo", "append", correctivo.id), ("correctivo", "delete", 99))
+    now = datetime.utcnow() + timedelta(seconds=1)
+
+    assert sheet_outbox.process_sheet_outbox(db_session, now=now) == 0
+
+    jobs = _jobs(db_session)
+    assert [(job.intentos, job.ultimo_error) for job in jobs] == [(1, str(error))] * 2
+    assert all(job.proximo_intento == now + timedelta(seconds=sheet_outbox.SHEET_SYNC_BACKOFF_SECONDS) for job in jobs)
+
+    sync.side_effect = None
+    _enqueue(db_session, ("correctivo", "update", correctivo.id))
+    assert sheet_outbox.process_sheet_outbox(db_session, now=now) == 0
+    sync.assert_called_once()
+
+    assert sheet_outbox.process_sheet_outbox(db_session, now=jobs[0].proximo_intento) == 3
+    assert _jobs(db_session) == []
+
+
+def test_jobs_leased_by_another_drainer_are_skipped_until_the_lease_expires(db_session, correctivo, sync):
+    _enqueue(db_session, ("correctivo", "update", correctivo.id))
+    now = datetime.utcnow() + timedelta(seconds=1)
+    (job,) = _jobs(db_session)
+    job.procesando_hasta = now + timedelta(seconds=60)
+    job.reclamado_por = "otro-worker"
+    db_session.commit()
+
+    assert sheet_outbox.process_sheet_outbox(db_session, now=now) == 0
+    sync.assert_not_called()
+
+    assert sheet_outbox.process_sheet_outbox(db_session, now=now + timedelta(seconds=60)) == 1
+    assert _jobs(db_session) == []
+
+
+def test_due_jobs_are_not_starved_by_older_jobs_in_backoff(db_session, correctivo, sync):
+    _enqueue(db_session, ("correctivo", "update", 98), ("correctivo", "update", correctivo.id))
+    now = datetime.utcnow() + timedelta(seconds=1)
+    atrasado = _jobs(db_session)[0]
+    atrasado.proximo_intento = now + timedelta(hours=1)
+    db_session.commit()
+
+    assert sheet_outbox.process_sheet_outbox(db_session, batch_size=1, now=now) == 1
+    assert [m.id for m in sync.call_args.args[1]] == [correctivo.id]
+    assert [job.mantenimiento_id for job in _jobs(db_session)] == [98]
+
+
+def test_row_error_only_charges_the_offending_maintenance(db_session, correctivo, sync):
+    def _rechazar_99(tipo, upserts, delete_ids, rows_by_token):
+        if 99 in delete_ids:
+            raise _api_error(400, "Invalid requests[0].deleteDimension")
+        return sheet_outbox.google_sheets.SheetSyncResult(None, [], [])
+
+    sync.side_effect = _rechazar_99
+    _enqueue(
+        db_session,
+        ("correctivo", "update", correctivo.id),
+        ("correctivo", "delete", 97),
+        ("correctivo", "delete", 98),
+        ("correctivo", "delete", 99),
+    )
+
+    assert sheet_outbox.process_sheet_outbox(db_session) == 3
+
+    (job,) = _jobs(db_session)
+    assert (job.mantenimiento_id, job.intentos, job.procesando_hasta) == (99, 1, None)
+    assert all(call.args[3] is None for call in sync.call_args_list[1:])
+
+
+def test_job_is_marked_failed_after_max_attempts(db_session, correctivo, sync, monkeypatch):
+    monkeypatch.setattr(sheet_outbox, "SHEET_SYNC_MAX_ATTEMPTS", 2)
+    sync.side_effect = RuntimeError("boom")
+    _enqueue(db_session, ("correctivo", "update", correctivo.id))
+
+    now = datetime.utcnow() + timedelta(seconds=1)
+    for day in range(3):
+        sheet_outbox.process_sheet_outbox(db_session, now=now + timedelta(days=day))
+
+    (job,) = _jobs(db_session)
+    assert job.estado == sheet_outbox.ESTADO_FALLIDO
+    assert job.intentos == 2
+    assert sync.call_count == 2
+
+
+def test_update_for_deleted_record_is_dropped(db_session, sync):
+    _enqueue(db_session, ("correctivo", "update", 12345))
+
+    assert sheet_outbox.process_sheet_outbox(db_session) == 1
+    sync.assert_called_once_with("correctivo", [], [], None)
+    assert _jobs(db_session) == []
+
+
+def test_process_uses_persisted_row_index_once_reconciled(db_session, correctivo, sync):
+    sheet_outbox.sheet_row_index.replace_rows(db_session, "correctivo", {str(correctivo.id): 2})
+    db_session.commit()
+    sync.return_value = sheet_outbox.google_sheets.SheetSyncResult(None, [], [("77", 3)])
+    _enqueue(db_session, ("correctivo", "update", correctivo.id))
+
+    sheet_outbox.process_sheet_outbox(db_session)
+
+    assert sync.call_args.args[3] == {str(correctivo.id): 2}
+    assert sheet_outbox.sheet_row_index.load_rows(db_session, "correctivo") == {str(correctivo.id): 2, "77": 3}
+
+
+def test_failed_flush_marks_row_index_stale(db_session, correctivo, sync):
+    sheet_outbox.sheet_row_index.replace_rows(db_session, "correctivo", {})
+    db_session.commit()
+    sync.side_effect = RuntimeError("boom")
+    _enqueue(db_session, ("correctivo", "update", correctivo.id))
+
+    sheet_outbox.process_sheet_outbox(db_session)
+
+    assert sheet_outbox.sheet_row_index.needs_reconcile(db_session, "correctivo")
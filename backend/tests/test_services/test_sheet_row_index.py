@@ -0,0 +1,68 @@
+from unittest.mock import MagicMock
+
+from src.api.models import SheetIndexEstado, SheetRowIndex
+from src.services import sheet_row_index
+from src.services.google_sheets import SheetSyncResult
+
+
+def test_replace_rows_ignores_foreign_tokens_and_marks_reconciled(db_session):
+    assert sheet_row_index.needs_reconcile(db_session, "correctivo")
+    sheet_row_index.replace_rows(db_session, "correctivo", {"1": 2, "abc": 3, "4": 5})
+    db_session.commit()
+
+    assert sheet_row_index.load_rows(db_session, "correctivo") == {"1": 2, "4": 5}
+    assert not sheet_row_index.needs_reconcile(db_session, "correctivo")
+
+
+def test_reconcile_state_is_shared_through_the_database(db_session, monkeypatch):
+    sheet_row_index.replace_rows(db_session, "correctivo", {"1": 2})
+    db_session.commit()
+    assert not sheet_row_index.needs_reconcile(db_session, "correctivo")
+
+    sheet_row_index.mark_stale(db_session, "correctivo")
+    db_session.commit()
+    assert db_session.get(SheetIndexEstado, "correctivo").reconciliado_en is None
+    assert sheet_row_index.needs_reconcile(db_session, "correctivo")
+
+    sheet_row_index.replace_rows(db_session, "correctivo", {"1": 2})
+    db_session.commit()
+    monkeypatch.setattr(sheet_row_index, "SHEET_INDEX_RECONCILE_SECONDS", 0)
+    assert sheet_row_index.needs_reconcile(db_session, "correctivo")
+
+
+def test_apply_sync_result_shifts_rows_after_deletes(db_session):
+    sheet_row_index.replace_rows(db_session, "correctivo", {"1": 2, "2": 3, "3": 4, "4": 5, "5": 6})
+    db_session.commit()
+
+    sheet_row_index.apply_sync_result(db_session, "correctivo", SheetSyncResult(None, [5, 3], [("9", 5)]))
+    db_session.commit()
+
+    assert sheet_row_index.load_rows(db_session, "correctivo") == {"1": 2, "3": 3, "5": 4, "9": 5}
+
+
+def test_apply_sync_result_with_snapshot_replaces_index(db_session):
+    sheet_row_index.replace_rows(db_session, "correctivo", {"1": 10})
+    db_session.commit()
+
+    sheet_row_index.apply_sync_result(db_session, "correctivo", SheetSyncResult({"1": 2, "2": 3}, [3], None))
+    db_session.commit()
+
+    assert sheet_row_index.load_rows(db_session, "correctivo") == {"1": 2}
+    assert sheet_row_index.needs_reconcile(db_session, "correctivo")
+
+
+def test_reconcile_reads_tracking_column(db_session, monkeypatch):
+    read = MagicMock(return_value={"7": 2})
+    monkeypatch.setattr(sheet_row_index.google_sheets, "read_tracking_rows", read)
+
+    assert sheet_row_index.reconcile(db_session, "correctivo") is True
+
+    read.assert_called_once_with("correctivo")
+    assert db_session.query(SheetRowIndex).count() == 1
+    assert not sheet_row_index.needs_reconcile(db_session, "correctivo")
+
+
+def test_reconcile_without_sheet_keeps_index(db_session, monkeypatch):
+    monkeypatch.setattr(sheet_row_index.google_sheets, "read_tracking_rows", MagicMock(return_value=None))
+    assert sheet_row_index.reconcile(db_session, "correctivo") is False
+    assert sheet_row_index.needs_reconcile(db_session, "correctivo")
@@ -0,0 +1,36 @@
+import io
+
+import pytest
+
+from src.services import thumbnails
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, format="JPEG")
+    buffer.seek(0)
+    return buffer
+
+
+def test_variant_url_uses_sibling_prefix():
+    url = "https://storage.googleapis.com/b/mantenimientos_correctivos/1/fotos/abc.jpg"
+    assert thumbnails.variant_url(url, "thumb") == "https://storage.googleapis.com/b/mantenimientos_correctivos/1/fotos_thumb/abc.jpg"
+
+
+def test_build_variants_downscales_to_each_size():
+    file = _jpeg(4000, 3000)
+
+    variantes = thumbnails.build_variants(file)
+
+    assert set(variantes) == {"thumb", "web"}
+    for variante, (contenido, content_type) in variantes.items():
+        assert content_type == "image/jpeg"
+        with Image.open(io.BytesIO(contenido)) as image:
+            assert max(image.size) == thumbnails.VARIANTES[variante]
+    assert file.tell() == 0
+
+
+def test_build_variants_ignores_non_images():
+    assert thumbnails.build_variants(io.BytesIO(b"%PDF-1.4")) == {}
@@ -0,0 +1,73 @@
+import time
+
+from src.services.token_cache import TokenCache
+
+
+def _entity(entity_type="usuario", entity_id=1):
+    return {"type": entity_type, "data": {"id": entity_id, "uid": f"uid-{entity_id}"}}
+
+
+def test_token_cache_hit_and_miss_counters():
+    cache = TokenCache(ttl_seconds=60, max_size=10)
+
+    assert cache.get("token") is None
+    cache.set("token", _entity())
+    assert cache.get("token") == _entity()
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+def test_token_cache_respects_token_exp():
+    cache = TokenCache(ttl_seconds=60, max_size=10)
+
+    cache.set("expired", _entity(), token_exp=time.time() - 1)
+    cache.set("short", _entity(), token_exp=time.time() + 0.05)
+
+    assert cache.get("expired") is None
+    assert cache.get("short") == _entity()
+    time.sleep(0.1)
+    assert cache.get("short") is None
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(ttl_seconds=60, max_size=2)
+
+    cache.set("a", _entity(entity_id=1))
+    cache.set("b", _entity(entity_id=2))
+    cache.get("a")
+    cache.set("c", _entity(entity_id=3))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_token_cache_invalidate_entity():
+    cache = TokenCache(ttl_seconds=60, max_size=10)
+
+    cache.set("user-token", _entity("usuario", 1))
+    cache.set("cuadrilla-token", _entity("cuadrilla", 1))
+    cache.invalidate_entity("cuadrilla", 1)
+
+    assert cache.get("user-token") is not None
+    assert cache.get("cuadrilla-token") is None
+
+
+def test_token_cache_ignores_entries_from_another_version():
+    cache = TokenCache(ttl_seconds=60, max_size=10)
+
+    cache.set("token", _entity(), version=1)
+
+    assert cache.get("token", version=1) == _entity()
+    assert cache.get("token", version=2) is None
+    # La entrada vieja se descarta: volver a la versión anterior no la revive.
+    assert cache.get("token", version=1) is None
+
+
+def test_token_cache_does_not_store_raw_token():
+    cache = TokenCache(ttl_seconds=60, max_size=10)
+    cache.set("secret-token", _entity())
+    assert "secret-token" not in cache._entries
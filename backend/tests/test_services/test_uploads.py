@@ -0,0 +1,224 @@
+import asyncio
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import HTTPException
+
+from src.api.models import (
+    Cliente,
+    MantenimientoCorrectivo,
+    MantenimientoPreventivo,
+    MantenimientoPreventivoFoto,
+    MantenimientoPreventivoPlanilla,
+    SheetSyncOutbox,
+    Sucursal,
+)
+from src.api.schemas import UploadConfirmacion, UploadUrlRequest
+from src.services import uploads
+
+USUARIO = {"type": "usuario", "data": {"uid": "admin"}}
+CUADRILLA = {"type": "cuadrilla", "data": {"uid": "c1"}}
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.public_url = f"https://storage.googleapis.com/test-bucket/{name}"
+
+    def generate_signed_url(self, **kwargs):
+        self.bucket.firmas.append((self.name, kwargs))
+        return f"{kwargs.get('api_access_endpoint', 'https://storage.googleapis.com')}/test-bucket/{self.name}?X-Goog-Signature=fake"
+
+    def exists(self):
+        return self.name in self.bucket.objetos
+
+
+class FakeBucket:
+    """Stand-in for a fake-gcs-server bucket: the client PUTs into `objetos`."""
+
+    def __init__(self):
+        self.objetos = {}
+        self.firmas = []
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def put(self, name, data=b"data"):
+        self.objetos[name] = data
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = FakeBucket()
+    monkeypatch.setattr(uploads, "get_bucket", lambda name: bucket)
+    monkeypatch.setattr(uploads, "GOOGLE_CLOUD_BUCKET_NAME", "test-bucket")
+    monkeypatch.setattr(uploads, "STORAGE_EMULATOR_HOST", None)
+    return bucket
+
+
+@pytest.fixture
+def background(monkeypatch):
+    patches = {"gallery": MagicMock(), "variants": MagicMock()}
+    monkeypatch.setattr(uploads, "schedule_gallery", patches["gallery"])
+    monkeypatch.setattr(uploads, "submit_to_gcs_executor", patches["variants"])
+    return patches
+
+
+@pytest.fixture
+def mantenimientos(db_session):
+    cliente = Cliente(nombre="ACME", contacto="Jane", email="acme@example.com")
+    db_session.add(cliente)
+    db_session.flush()
+    sucursal = Sucursal(nombre="Central", zona="Norte", direccion="Dir", superficie="100", cliente_id=cliente.id)
+    db_session.add(sucursal)
+    db_session.flush()
+    preventivo = MantenimientoPreventivo(
+        cliente_id=cliente.id, sucursal_id=sucursal.id, frecuencia="Mensual", fecha_apertura=date(2024, 1, 1), estado="Pendiente"
+    )
+    correctivo = MantenimientoCorrectivo(
+        cliente_id=cliente.id,
+        sucursal_id=sucursal.id,
+        fecha_apertura=date(2024, 1, 1),
+        numero_caso="1",
+        incidente="Falla",
+        rubro="Otros",
+        prioridad="Alta",
+        estado="Pendiente",
+    )
+    db_session.add_all([preventivo, correctivo])
+    db_session.commit()
+    return {"preventivo": preventivo, "correctivo": correctivo}
+
+
+def _firmar(db_session, tipo, mantenimiento_id, carpeta, current_entity=USUARIO):
+    solicitud = UploadUrlRequest(
+        tipo=tipo, mantenimiento_id=mantenimiento_id, carpeta=carpeta, filename="Foto.JPG", content_type="image/jpeg"
+    )
+    return uploads.create_upload_url(db_session, solicitud, current_entity)
+
+
+def test_create_upload_url_signs_put_inside_the_folder(db_session, mantenimientos, bucket):
+    preventivo = mantenimientos["preventivo"]
+
+    result = _firmar(db_session, "preventivo", preventivo.id, "fotos")
+
+    assert result["method"] == "PUT"
+    assert result["headers"] == {"Content-Type": "image/jpeg"}
+    assert result["object_name"].startswith(f"mantenimientos_preventivos/{preventivo.id}/fotos/")
+    assert result["object_name"].endswith(".jpg")
+    (nombre, kwargs), = bucket.firmas
+    assert nombre == result["object_name"]
+    assert kwargs["version"] == "v4"
+    assert kwargs["method"] == "PUT"
+    assert kwargs["content_type"] == "image/jpeg"
+    assert "api_access_endpoint" not in kwargs
+
+
+def test_create_upload_url_targets_emulator(db_session, mantenimientos, bucket, monkeypatch):
+    monkeypatch.setattr(uploads, "STORAGE_EMULATOR_HOST", "http://localhost:4443")
+
+    result = _firmar(db_session, "preventivo", mantenimientos["preventivo"].id, "fotos")
+
+    assert result["upload_url"].startswith("http://localhost:4443/test-bucket/")
+
+
+def test_create_upload_url_rejects_invalid_targets(db_session, mantenimientos, bucket):
+    with pytest.raises(HTTPException) as exc:
+        _firmar(db_session, "correctivo", mantenimientos["correctivo"].id, "planillas")
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        _firmar(db_session, "preventivo", mantenimientos["preventivo"].id, "fotos", CUADRILLA)
+    assert exc.value.status_code == 403
+    with pytest.raises(HTTPException) as exc:
+        _firmar(db_session, "preventivo", 999, "fotos")
+    assert exc.value.status_code == 404
+    assert bucket.firmas == []
+
+
+def test_confirm_upload_records_photo_once(db_session, async_db_session, mantenimientos, bucket, background):
+    preventivo = mantenimientos["preventivo"]
+    firmado = _firmar(db_session, "preventivo", preventivo.id, "fotos")
+    bucket.put(firmado["object_name"])
+    confirmacion = UploadConfirmacion(
+        tipo="preventivo", mantenimiento_id=preventivo.id, carpeta="fotos", object_name=firmado["object_name"]
+    )
+
+    primero = asyncio.run(uploads.confirm_upload(async_db_session, confirmacion, USUARIO))
+    segundo = asyncio.run(uploads.confirm_upload(async_db_session, confirmacion, USUARIO))
+
+    assert primero == segundo
+    fotos = db_session.query(MantenimientoPreventivoFoto).all()
+    assert [f.url for f in fotos] == [f"https://storage.googleapis.com/test-bucket/{firmado['object_name']}"]
+    background["gallery"].assert_called_once_with("preventivo", preventivo.id, "fotos")
+    background["variants"].assert_called_once_with(uploads.ensure_photo_variants, "test-bucket", firmado["object_name"])
+
+
+def test_confirm_upload_requires_uploaded_object(db_session, async_db_session, mantenimientos, bucket, background):
+    preventivo = mantenimientos["preventivo"]
+    firmado = _firmar(db_session, "preventivo", preventivo.id, "planillas")
+    confirmacion = UploadConfirmacion(
+        tipo="preventivo", mantenimiento_id=preventivo.id, carpeta="planillas", object_name=firmado["object_name"]
+    )
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(uploads.confirm_upload(async_db_session, confirmacion, USUARIO))
+
+    assert exc.value.status_code == 404
+    assert db_session.query(MantenimientoPreventivoPlanilla).count() == 0
+    background["gallery"].assert_not_called()
+
+
+def test_confirm_upload_rejects_object_outside_folder(db_session, async_db_session, mantenimientos, bucket, background):
+    preventivo = mantenimientos["preventivo"]
+    bucket.put("mantenimientos_preventivos/999/fotos/x.jpg")
+    confirmacion = UploadConfirmacion(
+        tipo="preventivo",
+        mantenimiento_id=preventivo.id,
+        carpeta="fotos",
+        object_name=f"mantenimientos_preventivos/{preventivo.id}/fotos/../../999/fotos/x.jpg",
+    )
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(uploads.confirm_upload(async_db_session, confirmacion, USUARIO))
+
+    assert exc.value.status_code == 400
+
+
+def test_confirm_upload_sets_correctivo_planilla(db_session, async_db_session, mantenimientos, bucket, background):
+    correctivo = mantenimientos["correctivo"]
+    firmado = _firmar(db_session, "correctivo", correctivo.id, "planilla")
+    bucket.put(firmado["object_name"])
+    confirmacion = UploadConfirmacion(
+        tipo="correctivo", mantenimiento_id=correctivo.id, carpeta="planilla", object_name=firmado["object_name"]
+    )
+
+    result = asyncio.run(uploads.confirm_upload(async_db_session, confirmacion, USUARIO))
+
+    db_session.refresh(correctivo)
+    assert correctivo.planilla == result["url"]
+    jobs = db_session.query(SheetSyncOutbox).all()
+    assert [(j.tipo, j.operacion, j.mantenimiento_id) for j in jobs] == [("correctivo", "update", correctivo.id)]
+
+
+def test_confirm_upload_chat_sends_message_with_file(db_session, async_db_session, mantenimientos, bucket, monkeypatch):
+    correctivo = mantenimientos["correctivo"]
+    firmado = _firmar(db_session, "correctivo", correctivo.id, "chat", CUADRILLA)
+    bucket.put(firmado["object_name"])
+    send = AsyncMock(return_value=MagicMock(id=7))
+    monkeypatch.setattr(uploads, "send_message_correctivo", send)
+    confirmacion = UploadConfirmacion(
+        tipo="correctivo",
+        mantenimiento_id=correctivo.id,
+        carpeta="chat",
+        object_name=firmado["object_name"],
+        firebase_uid="c1",
+        nombre_usuario="Cuadrilla",
+        texto="adjunto",
+    )
+
+    result = asyncio.run(uploads.confirm_upload(async_db_session, confirmacion, CUADRILLA))
+
+    assert result["mensaje_id"] == 7
+    assert send.call_args.kwargs == {"texto": "adjunto", "archivo_url": result["url"]}
@@ -1,5 +1,7 @@
 from unittest.mock import patch
+import asyncio
 import importlib
+import threading
 import src.services.webpush as webpush_service
 from src.api.models import PushSubscription
 
@@ -40,3 +42,28 @@ def test_send_webpush_handles_error(monkeypatch, db_session):
         )
         assert result == {"message": "Web push sent"}
         mock_push.assert_called_once()
+
+def test_send_webpush_async_sends_from_worker_thread(monkeypatch, db_session, async_db_session):
+    monkeypatch.setenv("VAPID_PRIVATE_KEY", "test-key")
+    importlib.reload(webpush_service)
+    db_session.add_all([
+        PushSubscription(firebase_uid="uid", endpoint="e1", p256dh="p", auth="a"),
+        PushSubscription(firebase_uid="uid", endpoint="e2", p256dh="p", auth="a"),
+        PushSubscription(firebase_uid="otro", endpoint="e3", p256dh="p", auth="a"),
+    ])
+    db_session.commit()
+    hilos = []
+
+    async def _enviar():
+        loop_thread = threading.get_ident()
+        result = await webpush_service.send_webpush_notification_async(async_db_session, "uid", "title", "body")
+        return loop_thread, result
+
+    with patch("src.services.webpush.webpush", side_effect=lambda *a, **k: hilos.append(threading.get_ident())) as mock_push:
+        loop_thread, result = asyncio.run(_enviar())
+
+    assert result == {"message": "Web push sent"}
+    assert sorted(call.args[0]["endpoint"] for call in mock_push.call_args_list) == ["e1", "e2"]
+    # pywebpush corre fuera del event loop.
+    assert hilos and all(hilo != loop_thread for hilo in hilos)
+    assert not async_db_session.in_transaction()
@@ -13,15 +13,25 @@ const ChatSection = ({
   onEnviarMensaje,
   chatBoxRef,
   currentUid,
+  hayAnteriores = false,
+  isLoadingAnteriores = false,
+  onCargarAnteriores,
 }) => (
   <>
     <div className="chat-box" ref={chatBoxRef}>
+      {hayAnteriores && onCargarAnteriores && (
+        <div className="text-center mb-2">
+          <Button variant="light" size="sm" onClick={onCargarAnteriores} disabled={isLoadingAnteriores}>
+            {isLoadingAnteriores ? 'Cargando...' : 'Cargar anteriores'}
+          </Button>
+        </div>
+      )}
       {mensajes.map((msg, index) => {
         const esPropio = msg.firebase_uid === currentUid;
         const esImagen = msg.archivo?.match(/\.(jpeg|jpg|png|gif)$/i);
         return (
           <div
-            key={index}
+            key={msg.id ?? index}
             className={`chat-message ${esPropio ? 'chat-message-sent' : 'chat-message-received'}`}
           >
             {msg.texto && <p className="chat-message-text">{msg.texto}</p>}
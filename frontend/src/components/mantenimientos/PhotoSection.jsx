@@ -2,7 +2,7 @@ import React, { useEffect, useRef, useState } from 'react';
 import { Row, Col, Button, Form, Modal } from 'react-bootstrap';
 import { BsUpload, BsTrashFill, BsPencilFill, BsX, BsSave } from 'react-icons/bs';
 
-const PhotoSection = ({ handleSubmit, isLoading, fotos = [], onUpload, onDelete, titulo }) => {
+const PhotoSection = ({ handleSubmit, isLoading, fotos = [], variantes = [], onUpload, onDelete, titulo }) => {
   const [selectedFiles, setSelectedFiles] = useState([]);
   const [fotoPreviews, setFotoPreviews] = useState([]);
   const [isSelectingPhotos, setIsSelectingPhotos] = useState(false);
@@ -16,6 +16,14 @@ const PhotoSection = ({ handleSubmit, isLoading, fotos = [], onUpload, onDelete,
     setFotoPreviews([]);
   }, [fotos]);
 
+  // Miniaturas para la grilla y tamaño web para el modal; si no existen, se usa el original.
+  const variantesPorUrl = Object.fromEntries(variantes.map((v) => [v.url, v]));
+  const thumbnailDe = (photo) => variantesPorUrl[photo]?.thumbnail || photo;
+  const webDe = (photo) => variantesPorUrl[photo]?.web || photo;
+  const usarOriginal = (photo) => (e) => {
+    if (e.currentTarget.src !== photo) e.currentTarget.src = photo;
+  };
+
   const handleFileChange = (e) => {
     const files = Array.from(e.target.files);
     setSelectedFiles(files);
@@ -162,14 +170,16 @@ const PhotoSection = ({ handleSubmit, isLoading, fotos = [], onUpload, onDelete,
                     if (isSelectingPhotos) {
                       handlePhotoSelect(photo);
                     } else {
-                      handleImageClick(photo);
+                      handleImageClick(webDe(photo));
                     }
                   }}
                 >
                   <img
-                    src={photo}
+                    src={thumbnailDe(photo)}
                     alt={`Foto ${index + 1}`}
                     className="gallery-thumbnail"
+                    loading="lazy"
+                    onError={usarOriginal(photo)}
                   />
                 </div>
               </Col>
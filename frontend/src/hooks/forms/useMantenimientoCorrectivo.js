@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { getMantenimientosCorrectivos, deleteMantenimientoCorrectivo } from '../../services/mantenimientoCorrectivoService';
+import { getMantenimientosCorrectivosPaginados, deleteMantenimientoCorrectivo } from '../../services/mantenimientoCorrectivoService';
 import { getSucursales } from '../../services/sucursalService';
 import { getCuadrillas } from '../../services/cuadrillaService';
 import { getZonas } from '../../services/zonaService';
@@ -8,6 +8,9 @@ import { useAuthRoles } from '../useAuthRoles';
 import { getClientes } from '../../services/clienteService';
 import { confirmDialog } from '../../components/ConfirmDialog';
 
+// Filtros que resuelve el backend en /paginado; zona, rubro y el orden se aplican sobre las páginas cargadas.
+const SERVER_FILTERS = ['cliente', 'cuadrilla', 'sucursal', 'estado', 'prioridad'];
+
 const useMantenimientoCorrectivo = () => {
   const { id, isUser, isCuadrilla } = useAuthRoles();
   const [mantenimientos, setMantenimientos] = useState([]);
@@ -33,15 +36,49 @@ const useMantenimientoCorrectivo = () => {
   const [success, setSuccess] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
 
-  const fetchMantenimientos = async () => {
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+
+  const buildParams = (currentFilters, cursor) => {
+    const params = {};
+    if (cursor) params.cursor = cursor;
+    if (currentFilters.cliente) params.cliente_id = currentFilters.cliente;
+    if (currentFilters.sucursal) params.sucursal_id = currentFilters.sucursal;
+    if (isCuadrilla) params.id_cuadrilla = id;
+    else if (currentFilters.cuadrilla) params.id_cuadrilla = currentFilters.cuadrilla;
+    if (currentFilters.estado) params.estado = currentFilters.estado;
+    if (currentFilters.prioridad) params.prioridad = currentFilters.prioridad;
+    return params;
+  };
+
+  const applyLocalFilters = (items, currentFilters) => {
+    let filtered = isCuadrilla ? items.filter(m => m.estado !== 'Finalizado') : [...items];
+
+    if (currentFilters.zona) {
+      filtered = filtered.filter(m => {
+        const sucursal = sucursales.find(s => s.id === m.id_sucursal);
+        return sucursal?.zona?.toLowerCase() === currentFilters.zona.toLowerCase();
+      });
+    }
+    if (currentFilters.rubro) {
+      filtered = filtered.filter(m => m.rubro.toLowerCase() === currentFilters.rubro.toLowerCase());
+    }
+
+    filtered.sort((a, b) => {
+      const dateA = new Date(a.fecha_apertura);
+      const dateB = new Date(b.fecha_apertura);
+      return currentFilters.sortByDate === 'asc' ? dateA - dateB : dateB - dateA;
+    });
+    return filtered;
+  };
+
+  const fetchMantenimientos = async (currentFilters = filters) => {
     setIsLoading(true);
     try {
-      const response = await getMantenimientosCorrectivos();
-      const mantenimientoArray = isCuadrilla
-        ? response.data.filter(m => m.id_cuadrilla === id && m.estado !== 'Finalizado')
-        : response.data;
-      setMantenimientos(mantenimientoArray);
-      setFilteredMantenimientos(mantenimientoArray);
+      const response = await getMantenimientosCorrectivosPaginados(buildParams(currentFilters));
+      setMantenimientos(response.data.items);
+      setFilteredMantenimientos(applyLocalFilters(response.data.items, currentFilters));
+      setNextCursor(response.data.next_cursor);
       setError(null);
     } catch (error) {
       setError(error.response?.data?.detail || 'Error al cargar los mantenimientos');
@@ -50,6 +87,23 @@ const useMantenimientoCorrectivo = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    try {
+      const response = await getMantenimientosCorrectivosPaginados(buildParams(filters, nextCursor));
+      const loaded = [...mantenimientos, ...response.data.items];
+      setMantenimientos(loaded);
+      setFilteredMantenimientos(applyLocalFilters(loaded, filters));
+      setNextCursor(response.data.next_cursor);
+      setError(null);
+    } catch (error) {
+      setError(error.response?.data?.detail || 'Error al cargar los mantenimientos');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const fetchData = async () => {
     try {
       const [clientesResponse, sucursalesResponse, cuadrillasResponse, zonasResponse] = await Promise.all([
@@ -80,40 +134,11 @@ const useMantenimientoCorrectivo = () => {
     const newFilters = { ...filters, [e.target.name]: e.target.value };
     setFilters(newFilters);
 
-    let filtered = [...mantenimientos];
-
-    if (newFilters.cliente) {
-      filtered = filtered.filter((m) => String(m.cliente_id || m.id_cliente) === newFilters.cliente);
-    }
-    if (newFilters.cuadrilla) {
-      filtered = filtered.filter(m => m.id_cuadrilla === parseInt(newFilters.cuadrilla));
-    }
-    if (newFilters.sucursal) {
-      filtered = filtered.filter(m => m.id_sucursal === parseInt(newFilters.sucursal));
-    }
-    if (newFilters.zona) {
-      filtered = filtered.filter(m => {
-        const sucursal = sucursales.find(s => s.id === m.id_sucursal);
-        return sucursal?.zona?.toLowerCase() === newFilters.zona.toLowerCase();
-      });
-    }
-    if (newFilters.rubro) {
-      filtered = filtered.filter(m => m.rubro.toLowerCase() === newFilters.rubro.toLowerCase());
-    }
-    if (newFilters.estado) {
-      filtered = filtered.filter(m => m.estado.toLowerCase() === newFilters.estado.toLowerCase());
+    if (SERVER_FILTERS.includes(e.target.name)) {
+      fetchMantenimientos(newFilters);
+    } else {
+      setFilteredMantenimientos(applyLocalFilters(mantenimientos, newFilters));
     }
-    if (newFilters.prioridad) {
-      filtered = filtered.filter(m => m.prioridad.toLowerCase() === newFilters.prioridad.toLowerCase());
-    }
-
-    filtered.sort((a, b) => {
-      const dateA = new Date(a.fecha_apertura);
-      const dateB = new Date(b.fecha_apertura);
-      return newFilters.sortByDate === 'asc' ? dateA - dateB : dateB - dateA;
-    });
-
-    setFilteredMantenimientos(filtered);
   };
 
   const handleDelete = async (id) => {
@@ -187,6 +212,9 @@ const useMantenimientoCorrectivo = () => {
     error,
     success,
     isLoading,
+    isLoadingMore,
+    hasMore: Boolean(nextCursor),
+    loadMore,
     handleFilterChange,
     handleDelete,
     handleEdit,
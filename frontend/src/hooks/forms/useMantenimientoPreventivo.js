@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { getMantenimientosPreventivos, deleteMantenimientoPreventivo } from '../../services/mantenimientoPreventivoService';
+import { getMantenimientosPreventivosPaginados, deleteMantenimientoPreventivo } from '../../services/mantenimientoPreventivoService';
 import { getCuadrillas } from '../../services/cuadrillaService';
 import { getSucursales } from '../../services/sucursalService';
 import { getZonas } from '../../services/zonaService';
@@ -8,6 +8,9 @@ import { useAuthRoles } from '../useAuthRoles';
 import { getClientes } from '../../services/clienteService';
 import { confirmDialog } from '../../components/ConfirmDialog';
 
+// Filtros que resuelve el backend en /paginado; zona y el orden se aplican sobre las páginas cargadas.
+const SERVER_FILTERS = ['cliente', 'cuadrilla', 'sucursal'];
+
 const useMantenimientoPreventivo = () => {
   const { id, isUser, isCuadrilla } = useAuthRoles();
   const [mantenimientos, setMantenimientos] = useState([]);
@@ -30,15 +33,44 @@ const useMantenimientoPreventivo = () => {
   const [success, setSuccess] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
 
-  const fetchMantenimientos = async () => {
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+
+  const buildParams = (currentFilters, cursor) => {
+    const params = {};
+    if (cursor) params.cursor = cursor;
+    if (currentFilters.cliente) params.cliente_id = currentFilters.cliente;
+    if (currentFilters.sucursal) params.sucursal_id = currentFilters.sucursal;
+    if (isCuadrilla) params.id_cuadrilla = id;
+    else if (currentFilters.cuadrilla) params.id_cuadrilla = currentFilters.cuadrilla;
+    return params;
+  };
+
+  const applyLocalFilters = (items, currentFilters) => {
+    let filtered = isCuadrilla ? items.filter(m => m.fecha_cierre === null) : [...items];
+
+    if (currentFilters.zona) {
+      filtered = filtered.filter(m => {
+        const sucursal = sucursales.find(s => s.id === m.id_sucursal);
+        return sucursal?.zona?.toLowerCase() === currentFilters.zona.toLowerCase();
+      });
+    }
+
+    filtered.sort((a, b) => {
+      const dateA = new Date(a.fecha_apertura);
+      const dateB = new Date(b.fecha_apertura);
+      return currentFilters.sortByDate === 'asc' ? dateA - dateB : dateB - dateA;
+    });
+    return filtered;
+  };
+
+  const fetchMantenimientos = async (currentFilters = filters) => {
     setIsLoading(true);
     try {
-      const response = await getMantenimientosPreventivos();
-      const mantenimientoArray = isCuadrilla
-        ? response.data.filter(m => m.id_cuadrilla === id && m.fecha_cierre === null)
-        : response.data;
-      setMantenimientos(mantenimientoArray);
-      setFilteredMantenimientos(mantenimientoArray);
+      const response = await getMantenimientosPreventivosPaginados(buildParams(currentFilters));
+      setMantenimientos(response.data.items);
+      setFilteredMantenimientos(applyLocalFilters(response.data.items, currentFilters));
+      setNextCursor(response.data.next_cursor);
       setError(null);
     } catch (error) {
       setError(error.response?.data?.detail || 'Error al cargar los mantenimientos');
@@ -47,6 +79,23 @@ const useMantenimientoPreventivo = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    try {
+      const response = await getMantenimientosPreventivosPaginados(buildParams(filters, nextCursor));
+      const loaded = [...mantenimientos, ...response.data.items];
+      setMantenimientos(loaded);
+      setFilteredMantenimientos(applyLocalFilters(loaded, filters));
+      setNextCursor(response.data.next_cursor);
+      setError(null);
+    } catch (error) {
+      setError(error.response?.data?.detail || 'Error al cargar los mantenimientos');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const fetchData = async () => {
     try {
       const [clientesResponse, cuadrillasResponse, sucursalesResponse, zonasResponse] = await Promise.all([
@@ -77,31 +126,11 @@ const useMantenimientoPreventivo = () => {
     const newFilters = { ...filters, [e.target.name]: e.target.value };
     setFilters(newFilters);
 
-    let filtered = [...mantenimientos];
-
-    if (newFilters.cliente) {
-      filtered = filtered.filter((m) => String(m.cliente_id || m.id_cliente) === newFilters.cliente);
-    }
-    if (newFilters.cuadrilla) {
-      filtered = filtered.filter(m => m.id_cuadrilla === parseInt(newFilters.cuadrilla));
-    }
-    if (newFilters.sucursal) {
-      filtered = filtered.filter(m => m.id_sucursal === parseInt(newFilters.sucursal));
-    }
-    if (newFilters.zona) {
-      filtered = filtered.filter(m => {
-        const sucursal = sucursales.find(s => s.id === m.id_sucursal);
-        return sucursal?.zona?.toLowerCase() === newFilters.zona.toLowerCase();
-      });
+    if (SERVER_FILTERS.includes(e.target.name)) {
+      fetchMantenimientos(newFilters);
+    } else {
+      setFilteredMantenimientos(applyLocalFilters(mantenimientos, newFilters));
     }
-
-    filtered.sort((a, b) => {
-      const dateA = new Date(a.fecha_apertura);
-      const dateB = new Date(b.fecha_apertura);
-      return newFilters.sortByDate === 'asc' ? dateA - dateB : dateB - dateA;
-    });
-
-    setFilteredMantenimientos(filtered);
   };
 
   const handleDelete = async (id) => {
@@ -175,6 +204,9 @@ const useMantenimientoPreventivo = () => {
     error,
     success,
     isLoading,
+    isLoadingMore,
+    hasMore: Boolean(nextCursor),
+    loadMore,
     handleFilterChange,
     handleDelete,
     handleEdit,
@@ -1,8 +1,19 @@
-import { useEffect, useRef } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { subscribeToChat } from '../../services/chatWs';
 
-const useChat = (chatId, setMensajes) => {
+// Mensajes por página; el backend acepta hasta 500.
+export const CHAT_PAGE_SIZE = 50;
+
+// getChat(id, params) pagina por id de mensaje: `before` para el historial y `since_id` para lo nuevo.
+const useChat = (chatId, setMensajes, { mensajes = [], getChat } = {}) => {
   const chatBoxRef = useRef(null);
+  const [hayAnteriores, setHayAnteriores] = useState(false);
+  const [isLoadingAnteriores, setIsLoadingAnteriores] = useState(false);
+  // El websocket se abre una sola vez por chat: los refs le dan la lista y el servicio actuales al reconectar.
+  const mensajesRef = useRef(mensajes);
+  mensajesRef.current = mensajes;
+  const getChatRef = useRef(getChat);
+  getChatRef.current = getChat;
 
   const scrollToBottom = () => {
     setTimeout(() => {
@@ -12,9 +23,67 @@ const useChat = (chatId, setMensajes) => {
     }, 100);
   };
 
+  const agregarNuevos = (nuevos) => {
+    setMensajes((prev) => {
+      const ids = new Set(prev.map((m) => m.id));
+      return [...prev, ...nuevos.filter((m) => !ids.has(m.id))];
+    });
+  };
+
+  const cargarMensajes = async (id) => {
+    try {
+      const response = await getChatRef.current(id, { limit: CHAT_PAGE_SIZE });
+      setMensajes(response.data);
+      setHayAnteriores(response.data.length === CHAT_PAGE_SIZE);
+      scrollToBottom();
+    } catch (error) {
+      console.error('Error al cargar mensajes:', error);
+    }
+  };
+
+  const cargarAnteriores = async () => {
+    const primero = mensajesRef.current[0];
+    if (!chatId || !primero) return;
+    setIsLoadingAnteriores(true);
+    try {
+      const response = await getChatRef.current(chatId, { before: primero.id, limit: CHAT_PAGE_SIZE });
+      setMensajes((prev) => [...response.data, ...prev]);
+      setHayAnteriores(response.data.length === CHAT_PAGE_SIZE);
+    } catch (error) {
+      console.error('Error al cargar mensajes anteriores:', error);
+    } finally {
+      setIsLoadingAnteriores(false);
+    }
+  };
+
+  // Trae lo que llegó mientras el websocket estuvo caído, sin volver a pedir la página entera.
+  const sincronizarMensajes = async (id) => {
+    const actuales = mensajesRef.current;
+    if (!actuales.length) {
+      await cargarMensajes(id);
+      return;
+    }
+    let ultimoId = actuales[actuales.length - 1].id;
+    try {
+      let pagina;
+      do {
+        const response = await getChatRef.current(id, { since_id: ultimoId, limit: CHAT_PAGE_SIZE });
+        pagina = response.data;
+        if (pagina.length) {
+          agregarNuevos(pagina);
+          ultimoId = pagina[pagina.length - 1].id;
+        }
+      } while (pagina.length === CHAT_PAGE_SIZE);
+      scrollToBottom();
+    } catch (error) {
+      console.error('Error al sincronizar mensajes:', error);
+    }
+  };
+
   useEffect(() => {
     let socket;
     let reconnectTimeout;
+    let reconectando = false;
 
     const connect = () => {
       if (!chatId) return;
@@ -25,7 +94,13 @@ const useChat = (chatId, setMensajes) => {
       });
 
       if (socket) {
+        socket.onopen = () => {
+          if (reconectando && getChatRef.current) sincronizarMensajes(chatId);
+          reconectando = false;
+        };
+
         socket.onclose = () => {
+          reconectando = true;
           reconnectTimeout = setTimeout(connect, 5000);
         };
 
@@ -38,12 +113,15 @@ const useChat = (chatId, setMensajes) => {
     connect();
 
     return () => {
-      if (socket) socket.close();
+      if (socket) {
+        socket.onclose = null;
+        socket.close();
+      }
       if (reconnectTimeout) clearTimeout(reconnectTimeout);
     };
   }, [chatId, setMensajes]);
 
-  return { chatBoxRef, scrollToBottom };
+  return { chatBoxRef, scrollToBottom, cargarMensajes, cargarAnteriores, hayAnteriores, isLoadingAnteriores };
 };
 
-export default useChat;
\ No newline at end of file
+export default useChat;
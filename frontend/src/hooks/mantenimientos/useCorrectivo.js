@@ -33,7 +33,11 @@ const useCorrectivo = (mantenimientoId) => {
   const [archivoAdjunto, setArchivoAdjunto] = useState(null);
   const [previewArchivoAdjunto, setPreviewArchivoAdjunto] = useState(null);
   const [isChatOpen, setIsChatOpen] = useState(false);
-  const { chatBoxRef, scrollToBottom } = useChat(mantenimiento.id, setMensajes);
+  const { chatBoxRef, cargarMensajes, cargarAnteriores, hayAnteriores, isLoadingAnteriores } = useChat(
+    mantenimiento.id,
+    setMensajes,
+    { mensajes, getChat: getChatCorrectivo }
+  );
   const isMobile = useIsMobile();
 
   const handleAddToRoute = async () => {
@@ -224,16 +228,6 @@ const useCorrectivo = (mantenimientoId) => {
     }
   };
 
-  const cargarMensajes = async (id) => {
-    try {
-      const response = await getChatCorrectivo(id);
-      setMensajes(response.data);
-      scrollToBottom();
-    } catch (error) {
-      console.error('Error al cargar mensajes:', error);
-    }
-  };
-
   const handleEnviarMensaje = async () => {
     if (!nuevoMensaje && !archivoAdjunto) return;
 
@@ -267,6 +261,9 @@ const useCorrectivo = (mantenimientoId) => {
     isLoading,
     isSelected,
     mensajes,
+    hayAnteriores,
+    isLoadingAnteriores,
+    cargarAnteriores,
     nuevoMensaje,
     archivoAdjunto,
     previewArchivoAdjunto,
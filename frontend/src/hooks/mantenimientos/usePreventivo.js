@@ -33,7 +33,11 @@ const usePreventivo = (mantenimientoId) => {
   const [archivoAdjunto, setArchivoAdjunto] = useState(null);
   const [previewArchivoAdjunto, setPreviewArchivoAdjunto] = useState(null);
   const [isChatOpen, setIsChatOpen] = useState(false);
-  const { chatBoxRef, scrollToBottom } = useChat(mantenimiento.id, setMensajes);
+  const { chatBoxRef, cargarMensajes, cargarAnteriores, hayAnteriores, isLoadingAnteriores } = useChat(
+    mantenimiento.id,
+    setMensajes,
+    { mensajes, getChat: getChatPreventivo }
+  );
   const isMobile = useIsMobile();
 
   const handleAddToRoute = async () => {
@@ -219,16 +223,6 @@ const usePreventivo = (mantenimientoId) => {
     }
   };
 
-  const cargarMensajes = async (id) => {
-    try {
-      const response = await getChatPreventivo(id);
-      setMensajes(response.data);
-      scrollToBottom();
-    } catch (error) {
-      console.error('Error al cargar mensajes:', error);
-    }
-  };
-
   const handleEnviarMensaje = async () => {
     if (!nuevoMensaje && !archivoAdjunto) return;
 
@@ -261,6 +255,9 @@ const usePreventivo = (mantenimientoId) => {
     isLoading,
     isSelected,
     mensajes,
+    hayAnteriores,
+    isLoadingAnteriores,
+    cargarAnteriores,
     nuevoMensaje,
     archivoAdjunto,
     previewArchivoAdjunto,
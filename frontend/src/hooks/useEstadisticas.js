@@ -1,25 +1,60 @@
-import React, { useState, useEffect, useMemo, useCallback } from 'react';
+import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react';
 import { getCuadrillas } from '../services/cuadrillaService';
-import { getMantenimientosCorrectivos } from '../services/mantenimientoCorrectivoService';
-import { getMantenimientosPreventivos } from '../services/mantenimientoPreventivoService';
 import { getSucursales } from '../services/sucursalService';
 import { getZonas } from '../services/zonaService';
 import { getClientes } from '../services/clienteService';
+import {
+  getEstadisticasPreventivos,
+  getEstadisticasCorrectivos,
+  getEstadisticasRubros,
+  getEstadisticasZonas,
+  getEstadisticasSucursales,
+} from '../services/estadisticasService';
 import html2canvas from 'html2canvas';
 import jsPDF from 'jspdf';
 import logoImg from '../assets/logo_inversur.png';
 
+const toFixed2 = (value) => Number(value || 0).toFixed(2);
+
+const mapCuadrillaReport = (rows = []) => rows.map((row) => ({
+  nombre: row.nombre,
+  ratio: toFixed2(row.ratio),
+  resueltos: row.resueltos,
+  asignados: row.asignados,
+}));
+
+const mapRubroReport = (data = {}) => ({
+  rubros: (data.rubros || []).map((row) => ({
+    rubro: row.rubro,
+    avgDays: toFixed2(row.promedio_dias),
+    count: row.cantidad,
+  })),
+  totalAvgDays: toFixed2(data.promedio_dias),
+  totalCount: data.cantidad || 0,
+});
+
+const mapZonaReport = (rows = []) => rows.map((row) => ({
+  zona: row.zona,
+  totalCorrectivos: row.total_correctivos,
+  avgCorrectivos: toFixed2(row.promedio_correctivos),
+}));
+
+const mapSucursalReport = (rows = []) => rows.map((row) => ({
+  sucursal: row.sucursal,
+  zona: row.zona,
+  totalCorrectivos: row.total_correctivos,
+}));
+
 const useEstadisticas = () => {
   const [selectedMonths, setSelectedMonths] = useState([]);
   const [selectedYears, setSelectedYears] = useState([]);
   const [cuadrillas, setCuadrillas] = useState([]);
-  const [correctivos, setCorrectivos] = useState([]);
-  const [preventivos, setPreventivos] = useState([]);
   const [zonas, setZonas] = useState([]);
   const [sucursales, setSucursales] = useState([]);
   const [estadisticasData, setEstadisticasData] = useState({});
   const [clientes, setClientes] = useState([]);
   const [isLoadingData, setIsLoadingData] = useState(true);
+  const latestRequest = useRef(0);
 
   useEffect(() => {
     const fetchData = async () => {
@@ -27,22 +62,16 @@ const useEstadisticas = () => {
       try {
         const [
           cuadrillasRes,
-          correctivosRes,
-          preventivosRes,
           zonasRes,
           sucursalesRes,
           clientesRes,
         ] = await Promise.all([
           getCuadrillas(),
-          getMantenimientosCorrectivos(),
-          getMantenimientosPreventivos(),
           getZonas(),
           getSucursales(),
           getClientes(),
         ]);
         setCuadrillas(cuadrillasRes.data);
-        setCorrectivos(correctivosRes.data);
-        setPreventivos(preventivosRes.data);
         setZonas(zonasRes.data);
         setSucursales(sucursalesRes.data);
         setClientes(clientesRes.data || []);
@@ -55,236 +84,42 @@ const useEstadisticas = () => {
     fetchData();
   }, []);
 
-  const sucursalMap = useMemo(() => {
-    const map = {};
-    sucursales.forEach((s) => {
-      map[s.id] = s;
-    });
-    return map;
-  }, [sucursales]);
-
-  const filterByMonthYear = useCallback((items, dateField) => {
-    return items.filter(item => {
-      const rawDate = item[dateField];
-      if (!rawDate) return false;
-
-      const date = new Date(rawDate);
-      if (isNaN(date)) return false;
-
-      const monthValue = `${date.getMonth() + 1}`;
-      const yearValue = `${date.getFullYear()}`;
-      const matchesMonth = selectedMonths.length ? selectedMonths.includes(monthValue) : true;
-      const matchesYear = selectedYears.length ? selectedYears.includes(yearValue) : true;
+  const withPeriod = useCallback((filters = {}) => ({
+    ...filters,
+    meses: selectedMonths.length === 12 ? [] : selectedMonths,
+    anios: selectedYears,
+  }), [selectedMonths, selectedYears]);
 
-      return matchesMonth && matchesYear;
-    });
-  }, [selectedMonths, selectedYears]);
-
-  const applyFilters = useCallback((items, filters = {}, dateField = 'fecha_apertura') => {
-    let filtered = filterByMonthYear(items, dateField);
-    const {
-      cliente: clienteFilter,
-      zona: zonaFilter,
-      sucursal: sucursalFilter,
-      cuadrilla: cuadrillaFilter,
-      estado: estadoFilter,
-    } = filters;
-
-    if (clienteFilter) {
-      filtered = filtered.filter((item) => {
-        const sucursal = sucursalMap[item.id_sucursal];
-        return sucursal && String(sucursal.cliente_id) === clienteFilter;
-      });
-    }
-    if (zonaFilter) {
-      filtered = filtered.filter((item) => {
-        const sucursal = sucursalMap[item.id_sucursal];
-        return sucursal?.zona === zonaFilter;
-      });
-    }
-    if (sucursalFilter) {
-      filtered = filtered.filter((item) => String(item.id_sucursal) === sucursalFilter);
-    }
-    if (cuadrillaFilter) {
-      filtered = filtered.filter((item) => String(item.id_cuadrilla) === cuadrillaFilter);
-    }
-    if (estadoFilter) {
-      filtered = filtered.filter((item) => item.estado === estadoFilter);
-    }
-    return filtered;
-  }, [filterByMonthYear, sucursalMap]);
-
-  const generatePreventivoReport = useCallback((filters = {}) => {
-    const filteredPreventivos = applyFilters(preventivos, filters, 'fecha_apertura');
-    if (filteredPreventivos.length === 0) return [];
-
-    const targetCuadrillas = filters.cuadrilla
-      ? cuadrillas.filter((cuadrilla) => String(cuadrilla.id) === filters.cuadrilla)
-      : cuadrillas.filter((cuadrilla) => filteredPreventivos.some((p) => p.id_cuadrilla === cuadrilla.id));
-
-    return targetCuadrillas
-      .map((cuadrilla) => {
-        const asignados = filteredPreventivos.filter((p) => p.id_cuadrilla === cuadrilla.id).length;
-        if (asignados === 0) {
-          return null;
-        }
-        const resueltos = filteredPreventivos.filter((p) => p.id_cuadrilla === cuadrilla.id && p.fecha_cierre).length;
-        return {
-          nombre: cuadrilla.nombre,
-          ratio: asignados ? (resueltos / asignados).toFixed(2) : 0,
-          resueltos,
-          asignados,
-        };
-      })
-      .filter(Boolean);
-  }, [applyFilters, cuadrillas, preventivos]);
-
-  const generateCorrectivoReport = useCallback((filters = {}) => {
-    const filteredCorrectivos = applyFilters(correctivos, filters, 'fecha_apertura');
-    if (filteredCorrectivos.length === 0) return [];
-
-    const targetCuadrillas = filters.cuadrilla
-      ? cuadrillas.filter((cuadrilla) => String(cuadrilla.id) === filters.cuadrilla)
-      : cuadrillas.filter((cuadrilla) => filteredCorrectivos.some((c) => c.id_cuadrilla === cuadrilla.id));
-
-    return targetCuadrillas
-      .map((cuadrilla) => {
-        const asignados = filteredCorrectivos.filter((c) => c.id_cuadrilla === cuadrilla.id).length;
-        if (asignados === 0) {
-          return null;
-        }
-        const resueltos = filteredCorrectivos.filter((c) => c.id_cuadrilla === cuadrilla.id && c.estado === 'Finalizado').length;
-        return {
-          nombre: cuadrilla.nombre,
-          ratio: asignados ? (resueltos / asignados).toFixed(2) : 0,
-          resueltos,
-          asignados,
-        };
-      })
-      .filter(Boolean);
-  }, [applyFilters, cuadrillas, correctivos]);
-
-  const generateRubroReport = useCallback((filters = {}) => {
-    const filtered = applyFilters(
-      correctivos.filter((c) => c.estado === 'Finalizado'),
-      filters,
-      'fecha_apertura'
-    );
-    const rubros = [...new Set(filtered.map(c => c.rubro))];
-    const report = rubros.map(rubro => {
-      const items = filtered.filter(c => c.rubro === rubro);
-      const days = items.map(c => (new Date(c.fecha_cierre) - new Date(c.fecha_apertura)) / (1000 * 60 * 60 * 24));
-      const avgDays = days.length ? (days.reduce((a, b) => a + b, 0) / days.length).toFixed(2) : 0;
-      return { rubro, avgDays, count: items.length };
-    });
-    const totalAvgDays = filtered.length
-      ? (filtered.reduce((sum, c) => sum + (new Date(c.fecha_cierre) - new Date(c.fecha_apertura)) / (1000 * 60 * 60 * 24), 0) / filtered.length).toFixed(2)
-      : 0;
-    const totalCount = filtered.length;
-
-    return { rubros: report, totalAvgDays, totalCount };
-  }, [applyFilters, correctivos]);
-
-  const generateZonaReport = useCallback((filters = {}) => {
-    const filtered = applyFilters(correctivos, filters, 'fecha_apertura');
-    if (filtered.length === 0) return [];
-
-    const zoneMap = new Map();
-
-    filtered.forEach((item) => {
-      const sucursal = sucursalMap[item.id_sucursal];
-      if (!sucursal) return;
-      const zoneName = sucursal.zona || 'Sin zona';
-
-      if (!zoneMap.has(zoneName)) {
-        const relevantSucursales = sucursales.filter((s) => {
-          if (s.zona !== zoneName) return false;
-          if (filters.cliente && String(s.cliente_id) !== filters.cliente) return false;
-          if (filters.sucursal && String(s.id) !== filters.sucursal) return false;
-          return true;
-        });
-
-        zoneMap.set(zoneName, {
-          zona: zoneName,
-          totalCorrectivos: 0,
-          sucursalesCount: relevantSucursales.length || 1,
-        });
-      }
-
-      const entry = zoneMap.get(zoneName);
-      entry.totalCorrectivos += 1;
-    });
-
-    if (filters.zona) {
-      const filteredZone = zoneMap.get(filters.zona);
-      return filteredZone
-        ? [{
-          zona: filteredZone.zona,
-          totalCorrectivos: filteredZone.totalCorrectivos,
-          avgCorrectivos: (filteredZone.totalCorrectivos / filteredZone.sucursalesCount).toFixed(2),
-        }]
-        : [];
-    }
-
-    return Array.from(zoneMap.values()).map((entry) => ({
-      zona: entry.zona,
-      totalCorrectivos: entry.totalCorrectivos,
-      avgCorrectivos: (entry.totalCorrectivos / entry.sucursalesCount).toFixed(2),
-    }));
-  }, [applyFilters, correctivos, sucursalMap, sucursales]);
-
-  const generateSucursalReport = useCallback((filters = {}) => {
-    const filtered = applyFilters(correctivos, filters, 'fecha_apertura');
-    if (filtered.length === 0) return [];
-
-    const totals = {};
-
-    filtered.forEach((item) => {
-      const sucursal = sucursalMap[item.id_sucursal];
-      if (!sucursal) return;
-
-      if (!totals[sucursal.id]) {
-        totals[sucursal.id] = {
-          sucursal: sucursal.nombre,
-          zona: sucursal.zona,
-          totalCorrectivos: 0,
-        };
-      }
-
-      totals[sucursal.id].totalCorrectivos += 1;
-    });
-
-    return Object.values(totals);
-  }, [applyFilters, correctivos, sucursalMap]);
-
-  const handleGenerateEstadisticas = useCallback((filtersBySection = {}) => {
+  const handleGenerateEstadisticas = useCallback(async (filtersBySection = {}) => {
     if (isLoadingData) {
       return;
     }
 
-    const normalizedFilters = {
-      preventivos: filtersBySection.preventivos || {},
-      correctivos: filtersBySection.correctivos || {},
-      rubros: filtersBySection.rubros || {},
-      zonas: filtersBySection.zonas || {},
-      sucursales: filtersBySection.sucursales || {},
-    };
-
-    setEstadisticasData({
-      preventivos: generatePreventivoReport(normalizedFilters.preventivos),
-      correctivos: generateCorrectivoReport(normalizedFilters.correctivos),
-      rubros: generateRubroReport(normalizedFilters.rubros),
-      zonas: generateZonaReport(normalizedFilters.zonas),
-      sucursales: generateSucursalReport(normalizedFilters.sucursales),
-    });
-  }, [
-    generatePreventivoReport,
-    generateCorrectivoReport,
-    generateRubroReport,
-    generateZonaReport,
-    generateSucursalReport,
-    isLoadingData,
-  ]);
+    const requestId = latestRequest.current + 1;
+    latestRequest.current = requestId;
+
+    try {
+      const [preventivosRes, correctivosRes, rubrosRes, zonasRes, sucursalesRes] = await Promise.all([
+        getEstadisticasPreventivos(withPeriod(filtersBySection.preventivos)),
+        getEstadisticasCorrectivos(withPeriod(filtersBySection.correctivos)),
+        getEstadisticasRubros(withPeriod(filtersBySection.rubros)),
+        getEstadisticasZonas(withPeriod(filtersBySection.zonas)),
+        getEstadisticasSucursales(withPeriod(filtersBySection.sucursales)),
+      ]);
+      if (latestRequest.current !== requestId) {
+        return;
+      }
+      setEstadisticasData({
+        preventivos: mapCuadrillaReport(preventivosRes.data),
+        correctivos: mapCuadrillaReport(correctivosRes.data),
+        rubros: mapRubroReport(rubrosRes.data),
+        zonas: mapZonaReport(zonasRes.data),
+        sucursales: mapSucursalReport(sucursalesRes.data),
+      });
+    } catch (error) {
+      console.error('Error al generar estadísticas', error);
+    }
+  }, [isLoadingData, withPeriod]);
 
   const generatePieChartData = (report, type) => {
     return report.map(item => ({
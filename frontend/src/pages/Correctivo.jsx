@@ -28,6 +28,9 @@ const Correctivo = () => {
     isLoading,
     isSelected,
     mensajes,
+    hayAnteriores,
+    isLoadingAnteriores,
+    cargarAnteriores,
     nuevoMensaje,
     archivoAdjunto,
     previewArchivoAdjunto,
@@ -102,6 +105,9 @@ const Correctivo = () => {
                   setPreviewArchivoAdjunto={setPreviewArchivoAdjunto}
                   onEnviarMensaje={handleEnviarMensaje}
                   chatBoxRef={chatBoxRef}
+                  hayAnteriores={hayAnteriores}
+                  isLoadingAnteriores={isLoadingAnteriores}
+                  onCargarAnteriores={cargarAnteriores}
                   currentUid={uid}
                 />
               </Col>
@@ -124,6 +130,7 @@ const Correctivo = () => {
             handleSubmit={handleSubmit}
             isLoading={isLoading}
             fotos={mantenimiento.fotos || []}
+            variantes={mantenimiento.fotos_variantes || []}
             onUpload={handlePhotoUpload}
             onDelete={handleDeleteSelectedPhotos}
             titulo="Fotos de la obra"
@@ -170,6 +177,9 @@ const Correctivo = () => {
                     setPreviewArchivoAdjunto={setPreviewArchivoAdjunto}
                     onEnviarMensaje={handleEnviarMensaje}
                     chatBoxRef={chatBoxRef}
+                    hayAnteriores={hayAnteriores}
+                    isLoadingAnteriores={isLoadingAnteriores}
+                    onCargarAnteriores={cargarAnteriores}
                     currentUid={uid}
                   />
                 </div>
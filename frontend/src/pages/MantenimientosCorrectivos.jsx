@@ -24,6 +24,9 @@ const MantenimientosCorrectivos = () => {
     error,
     success,
     isLoading,
+    isLoadingMore,
+    hasMore,
+    loadMore,
     handleFilterChange,
     handleDelete,
     handleEdit,
@@ -192,9 +195,9 @@ const MantenimientosCorrectivos = () => {
               <Form.Label>Prioridad</Form.Label>
               <Form.Select name='prioridad' value={filters.prioridad} onChange={handleFilterChange}>
                 <option value=''>Todas</option>
-                <option value='alta'>Alta</option>
-                <option value='media'>Media</option>
-                <option value='baja'>Baja</option>
+                <option value='Alta'>Alta</option>
+                <option value='Media'>Media</option>
+                <option value='Baja'>Baja</option>
               </Form.Select>
             </Form.Group>
           </div>
@@ -253,6 +256,13 @@ const MantenimientosCorrectivos = () => {
             onRowClick={(row) => handleRowClick(row.id)}
             filterContent={filterContent}
           />
+          {hasMore && (
+            <div className="text-center mt-3">
+              <Button className="custom-button" onClick={loadMore} disabled={isLoadingMore}>
+                {isLoadingMore ? 'Cargando...' : 'Cargar más'}
+              </Button>
+            </div>
+          )}
         </div>
       )}
     </Container>
@@ -24,6 +24,9 @@ const MantenimientosPreventivos = () => {
     error,
     success,
     isLoading,
+    isLoadingMore,
+    hasMore,
+    loadMore,
     handleFilterChange,
     handleDelete,
     handleEdit,
@@ -195,6 +198,13 @@ const MantenimientosPreventivos = () => {
             onRowClick={(row) => handleRowClick(row.id)}
             filterContent={filterContent}
           />
+          {hasMore && (
+            <div className="text-center mt-3">
+              <Button className="custom-button" onClick={loadMore} disabled={isLoadingMore}>
+                {isLoadingMore ? 'Cargando...' : 'Cargar más'}
+              </Button>
+            </div>
+          )}
         </div>
       )}
     </Container>
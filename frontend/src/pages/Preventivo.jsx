@@ -27,6 +27,9 @@ const Preventivo = () => {
     isLoading,
     isSelected,
     mensajes,
+    hayAnteriores,
+    isLoadingAnteriores,
+    cargarAnteriores,
     nuevoMensaje,
     archivoAdjunto,
     previewArchivoAdjunto,
@@ -100,6 +103,9 @@ const Preventivo = () => {
                   setPreviewArchivoAdjunto={setPreviewArchivoAdjunto}
                   onEnviarMensaje={handleEnviarMensaje}
                   chatBoxRef={chatBoxRef}
+                  hayAnteriores={hayAnteriores}
+                  isLoadingAnteriores={isLoadingAnteriores}
+                  onCargarAnteriores={cargarAnteriores}
                   currentUid={uid}
                 />
               </Col>
@@ -123,6 +129,7 @@ const Preventivo = () => {
             handleSubmit={handleSubmit}
             isLoading={isLoading}
             fotos={mantenimiento.fotos || []}
+            variantes={mantenimiento.fotos_variantes || []}
             onUpload={handlePhotoUpload}
             onDelete={handleDeleteSelectedPhotos}
             titulo="Fotos de la obra"
@@ -169,6 +176,9 @@ const Preventivo = () => {
                     setPreviewArchivoAdjunto={setPreviewArchivoAdjunto}
                     onEnviarMensaje={handleEnviarMensaje}
                     chatBoxRef={chatBoxRef}
+                    hayAnteriores={hayAnteriores}
+                    isLoadingAnteriores={isLoadingAnteriores}
+                    onCargarAnteriores={cargarAnteriores}
                     currentUid={uid}
                   />
                 </div>
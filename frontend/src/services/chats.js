@@ -1,7 +1,8 @@
 import api from './api';
 
-export const getChatCorrectivo = (id_mantenimiento) => api.get(`/chat/correctivo/${id_mantenimiento}`);
-export const getChatPreventivo = (id_mantenimiento) => api.get(`/chat/preventivo/${id_mantenimiento}`);
+// params: { before, after, since_id, limit } — cursores por id de mensaje.
+export const getChatCorrectivo = (id_mantenimiento, params) => api.get(`/chat/correctivo/${id_mantenimiento}`, { params });
+export const getChatPreventivo = (id_mantenimiento, params) => api.get(`/chat/preventivo/${id_mantenimiento}`, { params });
 export const sendMessageCorrectivo = (id_mantenimiento, message) => {
   return api.post(`/chat/message-correctivo/${id_mantenimiento}`, message, {
     headers: {
@@ -0,0 +1,20 @@
+import api from './api';
+
+const buildParams = (filters = {}) => {
+  const params = new URLSearchParams();
+  (filters.meses || []).forEach((mes) => params.append('meses', mes));
+  (filters.anios || []).forEach((anio) => params.append('anios', anio));
+  if (filters.cliente) params.append('cliente_id', filters.cliente);
+  if (filters.zona) params.append('zona', filters.zona);
+  if (filters.sucursal) params.append('sucursal_id', filters.sucursal);
+  if (filters.cuadrilla) params.append('id_cuadrilla', filters.cuadrilla);
+  if (filters.estado) params.append('estado', filters.estado);
+  return params;
+};
+
+export const getResumenEstadisticas = (filters) => api.get('/estadisticas/', { params: buildParams(filters) });
+export const getEstadisticasPreventivos = (filters) => api.get('/estadisticas/preventivos', { params: buildParams(filters) });
+export const getEstadisticasCorrectivos = (filters) => api.get('/estadisticas/correctivos', { params: buildParams(filters) });
+export const getEstadisticasRubros = (filters) => api.get('/estadisticas/rubros', { params: buildParams(filters) });
+export const getEstadisticasZonas = (filters) => api.get('/estadisticas/zonas', { params: buildParams(filters) });
+export const getEstadisticasSucursales = (filters) => api.get('/estadisticas/sucursales', { params: buildParams(filters) });
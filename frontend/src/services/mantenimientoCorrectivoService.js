@@ -23,6 +23,17 @@ export const getMantenimientosCorrectivos = async () => {
   };
 };
 
+export const getMantenimientosCorrectivosPaginados = async (params = {}) => {
+  const response = await api.get('/mantenimientos-correctivos/paginado', { params });
+  return {
+    ...response,
+    data: {
+      items: (response.data?.items || []).map(normalizeCorrectivo),
+      next_cursor: response.data?.next_cursor ?? null,
+    },
+  };
+};
+
 export const getMantenimientoCorrectivo = async (id) => {
   const response = await api.get(`/mantenimientos-correctivos/${id}`);
   return {
@@ -23,6 +23,17 @@ export const getMantenimientosPreventivos = async () => {
   };
 };
 
+export const getMantenimientosPreventivosPaginados = async (params = {}) => {
+  const response = await api.get('/mantenimientos-preventivos/paginado', { params });
+  return {
+    ...response,
+    data: {
+      items: (response.data?.items || []).map(normalizePreventivo),
+      next_cursor: response.data?.next_cursor ?? null,
+    },
+  };
+};
+
 export const getMantenimientoPreventivo = async (id) => {
   const response = await api.get(`/mantenimientos-preventivos/${id}`);
   return {
@@ -53,6 +53,15 @@ describe('PhotoSection', () => {
     expect(screen.queryByText('No hay fotos cargadas.')).toBeNull();
   });
 
+  it('debería usar la miniatura en la grilla y el tamaño web en el modal', async () => {
+    const variantes = [{ url: '/fotos/a.jpg', thumbnail: '/fotos_thumb/a.jpg', web: '/fotos_web/a.jpg' }];
+    setup({ fotos: ['/fotos/a.jpg'], variantes });
+
+    expect(screen.getByAltText('Foto 1')).toHaveAttribute('src', '/fotos_thumb/a.jpg');
+    fireEvent.click(screen.getByAltText('Foto 1'));
+    expect(await screen.findByAltText('Full size')).toHaveAttribute('src', '/fotos_web/a.jpg');
+  });
+
   it('debería permitir al usuario seleccionar archivos, llamar a onUpload y mostrar previsualizaciones', async () => {
     setup();
     
@@ -1,7 +1,7 @@
 import { renderHook, act } from '@testing-library/react';
 import { describe, it, expect, vi, beforeEach, afterEach } from 'vitest';
 
-import useChat from '../../src/hooks/mantenimientos/useChat';
+import useChat, { CHAT_PAGE_SIZE } from '../../src/hooks/mantenimientos/useChat';
 import * as chatWs from '../../src/services/chatWs';
 
 // Simulo el servicio de WebSocket.
@@ -70,4 +70,68 @@ describe('Hook: useChat', () => {
         // Verifico que se haya llamado a la función de limpieza para cerrar la conexión.
         expect(mockSocket.close).toHaveBeenCalledTimes(1);
     });
-});
\ No newline at end of file
+
+    it('Debería cargar la última página y pedir las anteriores con el cursor before', async () => {
+        vi.mocked(chatWs.subscribeToChat).mockReturnValue({ close: vi.fn() });
+        const pagina = Array.from({ length: CHAT_PAGE_SIZE }, (_, i) => ({ id: i + 11 }));
+        const getChat = vi.fn()
+            .mockResolvedValueOnce({ data: pagina })
+            .mockResolvedValueOnce({ data: [{ id: 10 }] });
+        const setMensajes = vi.fn();
+
+        const { result, rerender } = renderHook(
+            ({ mensajes }) => useChat('chat-123', setMensajes, { mensajes, getChat }),
+            { initialProps: { mensajes: [] } }
+        );
+
+        await act(async () => {
+            await result.current.cargarMensajes('chat-123');
+        });
+        expect(getChat).toHaveBeenCalledWith('chat-123', { limit: CHAT_PAGE_SIZE });
+        expect(setMensajes).toHaveBeenCalledWith(pagina);
+        // Una página llena indica que puede haber más historial.
+        expect(result.current.hayAnteriores).toBe(true);
+
+        rerender({ mensajes: pagina });
+        await act(async () => {
+            await result.current.cargarAnteriores();
+        });
+        expect(getChat).toHaveBeenLastCalledWith('chat-123', { before: 11, limit: CHAT_PAGE_SIZE });
+        const updater = setMensajes.mock.calls[setMensajes.mock.calls.length - 1][0];
+        expect(updater(pagina)).toEqual([{ id: 10 }, ...pagina]);
+        expect(result.current.hayAnteriores).toBe(false);
+    });
+
+    it('Debería pedir solo los mensajes nuevos con since_id al reconectar', async () => {
+        const sockets = [];
+        vi.mocked(chatWs.subscribeToChat).mockImplementation(() => {
+            const socket = { close: vi.fn(), onopen: null, onclose: null, onerror: null };
+            sockets.push(socket);
+            return socket;
+        });
+        const getChat = vi.fn().mockResolvedValue({ data: [{ id: 2 }, { id: 3 }] });
+        const setMensajes = vi.fn();
+        const mensajes = [{ id: 1 }, { id: 2 }];
+
+        renderHook(() => useChat('chat-123', setMensajes, { mensajes, getChat }));
+
+        // La primera apertura no pide nada: la carga inicial la hace cargarMensajes.
+        act(() => sockets[0].onopen());
+        expect(getChat).not.toHaveBeenCalled();
+
+        // Se cae la conexión y a los 5 segundos se reconecta.
+        act(() => sockets[0].onclose());
+        act(() => {
+            vi.advanceTimersByTime(5000);
+        });
+        expect(sockets).toHaveLength(2);
+
+        await act(async () => {
+            sockets[1].onopen();
+        });
+        expect(getChat).toHaveBeenCalledWith('chat-123', { since_id: 2, limit: CHAT_PAGE_SIZE });
+        // Los mensajes que ya estaban (por ejemplo, recibidos por el socket) no se duplican.
+        const updater = setMensajes.mock.calls[0][0];
+        expect(updater(mensajes)).toEqual([{ id: 1 }, { id: 2 }, { id: 3 }]);
+    });
+});
@@ -38,7 +38,7 @@ describe('Hook: useCorrectivo', () => {
         // Configuro las respuestas por defecto de los servicios y hooks simulados.
         vi.spyOn(useAuthRoles, 'useAuthRoles').mockReturnValue({ id: 1, uid: 'user-uid', nombre: 'Test User', isUser: true, isCuadrilla: false });
         vi.spyOn(useIsMobile, 'default').mockReturnValue(false);
-        vi.spyOn(useChat, 'default').mockReturnValue({ chatBoxRef: { current: null }, scrollToBottom: vi.fn() });
+        vi.spyOn(useChat, 'default').mockReturnValue({ chatBoxRef: { current: null }, scrollToBottom: vi.fn(), cargarMensajes: vi.fn() });
 
         vi.mocked(mantenimientoCorrectivoService.getMantenimientoCorrectivo).mockResolvedValue({ data: mockMantenimiento });
         vi.mocked(sucursalService.getSucursales).mockResolvedValue({ data: mockSucursales });
@@ -63,7 +63,9 @@ describe('Hook: useCorrectivo', () => {
         expect(mantenimientoCorrectivoService.getMantenimientoCorrectivo).toHaveBeenCalledWith('m1');
         expect(sucursalService.getSucursales).toHaveBeenCalled();
         expect(cuadrillaService.getCuadrillas).toHaveBeenCalled();
-        expect(chatsService.getChatCorrectivo).toHaveBeenCalledWith('m1');
+        // La paginación del chat vive en useChat: recibe el servicio y carga la última página.
+        expect(useChat.default).toHaveBeenCalledWith(undefined, expect.any(Function), { mensajes: [], getChat: chatsService.getChatCorrectivo });
+        expect(vi.mocked(useChat.default).mock.results[0].value.cargarMensajes).toHaveBeenCalledWith('m1');
 
         // Verifico que los datos se hayan guardado en el estado.
         expect(result.current.mantenimiento).toEqual(mockMantenimiento);
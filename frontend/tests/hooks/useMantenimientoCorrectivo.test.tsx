@@ -33,7 +33,9 @@ describe('Hook: useMantenimientoCorrectivo', () => {
 
   beforeEach(() => {
     vi.clearAllMocks();
-    vi.mocked(mantenimientoCorrectivoService.getMantenimientosCorrectivos).mockResolvedValue({ data: mockMantenimientos });
+    vi.mocked(mantenimientoCorrectivoService.getMantenimientosCorrectivosPaginados).mockResolvedValue({
+      data: { items: mockMantenimientos, next_cursor: null },
+    });
     vi.mocked(sucursalService.getSucursales).mockResolvedValue({ data: mockSucursales });
     vi.mocked(cuadrillaService.getCuadrillas).mockResolvedValue({ data: mockCuadrillas });
     vi.mocked(zonaService.getZonas).mockResolvedValue({ data: mockZonas });
@@ -43,7 +45,7 @@ describe('Hook: useMantenimientoCorrectivo', () => {
   });
 
   const waitForLoad = async () => {
-    await waitFor(() => expect(mantenimientoCorrectivoService.getMantenimientosCorrectivos).toHaveBeenCalled());
+    await waitFor(() => expect(mantenimientoCorrectivoService.getMantenimientosCorrectivosPaginados).toHaveBeenCalled());
   };
 
   it('Deber�a cargar todos los datos iniciales para un usuario/admin', async () => {
@@ -60,10 +62,14 @@ describe('Hook: useMantenimientoCorrectivo', () => {
 
   it('Deber�a filtrar los mantenimientos para un usuario cuadrilla', async () => {
     vi.spyOn(useAuthRoles, 'useAuthRoles').mockReturnValue({ id: 1, isUser: false, isCuadrilla: true });
+    vi.mocked(mantenimientoCorrectivoService.getMantenimientosCorrectivosPaginados).mockResolvedValue({
+      data: { items: mockMantenimientos.filter(m => m.id_cuadrilla === 1), next_cursor: null },
+    });
     const { result } = renderHook(() => useMantenimientoCorrectivo());
 
     await waitFor(() => expect(result.current.isLoading).toBe(false));
-    
+
+    expect(mantenimientoCorrectivoService.getMantenimientosCorrectivosPaginados).toHaveBeenCalledWith({ id_cuadrilla: 1 });
     expect(result.current.filteredMantenimientos).toHaveLength(1);
     expect(result.current.filteredMantenimientos[0].id).toBe(1);
   });
@@ -74,14 +80,36 @@ describe('Hook: useMantenimientoCorrectivo', () => {
     await waitForLoad();
     await waitFor(() => expect(result.current.isLoading).toBe(false));
 
-    act(() => {
+    vi.mocked(mantenimientoCorrectivoService.getMantenimientosCorrectivosPaginados).mockResolvedValueOnce({
+      data: { items: [mockMantenimientos[1]], next_cursor: null },
+    });
+    await act(async () => {
       result.current.handleFilterChange({ target: { name: 'estado', value: 'En Progreso' } } as any);
     });
 
+    expect(mantenimientoCorrectivoService.getMantenimientosCorrectivosPaginados).toHaveBeenLastCalledWith({ estado: 'En Progreso' });
     expect(result.current.filteredMantenimientos).toHaveLength(1);
     expect(result.current.filteredMantenimientos[0].estado).toBe('En Progreso');
   });
 
+  it('Debería cargar la página siguiente con el cursor', async () => {
+    vi.spyOn(useAuthRoles, 'useAuthRoles').mockReturnValue({ isUser: true, isCuadrilla: false });
+    vi.mocked(mantenimientoCorrectivoService.getMantenimientosCorrectivosPaginados)
+      .mockResolvedValueOnce({ data: { items: mockMantenimientos.slice(0, 2), next_cursor: 'c1' } })
+      .mockResolvedValueOnce({ data: { items: mockMantenimientos.slice(2), next_cursor: null } });
+    const { result } = renderHook(() => useMantenimientoCorrectivo());
+    await waitFor(() => expect(result.current.isLoading).toBe(false));
+    expect(result.current.hasMore).toBe(true);
+
+    await act(async () => {
+      await result.current.loadMore();
+    });
+
+    expect(mantenimientoCorrectivoService.getMantenimientosCorrectivosPaginados).toHaveBeenLastCalledWith({ cursor: 'c1' });
+    expect(result.current.filteredMantenimientos).toHaveLength(3);
+    expect(result.current.hasMore).toBe(false);
+  });
+
   it('Deber�a llamar a deleteMantenimientoCorrectivo y recargar los datos', async () => {
     const confirmSpy = vi.spyOn(window, 'confirm').mockReturnValue(true);
     vi.spyOn(useAuthRoles, 'useAuthRoles').mockReturnValue({ isUser: true, isCuadrilla: false });
@@ -93,7 +121,7 @@ describe('Hook: useMantenimientoCorrectivo', () => {
     });
 
     expect(mantenimientoCorrectivoService.deleteMantenimientoCorrectivo).toHaveBeenCalledWith(1);
-    expect(mantenimientoCorrectivoService.getMantenimientosCorrectivos).toHaveBeenCalledTimes(2);
+    expect(mantenimientoCorrectivoService.getMantenimientosCorrectivosPaginados).toHaveBeenCalledTimes(2);
     confirmSpy.mockRestore();
   });
 
@@ -33,7 +33,9 @@ describe('Hook: useMantenimientoPreventivo', () => {
 
   beforeEach(() => {
     vi.clearAllMocks();
-    vi.mocked(mantenimientoPreventivoService.getMantenimientosPreventivos).mockResolvedValue({ data: mockMantenimientos });
+    vi.mocked(mantenimientoPreventivoService.getMantenimientosPreventivosPaginados).mockResolvedValue({
+      data: { items: mockMantenimientos, next_cursor: null },
+    });
     vi.mocked(sucursalService.getSucursales).mockResolvedValue({ data: mockSucursales });
     vi.mocked(cuadrillaService.getCuadrillas).mockResolvedValue({ data: mockCuadrillas });
     vi.mocked(zonaService.getZonas).mockResolvedValue({ data: mockZonas });
@@ -55,10 +57,14 @@ describe('Hook: useMantenimientoPreventivo', () => {
 
   it('Deber�a filtrar los mantenimientos para una cuadrilla (solo abiertos)', async () => {
     vi.spyOn(useAuthRoles, 'useAuthRoles').mockReturnValue({ id: 1, isUser: false, isCuadrilla: true });
+    vi.mocked(mantenimientoPreventivoService.getMantenimientosPreventivosPaginados).mockResolvedValue({
+      data: { items: mockMantenimientos.filter(m => m.id_cuadrilla === 1), next_cursor: null },
+    });
     const { result } = renderHook(() => useMantenimientoPreventivo());
 
     await waitFor(() => expect(result.current.isLoading).toBe(false));
-    
+
+    expect(mantenimientoPreventivoService.getMantenimientosPreventivosPaginados).toHaveBeenCalledWith({ id_cuadrilla: 1 });
     expect(result.current.filteredMantenimientos).toHaveLength(1);
     expect(result.current.filteredMantenimientos[0].id).toBe(1);
   });
@@ -68,10 +74,15 @@ describe('Hook: useMantenimientoPreventivo', () => {
     const { result } = renderHook(() => useMantenimientoPreventivo());
     await waitFor(() => expect(result.current.isLoading).toBe(false));
 
-    act(() => {
+    vi.mocked(mantenimientoPreventivoService.getMantenimientosPreventivosPaginados).mockResolvedValueOnce({
+      data: { items: [mockMantenimientos[1]], next_cursor: null },
+    });
+    await act(async () => {
       result.current.handleFilterChange({ target: { name: 'cuadrilla', value: '2' } } as any);
     });
 
+    expect(mantenimientoPreventivoService.getMantenimientosPreventivosPaginados).toHaveBeenLastCalledWith({ id_cuadrilla: '2' });
+
     expect(result.current.filteredMantenimientos).toHaveLength(1);
     expect(result.current.filteredMantenimientos[0].id_cuadrilla).toBe(2);
   });
@@ -87,7 +98,7 @@ describe('Hook: useMantenimientoPreventivo', () => {
     });
 
     expect(mantenimientoPreventivoService.deleteMantenimientoPreventivo).toHaveBeenCalledWith(1);
-    expect(mantenimientoPreventivoService.getMantenimientosPreventivos).toHaveBeenCalledTimes(2);
+    expect(mantenimientoPreventivoService.getMantenimientosPreventivosPaginados).toHaveBeenCalledTimes(2);
     confirmSpy.mockRestore();
   });
 
@@ -52,6 +52,7 @@ describe('Hook: usePreventivo', () => {
     vi.spyOn(useChat, 'default').mockReturnValue({
       chatBoxRef: { current: null },
       scrollToBottom: vi.fn(),
+      cargarMensajes: vi.fn(),
     });
 
     // Servicios (defaults)
@@ -85,7 +86,9 @@ describe('Hook: usePreventivo', () => {
       .toHaveBeenCalledWith('p1');
     expect(sucursalService.getSucursales).toHaveBeenCalled();
     expect(cuadrillaService.getCuadrillas).toHaveBeenCalled();
-    expect(chatsService.getChatPreventivo).toHaveBeenCalledWith('p1');
+    // La paginación del chat vive en useChat: recibe el servicio y carga la última página
+    expect(useChat.default).toHaveBeenCalledWith(undefined, expect.any(Function), { mensajes: [], getChat: chatsService.getChatPreventivo });
+    expect(vi.mocked(useChat.default).mock.results[0].value.cargarMensajes).toHaveBeenCalledWith('p1');
 
     // Estado poblado
     expect(result.current.mantenimiento).toEqual(baseMantenimiento);
@@ -44,6 +44,9 @@ describe('Página MantenimientosCorrectivos', () => {
         selectedMantenimiento: null,
         filters: { cuadrilla: '', sucursal: '', zona: '', rubro: '', estado: '', prioridad: '', sortByDate: 'desc' },
         isLoading: false,
+        isLoadingMore: false,
+        hasMore: false,
+        loadMore: vi.fn(),
         isUser: true, // Por defecto, pruebo la vista de administrador/usuario.
         handleFilterChange: vi.fn(),
         handleDelete: vi.fn(),
@@ -119,6 +122,20 @@ describe('Página MantenimientosCorrectivos', () => {
         expect(filterButton).toHaveAttribute('aria-expanded', 'false');
     });
 
+    // Test para la paginación: el botón solo aparece si el backend devolvió un cursor.
+    it('Debería mostrar "Cargar más" cuando hay más páginas y llamar a loadMore', () => {
+        const loadMore = vi.fn();
+        vi.mocked(useMantenimientoCorrectivo).mockReturnValue({ ...mockUseCorrectivoReturn, hasMore: true, loadMore });
+        renderPage();
+        fireEvent.click(screen.getByRole('button', { name: /Cargar más/i }));
+        expect(loadMore).toHaveBeenCalled();
+    });
+
+    it('NO debería mostrar "Cargar más" en la última página', () => {
+        renderPage();
+        expect(screen.queryByRole('button', { name: /Cargar más/i })).toBeNull();
+    });
+
     // Test para la visibilidad del formulario.
     it('Debería mostrar el formulario cuando showForm es true', () => {
         // Simulo el estado en el que el formulario debe ser visible.
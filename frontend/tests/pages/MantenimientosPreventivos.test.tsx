@@ -43,6 +43,9 @@ describe('Página MantenimientosPreventivos', () => {
         selectedMantenimiento: null,
         filters: { cuadrilla: '', sucursal: '', zona: '', sortByDate: 'desc' },
         isLoading: false,
+        isLoadingMore: false,
+        hasMore: false,
+        loadMore: vi.fn(),
         isUser: true, // Por defecto, pruebo como usuario/admin.
         handleFilterChange: vi.fn(),
         handleDelete: vi.fn(),